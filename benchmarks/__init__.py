@@ -0,0 +1,9 @@
+"""
+Benchmarks del sistema de análisis de coples
+Modelos ONNX sintéticos y fuente de captura sin cámara para medir el pipeline en CI
+"""
+
+from .synthetic_models import generar_modelos_sinteticos
+from .synthetic_source import FuenteCapturaSintetica
+
+__all__ = ['generar_modelos_sinteticos', 'FuenteCapturaSintetica']
@@ -0,0 +1,236 @@
+"""
+Autoajuste de perfiles de sesión ONNX Runtime en la CPU local
+Mide cada modelo con perfiles candidatos (hilos, modo de ejecución, nivel de optimización,
+patrón de memoria, espera activa) y guarda el más rápido en el archivo de perfiles
+(SesionConfig.ARCHIVO_PERFILES, por defecto <MODELS_DIR>/perfiles_sesion.json), que el registro
+de sesiones aplica en la siguiente carga.
+
+La búsqueda es por coordenadas: parte del perfil actual del modelo y prueba cada opción por separado,
+conservando el mejor valor antes de pasar a la siguiente (unas 12 mediciones por modelo en vez de la
+rejilla completa).
+
+Con PipelineConfig.EJECUCION_CONCURRENTE cada modelo se mide bajo el presupuesto de hilos que el
+planificador asigna a su etapa (no se prueban más hilos intra-op que ese presupuesto). Los hilos
+ajustados tienen prioridad sobre el presupuesto al cargar la sesión (ver resolver_perfil).
+
+Uso:
+    python benchmarks/autotune_sessions.py
+    python benchmarks/autotune_sessions.py --modelos CopleSegDef1C8V.onnx --iteraciones 30 --no-guardar
+    python benchmarks/autotune_sessions.py --sinteticos --salida autoajuste.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Agregar path para imports
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.synthetic_models import MODELOS
+from config import ModelsConfig, PipelineConfig
+from modules.stage_scheduler import PlanificadorEtapas
+from modules.session_profiles import crear_opciones_sesion, describir_perfil, guardar_perfil, resolver_perfil
+from modules.session_registry import es_archivo_variante, ruta_variante
+
+MEJORA_MINIMA = 0.03  # Un candidato reemplaza al mejor solo si es al menos 3% más rápido (ruido)
+
+
+def opciones_candidatas(nucleos: int) -> Dict[str, List]:
+    """Valores a probar por clave de perfil, en el orden en que se recorren."""
+    hilos = sorted({1, 2, max(1, nucleos // 2), nucleos} - {0})
+    return {
+        "intra_op_threads": [h for h in hilos if h <= nucleos],
+        "modo_ejecucion": ["secuencial", "paralelo"],
+        "nivel_optimizacion": ["extendido", "todo"],
+        "patron_memoria": [True, False],
+        "espera_activa": [True, False]
+    }
+
+
+def presupuesto_por_modelo(nucleos: int) -> Dict[str, int]:
+    """
+    Hilos intra-op que el planificador asigna a cada modelo en ejecución concurrente
+    ({} en modo secuencial, donde cada modelo dispone de todos los núcleos).
+    """
+    if not PipelineConfig.EJECUCION_CONCURRENTE:
+        return {}
+    presupuesto = PlanificadorEtapas.calcular_presupuesto_hilos(
+        PipelineConfig.PESOS_ETAPAS, PipelineConfig.NUCLEOS_DISPONIBLES or nucleos
+    )
+    return {modelo: presupuesto[etapa] for etapa, modelo in MODELOS.items() if etapa in presupuesto}
+
+
+def medir_perfil(ruta: str, perfil: Dict, iteraciones: int, calentamiento: int) -> Optional[float]:
+    """
+    p50 (ms) de una inferencia del modelo con el perfil indicado (None si el perfil no es válido).
+
+    La sesión se crea directamente (sin registro ni caché) para que cada candidato parta de cero.
+    """
+    import onnxruntime as ort
+
+    try:
+        sesion = ort.InferenceSession(ruta, sess_options=crear_opciones_sesion(perfil),
+                                      providers=perfil["proveedores"])
+    except Exception as e:
+        print(f"   ⚠️ Perfil no válido ({describir_perfil(perfil)}): {e}")
+        return None
+
+    rng = np.random.default_rng(0)
+    entradas = {
+        entrada.name: rng.random([d if isinstance(d, int) and d > 0 else 1 for d in entrada.shape],
+                                 dtype=np.float32)
+        for entrada in sesion.get_inputs()
+    }
+    for _ in range(calentamiento):
+        sesion.run(None, entradas)
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        sesion.run(None, entradas)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.median(tiempos))
+
+
+def ajustar_modelo(ruta: str, nucleos: int, iteraciones: int, calentamiento: int,
+                   presupuesto: Optional[int] = None) -> Dict:
+    """
+    Búsqueda por coordenadas del mejor perfil de un modelo.
+
+    Se mide la variante configurada (ModelsConfig.VARIANTE_MODELO); el perfil es el del modelo original.
+
+    Args:
+        presupuesto (int, optional): Hilos intra-op que el planificador asigna al modelo; el perfil
+            inicial se resuelve con él y no se prueban más hilos
+
+    Returns:
+        Dict: perfil inicial y mejor, sus p50 y todas las mediciones
+    """
+    inicial = resolver_perfil(ruta, intra_op_threads=presupuesto)
+    ruta = ruta_variante(ruta)
+    p50_inicial = medir_perfil(ruta, inicial, iteraciones, calentamiento)
+    if p50_inicial is None:
+        raise RuntimeError(f"el perfil actual de {os.path.basename(ruta)} no es válido")
+    print(f"   {'perfil actual':<32} {p50_inicial:8.2f} ms  ({describir_perfil(inicial)})")
+
+    mejor, p50_mejor = dict(inicial), p50_inicial
+    mediciones = [{"perfil": dict(inicial), "p50_ms": round(p50_inicial, 3)}]
+    for clave, valores in opciones_candidatas(presupuesto or nucleos).items():
+        for valor in valores:
+            if mejor.get(clave) == valor:
+                continue
+            candidato = dict(mejor, **{clave: valor})
+            if candidato["modo_ejecucion"] == "paralelo" and not candidato.get("inter_op_threads"):
+                candidato["inter_op_threads"] = min(2, nucleos)
+            p50 = medir_perfil(ruta, candidato, iteraciones, calentamiento)
+            if p50 is None:
+                continue
+            mediciones.append({"perfil": candidato, "p50_ms": round(p50, 3)})
+            marca = ""
+            if p50 < p50_mejor * (1 - MEJORA_MINIMA):
+                mejor, p50_mejor, marca = candidato, p50, "  ⭐"
+            print(f"   {f'{clave}={valor}':<32} {p50:8.2f} ms{marca}")
+
+    return {
+        "perfil_inicial": inicial,
+        "p50_inicial_ms": round(p50_inicial, 3),
+        "perfil": mejor,
+        "p50_ms": round(p50_mejor, 3),
+        "mejora": round(1 - p50_mejor / p50_inicial, 3),
+        "mediciones": mediciones
+    }
+
+
+def _argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Autoajuste de perfiles de sesión ONNX Runtime")
+    parser.add_argument("--modelos", default=None,
+                        help="Modelos a ajustar separados por coma (por defecto todos los .onnx de MODELS_DIR)")
+    parser.add_argument("--directorio", default=None, help="Directorio de modelos (por defecto ModelsConfig.MODELS_DIR)")
+    parser.add_argument("--sinteticos", action="store_true",
+                        help="Ajustar modelos sintéticos (benchmarks/synthetic_models.py) en un directorio temporal")
+    parser.add_argument("--nucleos", type=int, default=None, help="Núcleos a considerar (por defecto os.cpu_count())")
+    parser.add_argument("--iteraciones", type=int, default=20, help="Inferencias medidas por candidato")
+    parser.add_argument("--calentamiento", type=int, default=3, help="Inferencias de calentamiento por candidato")
+    parser.add_argument("--no-guardar", action="store_true", help="Solo reportar, sin escribir el archivo de perfiles")
+    parser.add_argument("--archivo", default=None,
+                        help="Archivo de perfiles a escribir (por defecto SesionConfig.ARCHIVO_PERFILES; "
+                             "con --sinteticos solo se guarda si se indica)")
+    parser.add_argument("--salida", default=None, help="Guardar todas las mediciones en JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    nucleos = args.nucleos or os.cpu_count() or 1
+    guardar = not args.no_guardar and (args.archivo or not args.sinteticos)
+
+    with tempfile.TemporaryDirectory(prefix="autoajuste_coples_") as temporal:
+        if args.sinteticos:
+            from benchmarks.synthetic_models import generar_modelos_sinteticos
+            generar_modelos_sinteticos(temporal, directorio_clases=os.path.join(RAIZ, ModelsConfig.MODELS_DIR))
+            ModelsConfig.MODELS_DIR = temporal
+        elif args.directorio:
+            ModelsConfig.MODELS_DIR = args.directorio
+
+        directorio = ModelsConfig.MODELS_DIR
+        if args.modelos:
+            nombres = [nombre.strip() for nombre in args.modelos.split(",") if nombre.strip()]
+        else:
+            nombres = sorted(n for n in os.listdir(directorio)
+                             if n.endswith(".onnx") and not n.endswith(".opt.onnx") and not es_archivo_variante(n))
+        if not nombres:
+            print(f"❌ No hay modelos .onnx en {directorio}")
+            return 1
+
+        print(f"🔧 Autoajuste de sesiones en {directorio} ({nucleos} núcleos, {args.iteraciones} iteraciones)")
+        presupuestos = presupuesto_por_modelo(nucleos)
+        if presupuestos:
+            print(f"🧵 Ejecución concurrente: cada modelo se mide con a lo sumo los hilos intra-op que el "
+                  f"planificador asigna a su etapa {presupuestos}; los hilos ajustados reemplazan a ese presupuesto")
+        else:
+            print("🧵 Ejecución secuencial: los hilos ajustados se aplican tal cual")
+        informe = {"fecha": time.strftime("%Y-%m-%dT%H:%M:%S"), "nucleos": nucleos,
+                   "presupuesto_hilos": presupuestos, "modelos": {}}
+        for nombre in nombres:
+            ruta = os.path.join(directorio, nombre)
+            if not os.path.exists(ruta):
+                print(f"⚠️ Modelo no encontrado, se omite: {ruta}")
+                continue
+            print(f"🧠 {nombre}")
+            try:
+                resultado = ajustar_modelo(ruta, nucleos, args.iteraciones, args.calentamiento,
+                                           presupuestos.get(nombre))
+            except Exception as e:
+                print(f"   ❌ {e}")
+                continue
+            informe["modelos"][nombre] = resultado
+            print(f"   ✅ mejor {resultado['p50_ms']:.2f} ms ({resultado['mejora']:+.0%}): "
+                  f"{describir_perfil(resultado['perfil'])}")
+
+            if guardar:
+                archivo = guardar_perfil(nombre, resultado["perfil"], ruta=args.archivo, medicion={
+                    "fecha": informe["fecha"],
+                    "nucleos": nucleos,
+                    "presupuesto_hilos": presupuestos.get(nombre),
+                    "p50_ms": resultado["p50_ms"],
+                    "p50_inicial_ms": resultado["p50_inicial_ms"]
+                })
+
+        if guardar and informe["modelos"]:
+            print(f"💾 Perfiles guardados en {archivo}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"💾 Mediciones guardadas en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
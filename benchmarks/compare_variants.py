@@ -0,0 +1,294 @@
+"""
+Comparación de variantes FP32 e INT8 sobre un conjunto de replay
+Ejecuta los cinco motores con cada variante sobre los mismos frames y reporta la ganancia de
+latencia junto con la concordancia de INT8 respecto a FP32 (clase, cajas, máscaras y decisiones).
+
+Uso:
+    python benchmarks/compare_variants.py Salida_cople --salida comparacion.json
+    python benchmarks/compare_variants.py turno.frames --limite 300 --max-discrepancias 0.01
+    python benchmarks/compare_variants.py --sinteticos      # Modelos sintéticos cuantizados al vuelo
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Agregar path para imports
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+from config import ModelsConfig, RobustezConfig
+
+IOU_COINCIDENCIA = 0.5   # IoU mínimo para considerar la misma detección en ambas variantes
+CLASES_RECHAZO = ("Rechazado",)
+METODOS = {
+    "clasificacion": "clasificar",
+    "deteccion_piezas": "detectar_piezas",
+    "deteccion_defectos": "detectar_defectos",
+    "segmentacion_defectos": "segmentar_defectos",
+    "segmentacion_piezas": "segmentar"
+}
+
+
+def _iou_cajas(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Matriz IoU (N, M) entre cajas xyxy."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    interseccion = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return interseccion / np.maximum(area_a[:, None] + area_b[None, :] - interseccion, 1e-9)
+
+
+def emparejar(referencia: List[Dict], candidata: List[Dict]) -> List[tuple]:
+    """Emparejamiento greedy por IoU (misma clase, IoU >= IOU_COINCIDENCIA); retorna pares (i, j, iou)."""
+    cajas = lambda ds: np.array([[d["bbox"]["x1"], d["bbox"]["y1"], d["bbox"]["x2"], d["bbox"]["y2"]]
+                                 for d in ds], dtype=np.float64).reshape(-1, 4)
+    ious = _iou_cajas(cajas(referencia), cajas(candidata))
+    pares, usados_i, usados_j = [], set(), set()
+    for indice in np.argsort(-ious, axis=None):
+        i, j = np.unravel_index(indice, ious.shape)
+        if ious[i, j] < IOU_COINCIDENCIA:
+            break
+        if i in usados_i or j in usados_j or referencia[i]["clase"] != candidata[j]["clase"]:
+            continue
+        pares.append((int(i), int(j), float(ious[i, j])))
+        usados_i.add(i)
+        usados_j.add(j)
+    return pares
+
+
+def _instanciar(analisis: List[str]) -> Dict[str, object]:
+    """Motores de la variante configurada con los umbrales que aplica el sistema al iniciar."""
+    from benchmarks.run_benchmarks import _instanciar_motores
+    from modules.session_registry import obtener_registro
+
+    obtener_registro().liberar()
+    motores = {etapa: motor for etapa, motor in _instanciar_motores().items() if etapa in analisis}
+    umbrales = RobustezConfig.CONFIGURACION_DEFAULT
+    for etapa in ("deteccion_piezas", "deteccion_defectos"):
+        if etapa in motores:
+            motores[etapa].actualizar_umbrales(confianza_min=umbrales["confianza_min"],
+                                               iou_threshold=umbrales["iou_threshold"])
+    return motores
+
+
+def ejecutar_variante(variante: str, frames: List[np.ndarray], analisis: List[str],
+                      calentamiento: int = 2) -> Dict[str, Dict]:
+    """
+    Ejecuta los análisis con una variante sobre todos los frames.
+
+    Returns:
+        Dict: etapa -> {"resultados": [...por frame], "tiempos_ms": [...], "archivo": modelo cargado}
+    """
+    from modules.session_registry import obtener_registro
+
+    ModelsConfig.VARIANTE_MODELO = variante
+    with contextlib.redirect_stdout(io.StringIO()):
+        motores = _instanciar(analisis)
+    archivos = {stats.get("archivo") for stats in obtener_registro().obtener_estadisticas().values()}
+
+    salida = {}
+    for etapa, motor in motores.items():
+        metodo = getattr(motor, METODOS[etapa])
+        with contextlib.redirect_stdout(io.StringIO()):
+            for frame in frames[:calentamiento]:
+                metodo(frame)
+            resultados, tiempos = [], []
+            for frame in frames:
+                inicio = time.perf_counter()
+                resultados.append(metodo(frame))
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        salida[etapa] = {"resultados": resultados, "tiempos_ms": tiempos}
+    salida["_archivos"] = sorted(a for a in archivos if a)
+    return salida
+
+
+def comparar(fp32: Dict, int8: Dict, ids: List[str]) -> Dict:
+    """Latencia y concordancia por etapa más las discrepancias de decisión por frame."""
+    informe = {"etapas": {}}
+    for etapa in METODOS:
+        if etapa not in fp32:
+            continue
+        p50_fp32 = float(np.median(fp32[etapa]["tiempos_ms"]))
+        p50_int8 = float(np.median(int8[etapa]["tiempos_ms"]))
+        datos = {
+            "p50_fp32_ms": round(p50_fp32, 3),
+            "p50_int8_ms": round(p50_int8, 3),
+            "aceleracion": round(p50_fp32 / max(p50_int8, 1e-9), 3)
+        }
+        referencia, candidata = fp32[etapa]["resultados"], int8[etapa]["resultados"]
+
+        if etapa == "clasificacion":
+            clases = [(r[0], c[0]) for r, c in zip(referencia, candidata)]
+            datos["concordancia_clase"] = round(float(np.mean([a == b for a, b in clases])), 4)
+            datos["diferencia_confianza_media"] = round(float(np.mean(
+                [abs(float(r[1]) - float(c[1])) for r, c in zip(referencia, candidata)]
+            )), 4)
+        else:
+            coincidencias = total_ref = total_int8 = 0
+            conteo_igual = presencia_igual = 0
+            ious_mascara = []
+            for r, c in zip(referencia, candidata):
+                pares = emparejar(r, c)
+                coincidencias += len(pares)
+                total_ref += len(r)
+                total_int8 += len(c)
+                conteo_igual += len(r) == len(c)
+                presencia_igual += bool(r) == bool(c)
+                for i, j, _ in pares:
+                    if r[i].get("mascara") is not None and c[j].get("mascara") is not None:
+                        ious_mascara.append(r[i]["mascara"].iou(c[j]["mascara"]))
+            n = max(len(referencia), 1)
+            datos.update({
+                "recall": round(coincidencias / total_ref, 4) if total_ref else 1.0,
+                "precision": round(coincidencias / total_int8, 4) if total_int8 else 1.0,
+                "concordancia_conteo": round(conteo_igual / n, 4),
+                "concordancia_presencia": round(presencia_igual / n, 4),
+                "detecciones_fp32": total_ref,
+                "detecciones_int8": total_int8
+            })
+            if ious_mascara:
+                datos["iou_mascara_media"] = round(float(np.mean(ious_mascara)), 4)
+        informe["etapas"][etapa] = datos
+
+    # Decisión de aceptación/rechazo: clase del clasificador y presencia de defectos detectados
+    discrepancias = []
+    for indice, id_frame in enumerate(ids):
+        motivos = []
+        if "clasificacion" in fp32:
+            clase_fp32 = fp32["clasificacion"]["resultados"][indice][0]
+            clase_int8 = int8["clasificacion"]["resultados"][indice][0]
+            if (clase_fp32 in CLASES_RECHAZO) != (clase_int8 in CLASES_RECHAZO):
+                motivos.append(f"clase {clase_fp32} -> {clase_int8}")
+        if "deteccion_defectos" in fp32:
+            con_defectos_fp32 = bool(fp32["deteccion_defectos"]["resultados"][indice])
+            con_defectos_int8 = bool(int8["deteccion_defectos"]["resultados"][indice])
+            if con_defectos_fp32 != con_defectos_int8:
+                motivos.append(f"defectos {con_defectos_fp32} -> {con_defectos_int8}")
+        if motivos:
+            discrepancias.append({"id": id_frame, "motivos": motivos})
+    informe["frames"] = len(ids)
+    informe["decisiones_distintas"] = len(discrepancias)
+    informe["tasa_decisiones_distintas"] = round(len(discrepancias) / max(len(ids), 1), 4)
+    informe["discrepancias"] = discrepancias[:50]
+    return informe
+
+
+def _cargar_frames(entradas: List[str], limite: int) -> tuple:
+    """Frames del conjunto de replay (mismos formatos que reinspect.py), hasta `limite`."""
+    from reinspect import cargar_imagen, enumerar_entradas
+
+    ids, frames = [], []
+    for elemento in enumerar_entradas(entradas):
+        if len(frames) >= limite:
+            break
+        try:
+            frames.append(cargar_imagen(elemento))
+            ids.append(elemento[0])
+        except Exception as e:
+            print(f"⚠️ Frame ignorado ({elemento[0]}): {e}")
+    return ids, frames
+
+
+def _argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Latencia y concordancia de INT8 frente a FP32")
+    parser.add_argument("entradas", nargs="*", help="Conjunto de replay: directorios, .zip/.tar, .frames o .npy")
+    parser.add_argument("--modelos", default=None, help="Directorio de modelos (por defecto ModelsConfig.MODELS_DIR)")
+    parser.add_argument("--analisis", default=",".join(METODOS), help="Análisis a comparar separados por coma")
+    parser.add_argument("--limite", type=int, default=200, help="Máximo de frames a comparar")
+    parser.add_argument("--sinteticos", action="store_true",
+                        help="Modelos sintéticos cuantizados al vuelo (y frames sintéticos si no hay entradas)")
+    parser.add_argument("--max-discrepancias", type=float, default=None,
+                        help="Falla (código 1) si la tasa de decisiones distintas supera este valor")
+    parser.add_argument("--salida", default=None, help="Guardar el informe en JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    analisis = [a.strip() for a in args.analisis.split(",") if a.strip() in METODOS]
+
+    with tempfile.TemporaryDirectory(prefix="variantes_coples_") as temporal:
+        if args.entradas:
+            ids, frames = _cargar_frames(args.entradas, args.limite)
+        elif args.sinteticos:
+            from benchmarks.synthetic_source import FuenteCapturaSintetica
+            frames = FuenteCapturaSintetica(num_frames=min(args.limite, 30)).frames
+            ids = [f"sintetico#{i}" for i in range(len(frames))]
+        else:
+            print("❌ Indicar el conjunto de replay (o --sinteticos)")
+            return 2
+        if not frames:
+            print("❌ No hay frames para comparar")
+            return 1
+
+        if args.sinteticos:
+            from benchmarks.synthetic_models import generar_modelos_sinteticos
+            from quantize_models import INVERTIR_CANALES, cuantizar_modelo, ruta_int8, rutas_modelos
+            generar_modelos_sinteticos(temporal, directorio_clases=os.path.join(RAIZ, ModelsConfig.MODELS_DIR))
+            ModelsConfig.MODELS_DIR = temporal
+            calibracion = os.path.join(temporal, "calibracion.npy")
+            np.save(calibracion, np.stack(frames[:20]))
+            from reinspect import enumerar_entradas
+            elementos = list(enumerar_entradas([calibracion]))
+            print("🔢 Cuantizando modelos sintéticos...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                for etapa, ruta in rutas_modelos().items():
+                    cuantizar_modelo(ruta, ruta_int8(ruta), "estatico", elementos,
+                                     invertir_canales=INVERTIR_CANALES.get(etapa, False))
+        elif args.modelos:
+            ModelsConfig.MODELS_DIR = args.modelos
+
+        print(f"⚖️ Comparando FP32 e INT8 en {len(frames)} frames ({', '.join(analisis)})...")
+        variante_original = ModelsConfig.VARIANTE_MODELO
+        try:
+            fp32 = ejecutar_variante("fp32", frames, analisis)
+            int8 = ejecutar_variante("int8", frames, analisis)
+        finally:
+            ModelsConfig.VARIANTE_MODELO = variante_original
+            from modules.session_registry import obtener_registro
+            obtener_registro().liberar()
+
+    informe = comparar(fp32, int8, ids)
+    informe["modelos_fp32"] = fp32.pop("_archivos")
+    informe["modelos_int8"] = int8.pop("_archivos")
+    informe["fecha"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    for etapa, datos in informe["etapas"].items():
+        concordancia = (f"clase {datos['concordancia_clase']:.1%}" if "concordancia_clase" in datos
+                        else f"recall {datos['recall']:.1%} precisión {datos['precision']:.1%}"
+                             + (f" IoU máscara {datos['iou_mascara_media']:.3f}" if "iou_mascara_media" in datos else ""))
+        print(f"   {etapa:<22} FP32 {datos['p50_fp32_ms']:8.2f} ms  INT8 {datos['p50_int8_ms']:8.2f} ms  "
+              f"x{datos['aceleracion']:.2f}  {concordancia}")
+    print(f"   Decisiones distintas: {informe['decisiones_distintas']} de {informe['frames']} "
+          f"({informe['tasa_decisiones_distintas']:.1%})")
+    faltantes = [m for m in informe["modelos_int8"] if not m.endswith(ModelsConfig.SUFIJOS_VARIANTE["int8"])]
+    if faltantes:
+        print(f"⚠️ Sin variante INT8 (se comparó FP32 contra sí mismo): {faltantes}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"💾 Informe guardado en {args.salida}")
+
+    if args.max_discrepancias is not None and informe["tasa_decisiones_distintas"] > args.max_discrepancias:
+        print(f"❌ Tasa de decisiones distintas por encima de {args.max_discrepancias:.1%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
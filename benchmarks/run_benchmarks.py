@@ -0,0 +1,453 @@
+"""
+Benchmark del pipeline de inspección con modelos sintéticos
+Mide cada motor y SistemaAnalisisIntegrado completo sin cámara ni modelos reales
+y escribe un JSON con latencias (p50/p95/p99), throughput, RSS pico y asignaciones.
+
+Uso:
+    python benchmarks/run_benchmarks.py --iteraciones 50 --salida benchmark.json
+    python benchmarks/run_benchmarks.py --referencia benchmark_base.json --tolerancia 0.25
+    python benchmarks/run_benchmarks.py --lote 8 --solo-motores
+    python benchmarks/run_benchmarks.py --iobinding
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Agregar path para imports
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.synthetic_models import generar_modelos_sinteticos
+from benchmarks.synthetic_source import FuenteCapturaSintetica
+from config import EnlaceIOConfig, ModelsConfig, PipelineConfig
+
+VERSION_FORMATO = 1
+ITERACIONES_ASIGNACIONES = 5  # Iteraciones medidas con tracemalloc (más lento, pasada separada)
+
+
+def _percentiles(muestras: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, media, mínimo y máximo de una lista de tiempos en ms."""
+    if not muestras:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "media": 0.0, "min": 0.0, "max": 0.0}
+    arreglo = np.asarray(muestras, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arreglo, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "media": round(float(arreglo.mean()), 3),
+        "min": round(float(arreglo.min()), 3),
+        "max": round(float(arreglo.max()), 3)
+    }
+
+
+def _rss_pico_mb() -> float:
+    """RSS máximo del proceso hasta ahora (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+
+def _medir_asignaciones(funcion: Callable[[], object], iteraciones: int) -> Dict[str, float]:
+    """
+    Asignaciones de Python/NumPy por llamada (tracemalloc no ve la memoria interna de ONNX Runtime).
+
+    Returns:
+        Dict: pico y neto por llamada en KB, y bloques asignados por llamada
+    """
+    tracemalloc.start()
+    try:
+        picos, netos, bloques = [], [], []
+        for _ in range(iteraciones):
+            antes = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            actual_antes, _ = tracemalloc.get_traced_memory()
+            funcion()
+            actual, pico = tracemalloc.get_traced_memory()
+            despues = tracemalloc.take_snapshot()
+            picos.append((pico - actual_antes) / 1024)
+            netos.append((actual - actual_antes) / 1024)
+            bloques.append(sum(max(0, d.count_diff) for d in despues.compare_to(antes, "filename")))
+    finally:
+        tracemalloc.stop()
+    return {
+        "pico_kb": round(float(np.median(picos)), 1),
+        "neto_kb": round(float(np.median(netos)), 1),
+        "bloques": int(np.median(bloques))
+    }
+
+
+@contextlib.contextmanager
+def _silenciar(activo: bool):
+    """Descarta los prints de los motores mientras se mide."""
+    if not activo:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _instanciar_motores() -> Dict[str, object]:
+    """Crea e inicializa los cinco motores; retorna etapa -> motor."""
+    from modules.classification import ClasificadorCoplesONNX
+    from modules.detection import DetectorPiezasCoples, DetectorDefectosCoples
+    from modules.segmentation import SegmentadorDefectosCoples
+    from modules.segmentation.segmentation_piezas_engine import SegmentadorPiezasCoples
+
+    clasificador = ClasificadorCoplesONNX()
+    detector_defectos = DetectorDefectosCoples()
+    segmentador_defectos = SegmentadorDefectosCoples()
+    detector_piezas = DetectorPiezasCoples()
+    segmentador_piezas = SegmentadorPiezasCoples()
+    if not (clasificador.inicializar() and detector_defectos.inicializar()
+            and segmentador_defectos._inicializar_modelo()
+            and segmentador_piezas.stats["inicializado"]):
+        raise RuntimeError("no se pudieron inicializar los motores con los modelos sintéticos")
+
+    return {
+        "clasificacion": clasificador,
+        "deteccion_piezas": detector_piezas,
+        "deteccion_defectos": detector_defectos,
+        "segmentacion_defectos": segmentador_defectos,
+        "segmentacion_piezas": segmentador_piezas
+    }
+
+
+def _crear_motores() -> Dict[str, Callable[[np.ndarray], object]]:
+    """Crea e inicializa los cinco motores; retorna etapa -> función(frame)."""
+    motores = _instanciar_motores()
+    return {
+        "clasificacion": motores["clasificacion"].clasificar,
+        "deteccion_piezas": motores["deteccion_piezas"].detectar_piezas,
+        "deteccion_defectos": motores["deteccion_defectos"].detectar_defectos,
+        "segmentacion_defectos": motores["segmentacion_defectos"].segmentar_defectos,
+        "segmentacion_piezas": motores["segmentacion_piezas"].segmentar
+    }
+
+
+def medir_lotes(fuente: FuenteCapturaSintetica, tamano_lote: int, iteraciones: int,
+                silencioso: bool) -> Dict:
+    """Throughput de los métodos *_lote frente a llamadas de a un frame con los mismos frames."""
+    with _silenciar(silencioso):
+        motores = _instanciar_motores()
+    metodos = {
+        "clasificacion": ("clasificar", "clasificar_lote"),
+        "deteccion_piezas": ("detectar_piezas", "detectar_piezas_lote"),
+        "deteccion_defectos": ("detectar_defectos", "detectar_defectos_lote"),
+        "segmentacion_defectos": ("segmentar_defectos", "segmentar_defectos_lote"),
+        "segmentacion_piezas": ("segmentar", "segmentar_lote")
+    }
+    lote = [fuente.frames[i % len(fuente.frames)] for i in range(tamano_lote)]
+
+    from modules.batch_inference import admite_lote_dinamico
+    resultados = {}
+    for etapa, (individual, por_lote) in metodos.items():
+        motor = motores[etapa]
+        uno, varios = getattr(motor, individual), getattr(motor, por_lote)
+        with _silenciar(silencioso):
+            varios(lote)  # calentamiento (ONNX Runtime prepara las formas del lote)
+            inicio = time.perf_counter()
+            for _ in range(iteraciones):
+                for frame in lote:
+                    uno(frame)
+            tiempo_secuencial = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            for _ in range(iteraciones):
+                varios(lote)
+            tiempo_lote = time.perf_counter() - inicio
+
+        frames = iteraciones * tamano_lote
+        resultados[etapa] = {
+            "lote_dinamico": admite_lote_dinamico(motor.session),
+            "fps_secuencial": round(frames / tiempo_secuencial, 2) if tiempo_secuencial > 0 else 0.0,
+            "fps_lote": round(frames / tiempo_lote, 2) if tiempo_lote > 0 else 0.0,
+            "aceleracion": round(tiempo_secuencial / tiempo_lote, 2) if tiempo_lote > 0 else 0.0
+        }
+    return resultados
+
+
+def _buffers_reservados(motor) -> int:
+    """Buffers reservados hasta ahora por un motor (preprocesamiento + salidas de inferencia)."""
+    from modules.io_binding import estadisticas_buffers
+    buffers = estadisticas_buffers(motor)
+    return sum(parte.get("asignaciones", 0) for parte in (buffers["inferencia"], buffers["preprocesamiento"]))
+
+
+def medir_motores(fuente: FuenteCapturaSintetica, iteraciones: int, calentamiento: int,
+                  silencioso: bool) -> Dict:
+    """Latencia, throughput y asignaciones de cada motor por separado."""
+    with _silenciar(silencioso):
+        motores = _crear_motores()
+
+    frames = fuente.frames
+    resultados = {}
+    for etapa, motor in motores.items():
+        latencias = []
+        salidas = None
+        with _silenciar(silencioso):
+            for i in range(calentamiento):
+                motor(frames[i % len(frames)])
+            buffers_inicio = _buffers_reservados(motor.__self__)
+            inicio_total = time.perf_counter()
+            for i in range(iteraciones):
+                inicio = time.perf_counter()
+                salida = motor(frames[i % len(frames)])
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if isinstance(salida, list):
+                    salidas = (salidas or 0) + len(salida)
+            tiempo_total = time.perf_counter() - inicio_total
+            buffers_bucle = _buffers_reservados(motor.__self__) - buffers_inicio
+            asignaciones = _medir_asignaciones(lambda: motor(frames[0]),
+                                               min(ITERACIONES_ASIGNACIONES, iteraciones))
+
+        resultados[etapa] = {
+            "latencia_ms": _percentiles(latencias),
+            "throughput_fps": round(iteraciones / tiempo_total, 2) if tiempo_total > 0 else 0.0,
+            "detecciones_promedio": round(salidas / iteraciones, 2) if salidas is not None else None,
+            "asignaciones": asignaciones,
+            "buffers_por_iteracion": round(buffers_bucle / iteraciones, 2) if iteraciones else 0.0
+        }
+    return resultados
+
+
+def medir_sistema(fuente, iteraciones: int, calentamiento: int, silencioso: bool) -> Dict:
+    """Análisis completo de SistemaAnalisisIntegrado alimentado por la fuente indicada (sintética o replay)."""
+    from modules.analysis_system import SistemaAnalisisIntegrado
+
+    with _silenciar(silencioso):
+        sistema = SistemaAnalisisIntegrado(fuente_captura=fuente)
+        if not sistema.inicializar():
+            raise RuntimeError("no se pudo inicializar SistemaAnalisisIntegrado")
+
+    try:
+        latencias, errores = [], 0
+        etapas: Dict[str, Dict[str, list]] = {}
+        with _silenciar(silencioso):
+            for _ in range(calentamiento):
+                sistema.analisis_completo()
+            if sistema.escritor:
+                sistema.escritor.vaciar()
+
+            buffers_inicio = sistema.obtener_asignaciones_buffers()["total"]
+            inicio_total = time.perf_counter()
+            for _ in range(iteraciones):
+                inicio = time.perf_counter()
+                resultados = sistema.analisis_completo()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if "error" in resultados:
+                    errores += 1
+                    continue
+                tiempos = resultados.get("tiempos", {})
+                for nombre, valores in tiempos.get("etapas", {}).items():
+                    etapa = etapas.setdefault(nombre, {"duracion_ms": [], "espera_ms": [], "omitida": []})
+                    etapa["duracion_ms"].append(valores.get("duracion_ms", 0.0))
+                    etapa["espera_ms"].append(valores.get("espera_ms", 0.0))
+                    etapa["omitida"].append(bool(valores.get("omitida", False)))
+                for nombre in ("captura_ms", "preprocesamiento_ms"):
+                    if nombre in tiempos:
+                        etapas.setdefault(nombre[:-3], {"duracion_ms": [], "espera_ms": [], "omitida": []})
+                        etapas[nombre[:-3]]["duracion_ms"].append(tiempos[nombre])
+            tiempo_bucle = time.perf_counter() - inicio_total
+            buffers_bucle = sistema.obtener_asignaciones_buffers()["total"] - buffers_inicio
+            if sistema.escritor:
+                sistema.escritor.vaciar()
+            tiempo_con_escritura = time.perf_counter() - inicio_total
+
+            asignaciones = _medir_asignaciones(sistema.analisis_completo,
+                                               min(ITERACIONES_ASIGNACIONES, iteraciones))
+            estadisticas = sistema.obtener_estadisticas()
+    finally:
+        with _silenciar(silencioso):
+            sistema.liberar()
+
+    completadas = iteraciones - errores
+    return {
+        "latencia_ms": _percentiles(latencias),
+        "piezas_por_minuto": round(completadas * 60 / tiempo_bucle, 1) if tiempo_bucle > 0 else 0.0,
+        "piezas_por_minuto_con_escritura": (round(completadas * 60 / tiempo_con_escritura, 1)
+                                            if tiempo_con_escritura > 0 else 0.0),
+        "errores": errores,
+        "etapas": {
+            nombre: {
+                "latencia_ms": _percentiles(valores["duracion_ms"]),
+                "espera_ms": _percentiles(valores["espera_ms"]),
+                "fraccion_omitida": (round(sum(valores["omitida"]) / len(valores["omitida"]), 3)
+                                     if valores["omitida"] else 0.0)
+            }
+            for nombre, valores in etapas.items()
+        },
+        "asignaciones": asignaciones,
+        "buffers_por_iteracion": round(buffers_bucle / iteraciones, 2) if iteraciones else 0.0,
+        "asignaciones_buffers": estadisticas.get("asignaciones_buffers", {}),
+        "escritor": estadisticas.get("escritor", {})
+    }
+
+
+def comparar_con_referencia(actual: Dict, referencia: Dict, tolerancia: float) -> List[str]:
+    """
+    Compara los p50 con un JSON de referencia.
+
+    Returns:
+        List[str]: Descripción de cada regresión mayor que `tolerancia` (fracción)
+    """
+    regresiones = []
+    pares = [(f"motores.{etapa}", datos, referencia.get("motores", {}).get(etapa))
+             for etapa, datos in actual.get("motores", {}).items()]
+    if "sistema" in actual:
+        pares.append(("sistema", actual["sistema"], referencia.get("sistema")))
+        pares += [(f"sistema.etapas.{etapa}", datos, referencia.get("sistema", {}).get("etapas", {}).get(etapa))
+                  for etapa, datos in actual["sistema"]["etapas"].items()]
+
+    for nombre, datos, base in pares:
+        if not base:
+            continue
+        p50, p50_base = datos["latencia_ms"]["p50"], base["latencia_ms"]["p50"]
+        if p50_base > 0 and p50 > p50_base * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p50 {p50:.2f} ms vs {p50_base:.2f} ms (+{(p50 / p50_base - 1) * 100:.0f}%)")
+    return regresiones
+
+
+def _argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline con modelos ONNX sintéticos")
+    parser.add_argument("--iteraciones", type=int, default=50, help="Iteraciones medidas por motor/sistema")
+    parser.add_argument("--calentamiento", type=int, default=5, help="Iteraciones de calentamiento")
+    parser.add_argument("--salida", default="benchmark_resultados.json", help="Archivo JSON de resultados")
+    parser.add_argument("--modelos", default=None,
+                        help="Directorio para los modelos sintéticos (por defecto uno temporal)")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de modelos y frames")
+    parser.add_argument("--objetos", type=int, default=3, help="Objetos detectados por modelo")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="Ritmo de la fuente sintética (por defecto frames bajo demanda)")
+    parser.add_argument("--replay", default=None,
+                        help="Alimentar el sistema con una captura grabada (directorio, .npy o video) vía FuenteReplay")
+    parser.add_argument("--lote", type=int, default=None,
+                        help="Medir también los métodos *_lote con este tamaño (modelos con lote dinámico)")
+    parser.add_argument("--secuencial", action="store_true", help="Ejecutar las etapas en modo secuencial")
+    parser.add_argument("--iobinding", action="store_true",
+                        help="Ejecutar los motores con IOBinding y buffers preasignados")
+    parser.add_argument("--solo-motores", action="store_true", help="No medir SistemaAnalisisIntegrado")
+    parser.add_argument("--referencia", default=None, help="JSON previo contra el que comparar p50")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="Regresión de p50 tolerada respecto a la referencia (fracción)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs de los motores")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    directorio_original = os.getcwd()
+    ruta_salida = os.path.abspath(args.salida)
+    ruta_replay = os.path.abspath(args.replay) if args.replay else None
+
+    with tempfile.TemporaryDirectory(prefix="bench_coples_") as temporal:
+        # Modelos sintéticos en lugar de Modelos/ (los .onnx reales no se versionan)
+        directorio_modelos = os.path.abspath(args.modelos or os.path.join(temporal, "Modelos"))
+        print(f"🧪 Generando modelos sintéticos en {directorio_modelos}...")
+        generar_modelos_sinteticos(directorio_modelos, semilla=args.semilla, objetos=args.objetos,
+                                   directorio_clases=os.path.join(RAIZ, ModelsConfig.MODELS_DIR),
+                                   lote_dinamico=bool(args.lote))
+        ModelsConfig.MODELS_DIR = directorio_modelos
+        if args.secuencial:
+            PipelineConfig.EJECUCION_CONCURRENTE = False
+        if args.iobinding:
+            EnlaceIOConfig.HABILITADO = True
+
+        # Las salidas del sistema (Salida_cople/) quedan en el directorio temporal
+        os.chdir(temporal)
+        try:
+            fuente = FuenteCapturaSintetica(fps=args.fps, semilla=args.semilla)
+            silencioso = not args.verbose
+
+            import onnxruntime
+            informe = {
+                "version_formato": VERSION_FORMATO,
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "plataforma": {
+                    "python": platform.python_version(),
+                    "sistema": platform.platform(),
+                    "procesador": platform.machine(),
+                    "nucleos": os.cpu_count(),
+                    "numpy": np.__version__,
+                    "onnxruntime": onnxruntime.__version__
+                },
+                "configuracion": {
+                    "iteraciones": args.iteraciones,
+                    "calentamiento": args.calentamiento,
+                    "semilla": args.semilla,
+                    "objetos": args.objetos,
+                    "fps_fuente": args.fps,
+                    "replay": ruta_replay,
+                    "tamano_lote": args.lote,
+                    "ejecucion_concurrente": PipelineConfig.EJECUCION_CONCURRENTE,
+                    "iobinding": EnlaceIOConfig.HABILITADO
+                }
+            }
+
+            print(f"⏱️ Midiendo motores ({args.iteraciones} iteraciones)...")
+            informe["motores"] = medir_motores(fuente, args.iteraciones, args.calentamiento, silencioso)
+            informe["rss_pico_mb_motores"] = _rss_pico_mb()
+
+            if args.lote:
+                print(f"⏱️ Midiendo inferencia por lotes de {args.lote} frames...")
+                informe["lotes"] = medir_lotes(fuente, args.lote, max(1, args.iteraciones // args.lote),
+                                               silencioso)
+
+            if not args.solo_motores:
+                print(f"⏱️ Midiendo sistema integrado ({args.iteraciones} análisis completos)...")
+                if ruta_replay:
+                    from modules.capture import FuenteReplay
+                    fuente_sistema = FuenteReplay(ruta_replay, fps=args.fps)
+                else:
+                    fuente_sistema = fuente
+                informe["sistema"] = medir_sistema(fuente_sistema, args.iteraciones, args.calentamiento,
+                                                   silencioso)
+            informe["rss_pico_mb"] = _rss_pico_mb()
+        finally:
+            os.chdir(directorio_original)
+
+    for etapa, datos in informe["motores"].items():
+        latencia = datos["latencia_ms"]
+        print(f"   {etapa:<22} p50 {latencia['p50']:8.2f} ms  p95 {latencia['p95']:8.2f} ms  "
+              f"p99 {latencia['p99']:8.2f} ms  {datos['throughput_fps']:7.1f} fps")
+    for etapa, datos in informe.get("lotes", {}).items():
+        print(f"   {etapa + ' (lote)':<22} {datos['fps_secuencial']:7.1f} -> {datos['fps_lote']:7.1f} fps  "
+              f"x{datos['aceleracion']:.2f}")
+    if "sistema" in informe:
+        latencia = informe["sistema"]["latencia_ms"]
+        print(f"   {'sistema':<22} p50 {latencia['p50']:8.2f} ms  p95 {latencia['p95']:8.2f} ms  "
+              f"p99 {latencia['p99']:8.2f} ms  {informe['sistema']['piezas_por_minuto']:7.1f} piezas/min")
+    print(f"   RSS pico: {informe['rss_pico_mb']} MB")
+
+    codigo_salida = 0
+    if args.referencia:
+        with open(args.referencia, "r", encoding="utf-8") as f:
+            referencia = json.load(f)
+        regresiones = comparar_con_referencia(informe, referencia, args.tolerancia)
+        informe["regresiones"] = regresiones
+        if regresiones:
+            print(f"❌ {len(regresiones)} regresión(es) respecto a {args.referencia}:")
+            for regresion in regresiones:
+                print(f"   - {regresion}")
+            codigo_salida = 1
+        else:
+            print(f"✅ Sin regresiones mayores al {args.tolerancia * 100:.0f}% respecto a {args.referencia}")
+
+    with open(ruta_salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados guardados en {ruta_salida}")
+    return codigo_salida
+
+
+if __name__ == "__main__":
+    sys.exit(main())
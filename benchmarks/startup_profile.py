@@ -0,0 +1,240 @@
+"""
+Perfil de arranque del sistema de inspección
+Mide el costo de cada importación (python -X importtime en un proceso limpio),
+la carga de cada modelo ONNX con su primera inferencia y, opcionalmente, el tiempo
+hasta el primer análisis completo con inicialización normal y diferida.
+
+Uso:
+    python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --sinteticos --sistema --salida arranque.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Agregar path para imports
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+from config import ModelsConfig
+
+MODULO_SISTEMA = "modules.analysis_system"
+# Dependencias pesadas que se reportan siempre (aunque no estén entre las más costosas)
+DEPENDENCIAS = ("numpy", "cv2", "onnxruntime", "matplotlib", "pygigev")
+
+_LINEA_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def perfil_importaciones(modulo: str = MODULO_SISTEMA) -> Dict:
+    """
+    Importa `modulo` en un intérprete nuevo con -X importtime.
+
+    Returns:
+        Dict: total (ms) y por módulo {propio_ms, acumulado_ms, nivel}
+    """
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                             cwd=RAIZ, capture_output=True, text=True)
+    total_ms = (time.perf_counter() - inicio) * 1000
+    if proceso.returncode != 0:
+        raise RuntimeError(f"no se pudo importar {modulo}: {proceso.stderr.strip().splitlines()[-1:]}")
+
+    modulos = {}
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            modulos[nombre] = {
+                "propio_ms": int(propio) / 1000,
+                "acumulado_ms": int(acumulado) / 1000,
+                "nivel": (len(sangria) - 1) // 2
+            }
+    return {
+        "modulo": modulo,
+        "proceso_ms": round(total_ms, 1),
+        "importacion_ms": modulos.get(modulo, {}).get("acumulado_ms", 0.0),
+        "modulos": modulos
+    }
+
+
+def perfil_dependencia(nombre: str) -> Optional[float]:
+    """Costo (ms) de importar una dependencia aislada en un intérprete nuevo (None si no está instalada)."""
+    perfil = None
+    with contextlib.suppress(RuntimeError):
+        perfil = perfil_importaciones(nombre)
+    return perfil["importacion_ms"] if perfil else None
+
+
+def _rutas_modelos() -> Dict[str, str]:
+    """Etapa -> ruta del modelo según ModelsConfig (el detector de piezas usa su nombre fijo)."""
+    directorio = ModelsConfig.MODELS_DIR
+    return {
+        "clasificacion": os.path.join(directorio, ModelsConfig.CLASSIFICATION_MODEL),
+        "deteccion_piezas": os.path.join(directorio, "CopleDetPz1C1V.onnx"),
+        "deteccion_defectos": os.path.join(directorio, ModelsConfig.DETECTION_DEFECTOS_MODEL),
+        "segmentacion_defectos": os.path.join(directorio, ModelsConfig.SEGMENTATION_DEFECTOS_MODEL),
+        "segmentacion_piezas": os.path.join(directorio, ModelsConfig.SEGMENTATION_PARTS_MODEL)
+    }
+
+
+def perfil_modelos() -> Dict:
+    """Carga de sesión, primera inferencia (en frío) y segunda inferencia por modelo."""
+    from modules.session_registry import obtener_registro
+    registro = obtener_registro()
+
+    # La primera sesión importa onnxruntime: se mide aparte para no cargarlo al primer modelo
+    inicio = time.perf_counter()
+    import onnxruntime  # noqa: F401
+    resultados = {"importar_onnxruntime_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+    for etapa, ruta in _rutas_modelos().items():
+        if not os.path.exists(ruta):
+            print(f"⚠️ Modelo no encontrado, se omite: {ruta}")
+            continue
+        registro.liberar(ruta)
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sesion = registro.obtener_sesion(ruta)
+        carga_ms = (time.perf_counter() - inicio) * 1000
+
+        entrada = sesion.get_inputs()[0]
+        forma = [d if isinstance(d, int) else 1 for d in entrada.shape]
+        tensor = np.zeros(forma, dtype=np.float32)
+        tiempos = []
+        for _ in range(2):
+            inicio = time.perf_counter()
+            sesion.run(None, {entrada.name: tensor})
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        resultados[etapa] = {
+            "modelo": os.path.basename(ruta),
+            "tamano_mb": round(os.path.getsize(ruta) / (1024 * 1024), 1),
+            "carga_ms": round(carga_ms, 1),
+            "primera_inferencia_ms": round(tiempos[0], 1),
+            "segunda_inferencia_ms": round(tiempos[1], 1)
+        }
+    registro.liberar()
+    return resultados
+
+
+def perfil_sistema(diferido: bool, analisis_adicionales: int = 5) -> Dict:
+    """
+    Tiempo de inicializar(), hasta el primer análisis completo con una fuente sintética,
+    y duración del primer análisis frente a los siguientes (efecto del calentamiento).
+    """
+    from benchmarks.synthetic_source import FuenteCapturaSintetica
+    from modules.analysis_system import SistemaAnalisisIntegrado
+    from modules.session_registry import obtener_registro
+
+    obtener_registro().liberar()
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        sistema = SistemaAnalisisIntegrado(fuente_captura=FuenteCapturaSintetica())
+        exito = sistema.inicializar(diferido=diferido)
+        inicializar_ms = (time.perf_counter() - inicio) * 1000
+        try:
+            resultado = sistema.analisis_completo() if exito else {"error": "inicialización fallida"}
+            primer_analisis_ms = (time.perf_counter() - inicio) * 1000
+            duraciones = [resultado.get("tiempos", {}).get("total_ms", 0.0)]
+            for _ in range(analisis_adicionales if exito else 0):
+                duraciones.append(sistema.analisis_completo().get("tiempos", {}).get("total_ms", 0.0))
+            preparacion = sistema.obtener_estado_preparacion()
+        finally:
+            sistema.liberar()
+    siguientes = duraciones[1:]
+    return {
+        "diferido": diferido,
+        "inicializar_ms": round(inicializar_ms, 1),
+        "hasta_primer_analisis_ms": round(primer_analisis_ms, 1),
+        "primer_analisis_ms": round(duraciones[0], 1),
+        "analisis_siguientes_ms": round(float(np.median(siguientes)), 1) if siguientes else None,
+        "preparacion": preparacion,
+        "error": resultado.get("error")
+    }
+
+
+def _argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Perfil de arranque: importaciones y carga de modelos")
+    parser.add_argument("--top", type=int, default=15, help="Importaciones más costosas a mostrar")
+    parser.add_argument("--sinteticos", action="store_true",
+                        help="Usar modelos sintéticos (benchmarks/synthetic_models.py) en vez de Modelos/")
+    parser.add_argument("--sistema", action="store_true",
+                        help="Medir también SistemaAnalisisIntegrado.inicializar (normal y diferido)")
+    parser.add_argument("--salida", default=None, help="Guardar el perfil en JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    informe = {"fecha": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    print(f"📦 Importaciones de {MODULO_SISTEMA} (intérprete nuevo, -X importtime)...")
+    importaciones = perfil_importaciones()
+    modulos = importaciones.pop("modulos")
+    mas_costosas = sorted(modulos.items(), key=lambda m: m[1]["acumulado_ms"], reverse=True)[:args.top]
+    importaciones["mas_costosas"] = {nombre: datos for nombre, datos in mas_costosas}
+    importaciones["dependencias"] = {
+        nombre: (modulos[nombre]["acumulado_ms"] if nombre in modulos else None) for nombre in DEPENDENCIAS
+    }
+    # Las que no carga la importación se cargan más tarde (onnxruntime con la primera sesión)
+    importaciones["dependencias_diferidas"] = {
+        nombre: perfil_dependencia(nombre) for nombre in DEPENDENCIAS if nombre not in modulos
+    }
+    informe["importaciones"] = importaciones
+
+    print(f"   Total: {importaciones['importacion_ms']:.1f} ms (proceso completo {importaciones['proceso_ms']:.0f} ms)")
+    for nombre, datos in importaciones["mas_costosas"].items():
+        print(f"   {'  ' * min(datos['nivel'], 4)}{nombre:<45} {datos['acumulado_ms']:8.1f} ms")
+    for nombre, ms in importaciones["dependencias_diferidas"].items():
+        estado = "no instalada" if ms is None else f"{ms:.1f} ms (al usarse)"
+        print(f"   [diferida] {nombre:<34} {estado}")
+
+    with tempfile.TemporaryDirectory(prefix="arranque_coples_") as temporal:
+        if args.sinteticos:
+            from benchmarks.synthetic_models import generar_modelos_sinteticos
+            directorio = os.path.join(temporal, "Modelos")
+            generar_modelos_sinteticos(directorio, directorio_clases=os.path.join(RAIZ, ModelsConfig.MODELS_DIR))
+            ModelsConfig.MODELS_DIR = directorio
+        else:
+            ModelsConfig.MODELS_DIR = os.path.join(RAIZ, ModelsConfig.MODELS_DIR)
+
+        print(f"🧠 Carga de modelos desde {ModelsConfig.MODELS_DIR}...")
+        informe["modelos"] = perfil_modelos()
+        print(f"   {'importar onnxruntime':<22} {informe['modelos'].pop('importar_onnxruntime_ms'):8.1f} ms")
+        for etapa, datos in informe["modelos"].items():
+            print(f"   {etapa:<22} carga {datos['carga_ms']:8.1f} ms  1ª inferencia {datos['primera_inferencia_ms']:8.1f} ms"
+                  f"  2ª {datos['segunda_inferencia_ms']:8.1f} ms")
+
+        if args.sistema:
+            print("🚀 Inicialización del sistema integrado (fuente sintética)...")
+            directorio_original = os.getcwd()
+            os.chdir(temporal)  # Las salidas del primer análisis quedan en el directorio temporal
+            try:
+                informe["sistema"] = [perfil_sistema(diferido=False), perfil_sistema(diferido=True)]
+            finally:
+                os.chdir(directorio_original)
+            for datos in informe["sistema"]:
+                modo = "diferida" if datos["diferido"] else "normal"
+                print(f"   {modo:<9} inicializar {datos['inicializar_ms']:8.1f} ms  "
+                      f"primer análisis a los {datos['hasta_primer_analisis_ms']:8.1f} ms  "
+                      f"(dura {datos['primer_analisis_ms']:.1f} ms, siguientes {datos['analisis_siguientes_ms']} ms)")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"💾 Perfil guardado en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Modelos ONNX sintéticos para benchmarks
+Genera grafos con las mismas firmas de entrada/salida que los modelos reales
+(los .onnx de producción no se versionan en Modelos/)
+"""
+
+import os
+import shutil
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Firmas de los modelos reales
+FORMA_ENTRADA = (1, 3, 640, 640)
+PASOS_YOLO = (8, 16, 32)          # Strides de las tres cabezas YOLO11 -> 80² + 40² + 20² = 8400 anclas
+NUM_ANCLAS = sum((640 // paso) ** 2 for paso in PASOS_YOLO)
+NUM_COEFICIENTES = 32             # Coeficientes de máscara YOLO11-SEG
+LADO_PROTOTIPOS = 160             # Prototipos (32, 160, 160)
+
+# Nombres de archivo que abren los motores
+MODELOS = {
+    "clasificacion": "CopleClasDef2C1V.onnx",
+    "deteccion_piezas": "CopleDetPz1C1V.onnx",
+    "deteccion_defectos": "CopleDetDef1C2V.onnx",
+    "segmentacion_defectos": "CopleSegDef1C8V.onnx",
+    "segmentacion_piezas": "CopleSegPZ1C1V.onnx"
+}
+
+
+def _anclas() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Centros (cx, cy) y stride de las 8400 anclas en el orden de salida de YOLO11."""
+    cx, cy, pasos = [], [], []
+    for paso in PASOS_YOLO:
+        lado = 640 // paso
+        ys, xs = np.mgrid[0:lado, 0:lado]
+        cx.append((xs.ravel() + 0.5) * paso)
+        cy.append((ys.ravel() + 0.5) * paso)
+        pasos.append(np.full(lado * lado, paso))
+    return (np.concatenate(cx).astype(np.float32), np.concatenate(cy).astype(np.float32),
+            np.concatenate(pasos).astype(np.float32))
+
+
+def _sesgo_yolo(rng: np.random.Generator, num_canales: int,
+                objetos: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ganancia y sesgo por canal/ancla que convierten la salida de las convoluciones
+    en una predicción YOLO11 plausible: cajas alrededor de cada ancla y logits de
+    confianza altos solo en las anclas que caen dentro de `objetos` cajas fijas
+    (varias anclas por objeto, de modo que el NMS tenga trabajo real).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (ganancia, sesgo), ambos (1, num_canales, 8400)
+    """
+    cx, cy, pasos = _anclas()
+    ganancia = np.ones((1, num_canales, NUM_ANCLAS), dtype=np.float32)
+    sesgo = np.zeros((1, num_canales, NUM_ANCLAS), dtype=np.float32)
+
+    # Cajas: centro de ancla +- unos píxeles, tamaño proporcional al stride
+    ganancia[0, 0:4] = 4.0
+    sesgo[0, 0] = cx
+    sesgo[0, 1] = cy
+    sesgo[0, 2] = pasos * 6.0
+    sesgo[0, 3] = pasos * 6.0
+
+    # Confianza (logit): fondo muy negativo, positivo dentro de los objetos
+    logits = np.full(NUM_ANCLAS, -8.0, dtype=np.float32)
+    for _ in range(objetos):
+        ox, oy = rng.uniform(120, 520, size=2)
+        lado = rng.uniform(60, 160)
+        dentro = (np.abs(cx - ox) < lado / 2) & (np.abs(cy - oy) < lado / 2)
+        logits[dentro] = rng.uniform(1.0, 4.0, size=int(dentro.sum()))
+        sesgo[0, 0, dentro] = ox
+        sesgo[0, 1, dentro] = oy
+        sesgo[0, 2, dentro] = lado
+        sesgo[0, 3, dentro] = lado
+    sesgo[0, 4] = logits
+
+    # Coeficientes de máscara: la salida de la convolución con algo más de rango
+    if num_canales > 5:
+        ganancia[0, 5:] = 8.0
+    return ganancia, sesgo
+
+
+class _ConstructorGrafo:
+    """Acumula nodos e inicializadores de un grafo ONNX."""
+
+    def __init__(self, rng: np.random.Generator, lote_dinamico: bool = False):
+        from onnx import helper, numpy_helper
+        self.helper = helper
+        self.numpy_helper = numpy_helper
+        self.rng = rng
+        self.lote = "lote" if lote_dinamico else FORMA_ENTRADA[0]  # Eje 0 simbólico o fijo
+        self.nodos = []
+        self.inicializadores = []
+
+    def constante(self, nombre: str, valor: np.ndarray) -> str:
+        self.inicializadores.append(self.numpy_helper.from_array(valor, nombre))
+        return nombre
+
+    def nodo(self, tipo: str, entradas: List[str], salida: str, **atributos) -> str:
+        self.nodos.append(self.helper.make_node(tipo, entradas, [salida], **atributos))
+        return salida
+
+    def conv(self, nombre: str, entrada: str, canales_entrada: int, canales_salida: int,
+             kernel: int, paso: int) -> str:
+        pesos = (self.rng.standard_normal((canales_salida, canales_entrada, kernel, kernel))
+                 * 0.05).astype(np.float32)
+        return self.nodo("Conv", [entrada, self.constante(nombre + "_w", pesos)], nombre,
+                         kernel_shape=[kernel, kernel], strides=[paso, paso])
+
+    def cabeza_yolo(self, num_canales: int, objetos: int, salida: str) -> str:
+        """Tres convoluciones (stride 8/16/32) concatenadas a (1, C, 8400) y escaladas."""
+        ramas = []
+        for paso in PASOS_YOLO:
+            conv = self.conv(f"cabeza_p{paso}", "images", 3, num_canales, paso, paso)
+            forma = self.constante(f"forma_p{paso}", np.array([0, num_canales, -1], dtype=np.int64))
+            ramas.append(self.nodo("Reshape", [conv, forma], f"plano_p{paso}"))
+        crudo = self.nodo("Concat", ramas, "cabeza", axis=2)
+
+        ganancia, sesgo = _sesgo_yolo(self.rng, num_canales, objetos)
+        escalado = self.nodo("Mul", [crudo, self.constante("ganancia", ganancia)], "cabeza_escalada")
+        return self.nodo("Add", [escalado, self.constante("sesgo", sesgo)], salida)
+
+    def guardar(self, nombre: str, salidas: List[Tuple[str, List[int]]], ruta: str):
+        from onnx import TensorProto, checker, save
+        entrada = self.helper.make_tensor_value_info("images", TensorProto.FLOAT,
+                                                     [self.lote] + list(FORMA_ENTRADA[1:]))
+        infos = [self.helper.make_tensor_value_info(n, TensorProto.FLOAT, [self.lote] + forma[1:])
+                 for n, forma in salidas]
+        grafo = self.helper.make_graph(self.nodos, nombre, [entrada], infos, self.inicializadores)
+        modelo = self.helper.make_model(grafo, opset_imports=[self.helper.make_opsetid("", 17)])
+        modelo.ir_version = 8
+        checker.check_model(modelo)
+        save(modelo, ruta)
+
+
+def _clasificador(rng: np.random.Generator, ruta: str, lote_dinamico: bool = False):
+    """[1,3,640,640] -> [1,2] (probabilidades)."""
+    g = _ConstructorGrafo(rng, lote_dinamico)
+    conv = g.conv("tronco", "images", 3, 16, 32, 32)
+    media = g.nodo("GlobalAveragePool", [conv], "media")
+    plano = g.nodo("Flatten", [media], "plano")
+    pesos = g.constante("fc", rng.standard_normal((16, 2)).astype(np.float32))
+    logits = g.nodo("MatMul", [plano, pesos], "logits")
+    g.nodo("Softmax", [logits], "output0", axis=1)
+    g.guardar("clasificador_sintetico", [("output0", [1, 2])], ruta)
+
+
+def _detector(rng: np.random.Generator, ruta: str, objetos: int, lote_dinamico: bool = False):
+    """[1,3,640,640] -> [1,5,8400] (cx, cy, w, h, logit)."""
+    g = _ConstructorGrafo(rng, lote_dinamico)
+    g.cabeza_yolo(5, objetos, "output0")
+    g.guardar("detector_sintetico", [("output0", [1, 5, NUM_ANCLAS])], ruta)
+
+
+def _segmentador(rng: np.random.Generator, ruta: str, objetos: int, lote_dinamico: bool = False):
+    """[1,3,640,640] -> [1,37,8400] + [1,32,160,160]."""
+    g = _ConstructorGrafo(rng, lote_dinamico)
+    g.cabeza_yolo(5 + NUM_COEFICIENTES, objetos, "output0")
+    paso = 640 // LADO_PROTOTIPOS
+    g.conv("output1", "images", 3, NUM_COEFICIENTES, paso, paso)
+    g.guardar("segmentador_sintetico", [
+        ("output0", [1, 5 + NUM_COEFICIENTES, NUM_ANCLAS]),
+        ("output1", [1, NUM_COEFICIENTES, LADO_PROTOTIPOS, LADO_PROTOTIPOS])
+    ], ruta)
+
+
+def generar_modelos_sinteticos(directorio: str, semilla: int = 0, objetos: int = 3,
+                               directorio_clases: str = "Modelos",
+                               lote_dinamico: bool = False) -> Dict[str, str]:
+    """
+    Escribe los cinco modelos sintéticos y sus archivos de clases en `directorio`.
+
+    Los pesos son aleatorios (semilla fija) pero las salidas tienen la forma y el
+    rango de las reales: cajas dentro de la imagen, unas decenas de anclas con
+    confianza alta alrededor de `objetos` objetos y prototipos de máscara.
+
+    Args:
+        directorio (str): Directorio destino (se usa como ModelsConfig.MODELS_DIR)
+        semilla (int): Semilla de los pesos y de la posición de los objetos
+        objetos (int): Objetos "detectados" por cada detector/segmentador
+        directorio_clases (str): Directorio con los clases_*.txt a copiar
+        lote_dinamico (bool): Exportar el eje de lote como simbólico ([N,3,640,640]) en vez de 1
+
+    Returns:
+        Dict[str, str]: Etapa -> ruta del modelo generado
+    """
+    os.makedirs(directorio, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+
+    rutas = {etapa: os.path.join(directorio, nombre) for etapa, nombre in MODELOS.items()}
+    _clasificador(rng, rutas["clasificacion"], lote_dinamico)
+    _detector(rng, rutas["deteccion_piezas"], objetos, lote_dinamico)
+    _detector(rng, rutas["deteccion_defectos"], objetos, lote_dinamico)
+    _segmentador(rng, rutas["segmentacion_defectos"], objetos, lote_dinamico)
+    _segmentador(rng, rutas["segmentacion_piezas"], objetos, lote_dinamico)
+
+    # Los motores leen las clases junto al modelo
+    if os.path.isdir(directorio_clases) and os.path.abspath(directorio_clases) != os.path.abspath(directorio):
+        for archivo in os.listdir(directorio_clases):
+            if archivo.startswith("clases_") and archivo.endswith(".txt"):
+                shutil.copy(os.path.join(directorio_clases, archivo), directorio)
+    return rutas
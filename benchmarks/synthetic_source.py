@@ -0,0 +1,147 @@
+"""
+Fuente de captura sintética para benchmarks
+Implementa la interfaz de CamaraTiempoOptimizada sin hardware GigE
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class FuenteCapturaSintetica:
+    """
+    Sustituto de la cámara GigE que entrega frames generados en memoria.
+
+    Características:
+    - Misma interfaz que CamaraTiempoOptimizada (configurar, iniciar/pausar/reanudar,
+      obtener_frame_instantaneo, esperar_frame_nuevo, liberar, estadísticas)
+    - Frames 640x640 BGR con un cople sintético (anillo) y ruido, precalculados
+    - Sin fps: cada petición produce un frame nuevo al instante (mide solo el pipeline)
+    - Con fps: un hilo publica frames a ese ritmo, como la cámara real
+    """
+
+    def __init__(self, ancho: int = 640, alto: int = 640, fps: Optional[float] = None,
+                 num_frames: int = 8, semilla: int = 0):
+        """
+        Args:
+            ancho (int): Ancho de los frames
+            alto (int): Alto de los frames
+            fps (float, optional): Ritmo de adquisición simulado (None = bajo demanda)
+            num_frames (int): Frames distintos precalculados (se recorren en ciclo)
+            semilla (int): Semilla del contenido de los frames
+        """
+        self.ancho = ancho
+        self.alto = alto
+        self.fps = fps
+        self.frames = self._generar_frames(num_frames, semilla)
+
+        self.frame_condition = threading.Condition()
+        self.frame_sequence = 0
+        self.frame_actual = None
+        self.timestamp_actual = 0.0
+
+        self.capture_active = False
+        self.capture_paused = False
+        self.capture_thread = None
+        self.start_time = 0
+        self.total_frames_captured = 0
+
+    def _generar_frames(self, num_frames: int, semilla: int):
+        """Frames con un anillo (cople) en posición variable sobre fondo con ruido."""
+        rng = np.random.default_rng(semilla)
+        frames = []
+        for _ in range(num_frames):
+            frame = rng.integers(40, 80, size=(self.alto, self.ancho, 3), dtype=np.uint8)
+            centro = (int(rng.integers(self.ancho // 3, 2 * self.ancho // 3)),
+                      int(rng.integers(self.alto // 3, 2 * self.alto // 3)))
+            radio = int(rng.integers(self.alto // 6, self.alto // 4))
+            cv2.circle(frame, centro, radio, (170, 170, 175), thickness=radio // 3)
+            frames.append(frame)
+        return frames
+
+    def _publicar_frame(self):
+        """Publica el siguiente frame del ciclo con un número de secuencia nuevo."""
+        with self.frame_condition:
+            self.frame_sequence += 1
+            self.frame_actual = self.frames[self.frame_sequence % len(self.frames)]
+            self.timestamp_actual = time.time()
+            self.total_frames_captured += 1
+            self.frame_condition.notify_all()
+
+    def _thread_captura_continua(self):
+        periodo = 1.0 / self.fps
+        while self.capture_active:
+            if not self.capture_paused:
+                self._publicar_frame()
+            time.sleep(periodo)
+
+    # ------------------------------------------------------------------ interfaz de cámara
+
+    def configurar_camara(self) -> bool:
+        return True
+
+    def iniciar_captura_continua(self) -> bool:
+        self.capture_active = True
+        self.start_time = time.time()
+        self._publicar_frame()
+        if self.fps:
+            self.capture_thread = threading.Thread(target=self._thread_captura_continua, daemon=True)
+            self.capture_thread.start()
+        return True
+
+    def obtener_frame_instantaneo(self):
+        inicio = time.time()
+        if not self.fps:
+            self._publicar_frame()
+        with self.frame_condition:
+            frame = None if self.frame_actual is None else self.frame_actual.copy()
+            timestamp = self.timestamp_actual
+        return frame, (time.time() - inicio) * 1000, timestamp
+
+    def obtener_secuencia_actual(self) -> int:
+        with self.frame_condition:
+            return self.frame_sequence
+
+    def esperar_frame_nuevo(self, secuencia_minima: int = 0, timeout: Optional[float] = None):
+        inicio = time.time()
+        if not self.fps:
+            self._publicar_frame()
+        with self.frame_condition:
+            if not self.frame_condition.wait_for(lambda: self.frame_sequence > secuencia_minima,
+                                                 1.0 if timeout is None else timeout):
+                return None, (time.time() - inicio) * 1000, 0, self.frame_sequence
+            frame = self.frame_actual.copy()
+            timestamp = self.timestamp_actual
+            secuencia = self.frame_sequence
+        return frame, (time.time() - inicio) * 1000, timestamp, secuencia
+
+    def capturar_frame(self):
+        return self.obtener_frame_instantaneo()[0]
+
+    def pausar_captura_continua(self):
+        self.capture_paused = True
+
+    def reanudar_captura_continua(self) -> int:
+        self.capture_paused = False
+        return self.obtener_secuencia_actual()
+
+    def detener_captura(self):
+        self.capture_active = False
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=1.0)
+
+    def liberar(self):
+        self.detener_captura()
+
+    def obtener_estadisticas(self) -> Dict:
+        tiempo_total = time.time() - self.start_time if self.start_time else 0
+        return {
+            "fps_real": self.total_frames_captured / tiempo_total if tiempo_total > 0 else 0,
+            "frames_totales": self.total_frames_captured,
+            "tiempo_total": tiempo_total,
+            "roi_size": f"{self.ancho}x{self.alto}",
+            "framerate": self.fps or "bajo demanda"
+        }
@@ -0,0 +1,147 @@
+"""
+Costo de la inferencia por teselas a resolución nativa
+Mide el detector y el segmentador de defectos sobre un frame del sensor completo (4112x2176)
+con distintos solapamientos y regiones, frente a la inferencia única reducida a 640.
+
+Uso:
+    python benchmarks/tiling_throughput.py --iteraciones 10 --salida teselado.json
+    python benchmarks/tiling_throughput.py --solapamientos 0,0.2 --regiones 1280x1280 --teselas-por-run 1
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+# Agregar path para imports
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.run_benchmarks import _percentiles, _silenciar
+from benchmarks.synthetic_models import generar_modelos_sinteticos
+from benchmarks.synthetic_source import FuenteCapturaSintetica
+from config import CameraConfig, ModelsConfig, TeseladoConfig
+
+
+def _medir(funcion: Callable[[], object], iteraciones: int, calentamiento: int, silencio: bool) -> Dict:
+    """Percentiles de `funcion` y número de resultados de la última ejecución."""
+    with _silenciar(silencio):
+        for _ in range(calentamiento):
+            funcion()
+        tiempos = []
+        for _ in range(iteraciones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"latencia_ms": _percentiles(tiempos), "resultados": len(resultado)}
+
+
+def _region_centrada(forma, tamano: str):
+    """Región "ANCHOxALTO" centrada en el frame (simula la caja de una pieza)."""
+    ancho, alto = (int(v) for v in tamano.lower().split("x"))
+    alto_frame, ancho_frame = forma[:2]
+    x1, y1 = (ancho_frame - ancho) // 2, (alto_frame - alto) // 2
+    return (x1, y1, x1 + ancho, y1 + alto)
+
+
+def _argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Costo de la inferencia de defectos por teselas")
+    parser.add_argument("--iteraciones", type=int, default=10, help="Frames medidos por configuración")
+    parser.add_argument("--calentamiento", type=int, default=2, help="Frames de calentamiento por configuración")
+    parser.add_argument("--solapamientos", default="0,0.1,0.2,0.3",
+                        help="Solapamientos a medir sobre el frame completo, separados por coma")
+    parser.add_argument("--regiones", default="1280x1280,960x960",
+                        help="Regiones de pieza (ANCHOxALTO, centradas) a medir con TeseladoConfig.SOLAPAMIENTO")
+    parser.add_argument("--teselas-por-run", type=int, default=None,
+                        help="Teselas por session.run (por defecto todas en una; 1 = una por una)")
+    parser.add_argument("--modelos", default=None,
+                        help="Directorio con modelos reales (por defecto modelos sintéticos con lote dinámico)")
+    parser.add_argument("--salida", default=None, help="Guardar los resultados en JSON")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs de los motores")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    silencio = not args.verbose
+    TeseladoConfig.TESELAS_POR_RUN = args.teselas_por_run
+
+    with tempfile.TemporaryDirectory(prefix="teselado_coples_") as temporal:
+        if args.modelos:
+            ModelsConfig.MODELS_DIR = args.modelos
+        else:
+            generar_modelos_sinteticos(temporal, directorio_clases=os.path.join(RAIZ, ModelsConfig.MODELS_DIR),
+                                       lote_dinamico=True)
+            ModelsConfig.MODELS_DIR = temporal
+
+        from modules.batch_inference import admite_lote_dinamico
+        from modules.detection import DetectorDefectosCoples
+        from modules.segmentation import SegmentadorDefectosCoples
+        from modules.tiled_inference import calcular_teselas
+
+        with _silenciar(silencio):
+            detector = DetectorDefectosCoples()
+            segmentador = SegmentadorDefectosCoples()
+            if not detector.inicializar() or segmentador.session is None:
+                print("❌ No se pudieron inicializar los modelos de defectos")
+                return 1
+        frame = FuenteCapturaSintetica(ancho=CameraConfig.NATIVE_WIDTH, alto=CameraConfig.NATIVE_HEIGHT,
+                                       num_frames=1).frames[0]
+        forma = frame.shape[:2]
+        print(f"🧩 Teselado sobre {forma[1]}x{forma[0]} (tesela {detector.input_size}, "
+              f"lote dinámico: {admite_lote_dinamico(detector.session)}, "
+              f"teselas por run: {args.teselas_por_run or 'todas'})")
+
+        configuraciones = [("unica_640", None, None)]
+        configuraciones += [(f"completo_s{s}", float(s), None) for s in args.solapamientos.split(",") if s.strip()]
+        configuraciones += [(f"pieza_{r}", TeseladoConfig.SOLAPAMIENTO, _region_centrada(forma, r))
+                            for r in args.regiones.split(",") if r.strip()]
+
+        informe = {"fecha": time.strftime("%Y-%m-%dT%H:%M:%S"), "frame": [forma[1], forma[0]],
+                   "teselas_por_run": args.teselas_por_run, "configuraciones": {}}
+        base = {}
+        for nombre, solapamiento, region in configuraciones:
+            if solapamiento is not None:
+                TeseladoConfig.SOLAPAMIENTO = solapamiento
+                teselas = len(calcular_teselas(forma, detector.input_size, region=region))
+                funciones = {
+                    "deteccion_defectos": lambda: detector.detectar_defectos_teselado(frame, region),
+                    "segmentacion_defectos": lambda: segmentador.segmentar_defectos_teselado(frame, region)
+                }
+            else:
+                # Referencia: el frame completo reducido a la entrada del modelo (incluye el letterbox)
+                teselas = 1
+                funciones = {
+                    "deteccion_defectos": lambda: detector.detectar_defectos(frame),
+                    "segmentacion_defectos": lambda: segmentador.segmentar_defectos(frame)
+                }
+
+            datos = {"teselas": teselas, "solapamiento": solapamiento, "region": region, "etapas": {}}
+            linea = []
+            for etapa, funcion in funciones.items():
+                medicion = _medir(funcion, args.iteraciones, args.calentamiento, silencio)
+                p50 = medicion["latencia_ms"]["p50"]
+                medicion["ms_por_tesela"] = round(p50 / teselas, 3)
+                medicion["frames_por_minuto"] = round(60000 / max(p50, 1e-9), 1)
+                if etapa in base:
+                    medicion["costo_relativo"] = round(p50 / max(base[etapa], 1e-9), 2)
+                else:
+                    base[etapa] = p50
+                datos["etapas"][etapa] = medicion
+                linea.append(f"{etapa} {p50:8.1f} ms" + (f" (x{medicion['costo_relativo']:.1f})"
+                                                         if "costo_relativo" in medicion else ""))
+            informe["configuraciones"][nombre] = datos
+            print(f"   {nombre:<20} {teselas:>3} teselas  " + "  ".join(linea))
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,6 +22,7 @@ class CameraConfig:
     FRAMERATE = 10.0          # 10 FPS - reducido para menor carga CPU
     PACKET_SIZE = 9000        # Tamaño de paquete jumbo
     NUM_BUFFERS = 2           # Solo 2 buffers para minimizar memoria
+    RING_SLOTS = 4            # Slots RGB preasignados del anillo de frames (lectores fijados + escritura)
     GAIN = 2.0               # Ganancia mínima para mejor calidad
     
     # Configuración del ROI
@@ -34,6 +35,10 @@ class CameraConfig:
     FRAME_TIMEOUT = 0.1       # 100ms timeout para frames
     STARTUP_TIMEOUT = 5.0     # 5s timeout para primer frame
     SHUTDOWN_TIMEOUT = 2.0    # 2s timeout para cerrar thread
+    FRESH_FRAME_TIMEOUT = 1.0 # 1s máximo esperando un frame nuevo tras reanudar
+    
+    # Conversión del sensor (patrón Bayer -> RGB, nombre del código cv2.COLOR_*)
+    BAYER_CONVERSION = "BayerRG2RGB"
 
 # ==================== CONFIGURACIÓN DE WEBCAM FALLBACK ====================
 class WebcamConfig:
@@ -60,6 +65,29 @@ class WebcamConfig:
     DETECTION_TIMEOUT = 3.0    # Timeout para detectar webcams
     INIT_TIMEOUT = 5.0         # Timeout para inicializar webcam
 
+# ==================== CONFIGURACIÓN DE REPLAY ====================
+class ReplayConfig:
+    """Reproducción de capturas grabadas (directorio de imágenes, .npy o video) en lugar de la cámara"""
+    
+    # Fuente a reproducir (None = usar la cámara GigE)
+    RUTA = None               # Directorio de JPEG/PNG/.raw, archivo .npy/.frames o video
+    
+    # Ritmo de reproducción
+    FPS = None                # None = tan rápido como se consuma (cada frame se entrega una vez)
+    BUCLE = True              # Volver al primer frame al terminar
+    
+    # Volcados Bayer crudos (.raw y .npy de 2 dimensiones)
+    ANCHO_BAYER = 640         # Ancho de los archivos .raw
+    ALTO_BAYER = 640          # Alto de los archivos .raw
+
+# ==================== CONFIGURACIÓN DE GRABACIÓN ====================
+class GrabacionConfig:
+    """Grabación de la captura continua a archivos de frames crudos (.frames)"""
+    
+    DIRECTORIO = "Grabaciones"  # Carpeta de los archivos de frames
+    GRABAR_BAYER = True         # True: frame crudo del sensor (1 byte/píxel); False: RGB tras el debayer
+    FRAMES_POR_BLOQUE = 64      # Frames reservados cada vez que el archivo crece
+
 # ==================== CONFIGURACIÓN DE MODELOS ====================
 class ModelsConfig:
     """Configuración de los modelos ONNX"""
@@ -92,6 +120,176 @@ class ModelsConfig:
     INTRA_OP_THREADS = 2
     INTER_OP_THREADS = 2
     PROVIDERS = ['CPUExecutionProvider']
+    GRAPH_OPTIMIZATION_LEVEL = "todo"  # "deshabilitado", "basico", "extendido" o "todo"
+    
+    # Variante de los modelos: "fp32" (original) o "int8" (<modelo>.int8.onnx de quantize_models.py;
+    # si un modelo no tiene variante INT8 se usa el FP32)
+    VARIANTE_MODELO = "fp32"
+    SUFIJOS_VARIANTE = {"fp32": ".onnx", "int8": ".int8.onnx"}
+
+# ==================== CONFIGURACIÓN DE SESIONES ONNX ====================
+class SesionConfig:
+    """Perfiles de SessionOptions por modelo (modules/session_profiles.py, los aplica el registro de sesiones)"""
+    
+    # Valores comunes a todos los modelos (hilos, proveedores y nivel de optimización salen de ModelsConfig)
+    PERFIL_DEFAULT = {
+        "modo_ejecucion": "secuencial",  # "secuencial" o "paralelo" (usa inter_op_threads)
+        "patron_memoria": True,           # enable_mem_pattern: reutiliza el plan de memoria entre ejecuciones
+        "arena_cpu": True,                # enable_cpu_mem_arena
+        "afinidad": None,                 # session.intra_op_thread_affinities, p. ej. "1;2;3" (None = SO)
+        "espera_activa": None             # session.intra_op.allow_spinning (None = por defecto de ORT)
+    }
+    
+    # Sobrescrituras por nombre de modelo; las del presupuesto de hilos del planificador tienen prioridad
+    PERFILES = {
+        ModelsConfig.CLASSIFICATION_MODEL: {
+            "intra_op_threads": ModelsConfig.INTRA_OP_THREADS,
+            "inter_op_threads": ModelsConfig.INTER_OP_THREADS
+        }
+    }
+    
+    # Perfiles ajustados por benchmarks/autotune_sessions.py (se aplican sobre PERFILES)
+    ARCHIVO_PERFILES = None    # None = <MODELS_DIR>/perfiles_sesion.json
+
+# ==================== CONFIGURACIÓN DE CUANTIZACIÓN ====================
+class CuantizacionConfig:
+    """Generación de variantes INT8 de los modelos (quantize_models.py)"""
+    
+    MODO = "estatico"                  # "estatico" (QDQ calibrado) o "dinamico" (solo pesos)
+    DIRECTORIO_CALIBRACION = "Salida_cople"  # Frames archivados para calibrar las activaciones
+    MUESTRAS_CALIBRACION = 200
+    METODO_CALIBRACION = "minmax"      # "minmax", "entropia" o "percentil"
+    POR_CANAL = True                   # Pesos cuantizados por canal de salida
+    PROFUNDIDAD_CABEZA_FP32 = 2        # Nodos (en saltos desde las salidas) que se dejan en FP32:
+                                       # cajas en píxeles y scores comparten tensor y se degradan en INT8
+
+# ==================== CONFIGURACIÓN DE CACHÉ DE MODELOS ====================
+class CacheModelosConfig:
+    """Caché en disco de los grafos ya optimizados por ONNX Runtime (modules/model_cache.py)"""
+    
+    HABILITADA = True
+    DIRECTORIO = None          # None = <MODELS_DIR>/.cache_ort
+
+# ==================== CONFIGURACIÓN DE IOBINDING ====================
+class EnlaceIOConfig:
+    """Buffers de entrada/salida preasignados con IOBinding de ONNX Runtime (modules/io_binding.py)"""
+    
+    HABILITADO = False         # True = cada motor reutiliza sus buffers de salida (sin asignaciones por frame)
+    MODELOS = None             # None = todos los modelos; o lista de nombres .onnx que usan IOBinding
+    REUTILIZAR_CONTEXTO = True # Con IOBinding, el análisis completo reutiliza los tensores del ContextoFrame
+
+# ==================== CONFIGURACIÓN DEL PIPELINE ====================
+class PipelineConfig:
+    """Configuración de ejecución de las etapas del análisis completo"""
+    
+    # Ejecución concurrente de las 5 inferencias (ONNX Runtime libera el GIL)
+    EJECUCION_CONCURRENTE = True
+    MAX_TRABAJADORES = 5       # Hilos del pool de etapas
+    NUCLEOS_DISPONIBLES = None  # None = os.cpu_count()
+    
+    # Peso relativo de cada etapa para repartir los hilos intra-op entre los núcleos
+    PESOS_ETAPAS = {
+        "clasificacion": 1,
+        "deteccion_piezas": 1,
+        "deteccion_defectos": 1,
+        "segmentacion_defectos": 2,
+        "segmentacion_piezas": 2
+    }
+    
+    # Arranque: True = la captura arranca de inmediato y los modelos se cargan en segundo plano
+    # (el primer análisis espera a que terminen)
+    INICIALIZACION_DIFERIDA = False
+    
+    # Carga de modelos: sesiones creadas en paralelo y calentadas con un tensor de ceros
+    # (la primera pieza inspeccionada no paga la inicialización de kernels y memoria)
+    CARGA_PARALELA = True
+    INFERENCIAS_CALENTAMIENTO = 2  # Inferencias de prueba por modelo (0 = sin calentamiento)
+    
+    # Inferencia por lotes (métodos *_lote de los motores, reinspección offline)
+    TAMANO_LOTE_MAXIMO = 8     # Frames por session.run cuando el modelo tiene eje de lote dinámico
+
+# ==================== CONFIGURACIÓN DE INFERENCIA POR TESELAS ====================
+class TeseladoConfig:
+    """Detección y segmentación de defectos por teselas a resolución nativa (modules/tiled_inference.py)"""
+
+    # True = los modelos de defectos recorren el frame en teselas cuando es mayor que su entrada
+    # (requiere capturar a resolución nativa: ROI de CameraConfig igual al sensor completo)
+    HABILITADO = False
+    TAMANO_TESELA = None       # None = ModelsConfig.INPUT_SIZE (640)
+    SOLAPAMIENTO = 0.2         # Fracción del lado compartida con la tesela vecina (defectos en el borde)
+
+    # Región a teselar: "completo" = todo el frame, "pieza" = caja de las piezas detectadas + margen
+    REGION = "completo"
+    MARGEN_PIEZA = 64          # Píxeles alrededor de la caja de la pieza
+
+    # Fusión entre teselas (NMS global + unión de máscaras)
+    IOU_FUSION = 0.5           # IoU a partir del cual dos detecciones de teselas distintas son la misma
+    CONTENCION_FUSION = 0.7    # ...o fracción de la caja menor contenida en la otra (defecto cortado)
+    TESELAS_POR_RUN = None     # None = todas las teselas en un session.run (modelos con lote dinámico)
+
+# ==================== CONFIGURACIÓN DE RECORTE POR PIEZA ====================
+class RecortePiezaConfig:
+    """Modelos de defectos sobre el recorte de la pieza detectada (modules/part_crop.py)"""
+
+    # True = la detección de piezas corre primero y los modelos de defectos reciben solo la caja
+    # de la pieza (recortada del frame capturado a su resolución) en vez del frame completo.
+    # Si TeseladoConfig.HABILITADO aplica al frame, el teselado tiene prioridad.
+    HABILITADO = False
+    MARGEN = 0.15              # Fracción del lado de la caja agregada a cada lado
+    MARGEN_MINIMO_PX = 16      # Margen mínimo en píxeles del frame
+    CUADRADO = True            # Recorte cuadrado: ocupa toda la entrada 640x640 sin relleno de letterbox
+    OMITIR_SIN_PIEZA = True    # Sin pieza detectada no se ejecutan los modelos de defectos
+
+# ==================== CONFIGURACIÓN DE CASCADA ====================
+class CascadaConfig:
+    """Política de cascada: la clasificación decide qué modelos posteriores se ejecutan"""
+    
+    HABILITADA = False          # False = ejecutar siempre los 5 modelos
+    
+    # Detección/segmentación de defectos solo si la clase está en la lista...
+    CLASES_DISPARO_DEFECTOS = ["Rechazado"]
+    # ...o si la confianza del clasificador cae dentro de esta banda (veredicto dudoso)
+    BANDA_CONFIANZA_DEFECTOS = (0.0, 0.75)
+    
+    # Segmentación de piezas solo si la detección de piezas encontró algo
+    SEGMENTAR_PIEZAS_SOLO_CON_DETECCION = True
+
+# ==================== CONFIGURACIÓN DE FILTRO DE FRAMES REPETIDOS ====================
+class FiltroFramesConfig:
+    """Reutilizar el último análisis cuando el frame no cambió (línea detenida) (modules/frame_gate.py)"""
+
+    HABILITADO = False           # False = ejecutar siempre los 5 modelos
+    LADO_MINIATURA = 32          # Lado de la miniatura en gris que se compara entre frames
+    UMBRAL_DIFERENCIA = 2.0      # Diferencia media absoluta (niveles de gris 0-255) bajo la cual se reutiliza
+    MAX_REUTILIZACIONES = 100    # Reanalizar tras N reutilizaciones seguidas (None = sin límite)
+    GUARDAR_REUTILIZADOS = False # True = guardar también los resultados reutilizados (imagen y JSON)
+
+# ==================== CONFIGURACIÓN DE ESCRITURA DE RESULTADOS ====================
+class EscrituraConfig:
+    """Escritura de resultados (anotación, JPEG y JSON) fuera del hilo de inspección"""
+    
+    ASINCRONA = True            # False = guardar en el mismo hilo del análisis (comportamiento original)
+    TAMANO_COLA = 8             # Resultados pendientes de escribir como máximo
+    TRABAJADORES = 2            # Hilos que anotan, codifican y escriben
+    
+    # Política cuando la cola está llena:
+    #   "bloquear"          -> esperar hasta TIEMPO_MAX_BLOQUEO_S y luego descartar el nuevo
+    #   "descartar_nuevo"   -> descartar el resultado que llega
+    #   "descartar_antiguo" -> descartar el resultado pendiente más antiguo
+    POLITICA_COLA_LLENA = "bloquear"
+    TIEMPO_MAX_BLOQUEO_S = 2.0
+    
+    TIEMPO_MAX_VACIADO_S = 30.0  # Espera máxima al vaciar la cola en liberar()
+
+# ==================== CONFIGURACIÓN DE REINSPECCIÓN OFFLINE ====================
+class ReinspeccionConfig:
+    """Reinspección por lotes de imágenes archivadas (reinspect.py)"""
+    
+    ARCHIVO_RESULTADOS = "reinspeccion.csv"  # Un renglón por imagen, columnas por análisis
+    PROCESOS = None             # Procesos trabajadores (None = os.cpu_count())
+    TAMANO_BLOQUE = 8           # Imágenes por tarea de un trabajador (se infieren con los métodos *_lote)
+    PROGRESO_CADA = 100         # Imprimir el progreso cada N imágenes
+    EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
 
 # ==================== CONFIGURACIÓN DE ROBUSTEZ ====================
 class RobustezConfig:
@@ -201,6 +399,9 @@ class FileConfig:
     
     # Nombres de archivo
     FILENAME_TEMPLATE = "cople_clasificacion_{timestamp}_#{count}{ext}"
+    
+    # Máscaras en metadatos
+    METADATOS_MASCARAS_RLE = False      # Incluir cada máscara como RLE estilo COCO en el JSON
 
 # ==================== CONFIGURACIÓN DE ESTADÍSTICAS ====================
 class StatsConfig:
@@ -256,6 +256,10 @@ def procesar_comando_analisis_completo(sistema, ventana_cv):
         print(f"❌ Error en análisis completo: {resultados['error']}")
         return True
     
+    if resultados.get("reutilizado"):
+        origen = resultados["filtro_frames"].get("timestamp_origen")
+        print(f"\n♻️ Frame sin cambios: resultados reutilizados del análisis {origen}")
+    
     # Mostrar resultados de clasificación
     if "clasificacion" in resultados:
         clasificacion = resultados["clasificacion"]
@@ -7,6 +7,9 @@ import numpy as np
 import cv2
 import time
 import json
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
 import os
 import sys
@@ -14,7 +17,6 @@ import sys
 # Agregar path para imports
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from modules.capture import CamaraTiempoOptimizada
 from modules.capture.webcam_fallback import WebcamFallback, detectar_mejor_webcam
 from modules.classification import ClasificadorCoplesONNX, ProcesadorImagenClasificacion
 from modules.detection import DetectorPiezasCoples, ProcesadorPiezasCoples, DetectorDefectosCoples, ProcesadorDefectos
@@ -23,8 +25,17 @@ from modules.metadata_standard import MetadataStandard
 from modules.segmentation.segmentation_piezas_engine import SegmentadorPiezasCoples
 from modules.segmentation.piezas_segmentation_processor import ProcesadorSegmentacionPiezas
 from modules.preprocessing.illumination_robust import RobustezIluminacion
+from modules.preprocessing.frame_context import BuffersContexto, ContextoFrame
 from modules.adaptive_thresholds import UmbralesAdaptativos
-from config import GlobalConfig, RobustezConfig, WebcamConfig
+from modules.session_registry import obtener_registro
+from modules.stage_scheduler import PlanificadorEtapas
+from modules.cascade_policy import PoliticaCascada
+from modules.frame_gate import FiltroFramesRepetidos
+from modules.result_writer import EscritorResultadosAsincrono
+from modules.tiled_inference import calcular_teselas, region_desde_piezas, tamano_tesela
+from modules.part_crop import calcular_recorte
+from modules.io_binding import estadisticas_buffers
+from config import GlobalConfig, RobustezConfig, WebcamConfig, ModelsConfig, PipelineConfig, EscrituraConfig, ReplayConfig, TeseladoConfig, RecortePiezaConfig, EnlaceIOConfig, FiltroFramesConfig
 
 
 class SistemaAnalisisIntegrado:
@@ -32,9 +43,18 @@ class SistemaAnalisisIntegrado:
     Sistema que integra clasificación y detección de coples
     """
     
-    def __init__(self):
-        """Inicializa el sistema integrado de análisis"""
+    def __init__(self, fuente_captura=None):
+        """
+        Inicializa el sistema integrado de análisis
+        
+        Args:
+            fuente_captura (optional): Fuente de frames con la interfaz de CamaraTiempoOptimizada
+                (configurar_camara, iniciar/pausar/reanudar captura, obtener_frame_instantaneo...).
+                Si no se indica se usa FuenteReplay cuando ReplayConfig.RUTA está definida
+                y la cámara GigE en otro caso.
+        """
         # Componentes del sistema
+        self.fuente_captura = fuente_captura
         self.camara = None
         self.webcam_fallback = None
         self.usando_webcam = False
@@ -49,6 +69,24 @@ class SistemaAnalisisIntegrado:
         self.procesador_segmentacion_defectos = None
         self.procesador_segmentacion_piezas = None
         
+        # Planificador de etapas y presupuesto de hilos intra-op por etapa
+        self.planificador = None
+        self.presupuesto_hilos = {}
+        
+        # Política de cascada (clasificación -> modelos posteriores)
+        self.politica_cascada = PoliticaCascada()
+        
+        # Filtro de frames repetidos (línea detenida -> reutilizar el último análisis)
+        self.filtro_frames = FiltroFramesRepetidos()
+        
+        # Escritor de resultados en segundo plano (None = escritura síncrona)
+        self.escritor = None
+        
+        # Lienzos y tensores del ContextoFrame (reutilizados entre frames con IOBinding)
+        self.buffers_contexto = BuffersContexto(
+            reutilizar=EnlaceIOConfig.HABILITADO and EnlaceIOConfig.REUTILIZAR_CONTEXTO
+        )
+        
         # Componentes de robustez
         self.robustez_iluminacion = RobustezIluminacion()
         self.umbrales_adaptativos = UmbralesAdaptativos()
@@ -56,8 +94,16 @@ class SistemaAnalisisIntegrado:
         # Estado del sistema
         self.inicializado = False
         self.contador_resultados = 0
+        self._secuencia_reanudacion = 0  # Secuencia de frame registrada en la última reanudación
         
-        # Directorios de salida por módulo
+        # Carga de modelos (en segundo plano con inicialización diferida)
+        self.modelos_listos = False
+        self._hilo_modelos = None
+        self.estado_modelos = {}          # Etapa -> estado y tiempos de carga/calentamiento
+        self.tiempo_preparacion_ms = None
+        self._lock_estado = threading.Lock()
+        
+        # Directorios de salida por módulo (se crean al guardar el primer resultado)
         self.directorios_salida = {
             "clasificacion": "Salida_cople/Salida_clas_def",
             "deteccion_piezas": "Salida_cople/Salida_det_pz",
@@ -65,11 +111,7 @@ class SistemaAnalisisIntegrado:
             "segmentacion_defectos": "Salida_cople/Salida_seg_def",
             "segmentacion_piezas": "Salida_cople/Salida_seg_pz"
         }
-        
-        # Crear directorios si no existen
-        for directorio in self.directorios_salida.values():
-            if not os.path.exists(directorio):
-                os.makedirs(directorio)
+        self._directorios_creados = False
     
     def _inicializar_webcam_fallback(self) -> bool:
         """
@@ -108,19 +150,35 @@ class SistemaAnalisisIntegrado:
             print(f"❌ Error en fallback a webcam: {e}")
             return False
     
-    def inicializar(self) -> bool:
+    def inicializar(self, diferido: Optional[bool] = None) -> bool:
         """
         Inicializa todos los componentes del sistema
         
+        Args:
+            diferido (bool, optional): True para arrancar la captura de inmediato y cargar los
+                modelos en segundo plano; el primer análisis espera a que terminen.
+                Por defecto PipelineConfig.INICIALIZACION_DIFERIDA.
+        
         Returns:
             True si se inicializó correctamente
         """
+        if diferido is None:
+            diferido = PipelineConfig.INICIALIZACION_DIFERIDA
+        
         try:
             print("🚀 Inicializando sistema integrado de análisis...")
             
             # 1. Inicializar cámara (con fallback a webcam)
             print("📷 Inicializando cámara...")
-            self.camara = CamaraTiempoOptimizada()
+            if self.fuente_captura is not None:
+                self.camara = self.fuente_captura
+            elif ReplayConfig.RUTA:
+                from modules.capture import FuenteReplay
+                print(f"📼 Usando replay de {ReplayConfig.RUTA}")
+                self.camara = FuenteReplay()
+            else:
+                from modules.capture import CamaraTiempoOptimizada
+                self.camara = CamaraTiempoOptimizada()
             if not self.camara.configurar_camara():
                 print("❌ Error configurando cámara GigE")
                 
@@ -138,44 +196,11 @@ class SistemaAnalisisIntegrado:
             else:
                 print("✅ Cámara GigE inicializada correctamente")
             
-            # 2. Inicializar clasificador
-            print("🧠 Inicializando clasificador...")
-            self.clasificador = ClasificadorCoplesONNX()
-            if not self.clasificador.inicializar():
-                print("❌ Error inicializando clasificador")
-                return False
-            self.procesador_clasificacion = ProcesadorImagenClasificacion()
-            
-            # 3. Inicializar detector de piezas
-            print("🎯 Inicializando detector de piezas...")
-            self.detector_piezas = DetectorPiezasCoples()
-            self.procesador_deteccion_piezas = ProcesadorPiezasCoples()
-            
-            # 4. Inicializar detector de defectos
-            print("🎯 Inicializando detector de defectos...")
-            self.detector_defectos = DetectorDefectosCoples()
-            if not self.detector_defectos.inicializar():
-                print("❌ Error inicializando detector de defectos")
-                return False
-            self.procesador_deteccion_defectos = ProcesadorDefectos()
-            
-            # 5. Inicializar segmentador de defectos
-            print("🎯 Inicializando segmentador de defectos...")
-            self.segmentador_defectos = SegmentadorDefectosCoples()
-            if not self.segmentador_defectos._inicializar_modelo():
-                print("❌ Error inicializando segmentador de defectos")
-                return False
-            self.procesador_segmentacion_defectos = ProcesadorSegmentacionDefectos()
-            
-            # 6. Inicializar segmentador de piezas
-            print("🎯 Inicializando segmentador de piezas...")
-            self.segmentador_piezas = SegmentadorPiezasCoples()
-            if not self.segmentador_piezas.stats['inicializado']:
-                print("❌ Error inicializando segmentador de piezas")
+            # 2-7. Modelos y umbrales (en segundo plano si la inicialización es diferida)
+            if not diferido and not self._inicializar_modelos():
                 return False
-            self.procesador_segmentacion_piezas = ProcesadorSegmentacionPiezas()
             
-            # 7. Iniciar captura continua (solo para cámara GigE)
+            # 8. Iniciar captura continua (solo para cámara GigE)
             if not self.usando_webcam:
                 print("🎬 Iniciando captura continua...")
                 if not self.camara.iniciar_captura_continua():
@@ -187,7 +212,51 @@ class SistemaAnalisisIntegrado:
                     print("❌ Error iniciando captura continua de webcam")
                     return False
             
-            # 7. Aplicar configuración de robustez por defecto
+            # 9. Escritor de resultados fuera del hilo de inspección
+            if EscrituraConfig.ASINCRONA:
+                self.escritor = EscritorResultadosAsincrono()
+                print(f"📤 Escritura asíncrona: {self.escritor.num_trabajadores} hilos, "
+                      f"cola {self.escritor.tamano_cola}, política '{self.escritor.politica}'")
+            
+            if diferido:
+                print("⏳ Inicialización diferida: cargando modelos en segundo plano...")
+                self._hilo_modelos = threading.Thread(
+                    target=self._inicializar_modelos, name="carga_modelos", daemon=True
+                )
+                self._hilo_modelos.start()
+            
+            self.inicializado = True
+            print("✅ Sistema integrado inicializado correctamente")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error inicializando sistema: {e}")
+            return False
+    
+    def _inicializar_modelos(self) -> bool:
+        """
+        Crea los motores de inferencia y procesadores y aplica la robustez por defecto
+        
+        Returns:
+            True si todos los modelos se cargaron correctamente
+        """
+        try:
+            # 2. Repartir núcleos entre etapas (evita sobresuscribir la CPU en modo concurrente)
+            if PipelineConfig.EJECUCION_CONCURRENTE:
+                self.presupuesto_hilos = PlanificadorEtapas.calcular_presupuesto_hilos(
+                    PipelineConfig.PESOS_ETAPAS, PipelineConfig.NUCLEOS_DISPONIBLES
+                )
+                self.planificador = PlanificadorEtapas(PipelineConfig.MAX_TRABAJADORES)
+                print(f"🧵 Presupuesto de hilos intra-op por etapa: {self.presupuesto_hilos}")
+            else:
+                self.presupuesto_hilos = {}
+                self.planificador = PlanificadorEtapas(1)
+            
+            # 3-7. Cargar los cinco modelos (en paralelo) y calentarlos con tensores de prueba
+            if not self._cargar_modelos():
+                return False
+            
+            # Aplicar configuración de robustez por defecto
             print("🔧 Aplicando configuración de robustez por defecto...")
             config_default = RobustezConfig.CONFIGURACION_DEFAULT
             if config_default == RobustezConfig.UMBRALES_ORIGINAL:
@@ -201,24 +270,205 @@ class SistemaAnalisisIntegrado:
             else:
                 self.aplicar_configuracion_robustez("original")  # Fallback a original
             
-            self.inicializado = True
-            print("✅ Sistema integrado inicializado correctamente")
+            self.modelos_listos = True
             return True
             
         except Exception as e:
-            print(f"❌ Error inicializando sistema: {e}")
+            print(f"❌ Error inicializando modelos: {e}")
             return False
     
-    def capturar_imagen_unica(self) -> Dict:
+    def _cargadores_modelos(self) -> Dict:
+        """
+        Funciones que crean el motor y el procesador de cada etapa
+        
+        Cada una retorna la ruta del modelo cargado y lanza una excepción si la carga falla.
+        """
+        def clasificador():
+            motor = ClasificadorCoplesONNX(hilos_intra_op=self.presupuesto_hilos.get("clasificacion"))
+            if not motor.inicializar():
+                raise RuntimeError("error inicializando clasificador")
+            self.clasificador = motor
+            self.procesador_clasificacion = ProcesadorImagenClasificacion()
+            return motor.model_path
+        
+        def detector_piezas():
+            motor = DetectorPiezasCoples(hilos_intra_op=self.presupuesto_hilos.get("deteccion_piezas"))
+            self.detector_piezas = motor
+            self.procesador_deteccion_piezas = ProcesadorPiezasCoples()
+            return motor.modelo_path
+        
+        def detector_defectos():
+            motor = DetectorDefectosCoples(hilos_intra_op=self.presupuesto_hilos.get("deteccion_defectos"))
+            if not motor.inicializar():
+                raise RuntimeError("error inicializando detector de defectos")
+            self.detector_defectos = motor
+            self.procesador_deteccion_defectos = ProcesadorDefectos()
+            return motor.model_path
+        
+        def segmentador_defectos():
+            motor = SegmentadorDefectosCoples(hilos_intra_op=self.presupuesto_hilos.get("segmentacion_defectos"))
+            if not motor._inicializar_modelo():
+                raise RuntimeError("error inicializando segmentador de defectos")
+            self.segmentador_defectos = motor
+            self.procesador_segmentacion_defectos = ProcesadorSegmentacionDefectos()
+            return motor.model_path
+        
+        def segmentador_piezas():
+            motor = SegmentadorPiezasCoples(hilos_intra_op=self.presupuesto_hilos.get("segmentacion_piezas"))
+            if not motor.stats['inicializado']:
+                raise RuntimeError("error inicializando segmentador de piezas")
+            self.segmentador_piezas = motor
+            self.procesador_segmentacion_piezas = ProcesadorSegmentacionPiezas()
+            return motor.model_path
+        
+        return {
+            "clasificacion": clasificador,
+            "deteccion_piezas": detector_piezas,
+            "deteccion_defectos": detector_defectos,
+            "segmentacion_defectos": segmentador_defectos,
+            "segmentacion_piezas": segmentador_piezas
+        }
+    
+    def _actualizar_estado_modelo(self, etapa: str, **valores):
+        with self._lock_estado:
+            self.estado_modelos[etapa].update(valores)
+    
+    def _cargar_modelo(self, etapa: str, cargador) -> bool:
+        """Carga un modelo, lo calienta y registra sus tiempos en estado_modelos"""
+        try:
+            self._actualizar_estado_modelo(etapa, estado="cargando")
+            inicio = time.time()
+            ruta = cargador()
+            self._actualizar_estado_modelo(etapa, estado="calentando", carga_ms=(time.time() - inicio) * 1000)
+            
+            registro = obtener_registro()
+            registro.calentar(ruta, PipelineConfig.INFERENCIAS_CALENTAMIENTO)
+            stats = registro.obtener_estadisticas().get(os.path.basename(ruta), {})
+            self._actualizar_estado_modelo(
+                etapa, estado="listo",
+                primera_inferencia_ms=stats.get("primera_inferencia_ms"),
+                calentamiento_ms=stats.get("calentamiento_ms")
+            )
+            return True
+        except Exception as e:
+            print(f"❌ Error cargando modelo de {etapa}: {e}")
+            self._actualizar_estado_modelo(etapa, estado="error", error=str(e))
+            return False
+    
+    def _cargar_modelos(self) -> bool:
+        """
+        Carga los cinco modelos, en paralelo si PipelineConfig.CARGA_PARALELA
+        (la creación de sesiones y las inferencias de calentamiento liberan el GIL)
+        
+        Returns:
+            True si todos los modelos quedaron cargados y calentados
+        """
+        cargadores = self._cargadores_modelos()
+        with self._lock_estado:
+            self.estado_modelos = {
+                etapa: {"estado": "pendiente", "carga_ms": None, "primera_inferencia_ms": None,
+                        "calentamiento_ms": None, "error": None}
+                for etapa in cargadores
+            }
+        
+        inicio = time.time()
+        if PipelineConfig.CARGA_PARALELA:
+            print(f"🧠 Cargando {len(cargadores)} modelos en paralelo "
+                  f"({PipelineConfig.INFERENCIAS_CALENTAMIENTO} inferencias de calentamiento c/u)...")
+            with ThreadPoolExecutor(max_workers=len(cargadores), thread_name_prefix="carga_modelo") as pool:
+                futuros = [pool.submit(self._cargar_modelo, etapa, cargador)
+                           for etapa, cargador in cargadores.items()]
+                exitos = [futuro.result() for futuro in futuros]
+        else:
+            print(f"🧠 Cargando {len(cargadores)} modelos "
+                  f"({PipelineConfig.INFERENCIAS_CALENTAMIENTO} inferencias de calentamiento c/u)...")
+            exitos = [self._cargar_modelo(etapa, cargador) for etapa, cargador in cargadores.items()]
+        self.tiempo_preparacion_ms = (time.time() - inicio) * 1000
+        
+        for etapa, estado in self.estado_modelos.items():
+            if estado["estado"] == "listo":
+                print(f"   ✅ {etapa:<22} carga {estado['carga_ms']:7.1f} ms  "
+                      f"1ª inferencia {estado['primera_inferencia_ms'] or 0.0:7.1f} ms")
+        print(f"⏱️ Modelos preparados en {self.tiempo_preparacion_ms:.1f} ms")
+        return all(exitos)
+    
+    def obtener_estado_preparacion(self) -> Dict:
+        """
+        Estado de preparación de los modelos
+        
+        Returns:
+            Dict: estado global ("pendiente", "cargando", "listo" o "error"), tiempo total de
+                preparación y, por etapa, estado, tiempo de carga, primera inferencia y calentamiento (ms)
+        """
+        with self._lock_estado:
+            modelos = copy.deepcopy(self.estado_modelos)
+        estados = {modelo["estado"] for modelo in modelos.values()}
+        if not modelos or estados == {"pendiente"}:
+            estado = "pendiente"
+        elif "error" in estados:
+            estado = "error"
+        elif estados == {"listo"} and self.modelos_listos:
+            estado = "listo"
+        else:
+            estado = "cargando"
+        return {
+            "estado": estado,
+            "tiempo_preparacion_ms": self.tiempo_preparacion_ms,
+            "inferencias_calentamiento": PipelineConfig.INFERENCIAS_CALENTAMIENTO,
+            "modelos": modelos
+        }
+    
+    def esperar_modelos(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que termine la carga de modelos en segundo plano (inicialización diferida)
+        
+        Args:
+            timeout (float, optional): Espera máxima en segundos (None = sin límite)
+            
+        Returns:
+            True si los modelos están listos
+        """
+        hilo = self._hilo_modelos
+        if hilo is not None and hilo.is_alive():
+            hilo.join(timeout)
+        return self.modelos_listos
+    
+    def _sistema_listo(self) -> bool:
+        """Sistema inicializado y modelos cargados (espera la carga diferida si sigue en curso)"""
+        return self.inicializado and self.esperar_modelos()
+    
+    def _asegurar_directorios(self):
+        """Crea los directorios de salida por módulo al guardar el primer resultado"""
+        if self._directorios_creados:
+            return
+        for directorio in self.directorios_salida.values():
+            os.makedirs(directorio, exist_ok=True)
+        self._directorios_creados = True
+    
+    def _reanudar_captura(self):
+        """Reanuda la captura continua y registra la secuencia a partir de la cual un frame es nuevo"""
+        secuencia = self.camara.reanudar_captura_continua()
+        if isinstance(secuencia, int):
+            self._secuencia_reanudacion = secuencia
+    
+    def capturar_imagen_unica(self, solo_frame_nuevo: bool = False, fijar: bool = False) -> Dict:
         """
         Captura una sola imagen para procesamiento por módulos
         
+        Args:
+            solo_frame_nuevo (bool): Esperar el primer frame adquirido después de la última
+                reanudación de la captura (evita analizar dos veces el mismo frame sin pausas fijas)
+            fijar (bool): Con solo_frame_nuevo y una fuente con anillo de frames, entregar la vista
+                de solo lectura del slot sin copiarla. El resultado incluye "frame_fijado", que el
+                llamador debe liberar (ver _liberar_frame_fijado)
+        
         Returns:
             Diccionario con la imagen capturada y metadatos
         """
         if not self.inicializado:
             return {"error": "Sistema no inicializado"}
         
+        fijado = None
         try:
             tiempo_inicio = time.time()
             
@@ -226,6 +476,22 @@ class SistemaAnalisisIntegrado:
             if self.usando_webcam and self.webcam_fallback is not None:
                 # Para webcam, usar captura síncrona que es más confiable
                 resultado_captura = self.webcam_fallback.obtener_frame_sincrono()
+            elif solo_frame_nuevo and fijar and hasattr(self.camara, "esperar_frame_fijado"):
+                # Sin copia: el slot queda fijado en el anillo mientras corren las inferencias
+                inicio_espera = time.time()
+                fijado = self.camara.esperar_frame_fijado(self._secuencia_reanudacion)
+                tiempo_espera_ms = (time.time() - inicio_espera) * 1000
+                if fijado is None:
+                    return {"error": f"No llegó un frame nuevo en {tiempo_espera_ms:.0f} ms"}
+                resultado_captura = (fijado.imagen, tiempo_espera_ms, fijado.timestamp)
+            elif solo_frame_nuevo and hasattr(self.camara, "esperar_frame_nuevo"):
+                # Handshake por secuencia: se despierta en cuanto llega el frame, sin sondeo
+                frame, tiempo_espera_ms, timestamp, _ = self.camara.esperar_frame_nuevo(
+                    self._secuencia_reanudacion
+                )
+                if frame is None:
+                    return {"error": f"No llegó un frame nuevo en {tiempo_espera_ms:.0f} ms"}
+                resultado_captura = (frame, tiempo_espera_ms, timestamp)
             else:
                 resultado_captura = self.camara.obtener_frame_instantaneo()
                 
@@ -249,38 +515,45 @@ class SistemaAnalisisIntegrado:
                 },
                 "timestamp_original": timestamp
             }
+            if fijado is not None:
+                resultados["frame_fijado"] = fijado
             
             print(f"📷 Imagen capturada: {timestamp_captura}")
             return resultados
             
         except Exception as e:
             print(f"❌ Error capturando imagen: {e}")
+            if fijado is not None:
+                fijado.liberar()
             return {"error": str(e)}
     
     def analisis_completo(self) -> Dict:
         """
-        Realiza análisis completo: clasificación + detección de manera SECUENCIAL
+        Realiza análisis completo: clasificación + detección + segmentación.
+        Las etapas de inferencia se ejecutan en el planificador de etapas
+        (concurrentes o secuenciales según PipelineConfig).
         
         Returns:
             Diccionario con resultados completos
         """
-        if not self.inicializado:
+        if not self._sistema_listo():
             return {"error": "Sistema no inicializado"}
         
+        fijado = None
         try:
-            print("🚀 INICIANDO ANÁLISIS COMPLETO SECUENCIAL...")
+            print("🚀 INICIANDO ANÁLISIS COMPLETO...")
             
-            # 1. Pausar captura continua temporalmente
-            print("⏸️ Pausando captura continua para análisis...")
-            self.camara.pausar_captura_continua()
-            
-            # 2. Capturar imagen única
+            # 1. Capturar imagen única (el primer frame nuevo desde la última reanudación).
+            # Con anillo de frames el frame llega fijado y sin copia; la única copia se hace al guardar
             print("📷 Capturando imagen única...")
-            resultado_captura = self.capturar_imagen_unica()
+            resultado_captura = self.capturar_imagen_unica(solo_frame_nuevo=True, fijar=True)
             if "error" in resultado_captura:
-                # Reanudar captura continua en caso de error
-                self.camara.reanudar_captura_continua()
                 return resultado_captura
+            fijado = resultado_captura.get("frame_fijado")
+            
+            # 2. Pausar captura continua durante el análisis
+            print("⏸️ Pausando captura continua para análisis...")
+            self.camara.pausar_captura_continua()
             
             frame = resultado_captura["frame"]
             timestamp_captura = resultado_captura["timestamp_captura"]
@@ -290,139 +563,117 @@ class SistemaAnalisisIntegrado:
             # Verificar frame capturado (logs simplificados)
             print(f"📊 Frame capturado: {frame.shape if hasattr(frame, 'shape') else 'No shape'}")
             
+            # Frame prácticamente igual al último analizado: reutilizar sus resultados
+            evaluacion_filtro = self.filtro_frames.evaluar(frame)
+            if evaluacion_filtro["reutilizar"]:
+                frame = self._liberar_frame_fijado(fijado, frame)
+                return self._reutilizar_analisis(evaluacion_filtro, frame, timestamp_captura, tiempo_captura)
+            
             # CORREGIDO: Iniciar cronómetro total DESPUÉS de captura, ANTES de procesamiento
             tiempo_inicio_total = time.time()
             
-            # 3. CLASIFICACIÓN (SECUENCIAL)
-            print("\n🧠 EJECUTANDO CLASIFICACIÓN...")
-            
-            tiempo_clasificacion_inicio = time.time()
-            resultado_clasificacion = self.clasificador.clasificar(frame)
-            tiempo_clasificacion = (time.time() - tiempo_clasificacion_inicio) * 1000
-            clase_predicha, confianza, tiempo_inferencia_clas = resultado_clasificacion
-            print(f"✅ Clasificación completada en {tiempo_clasificacion:.2f} ms")
-            print(f"   Resultado: {clase_predicha} ({confianza:.2%})")
-            
-            # 4. DETECCIÓN DE PIEZAS (SECUENCIAL)
-            print("\n🎯 EJECUTANDO DETECCIÓN DE PIEZAS...")
-            
-            # SOLUCIÓN CRÍTICA: Reinicializar detector de piezas antes de usar
-            print("   🔧 Reinicializando detector de piezas...")
-            try:
-                self.detector_piezas.liberar()
-                # Crear nueva instancia del detector de piezas
-                from modules.detection.detection_engine import DetectorPiezasCoples
-                self.detector_piezas = DetectorPiezasCoples(confianza_min=0.55)
-                print("   ✅ Detector de piezas reinicializado correctamente")
-                
-                tiempo_deteccion_piezas_inicio = time.time()
-                detecciones_piezas = self.detector_piezas.detectar_piezas(frame)
-                tiempo_deteccion_piezas = (time.time() - tiempo_deteccion_piezas_inicio) * 1000
-                print(f"✅ Detección de piezas completada en {tiempo_deteccion_piezas:.2f} ms")
-                print(f"   Piezas detectadas: {len(detecciones_piezas)}")
-                
-            except Exception as e:
-                print(f"❌ ERROR en detección de piezas: {e}")
-                detecciones_piezas = []
-                tiempo_deteccion_piezas = 0
-            
-            # 5. DETECCIÓN DE DEFECTOS (SECUENCIAL)
-            print("\n🔍 EJECUTANDO DETECCIÓN DE DEFECTOS...")
+            # Preprocesamiento compartido: un solo tensor por variante de canales para los 5 modelos
+            contexto = ContextoFrame(frame, self.buffers_contexto)
+            contexto.preparar(ModelsConfig.INPUT_SIZE)
+            tiempo_preprocesamiento = (time.time() - tiempo_inicio_total) * 1000
+            
+            # 3. INFERENCIAS: las 5 etapas son independientes dado el frame
+            modo = "CONCURRENTE" if self.planificador.max_trabajadores > 1 else "SECUENCIAL"
+            print(f"\n🧠 EJECUTANDO ETAPAS DE INFERENCIA ({modo})...")
+            etapas = {
+                "clasificacion": lambda: self.clasificador.clasificar(frame, contexto),
+                "deteccion_piezas": lambda: self.detector_piezas.detectar_piezas(frame, contexto),
+                "deteccion_defectos": lambda: self.detector_defectos.detectar_defectos(frame, contexto),
+                "segmentacion_defectos": lambda: self.segmentador_defectos.segmentar_defectos(frame, contexto),
+                "segmentacion_piezas": lambda: self.segmentador_piezas.segmentar(frame, contexto)
+            }
             
-            # SOLUCIÓN CRÍTICA: Reinicializar detector de defectos antes de usar
-            print("   🔧 Reinicializando detector de defectos...")
-            try:
-                self.detector_defectos.liberar()
-                if not self.detector_defectos.inicializar():
-                    print("❌ Error reinicializando detector de defectos")
-                    detecciones_defectos = []
-                    tiempo_deteccion_defectos = 0
-                else:
-                    print("   ✅ Detector de defectos reinicializado correctamente")
-                    
-                    tiempo_deteccion_defectos_inicio = time.time()
-                    detecciones_defectos = self.detector_defectos.detectar_defectos(frame)
-                    tiempo_deteccion_defectos = (time.time() - tiempo_deteccion_defectos_inicio) * 1000
-                    print(f"✅ Detección de defectos completada en {tiempo_deteccion_defectos:.2f} ms")
-                    print(f"   Defectos detectados: {len(detecciones_defectos)}")
-                    
-            except Exception as e:
-                print(f"❌ ERROR en detección de defectos: {e}")
-                print(f"   🔍 Frame original intacto - ID: {id(frame)}")
-                detecciones_defectos = []
-                tiempo_deteccion_defectos = (time.time() - tiempo_deteccion_defectos_inicio) * 1000
-            
-            # 6. SEGMENTACIÓN DE DEFECTOS (SECUENCIAL)
-            print("\n🎨 EJECUTANDO SEGMENTACIÓN DE DEFECTOS...")
-            print(f"🔍 DEBUG - Frame para segmentación:")
-            print(f"   Tipo: {type(frame)}")
-            print(f"   Shape: {frame.shape if hasattr(frame, 'shape') else 'No shape'}")
-            print(f"   Dtype: {frame.dtype if hasattr(frame, 'dtype') else 'No dtype'}")
-            print(f"   Rango valores: [{frame.min() if hasattr(frame, 'min') else 'N/A'}, {frame.max() if hasattr(frame, 'max') else 'N/A'}]")
-            print(f"   ID del objeto: {id(frame)}")
-            
-            # SOLUCIÓN CRÍTICA: Reinicializar segmentador antes de usar
-            print("   🔧 Reinicializando segmentador de defectos...")
-            tiempo_segmentacion_inicio = time.time()  # Inicializar antes del try
-            try:
-                self.segmentador_defectos.liberar()
-                # Crear nueva instancia del segmentador
-                from modules.segmentation.segmentation_defectos_engine import SegmentadorDefectosCoples
-                self.segmentador_defectos = SegmentadorDefectosCoples(confianza_min=0.55)
-                print("   ✅ Segmentador de defectos reinicializado correctamente")
-                
-                tiempo_segmentacion_inicio = time.time()
-                segmentaciones_defectos = self.segmentador_defectos.segmentar_defectos(frame)
-                tiempo_segmentacion = (time.time() - tiempo_segmentacion_inicio) * 1000
-                print(f"✅ Segmentación de defectos completada en {tiempo_segmentacion:.2f} ms")
-                print(f"   Segmentaciones detectadas: {len(segmentaciones_defectos)}")
-                
-            except Exception as e:
-                print(f"❌ ERROR en segmentación de defectos: {e}")
-                print(f"   🔍 Frame original intacto - ID: {id(frame)}")
-                segmentaciones_defectos = []
-                tiempo_segmentacion = (time.time() - tiempo_segmentacion_inicio) * 1000
-            
-            # 6. SEGMENTACIÓN DE PIEZAS (SECUENCIAL)
-            print("\n🎨 EJECUTANDO SEGMENTACIÓN DE PIEZAS...")
-            print(f"🔍 DEBUG - Frame para segmentación de piezas:")
-            print(f"   Tipo: {type(frame)}")
-            print(f"   Shape: {frame.shape if hasattr(frame, 'shape') else 'No shape'}")
-            print(f"   Dtype: {frame.dtype if hasattr(frame, 'dtype') else 'No dtype'}")
-            print(f"   Rango valores: [{frame.min() if hasattr(frame, 'min') else 'N/A'}, {frame.max() if hasattr(frame, 'max') else 'N/A'}]")
-            print(f"   ID del objeto: {id(frame)}")
-            
-            # SOLUCIÓN CRÍTICA: Reinicializar segmentador de piezas antes de usar
-            print("   🔧 Reinicializando segmentador de piezas...")
-            try:
-                self.segmentador_piezas.liberar()
-                # Recrear segmentador de piezas
-                from modules.segmentation.segmentation_piezas_engine import SegmentadorPiezasCoples
-                self.segmentador_piezas = SegmentadorPiezasCoples()
-                if not self.segmentador_piezas.stats['inicializado']:
-                    print("   ❌ Error reinicializando segmentador de piezas")
-                    segmentaciones_piezas = []
-                    tiempo_segmentacion_piezas = 0
-                else:
-                    print("   ✅ Segmentador de piezas reinicializado correctamente")
-                    
-                    tiempo_segmentacion_piezas_inicio = time.time()
-                    segmentaciones_piezas = self.segmentador_piezas.segmentar(frame)
-                    tiempo_segmentacion_piezas = (time.time() - tiempo_segmentacion_piezas_inicio) * 1000
-                    print(f"✅ Segmentación de piezas completada en {tiempo_segmentacion_piezas:.2f} ms")
-                    print(f"   Segmentaciones detectadas: {len(segmentaciones_piezas)}")
+            # Teselado: con frames mayores que la entrada, los modelos de defectos recorren
+            # el frame nativo en teselas en vez de reducirlo a 640.
+            # Recorte por pieza: los modelos de defectos reciben solo la caja de la pieza detectada.
+            teselado = self._usar_teselado(frame)
+            recorte_pieza = not teselado and RecortePiezaConfig.HABILITADO
+            regiones = {"teselas": None, "recorte": None}
+            if teselado:
+                etapas["deteccion_defectos"] = lambda: self.detector_defectos.detectar_defectos_teselado(
+                    frame, regiones["teselas"]
+                )
+                etapas["segmentacion_defectos"] = lambda: self.segmentador_defectos.segmentar_defectos_teselado(
+                    frame, regiones["teselas"]
+                )
+            elif recorte_pieza:
+                etapas["deteccion_defectos"] = lambda: self.detector_defectos.detectar_defectos_region(
+                    frame, regiones["recorte"]
+                )
+                etapas["segmentacion_defectos"] = lambda: self.segmentador_defectos.segmentar_defectos_region(
+                    frame, regiones["recorte"]
+                )
+            teselar_pieza = teselado and TeseladoConfig.REGION == "pieza"
+            
+            if self.politica_cascada.habilitada or teselar_pieza or recorte_pieza:
+                # Cascada: clasificación y piezas primero; deciden qué modelos posteriores correr
+                # (y, con teselado o recorte por pieza, la región que analizan los modelos de defectos)
+                salidas, tiempos_etapas = self.planificador.ejecutar({
+                    nombre: etapas[nombre] for nombre in ("clasificacion", "deteccion_piezas")
+                })
+                # Las cajas de piezas ya están en píxeles del frame (retroproyectadas del letterbox)
+                alto, ancho = frame.shape[:2]
+                if teselar_pieza:
+                    regiones["teselas"] = region_desde_piezas(salidas["deteccion_piezas"] or [], (alto, ancho))
+                if recorte_pieza:
+                    regiones["recorte"] = calcular_recorte(salidas["deteccion_piezas"] or [], (alto, ancho))
+                    if regiones["recorte"] is None and not RecortePiezaConfig.OMITIR_SIN_PIEZA:
+                        regiones["recorte"] = (0, 0, ancho, alto)
+                clase_previa, confianza_previa, _ = salidas["clasificacion"] or (None, 0, 0)
+                traza_cascada = self.politica_cascada.evaluar(
+                    clase_previa, confianza_previa, len(salidas["deteccion_piezas"] or []),
+                    defectos_requieren_pieza=recorte_pieza and RecortePiezaConfig.OMITIR_SIN_PIEZA
+                )
+                for decision in traza_cascada["decisiones"]:
+                    estado = "▶️" if decision["ejecutada"] else "⏭️"
+                    print(f"   {estado} {decision['etapa']}: {decision['motivo']}")
                 
-            except Exception as e:
-                print(f"❌ ERROR en segmentación de piezas: {e}")
-                print(f"   🔍 Frame original intacto - ID: {id(frame)}")
-                segmentaciones_piezas = []
-                tiempo_segmentacion_piezas = 0
+                salidas_posteriores, tiempos_posteriores = self.planificador.ejecutar({
+                    nombre: etapas[nombre]
+                    for nombre in ("deteccion_defectos", "segmentacion_defectos", "segmentacion_piezas")
+                    if nombre not in traza_cascada["omitidas"]
+                })
+                salidas.update(salidas_posteriores)
+                tiempos_etapas.update(tiempos_posteriores)
+                for nombre in traza_cascada["omitidas"]:
+                    salidas[nombre] = None
+                    tiempos_etapas[nombre] = {"espera_ms": 0.0, "duracion_ms": 0.0, "omitida": True}
+            else:
+                salidas, tiempos_etapas = self.planificador.ejecutar(etapas)
+                clase_previa, confianza_previa, _ = salidas["clasificacion"] or (None, 0, 0)
+                traza_cascada = self.politica_cascada.evaluar(
+                    clase_previa, confianza_previa, len(salidas["deteccion_piezas"] or [])
+                )
             
-            # 7. Calcular tiempo total (suma de todos los tiempos de procesamiento + captura)
+            # 4. Recoger resultados (las etapas con error devuelven valores vacíos)
+            clase_predicha, confianza, tiempo_inferencia_clas = salidas["clasificacion"] or (None, 0, 0)
+            detecciones_piezas = salidas["deteccion_piezas"] or []
+            detecciones_defectos = salidas["deteccion_defectos"] or []
+            segmentaciones_defectos = salidas["segmentacion_defectos"] or []
+            segmentaciones_piezas = salidas["segmentacion_piezas"] or []
+            
+            tiempo_clasificacion = tiempos_etapas["clasificacion"]["duracion_ms"]
+            tiempo_deteccion_piezas = tiempos_etapas["deteccion_piezas"]["duracion_ms"]
+            tiempo_deteccion_defectos = tiempos_etapas["deteccion_defectos"]["duracion_ms"]
+            tiempo_segmentacion = tiempos_etapas["segmentacion_defectos"]["duracion_ms"]
+            tiempo_segmentacion_piezas = tiempos_etapas["segmentacion_piezas"]["duracion_ms"]
+            
+            print(f"✅ Clasificación: {clase_predicha} ({confianza:.2%}) en {tiempo_clasificacion:.2f} ms")
+            print(f"✅ Piezas detectadas: {len(detecciones_piezas)} en {tiempo_deteccion_piezas:.2f} ms")
+            print(f"✅ Defectos detectados: {len(detecciones_defectos)} en {tiempo_deteccion_defectos:.2f} ms")
+            print(f"✅ Segmentaciones de defectos: {len(segmentaciones_defectos)} en {tiempo_segmentacion:.2f} ms")
+            print(f"✅ Segmentaciones de piezas: {len(segmentaciones_piezas)} en {tiempo_segmentacion_piezas:.2f} ms")
+            
+            # 5. Calcular tiempo total (procesamiento de pared + captura)
             tiempo_procesamiento_total = (time.time() - tiempo_inicio_total) * 1000
             tiempo_total = tiempo_captura + tiempo_procesamiento_total
             
-            # 8. Crear resultados
+            # 6. Crear resultados
             resultados = {
                 "clasificacion": {
                     "clase": clase_predicha,
@@ -435,28 +686,50 @@ class SistemaAnalisisIntegrado:
                 "segmentaciones_piezas": segmentaciones_piezas,
                 "tiempos": {
                     "captura_ms": tiempo_captura,
+                    "preprocesamiento_ms": tiempo_preprocesamiento,
                     "clasificacion_ms": tiempo_clasificacion,
                     "deteccion_piezas_ms": tiempo_deteccion_piezas,
                     "deteccion_defectos_ms": tiempo_deteccion_defectos,
                     "segmentacion_defectos_ms": tiempo_segmentacion,
                     "segmentacion_piezas_ms": tiempo_segmentacion_piezas,
-                    "total_ms": tiempo_total
+                    "filtro_frames_ms": evaluacion_filtro["tiempo_ms"],
+                    "procesamiento_ms": tiempo_procesamiento_total,
+                    "total_ms": tiempo_total,
+                    "etapas": tiempos_etapas
+                },
+                "cascada": traza_cascada,
+                "reutilizado": False,
+                "filtro_frames": {
+                    "reutilizado": False,
+                    "diferencia": evaluacion_filtro["diferencia"],
+                    "umbral": self.filtro_frames.umbral
+                },
+                "teselado": {
+                    "habilitado": teselado,
+                    "region": regiones["teselas"],
+                    "teselas": len(calcular_teselas(frame.shape[:2], region=regiones["teselas"])) if teselado else 0
+                },
+                "recorte_pieza": {
+                    "habilitado": recorte_pieza,
+                    "region": regiones["recorte"]
                 },
                 "frame": frame,
                 "timestamp_captura": timestamp_captura
             }
             
-            # 9. Guardar resultados por módulo
+            # Nueva referencia del filtro de frames repetidos
+            self.filtro_frames.registrar_analisis(frame, resultados, evaluacion_filtro["miniatura"])
+            
+            # Inferencias terminadas: copia única del frame (resultados y escritor) y slot liberado
+            resultados["frame"] = self._liberar_frame_fijado(fijado, frame)
+            
+            # 7. Guardar resultados por módulo
             print("\n💾 GUARDANDO RESULTADOS...")
             self._guardar_por_modulos(resultados)
             
-            # 10. Reanudar captura continua
+            # 8. Reanudar captura continua; el siguiente análisis esperará un frame posterior
             print("▶️ Reanudando captura continua...")
-            self.camara.reanudar_captura_continua()
-            
-            # 11. Pausa mínima para estabilizar sistema
-            print("⏸️ Pausa de 0.5 segundos para estabilizar sistema...")
-            time.sleep(0.5)
+            self._reanudar_captura()
             
             print(f"\n🎉 ANÁLISIS COMPLETO FINALIZADO EN {tiempo_total:.2f} ms")
             return resultados
@@ -467,10 +740,71 @@ class SistemaAnalisisIntegrado:
             traceback.print_exc()
             # Reanudar captura continua en caso de error
             try:
-                self.camara.reanudar_captura_continua()
+                self._reanudar_captura()
             except:
                 pass
             return {"error": str(e)}
+        finally:
+            if fijado is not None:
+                fijado.liberar()
+    
+    def _liberar_frame_fijado(self, fijado, frame: np.ndarray) -> np.ndarray:
+        """
+        Copia el frame fijado del anillo y libera su slot (sin frame fijado retorna `frame`).
+        
+        La copia queda de solo lectura: es la que retornan los resultados y la que el escritor
+        asíncrono guarda sin volver a copiarla (las anotaciones siempre dibujan sobre una copia).
+        """
+        if fijado is None:
+            return frame
+        with fijado:
+            copia = fijado.copia()
+        copia.flags.writeable = False
+        return copia
+    
+    def _reutilizar_analisis(self, evaluacion: Dict, frame: np.ndarray, timestamp_captura: str,
+                             tiempo_captura: float) -> Dict:
+        """
+        Resultados del último análisis para un frame que apenas cambió (sin ejecutar los modelos).
+        Las detecciones son las del frame de referencia; el frame y los tiempos son los actuales.
+        """
+        anterior = evaluacion["resultados"]
+        tiempo_filtro = evaluacion["tiempo_ms"]
+        resultados = dict(anterior)
+        resultados["tiempos"] = {
+            "captura_ms": tiempo_captura,
+            "preprocesamiento_ms": 0.0,
+            "clasificacion_ms": 0.0,
+            "deteccion_piezas_ms": 0.0,
+            "deteccion_defectos_ms": 0.0,
+            "segmentacion_defectos_ms": 0.0,
+            "segmentacion_piezas_ms": 0.0,
+            "filtro_frames_ms": tiempo_filtro,
+            "procesamiento_ms": tiempo_filtro,
+            "total_ms": tiempo_captura + tiempo_filtro,
+            "etapas": {}
+        }
+        resultados["reutilizado"] = True
+        resultados["filtro_frames"] = {
+            "reutilizado": True,
+            "diferencia": evaluacion["diferencia"],
+            "umbral": self.filtro_frames.umbral,
+            "timestamp_origen": anterior.get("timestamp_captura")
+        }
+        resultados["frame"] = frame
+        resultados["timestamp_captura"] = timestamp_captura
+        
+        print(f"♻️ Frame sin cambios (diferencia {evaluacion['diferencia']:.2f} < {self.filtro_frames.umbral}): "
+              f"se reutiliza el análisis de {anterior.get('timestamp_captura')}")
+        if FiltroFramesConfig.GUARDAR_REUTILIZADOS:
+            self._guardar_por_modulos(resultados)
+        
+        self._reanudar_captura()
+        return resultados
+    
+    def _usar_teselado(self, frame: np.ndarray) -> bool:
+        """Indica si los modelos de defectos deben recorrer el frame en teselas."""
+        return TeseladoConfig.HABILITADO and max(frame.shape[:2]) > tamano_tesela()
     
     def solo_clasificacion(self) -> Dict:
         """
@@ -479,7 +813,7 @@ class SistemaAnalisisIntegrado:
         Returns:
             Diccionario con resultados de clasificación
         """
-        if not self.inicializado:
+        if not self._sistema_listo():
             return {"error": "Sistema no inicializado"}
         
         try:
@@ -537,7 +871,7 @@ class SistemaAnalisisIntegrado:
         Returns:
             Diccionario con resultados de detección
         """
-        if not self.inicializado:
+        if not self._sistema_listo():
             return {"error": "Sistema no inicializado"}
         
         try:
@@ -588,7 +922,7 @@ class SistemaAnalisisIntegrado:
         Returns:
             Diccionario con resultados de detección de defectos
         """
-        if not self.inicializado:
+        if not self._sistema_listo():
             return {"error": "Sistema no inicializado"}
         
         try:
@@ -604,7 +938,10 @@ class SistemaAnalisisIntegrado:
             # 2. Detección de defectos
             tiempo_inicio = time.time()  # CORREGIDO: Iniciar cronómetro DESPUÉS de captura
             tiempo_deteccion_inicio = time.time()
-            detecciones_defectos = self.detector_defectos.detectar_defectos(frame)
+            if self._usar_teselado(frame):
+                detecciones_defectos = self.detector_defectos.detectar_defectos_teselado(frame)
+            else:
+                detecciones_defectos = self.detector_defectos.detectar_defectos(frame)
             tiempo_deteccion = (time.time() - tiempo_deteccion_inicio) * 1000
             
             # 3. Calcular tiempo total (captura + procesamiento)
@@ -639,7 +976,7 @@ class SistemaAnalisisIntegrado:
         Returns:
             Diccionario con resultados de segmentación de defectos
         """
-        if not self.inicializado:
+        if not self._sistema_listo():
             return {"error": "Sistema no inicializado"}
         
         try:
@@ -655,7 +992,10 @@ class SistemaAnalisisIntegrado:
             # 2. Segmentación de defectos
             tiempo_inicio = time.time()  # CORREGIDO: Iniciar cronómetro DESPUÉS de captura
             tiempo_segmentacion_inicio = time.time()
-            segmentaciones_defectos = self.segmentador_defectos.segmentar_defectos(frame)
+            if self._usar_teselado(frame):
+                segmentaciones_defectos = self.segmentador_defectos.segmentar_defectos_teselado(frame)
+            else:
+                segmentaciones_defectos = self.segmentador_defectos.segmentar_defectos(frame)
             tiempo_segmentacion = (time.time() - tiempo_segmentacion_inicio) * 1000
             
             # 3. Calcular tiempo total (captura + procesamiento)
@@ -690,7 +1030,7 @@ class SistemaAnalisisIntegrado:
         Returns:
             Diccionario con resultados de segmentación de piezas
         """
-        if not self.inicializado:
+        if not self._sistema_listo():
             return {"error": "Sistema no inicializado"}
         
         try:
@@ -752,37 +1092,74 @@ class SistemaAnalisisIntegrado:
             return {"error": str(e)}
     
     def _guardar_por_modulos(self, resultados: Dict):
-        """Guarda resultados por módulos en carpetas separadas"""
+        """
+        Guarda resultados por módulos en carpetas separadas.
+        Con el escritor asíncrono activo solo encola una instantánea; la anotación,
+        codificación y escritura a disco ocurren fuera del hilo de inspección.
+        """
+        self.contador_resultados += 1
+        numero = self.contador_resultados
+        
+        if self.escritor is None:
+            self._escribir_por_modulos(resultados, numero)
+            return
+        
         try:
-            self.contador_resultados += 1
+            instantanea = self._crear_instantanea(resultados)
+            if self.escritor.enviar(lambda: self._escribir_por_modulos(instantanea, numero),
+                                    f"resultados #{numero}"):
+                print(f"📤 Resultados #{numero} encolados para escritura")
+        except Exception as e:
+            print(f"❌ Error encolando resultados: {e}")
+    
+    def _crear_instantanea(self, resultados: Dict) -> Dict:
+        """
+        Copia independiente de los resultados para escribirla en segundo plano.
+        Un frame propio de solo lectura (ver _liberar_frame_fijado) se comparte sin copiar.
+        """
+        instantanea = copy.deepcopy({k: v for k, v in resultados.items() if k != "frame"})
+        frame = resultados.get("frame")
+        if isinstance(frame, np.ndarray) and (frame.flags.writeable or not frame.flags.owndata):
+            frame = frame.copy()
+        instantanea["frame"] = frame
+        return instantanea
+    
+    def _escribir_por_modulos(self, resultados: Dict, numero: int):
+        """Anota y escribe los resultados de cada módulo en su carpeta"""
+        try:
+            self._asegurar_directorios()
+            
             timestamp_captura = resultados.get("timestamp_captura", "unknown")
             
+            # Las etapas omitidas por la cascada no generan archivos; su traza va en la clasificación
+            omitidas = set(resultados.get("cascada", {}).get("omitidas", []))
+            
             # 1. Guardar clasificación (si existe)
             if "clasificacion" in resultados:
-                self._guardar_clasificacion_modulo(resultados, timestamp_captura)
+                self._guardar_clasificacion_modulo(resultados, timestamp_captura, numero)
             
             # 2. Guardar detección de piezas (si existe)
             if "detecciones_piezas" in resultados:
                 self._guardar_deteccion_piezas_modulo(resultados, timestamp_captura)
             
             # 3. Guardar detección de defectos (si existe)
-            if "detecciones_defectos" in resultados:
+            if "detecciones_defectos" in resultados and "deteccion_defectos" not in omitidas:
                 self._guardar_deteccion_defectos_modulo(resultados, timestamp_captura)
             
             # 4. Guardar segmentación de defectos (si existe)
-            if "segmentaciones_defectos" in resultados:
+            if "segmentaciones_defectos" in resultados and "segmentacion_defectos" not in omitidas:
                 self._guardar_segmentacion_defectos_modulo(resultados, timestamp_captura)
             
             # 5. Guardar segmentación de piezas (si existe)
-            if "segmentaciones_piezas" in resultados:
+            if "segmentaciones_piezas" in resultados and "segmentacion_piezas" not in omitidas:
                 self._guardar_segmentacion_piezas_modulo(resultados, timestamp_captura)
             
-            print(f"✅ Resultados #{self.contador_resultados} guardados por módulos")
+            print(f"✅ Resultados #{numero} guardados por módulos")
             
         except Exception as e:
             print(f"❌ Error guardando por módulos: {e}")
     
-    def _guardar_clasificacion_modulo(self, resultados: Dict, timestamp_captura: str):
+    def _guardar_clasificacion_modulo(self, resultados: Dict, timestamp_captura: str, numero: int):
         """Guarda resultados de clasificación en su módulo específico"""
         try:
             # Crear imagen anotada
@@ -795,7 +1172,7 @@ class SistemaAnalisisIntegrado:
             )
             
             # Guardar imagen en módulo de clasificación
-            nombre_imagen = f"clasificacion_{timestamp_captura}_{self.contador_resultados}.jpg"
+            nombre_imagen = f"clasificacion_{timestamp_captura}_{numero}.jpg"
             ruta_imagen = os.path.join(self.directorios_salida["clasificacion"], nombre_imagen)
             cv2.imwrite(ruta_imagen, frame_anotado)
             
@@ -805,10 +1182,11 @@ class SistemaAnalisisIntegrado:
                 archivo_imagen=nombre_imagen,
                 resultados=resultados["clasificacion"],
                 tiempos=resultados["tiempos"],
-                timestamp_captura=timestamp_captura
+                timestamp_captura=timestamp_captura,
+                cascada=resultados.get("cascada")
             )
             
-            nombre_json = f"clasificacion_{timestamp_captura}_{self.contador_resultados}.json"
+            nombre_json = f"clasificacion_{timestamp_captura}_{numero}.json"
             ruta_json = os.path.join(self.directorios_salida["clasificacion"], nombre_json)
             
             with open(ruta_json, 'w', encoding='utf-8') as f:
@@ -903,27 +1281,104 @@ class SistemaAnalisisIntegrado:
         stats = {
             "sistema": "Integrado (Clasificación + Detección de Piezas + Detección de Defectos + Segmentación de Defectos + Segmentación de Piezas)",
             "resultados_procesados": self.contador_resultados,
+            "modelos_listos": self.modelos_listos,
+            "preparacion": self.obtener_estado_preparacion(),
             "camara": camara_stats,
-            "clasificador": {"inicializado": True} if self.clasificador else {},
+            "clasificador": {"inicializado": True, "buffers": estadisticas_buffers(self.clasificador)} if self.clasificador else {},
             "detector_piezas": self.detector_piezas.obtener_estadisticas() if self.detector_piezas else {},
             "detector_defectos": self.detector_defectos.obtener_estadisticas() if self.detector_defectos else {},
             "segmentador_defectos": self.segmentador_defectos.obtener_estadisticas() if self.segmentador_defectos else {},
-            "segmentador_piezas": self.segmentador_piezas.obtener_estadisticas() if self.segmentador_piezas else {}
+            "segmentador_piezas": self.segmentador_piezas.obtener_estadisticas() if self.segmentador_piezas else {},
+            "sesiones_onnx": obtener_registro().obtener_estadisticas(),
+            "asignaciones_buffers": self.obtener_asignaciones_buffers(),
+            "filtro_frames": self.filtro_frames.obtener_estadisticas(),
+            "escritor": self.escritor.obtener_estadisticas() if self.escritor else {"asincrono": False}
         }
         
         return stats
+
+    def obtener_asignaciones_buffers(self) -> Dict:
+        """
+        Resumen de buffers reservados: contexto del frame y, por motor, preprocesamiento + salidas.
+        Con IOBinding los totales dejan de crecer tras los primeros frames de cada resolución.
+        """
+        motores = {
+            "clasificador": self.clasificador,
+            "detector_piezas": self.detector_piezas,
+            "detector_defectos": self.detector_defectos,
+            "segmentador_defectos": self.segmentador_defectos,
+            "segmentador_piezas": self.segmentador_piezas
+        }
+        resumen = {
+            "iobinding": EnlaceIOConfig.HABILITADO,
+            "contexto": self.buffers_contexto.contador.como_dict()
+        }
+        total = self.buffers_contexto.contador.asignaciones
+        for nombre, motor in motores.items():
+            if motor is None:
+                continue
+            buffers = estadisticas_buffers(motor)
+            asignaciones = sum(parte.get("asignaciones", 0)
+                               for parte in (buffers["inferencia"], buffers["preprocesamiento"]))
+            resumen[nombre] = asignaciones
+            total += asignaciones
+        resumen["total"] = total
+        return resumen
+
+    def recargar_modelos(self) -> bool:
+        """
+        Recarga bajo demanda todos los modelos del registro de sesiones
+        y actualiza las sesiones de los motores (p. ej. tras reemplazar un .onnx)
+        
+        Returns:
+            bool: True si todos los modelos se recargaron correctamente
+        """
+        try:
+            print("🔄 Recargando modelos ONNX...")
+            if not obtener_registro().recargar():
+                return False
+            
+            # Los resultados en caché corresponden a los modelos anteriores
+            self.filtro_frames.reiniciar()
+            
+            # Los motores vuelven a pedir su sesión al registro
+            exito = self.clasificador.inicializar() if self.clasificador else True
+            if self.detector_piezas:
+                self.detector_piezas._inicializar_modelo()
+            if self.detector_defectos:
+                exito = self.detector_defectos.inicializar() and exito
+            if self.segmentador_defectos:
+                exito = bool(self.segmentador_defectos._inicializar_modelo()) and exito
+            if self.segmentador_piezas:
+                exito = bool(self.segmentador_piezas._inicializar_modelo()) and exito
+            
+            print("✅ Modelos recargados" if exito else "⚠️ Recarga de modelos incompleta")
+            return exito
+            
+        except Exception as e:
+            print(f"❌ Error recargando modelos: {e}")
+            return False
     
     def liberar(self):
         """Libera todos los recursos del sistema"""
         try:
             print("🧹 Liberando recursos del sistema integrado...")
             
+            # Escribir los resultados pendientes antes de liberar lo demás
+            if self.escritor:
+                print("💾 Vaciando cola de escritura...")
+                self.escritor.cerrar()
+                self.escritor = None
+            
             if self.camara:
                 self.camara.liberar()
             
             if self.webcam_fallback:
                 self.webcam_fallback.liberar_recursos()
             
+            # No liberar motores mientras la carga diferida sigue creándolos
+            self.esperar_modelos()
+            
             if self.clasificador:
                 self.clasificador.liberar()
             
@@ -939,6 +1394,12 @@ class SistemaAnalisisIntegrado:
             if self.segmentador_piezas:
                 self.segmentador_piezas.liberar()
             
+            if self.planificador:
+                self.planificador.cerrar()
+            
+            # Descartar las sesiones compartidas del registro
+            obtener_registro().liberar()
+            
             self.inicializado = False
             print("✅ Recursos del sistema integrado liberados")
             
@@ -1054,7 +1515,10 @@ class SistemaAnalisisIntegrado:
                     confianza_min=config['confianza_min'],
                     iou_threshold=config['iou_threshold']
                 )
-            
+
+            # Los resultados en caché se decodificaron con los umbrales anteriores
+            self.filtro_frames.reiniciar()
+
             print("✅ Configuración de robustez aplicada correctamente")
             
         except Exception as e:
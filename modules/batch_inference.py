@@ -0,0 +1,76 @@
+"""
+Inferencia por lotes para los motores ONNX
+Apila N tensores [1, 3, H, W] en una sola ejecución [N, 3, H, W] cuando el modelo
+tiene el eje de lote dinámico, y reparte las salidas por frame
+"""
+
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config import PipelineConfig
+from modules.session_registry import obtener_registro
+
+
+def admite_lote_dinamico(session) -> bool:
+    """
+    Indica si la primera entrada del modelo acepta un tamaño de lote variable.
+
+    Los modelos exportados con batch fijo declaran un entero (1) en el eje 0;
+    los exportados con `dynamic=True` declaran un nombre simbólico o None.
+    """
+    try:
+        forma = session.get_inputs()[0].shape
+        return len(forma) > 0 and not isinstance(forma[0], int)
+    except Exception:
+        return False
+
+
+def ejecutar_lote(session, output_names: List[str], input_name: str,
+                  tensores: Sequence[np.ndarray], model_path: Optional[str] = None,
+                  tamano_lote: Optional[int] = None) -> List[List[np.ndarray]]:
+    """
+    Ejecuta el modelo sobre varios tensores de entrada y retorna las salidas por frame.
+
+    Con eje de lote dinámico los tensores se concatenan en bloques de hasta
+    `tamano_lote` frames (una llamada a session.run por bloque); si no, se ejecutan
+    de uno en uno. En ambos casos cada frame recibe sus salidas con batch 1
+    (vistas [i:i+1]), de modo que los decodificadores existentes no cambian.
+
+    Args:
+        session: Sesión ONNX Runtime
+        output_names (List[str]): Salidas a calcular
+        input_name (str): Nombre de la entrada
+        tensores (Sequence[np.ndarray]): Tensores [1, 3, H, W] preprocesados, o un solo arreglo
+            [N, 3, H, W] ya apilado (p. ej. las teselas de un frame)
+        model_path (str, optional): Modelo para registrar los tiempos en el registro de sesiones
+        tamano_lote (int, optional): Frames por ejecución (por defecto PipelineConfig.TAMANO_LOTE_MAXIMO)
+
+    Returns:
+        List[List[np.ndarray]]: Por cada frame, la lista de salidas con batch 1
+    """
+    if len(tensores) == 0:
+        return []
+
+    if admite_lote_dinamico(session):
+        tamano_lote = max(1, int(tamano_lote or PipelineConfig.TAMANO_LOTE_MAXIMO))
+    else:
+        tamano_lote = 1
+
+    resultados = []
+    for inicio in range(0, len(tensores), tamano_lote):
+        bloque = tensores[inicio:inicio + tamano_lote]
+        if isinstance(tensores, np.ndarray):
+            entrada = bloque  # Lote ya apilado [N, 3, H, W]: vista sin copia
+        else:
+            entrada = bloque[0] if len(bloque) == 1 else np.concatenate(bloque, axis=0)
+
+        tiempo_run = time.time()
+        salidas = session.run(output_names, {input_name: entrada})
+        if model_path:
+            obtener_registro().registrar_inferencia(model_path, (time.time() - tiempo_run) * 1000)
+
+        for i in range(len(bloque)):
+            resultados.append([salida[i:i + 1] for salida in salidas])
+    return resultados
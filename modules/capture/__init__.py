@@ -1,7 +1,33 @@
 """
 Módulo de captura de imágenes
+
+Las clases se importan bajo demanda (PEP 562): importar el paquete no carga
+el controlador GigE ni sus dependencias hasta que se usa CamaraTiempoOptimizada.
 """
 
-from .camera_controller import CamaraTiempoOptimizada
+import importlib
+
+_EXPORTACIONES = {
+    'CamaraTiempoOptimizada': '.camera_controller',
+    'AnilloFrames': '.frame_ring',
+    'FrameFijado': '.frame_ring',
+    'FuenteReplay': '.replay_source',
+    'EscritorArchivoFrames': '.frame_archive',
+    'LectorArchivoFrames': '.frame_archive',
+    'GrabadorCaptura': '.frame_archive'
+}
+
+__all__ = list(_EXPORTACIONES)
+
+
+def __getattr__(nombre):
+    modulo = _EXPORTACIONES.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(modulo, __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
 
-__all__ = ['CamaraTiempoOptimizada']
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTACIONES))
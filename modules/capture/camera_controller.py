@@ -14,13 +14,34 @@ import sys
 import os
 
 # Importar configuración
-from config import CameraConfig, StatsConfig, GlobalConfig
+from config import CameraConfig, StatsConfig, GlobalConfig, GrabacionConfig
+from .debayer import codigo_bayer, debayer
+from .frame_archive import GrabadorCaptura
+from .frame_ring import AnilloFrames
 
-# Obtener el código de soporte común para el GigE-V Framework
-sys.path.append("../gigev_common")
+# pygigev se importa al configurar la cámara: solo el backend GigE lo necesita
+pygigev = None
+GPF = None
 
-import pygigev
-from pygigev import GevPixelFormats as GPF
+
+def _cargar_pygigev() -> bool:
+    """
+    Importa pygigev bajo demanda (y el código de soporte común del GigE-V Framework).
+
+    Returns:
+        bool: False si el SDK GigE no está instalado (p. ej. equipos de CI)
+    """
+    global pygigev, GPF
+    if pygigev is None:
+        if "../gigev_common" not in sys.path:
+            sys.path.append("../gigev_common")
+        try:
+            import pygigev as modulo_pygigev
+            from pygigev import GevPixelFormats
+        except ImportError:
+            return False
+        pygigev, GPF = modulo_pygigev, GevPixelFormats
+    return True
 
 
 class CamaraTiempoOptimizada:
@@ -28,7 +49,7 @@ class CamaraTiempoOptimizada:
     Controlador optimizado de cámara GigE para captura de imágenes de coples.
     
     Características:
-    - Captura asíncrona continua con doble buffer
+    - Captura asíncrona continua sobre un anillo de frames preasignado (sin copias en captura)
     - Optimizado para resolución 640x640
     - Procesamiento en tiempo real con mínima latencia
     - Gestión automática de memoria
@@ -61,26 +82,32 @@ class CamaraTiempoOptimizada:
         self.roi_offset_x = CameraConfig.ROI_OFFSET_X
         self.roi_offset_y = CameraConfig.ROI_OFFSET_Y
         
-        # Sistema de doble buffer asíncrono optimizado
-        self.write_buffer_idx = 0    # Buffer donde se está escribiendo actualmente
-        self.read_buffer_idx = 1     # Buffer listo para lectura
+        # Anillo de frames RGB preasignado: el debayer escribe directo en el slot
+        # y los lectores fijan vistas de solo lectura (con número de secuencia)
+        self.anillo = AnilloFrames(CameraConfig.RING_SLOTS, self.roi_height, self.roi_width)
+        self.codigo_bayer = codigo_bayer()
         
-        # Almacenamiento de frames procesados
-        self.processed_frames = [None] * 2  # Solo necesitamos 2 slots
-        self.frame_ready = [False] * 2      # Estado de cada frame
-        self.frame_timestamps = [0] * 2     # Timestamps de captura
+        # Grabación opcional de cada frame a un archivo de frames crudos
+        self.grabador = None
+        self.grabar_bayer = GrabacionConfig.GRABAR_BAYER
         
         # Control de sincronización optimizado
-        self.buffer_lock = Lock()           # Lock mínimo para cambios de índices
+        self.buffer_lock = Lock()           # Lock mínimo para el estado de pausa
         self.frame_ready_event = Event()    # Señal de frame listo
         self.capture_thread = None          # Thread de captura continua
         self.capture_active = False         # Control del thread
         self.capture_paused = False         # Control de pausa temporal
+        self.capture_resumed_event = Event()  # Activo mientras la captura no está pausada
+        self.capture_resumed_event.set()
+        self._drenar_al_reanudar = False    # El thread descarta los buffers del driver antes de publicar
+        self._buffers_drenados = Event()    # Señal de buffers del driver ya descartados tras reanudar
+        self._buffers_drenados.set()
         
         # Estadísticas de rendimiento
         self.capture_times = Queue(maxsize=StatsConfig.CAPTURE_TIMES_QUEUE_SIZE)
         self.processing_times = Queue(maxsize=StatsConfig.PROCESSING_TIMES_QUEUE_SIZE)
         self.total_frames_captured = 0
+        self.frames_descartados_reanudacion = 0
         self.start_time = 0
         
         # Información de payload
@@ -94,6 +121,10 @@ class CamaraTiempoOptimizada:
         Returns:
             bool: True si la configuración fue exitosa
         """
+        if not _cargar_pygigev():
+            print("❌ pygigev no disponible: no se puede usar la cámara GigE")
+            return False
+        
         try:
             # Inicializar API GigE
             pygigev.GevApiInitialize()
@@ -311,11 +342,14 @@ class CamaraTiempoOptimizada:
         
         try:
             while self.capture_active:
-                # Verificar si la captura está pausada
-                with self.buffer_lock:
-                    if self.capture_paused:
-                        time.sleep(0.001)  # 1ms
-                        continue
+                # Si la captura está pausada, dormir hasta que se reanude (sin sondeo activo)
+                if not self.capture_resumed_event.wait(timeout=CameraConfig.FRAME_TIMEOUT):
+                    continue
+                
+                # Tras una pausa, los buffers del driver guardan frames adquiridos durante el análisis
+                if self._drenar_al_reanudar:
+                    self._drenar_buffers_driver()
+                    continue
                 
                 capture_start = time.time()
                 gevbufPtr = ctypes.POINTER(pygigev.GEV_BUFFER_OBJECT)()
@@ -359,11 +393,40 @@ class CamaraTiempoOptimizada:
         except Exception as e:
             print(f"❌ Error en thread de captura: {e}")
         finally:
+            # No dejar esperando a reanudar_captura_continua si el thread termina
+            self._buffers_drenados.set()
             # Detener transferencia
             if self.handle:
                 pygigev.GevStopTransfer(self.handle)
             print(f"📊 Thread de captura terminado. Frames capturados: {frame_local_count}")
 
+    def _drenar_buffers_driver(self):
+        """
+        Descarta sin publicar los frames que el driver adquirió mientras la captura estaba pausada.
+        
+        La transferencia sigue activa durante la pausa (modo asíncrono), así que al reanudar
+        los `num_buffers` buffers del driver contienen frames anteriores a la reanudación.
+        Si la pausa fue corta puede descartarse también algún frame posterior (un periodo de frame).
+        """
+        self._drenar_al_reanudar = False
+        try:
+            for _ in range(self.num_buffers):
+                gevbufPtr = ctypes.POINTER(pygigev.GEV_BUFFER_OBJECT)()
+                status = pygigev.GevWaitForNextFrame(
+                    self.handle,
+                    ctypes.byref(gevbufPtr),
+                    int(CameraConfig.FRAME_TIMEOUT * 1000)
+                )
+                if status != 0:
+                    break
+                if gevbufPtr:
+                    pygigev.GevReleaseFrame(self.handle, gevbufPtr)
+                self.frames_descartados_reanudacion += 1
+        except Exception as e:
+            print(f"❌ Error descartando buffers del driver: {e}")
+        finally:
+            self._buffers_drenados.set()
+
     def _procesar_frame_async(self, gevbufPtr):
         """
         Procesa frame de manera asíncrona en el buffer de escritura actual.
@@ -387,61 +450,149 @@ class CamaraTiempoOptimizada:
             raw_data = np.frombuffer(im_addr.contents, dtype=np.uint8)
             raw_data = raw_data.reshape((self.roi_height, self.roi_width))
             
-            # Procesar imagen (conversión Bayer a RGB)
-            frame_rgb = cv2.cvtColor(raw_data, cv2.COLOR_BayerRG2RGB)
+            # Reservar el siguiente slot libre del anillo (None si todos están fijados por lectores)
+            reserva = self.anillo.reservar()
+            if reserva is None:
+                return False
+            slot, destino = reserva
+            
+            # Conversión Bayer a RGB directamente en el slot (sin asignar ni copiar)
+            debayer(raw_data, destino, self.codigo_bayer)
             
-            # Actualizar buffer de escritura atómicamente
-            with self.buffer_lock:
-                # Guardar frame procesado en buffer de escritura
-                self.processed_frames[self.write_buffer_idx] = frame_rgb.copy()
-                self.frame_ready[self.write_buffer_idx] = True
-                self.frame_timestamps[self.write_buffer_idx] = time.time()
-                
-                # Rotar índices de buffers
-                self._rotar_buffers()
+            # Publicar el frame y avisar a quien espera un frame nuevo
+            timestamp = time.time()
+            secuencia = self.anillo.publicar(slot, timestamp)
             
+            # Grabar sin codificar (crudo antes del debayer o el RGB del slot)
+            grabador = self.grabador
+            if grabador is not None and grabador.activo:
+                grabador.grabar(raw_data if self.grabar_bayer else destino, timestamp, secuencia,
+                                self.exposure_time, self.gain)
             return True
             
         except Exception as e:
             print(f"❌ Error procesando frame async: {e}")
             return False
 
-    def _rotar_buffers(self):
-        """Rota los índices de buffers de manera circular."""
-        # Intercambiar buffers de manera simple
-        self.write_buffer_idx, self.read_buffer_idx = self.read_buffer_idx, self.write_buffer_idx
+    def iniciar_grabacion(self, ruta=None, bayer=None, max_frames=None):
+        """
+        Empieza a grabar cada frame capturado en un archivo de frames crudos.
+        
+        Args:
+            ruta (str, optional): Archivo destino (por defecto GrabacionConfig.DIRECTORIO/captura_<fecha>.frames)
+            bayer (bool, optional): Grabar el crudo Bayer (True) o el RGB (por defecto GrabacionConfig.GRABAR_BAYER)
+            max_frames (int, optional): Detener la grabación tras este número de frames
+            
+        Returns:
+            str or None: Ruta del archivo o None si hubo error
+        """
+        try:
+            self.detener_grabacion()
+            self.grabar_bayer = GrabacionConfig.GRABAR_BAYER if bayer is None else bayer
+            ruta = ruta or os.path.join(GrabacionConfig.DIRECTORIO,
+                                        f"captura_{time.strftime('%Y%m%d_%H%M%S')}.frames")
+            forma = (self.roi_height, self.roi_width) if self.grabar_bayer else self.anillo.forma
+            self.grabador = GrabadorCaptura(ruta, forma, GrabacionConfig.FRAMES_POR_BLOQUE, max_frames)
+            print(f"⏺️ Grabando captura en {ruta} ({'Bayer' if self.grabar_bayer else 'RGB'})")
+            return ruta
+        except Exception as e:
+            print(f"❌ Error iniciando grabación: {e}")
+            self.grabador = None
+            return None
+
+    def detener_grabacion(self):
+        """
+        Detiene la grabación en curso y cierra el archivo.
+        
+        Returns:
+            dict: Estadísticas de la grabación (vacío si no había grabación)
+        """
+        grabador, self.grabador = self.grabador, None
+        if grabador is None:
+            return {}
+        grabador.cerrar()
+        stats = grabador.obtener_estadisticas()
+        print(f"⏹️ Grabación detenida: {stats['frames_grabados']} frames en {stats['ruta']}")
+        return stats
 
     def obtener_frame_instantaneo(self):
         """
-        Obtiene el frame más reciente de manera instantánea (~1ms).
+        Obtiene una copia del frame más reciente de manera instantánea (~1ms).
+        La copia se hace fuera del lock con el slot fijado: la captura nunca espera al lector.
         
         Returns:
             tuple: (frame, tiempo_acceso_ms, timestamp) o (None, tiempo_acceso_ms, 0)
         """
         start_time = time.time()
         
-        with self.buffer_lock:
-            if self.frame_ready[self.read_buffer_idx]:
-                # Copiar frame del buffer de lectura
-                frame = self.processed_frames[self.read_buffer_idx].copy()
-                timestamp = self.frame_timestamps[self.read_buffer_idx]
-                
-                # Marcar como procesado
-                self.frame_ready[self.read_buffer_idx] = False
-                
-                elapsed = (time.time() - start_time) * 1000
-                return frame, elapsed, timestamp
-            else:
-                # No hay frame nuevo, devolver el último disponible
-                for i in range(2):
-                    if self.frame_ready[i]:
-                        frame = self.processed_frames[i].copy()
-                        timestamp = self.frame_timestamps[i]
-                        elapsed = (time.time() - start_time) * 1000
-                        return frame, elapsed, timestamp
+        fijado = self.anillo.ultimo()
+        if fijado is None:
+            elapsed = (time.time() - start_time) * 1000
+            return None, elapsed, 0
+        
+        with fijado:
+            frame = fijado.copia()
+        
+        elapsed = (time.time() - start_time) * 1000
+        return frame, elapsed, fijado.timestamp
+
+    def obtener_frame_fijado(self):
+        """
+        Obtiene el frame más reciente sin copiarlo.
+        
+        Returns:
+            FrameFijado or None: Vista de solo lectura con secuencia y timestamp.
+                Llamar a liberar() (o usar `with`) al terminar; hasta entonces la
+                captura no reutiliza su slot.
+        """
+        return self.anillo.ultimo()
+
+    def esperar_frame_fijado(self, secuencia_minima=0, timeout=None):
+        """
+        Espera el primer frame con secuencia mayor a `secuencia_minima` y lo retorna sin copiar.
+        
+        Args:
+            secuencia_minima (int): Secuencia a superar
+            timeout (float, optional): Segundos máximos de espera (por defecto CameraConfig.FRESH_FRAME_TIMEOUT)
+            
+        Returns:
+            FrameFijado or None: Vista fijada (ver obtener_frame_fijado) o None si se agotó el tiempo
+        """
+        timeout = CameraConfig.FRESH_FRAME_TIMEOUT if timeout is None else timeout
+        return self.anillo.esperar(secuencia_minima, timeout)
+
+    def obtener_secuencia_actual(self):
+        """
+        Retorna el número de secuencia del último frame adquirido.
+        
+        Returns:
+            int: Secuencia (0 si aún no hay frames)
+        """
+        return self.anillo.obtener_secuencia()
+
+    def esperar_frame_nuevo(self, secuencia_minima=0, timeout=None):
+        """
+        Espera el primer frame con secuencia mayor a `secuencia_minima` y retorna una copia.
+        
+        Args:
+            secuencia_minima (int): Secuencia a superar (p. ej. la registrada al reanudar)
+            timeout (float, optional): Segundos máximos de espera (por defecto CameraConfig.FRESH_FRAME_TIMEOUT)
+            
+        Returns:
+            tuple: (frame, tiempo_espera_ms, timestamp, secuencia) o (None, tiempo_espera_ms, 0, secuencia)
+        """
+        start_time = time.time()
+        
+        fijado = self.esperar_frame_fijado(secuencia_minima, timeout)
+        if fijado is None:
+            elapsed = (time.time() - start_time) * 1000
+            return None, elapsed, 0, self.anillo.obtener_secuencia()
+        
+        with fijado:
+            frame = fijado.copia()
         
         elapsed = (time.time() - start_time) * 1000
-        return None, elapsed, 0
+        return frame, elapsed, fijado.timestamp, fijado.secuencia
 
     def capturar_frame(self):
         """
@@ -474,7 +625,10 @@ class CamaraTiempoOptimizada:
             'fps_real': fps_real,
             'frames_totales': self.total_frames_captured,
             'tiempo_total': tiempo_total,
-            'buffers_listos': sum(self.frame_ready),
+            'buffers_listos': 1 if self.anillo.hay_frame() else 0,
+            'frames_descartados_reanudacion': self.frames_descartados_reanudacion,
+            'anillo': self.anillo.obtener_estadisticas(),
+            'grabacion': self.grabador.obtener_estadisticas() if self.grabador else None,
             'ip_camara': self.ip,
             'roi_size': f"{self.roi_width}x{self.roi_height}",
             'exposure_time': self.exposure_time,
@@ -493,23 +647,12 @@ class CamaraTiempoOptimizada:
     def liberar(self):
         """Liberar recursos de la cámara."""
         try:
-            # Detener captura
+            # Detener captura y cerrar la grabación en curso
             self.detener_captura()
+            self.detener_grabacion()
             
-            # Limpiar buffers de manera segura
-            with self.buffer_lock:
-                try:
-                    if hasattr(self, 'processed_frames') and self.processed_frames is not None:
-                        for i in range(len(self.processed_frames)):
-                            if i < len(self.processed_frames) and self.processed_frames[i] is not None:
-                                del self.processed_frames[i]
-                        self.processed_frames = [None] * 2
-                    if hasattr(self, 'frame_ready') and self.frame_ready is not None:
-                        self.frame_ready = [False] * 2
-                except Exception as e:
-                    print(f"   - Error limpiando buffers: {e}")
-                    self.processed_frames = [None] * 2
-                    self.frame_ready = [False] * 2
+            # Descartar los frames publicados (los slots preasignados se conservan)
+            self.anillo.reiniciar()
             
             # Cerrar cámara
             if self.handle:
@@ -535,15 +678,34 @@ class CamaraTiempoOptimizada:
         """
         with self.buffer_lock:
             self.capture_paused = True
+            self.capture_resumed_event.clear()
             print("⏸️ Captura continua pausada temporalmente")
     
     def reanudar_captura_continua(self):
         """
         Reanuda la captura continua después de una pausa temporal
+        
+        Los frames que el driver siguió adquiriendo durante la pausa se descartan antes de
+        retornar, de modo que la secuencia retornada ya los incluye.
+        
+        Returns:
+            int: Secuencia a superar; los frames con secuencia mayor se adquirieron después de reanudar
         """
         with self.buffer_lock:
+            drenar = (self.capture_paused and self.capture_thread is not None
+                      and self.capture_thread.is_alive())
+            if drenar:
+                self._buffers_drenados.clear()
+                self._drenar_al_reanudar = True
             self.capture_paused = False
-            print("▶️ Captura continua reanudada")
+            self.capture_resumed_event.set()
+        
+        # Un frame en curso al pausar más los buffers del driver, cada uno con FRAME_TIMEOUT como máximo
+        if drenar and not self._buffers_drenados.wait(
+                timeout=CameraConfig.FRAME_TIMEOUT * (self.num_buffers + 2)):
+            print("⚠️ Timeout descartando los buffers del driver al reanudar")
+        print("▶️ Captura continua reanudada")
+        return self.anillo.obtener_secuencia()
 
     def mostrar_configuracion(self):
         """Muestra la configuración actual de la cámara."""
@@ -0,0 +1,36 @@
+"""
+Conversión Bayer -> RGB común a la cámara GigE y a las fuentes de replay
+"""
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from config import CameraConfig
+
+
+def codigo_bayer(nombre: Optional[str] = None) -> int:
+    """Código cv2.COLOR_* para el patrón Bayer configurado (p. ej. "BayerRG2RGB")."""
+    return getattr(cv2, f"COLOR_{nombre or CameraConfig.BAYER_CONVERSION}")
+
+
+def debayer(raw: np.ndarray, destino: Optional[np.ndarray] = None,
+            codigo: Optional[int] = None) -> np.ndarray:
+    """
+    Convierte un frame Bayer (alto, ancho) a RGB.
+
+    Args:
+        raw (np.ndarray): Frame crudo uint8 (alto, ancho)
+        destino (np.ndarray, optional): Arreglo (alto, ancho, 3) donde escribir sin asignar
+            (p. ej. un slot de AnilloFrames)
+        codigo (int, optional): Código cv2.COLOR_Bayer* (por defecto CameraConfig.BAYER_CONVERSION)
+
+    Returns:
+        np.ndarray: Frame RGB (el propio `destino` si se indicó)
+    """
+    codigo = codigo_bayer() if codigo is None else codigo
+    if destino is None:
+        return cv2.cvtColor(raw, codigo)
+    cv2.cvtColor(raw, codigo, dst=destino)
+    return destino
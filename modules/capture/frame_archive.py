@@ -0,0 +1,307 @@
+"""
+Archivo de frames crudos memory-mapped para grabar turnos completos
+Cada frame se guarda sin codificar junto a un registro de tamaño fijo
+(timestamp, secuencia, exposición, ganancia); la lectura es acceso aleatorio sin decodificar
+"""
+
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+MAGIA = b"COPLEFRM"
+VERSION = 1
+TAMANO_CABECERA = 64   # Cabecera global: magia, versión, forma, dtype, número de frames
+TAMANO_REGISTRO = 64   # Registro por frame (relleno hasta 64 bytes para alinear los frames)
+EXTENSION = ".frames"
+
+# Cabecera: magia(8) versión(u4) alto(u4) ancho(u4) canales(u4) dtype(8s) num_frames(u8) creación(f8)
+_FORMATO_CABECERA = "<8sIIII8sQd"
+
+
+def _dtype_registro(forma: Tuple[int, ...], dtype) -> np.dtype:
+    """Registro + frame como un único dtype estructurado (una fila por frame)."""
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("secuencia", "<u8"),
+        ("exposicion", "<f4"),
+        ("ganancia", "<f4"),
+        ("_reservado", f"V{TAMANO_REGISTRO - 24}"),
+        ("frame", np.dtype(dtype), forma)
+    ])
+
+
+def _leer_cabecera(ruta: str) -> Dict:
+    with open(ruta, "rb") as f:
+        datos = f.read(struct.calcsize(_FORMATO_CABECERA))
+    magia, version, alto, ancho, canales, dtype, num_frames, creacion = struct.unpack(_FORMATO_CABECERA, datos)
+    if magia != MAGIA:
+        raise ValueError(f"{ruta} no es un archivo de frames")
+    if version != VERSION:
+        raise ValueError(f"versión de archivo de frames no soportada: {version}")
+    forma = (alto, ancho) if canales == 1 else (alto, ancho, canales)
+    return {
+        "forma": forma,
+        "dtype": np.dtype(dtype.rstrip(b"\0").decode()),
+        "num_frames": num_frames,
+        "creacion": creacion
+    }
+
+
+class EscritorArchivoFrames:
+    """
+    Escritor por bloques de un archivo de frames crudos.
+
+    Características:
+    - El archivo crece en bloques de `frames_por_bloque` frames (ftruncate + memmap del bloque)
+    - agregar() es una sola copia de memoria al mapa, sin codificar
+    - El número de frames de la cabecera se actualiza en cada frame (un lector ve lo ya escrito)
+    - Los frames quedan alineados a 64 bytes si su tamaño lo es
+    """
+
+    def __init__(self, ruta: str, forma: Tuple[int, ...], dtype=np.uint8, frames_por_bloque: int = 64):
+        """
+        Args:
+            ruta (str): Archivo a crear (se sobrescribe si existe)
+            forma (Tuple[int, ...]): (alto, ancho) para Bayer o (alto, ancho, canales) para RGB
+            dtype: Tipo de los píxeles
+            frames_por_bloque (int): Frames que se reservan cada vez que el archivo crece
+        """
+        self.ruta = ruta
+        self.forma = tuple(int(d) for d in forma)
+        self.dtype = np.dtype(dtype)
+        self.frames_por_bloque = max(1, int(frames_por_bloque))
+        self.registro = _dtype_registro(self.forma, self.dtype)
+        self.num_frames = 0
+        self.capacidad = 0
+        self._bloques = []  # [(primer_indice, memmap del bloque)]
+        self.bytes_escritos = 0
+
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        self._archivo = open(ruta, "w+b")
+        self._escribir_cabecera(creacion=time.time())
+
+    def _escribir_cabecera(self, creacion: Optional[float] = None):
+        if creacion is not None:
+            self._creacion = creacion
+        alto, ancho = self.forma[:2]
+        canales = self.forma[2] if len(self.forma) == 3 else 1
+        cabecera = struct.pack(_FORMATO_CABECERA, MAGIA, VERSION, alto, ancho, canales,
+                               self.dtype.str.encode(), self.num_frames, self._creacion)
+        self._archivo.seek(0)
+        self._archivo.write(cabecera.ljust(TAMANO_CABECERA, b"\0"))
+        self._archivo.flush()
+
+    def _crecer(self):
+        """Extiende el archivo un bloque y lo mapea."""
+        primero = self.capacidad
+        self.capacidad += self.frames_por_bloque
+        self._archivo.truncate(TAMANO_CABECERA + self.capacidad * self.registro.itemsize)
+        bloque = np.memmap(self._archivo, dtype=self.registro, mode="r+",
+                           offset=TAMANO_CABECERA + primero * self.registro.itemsize,
+                           shape=(self.frames_por_bloque,))
+        self._bloques.append((primero, bloque))
+
+    def agregar(self, frame: np.ndarray, timestamp: Optional[float] = None, secuencia: int = 0,
+                exposicion: float = 0.0, ganancia: float = 0.0) -> int:
+        """
+        Agrega un frame al final del archivo.
+
+        Args:
+            frame (np.ndarray): Frame con la forma y tipo del archivo
+            timestamp (float, optional): Instante de captura (por defecto ahora)
+            secuencia (int): Número de secuencia de la captura
+            exposicion (float): Tiempo de exposición (µs)
+            ganancia (float): Ganancia del sensor
+
+        Returns:
+            int: Índice del frame en el archivo
+        """
+        if frame.shape != self.forma:
+            raise ValueError(f"forma {frame.shape} distinta de la del archivo {self.forma}")
+        if self.num_frames >= self.capacidad:
+            self._crecer()
+
+        primero, bloque = self._bloques[-1]
+        fila = bloque[self.num_frames - primero]
+        fila["timestamp"] = time.time() if timestamp is None else timestamp
+        fila["secuencia"] = secuencia
+        fila["exposicion"] = exposicion
+        fila["ganancia"] = ganancia
+        np.copyto(fila["frame"], frame, casting="unsafe")
+
+        indice = self.num_frames
+        self.num_frames += 1
+        self.bytes_escritos += frame.nbytes
+        self._archivo.seek(struct.calcsize("<8sIIII8s"))
+        self._archivo.write(struct.pack("<Q", self.num_frames))
+        self._archivo.flush()
+        return indice
+
+    def cerrar(self):
+        """Vuelca los bloques, recorta el espacio reservado sin usar y cierra el archivo."""
+        if self._archivo is None:
+            return
+        for _, bloque in self._bloques:
+            bloque.flush()
+        self._bloques = []
+        self._archivo.truncate(TAMANO_CABECERA + self.num_frames * self.registro.itemsize)
+        self._escribir_cabecera()
+        self._archivo.close()
+        self._archivo = None
+
+    def __enter__(self) -> "EscritorArchivoFrames":
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+
+class LectorArchivoFrames:
+    """
+    Lector de acceso aleatorio de un archivo de frames.
+
+    Los frames son vistas de solo lectura sobre el memory-map (sin copias ni decodificación);
+    los metadatos de todos los frames están disponibles como arreglos (timestamps, secuencias...).
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        cabecera = _leer_cabecera(ruta)
+        self.forma = cabecera["forma"]
+        self.dtype = cabecera["dtype"]
+        self.creacion = cabecera["creacion"]
+        self.registro = _dtype_registro(self.forma, self.dtype)
+
+        # Frames completos realmente presentes (la cabecera puede ir por detrás si la grabación se cortó)
+        disponibles = (os.path.getsize(ruta) - TAMANO_CABECERA) // self.registro.itemsize
+        self.num_frames = int(min(cabecera["num_frames"], disponibles))
+        self._datos = (np.memmap(ruta, dtype=self.registro, mode="r", offset=TAMANO_CABECERA,
+                                 shape=(self.num_frames,))
+                       if self.num_frames else np.zeros(0, dtype=self.registro))
+
+    def __len__(self) -> int:
+        return self.num_frames
+
+    def __getitem__(self, indice: int) -> np.ndarray:
+        """Frame `indice` como vista de solo lectura (sin copia)."""
+        return self._datos["frame"][indice]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(self.num_frames):
+            yield self[i]
+
+    @property
+    def es_bayer(self) -> bool:
+        return len(self.forma) == 2
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._datos["timestamp"]
+
+    @property
+    def secuencias(self) -> np.ndarray:
+        return self._datos["secuencia"]
+
+    def registro_frame(self, indice: int) -> Dict:
+        """Metadatos de un frame (timestamp, secuencia, exposición, ganancia)."""
+        fila = self._datos[indice]
+        return {
+            "indice": indice,
+            "timestamp": float(fila["timestamp"]),
+            "secuencia": int(fila["secuencia"]),
+            "exposicion": float(fila["exposicion"]),
+            "ganancia": float(fila["ganancia"])
+        }
+
+    def indice_en(self, timestamp: float) -> int:
+        """Índice del último frame capturado en o antes de `timestamp` (0 si es anterior a todos)."""
+        if self.num_frames == 0:
+            raise IndexError("archivo de frames vacío")
+        return max(0, int(np.searchsorted(self.timestamps, timestamp, side="right")) - 1)
+
+    def frame_en(self, timestamp: float) -> np.ndarray:
+        """Frame vigente en `timestamp` (vista sin copia)."""
+        return self[self.indice_en(timestamp)]
+
+    def cerrar(self):
+        self._datos = np.zeros(0, dtype=self.registro)
+        self.num_frames = 0
+
+    def __enter__(self) -> "LectorArchivoFrames":
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+
+class GrabadorCaptura:
+    """
+    Grabador de la captura continua a un archivo de frames.
+
+    Se conecta a CamaraTiempoOptimizada (iniciar_grabacion) y recibe cada frame desde
+    el hilo de captura: crudo Bayer antes del debayer o RGB ya convertido.
+    """
+
+    def __init__(self, ruta: str, forma: Tuple[int, ...], frames_por_bloque: int = 64,
+                 max_frames: Optional[int] = None):
+        """
+        Args:
+            ruta (str): Archivo de frames a crear
+            forma (Tuple[int, ...]): Forma de los frames a grabar
+            frames_por_bloque (int): Crecimiento del archivo
+            max_frames (int, optional): Detener la grabación al alcanzar este número de frames
+        """
+        self.escritor = EscritorArchivoFrames(ruta, forma, frames_por_bloque=frames_por_bloque)
+        self.max_frames = max_frames
+        self.activo = True
+        self._lock = threading.Lock()  # cerrar() desde otro hilo no corta un frame a medias
+        self.tiempos_ms = []
+        self.errores = 0
+
+    @property
+    def ruta(self) -> str:
+        return self.escritor.ruta
+
+    @property
+    def frames_grabados(self) -> int:
+        return self.escritor.num_frames
+
+    def grabar(self, frame: np.ndarray, timestamp: float, secuencia: int,
+               exposicion: float = 0.0, ganancia: float = 0.0) -> bool:
+        """Agrega un frame (llamado desde el hilo de captura)."""
+        inicio = time.time()
+        with self._lock:
+            if not self.activo:
+                return False
+            try:
+                self.escritor.agregar(frame, timestamp, secuencia, exposicion, ganancia)
+            except Exception as e:
+                self.errores += 1
+                print(f"❌ Error grabando frame {secuencia}: {e}")
+                return False
+        self.tiempos_ms.append((time.time() - inicio) * 1000)
+        if len(self.tiempos_ms) > 100:
+            self.tiempos_ms = self.tiempos_ms[-100:]
+        if self.max_frames is not None and self.frames_grabados >= self.max_frames:
+            self.activo = False
+        return True
+
+    def cerrar(self):
+        with self._lock:
+            self.activo = False
+            self.escritor.cerrar()
+
+    def obtener_estadisticas(self) -> Dict:
+        return {
+            "ruta": self.ruta,
+            "activo": self.activo,
+            "frames_grabados": self.frames_grabados,
+            "mb_escritos": round(self.escritor.bytes_escritos / (1024 * 1024), 1),
+            "tiempo_promedio_ms": sum(self.tiempos_ms) / len(self.tiempos_ms) if self.tiempos_ms else 0.0,
+            "errores": self.errores
+        }
@@ -0,0 +1,190 @@
+"""
+Anillo de frames preasignado para la captura continua
+El debayer escribe directamente en el siguiente slot libre y los lectores reciben
+vistas de solo lectura fijadas (pin/release) con su número de secuencia
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class FrameFijado:
+    """
+    Vista de solo lectura de un slot del anillo.
+
+    Mientras el frame está fijado el hilo de captura no escribe en su slot.
+    Se debe llamar a liberar() (o usarlo como context manager) al terminar;
+    después de liberar, la vista puede ser sobrescrita por frames nuevos.
+    """
+
+    def __init__(self, anillo: "AnilloFrames", slot: int, imagen: np.ndarray,
+                 secuencia: int, timestamp: float):
+        self._anillo = anillo
+        self.slot = slot
+        self.imagen = imagen
+        self.secuencia = secuencia
+        self.timestamp = timestamp
+        self._liberado = False
+
+    def copia(self) -> np.ndarray:
+        """Copia propia (escribible) del frame, válida después de liberar."""
+        return self.imagen.copy()
+
+    def liberar(self):
+        """Libera el slot para el hilo de captura (idempotente)."""
+        if not self._liberado:
+            self._liberado = True
+            self._anillo._soltar(self.slot)
+
+    def __enter__(self) -> "FrameFijado":
+        return self
+
+    def __exit__(self, *args):
+        self.liberar()
+
+    def __repr__(self) -> str:
+        return f"FrameFijado(slot={self.slot}, secuencia={self.secuencia}, liberado={self._liberado})"
+
+
+class AnilloFrames:
+    """
+    Anillo de N slots RGB preasignados con números de secuencia.
+
+    Características:
+    - Sin asignaciones ni copias en el hilo de captura: reservar() entrega el slot
+      donde cv2.cvtColor escribe con dst= y publicar() lo hace visible
+    - Lectores sin copia: vistas de solo lectura con contador de fijaciones por slot
+    - El escritor nunca sobrescribe un slot fijado; si todos lo están, el frame se descarta
+    - Espera de frame nuevo por secuencia (Condition), sin sondeo
+    """
+
+    def __init__(self, num_slots: int, alto: int, ancho: int, canales: int = 3,
+                 dtype=np.uint8):
+        """
+        Args:
+            num_slots (int): Slots del anillo (mínimo 2: uno en escritura y uno publicado)
+            alto (int): Alto de los frames
+            ancho (int): Ancho de los frames
+            canales (int): Canales por píxel
+            dtype: Tipo de los frames
+        """
+        self.num_slots = max(2, int(num_slots))
+        forma = (alto, ancho, canales) if canales > 1 else (alto, ancho)
+        self.slots: List[np.ndarray] = [np.empty(forma, dtype=dtype) for _ in range(self.num_slots)]
+        self._vistas = []
+        for slot in self.slots:
+            vista = slot.view()
+            vista.flags.writeable = False
+            self._vistas.append(vista)
+
+        self.secuencias = [0] * self.num_slots
+        self.timestamps = [0.0] * self.num_slots
+        self.fijaciones = [0] * self.num_slots
+
+        self.condicion = threading.Condition()
+        self.secuencia = 0          # Secuencia del último frame publicado
+        self.slot_publicado = -1    # Slot del último frame publicado
+        self._siguiente = 0         # Próximo slot candidato para escribir
+        self._reservado = -1        # Slot entregado al escritor y aún no publicado
+
+        self.frames_descartados = 0
+        self.fijaciones_totales = 0
+
+    @property
+    def forma(self) -> Tuple[int, ...]:
+        return self.slots[0].shape
+
+    # ------------------------------------------------------------------ escritor
+
+    def reservar(self) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Reserva el siguiente slot escribible (no fijado y distinto del último publicado).
+
+        Returns:
+            Tuple[int, np.ndarray] o None: (slot, arreglo destino) o None si todos están fijados
+        """
+        with self.condicion:
+            for desplazamiento in range(self.num_slots):
+                slot = (self._siguiente + desplazamiento) % self.num_slots
+                if self.fijaciones[slot] == 0 and slot != self.slot_publicado:
+                    self._reservado = slot
+                    self._siguiente = (slot + 1) % self.num_slots
+                    return slot, self.slots[slot]
+            self.frames_descartados += 1
+            return None
+
+    def publicar(self, slot: int, timestamp: Optional[float] = None) -> int:
+        """
+        Publica el slot reservado como frame más reciente y despierta a los lectores.
+
+        Returns:
+            int: Secuencia asignada al frame
+        """
+        with self.condicion:
+            self.secuencia += 1
+            self.secuencias[slot] = self.secuencia
+            self.timestamps[slot] = time.time() if timestamp is None else timestamp
+            self.slot_publicado = slot
+            self._reservado = -1
+            self.condicion.notify_all()
+            return self.secuencia
+
+    # ------------------------------------------------------------------ lectores
+
+    def _fijar(self, slot: int) -> FrameFijado:
+        """Fija un slot (con la condición tomada)."""
+        self.fijaciones[slot] += 1
+        self.fijaciones_totales += 1
+        return FrameFijado(self, slot, self._vistas[slot], self.secuencias[slot], self.timestamps[slot])
+
+    def _soltar(self, slot: int):
+        with self.condicion:
+            if self.fijaciones[slot] > 0:
+                self.fijaciones[slot] -= 1
+
+    def ultimo(self) -> Optional[FrameFijado]:
+        """Fija y retorna el frame más reciente (None si aún no hay frames)."""
+        with self.condicion:
+            if self.slot_publicado < 0:
+                return None
+            return self._fijar(self.slot_publicado)
+
+    def esperar(self, secuencia_minima: int = 0, timeout: Optional[float] = None) -> Optional[FrameFijado]:
+        """
+        Espera el primer frame con secuencia mayor a `secuencia_minima` y lo retorna fijado.
+
+        Returns:
+            FrameFijado o None si se agotó el tiempo
+        """
+        with self.condicion:
+            if not self.condicion.wait_for(lambda: self.secuencia > secuencia_minima, timeout):
+                return None
+            return self._fijar(self.slot_publicado)
+
+    def obtener_secuencia(self) -> int:
+        with self.condicion:
+            return self.secuencia
+
+    def hay_frame(self) -> bool:
+        with self.condicion:
+            return self.slot_publicado >= 0
+
+    def reiniciar(self):
+        """Descarta los frames publicados (los slots y fijaciones se conservan)."""
+        with self.condicion:
+            self.slot_publicado = -1
+
+    def obtener_estadisticas(self) -> Dict:
+        with self.condicion:
+            return {
+                "slots": self.num_slots,
+                "forma": list(self.forma),
+                "memoria_mb": round(sum(s.nbytes for s in self.slots) / (1024 * 1024), 1),
+                "slots_fijados": sum(1 for f in self.fijaciones if f > 0),
+                "secuencia": self.secuencia,
+                "frames_descartados": self.frames_descartados,
+                "fijaciones_totales": self.fijaciones_totales
+            }
@@ -0,0 +1,469 @@
+"""
+Fuente de captura por reproducción de capturas grabadas
+Reproduce un directorio de imágenes/volcados Bayer, una pila .npy (memory-mapped)
+o un video con la misma interfaz que CamaraTiempoOptimizada
+"""
+
+import os
+import threading
+import time
+from queue import Queue
+from threading import Event, Lock
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from config import CameraConfig, ReplayConfig, StatsConfig
+from .debayer import codigo_bayer, debayer
+from .frame_archive import EXTENSION as EXTENSION_ARCHIVO, LectorArchivoFrames
+from .frame_ring import AnilloFrames
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+EXTENSIONES_CRUDO = (".raw", ".bin")
+EXTENSIONES_VIDEO = (".mp4", ".avi", ".mkv", ".mov")
+
+
+class _LectorDirectorio:
+    """Imágenes (decodificadas con OpenCV) y volcados Bayer crudos de un directorio, en orden alfabético."""
+
+    tipo = "directorio"
+
+    def __init__(self, ruta: str, forma_bayer):
+        self.archivos: List[str] = sorted(
+            os.path.join(ruta, nombre) for nombre in os.listdir(ruta)
+            if nombre.lower().endswith(EXTENSIONES_IMAGEN + EXTENSIONES_CRUDO)
+        )
+        self.forma_bayer = forma_bayer
+        self.num_frames = len(self.archivos)
+
+    def leer(self, indice: int) -> Optional[np.ndarray]:
+        ruta = self.archivos[indice]
+        if ruta.lower().endswith(EXTENSIONES_CRUDO):
+            return np.fromfile(ruta, dtype=np.uint8).reshape(self.forma_bayer)
+        return cv2.imread(ruta, cv2.IMREAD_UNCHANGED)
+
+    def liberar(self):
+        pass
+
+
+class _LectorNpy:
+    """Pila de frames .npy abierta como memory-map: (N, alto, ancho) Bayer o (N, alto, ancho, 3)."""
+
+    tipo = "npy"
+
+    def __init__(self, ruta: str):
+        self.pila = np.load(ruta, mmap_mode="r")
+        if self.pila.ndim not in (3, 4):
+            raise ValueError(f"se esperaba una pila (N, alto, ancho[, 3]) y no {self.pila.shape}")
+        self.num_frames = len(self.pila)
+
+    def leer(self, indice: int) -> Optional[np.ndarray]:
+        return self.pila[indice]
+
+    def liberar(self):
+        self.pila = None
+
+
+class _LectorArchivo:
+    """Archivo de frames crudos (.frames) grabado con GrabadorCaptura: vistas del memory-map sin decodificar."""
+
+    tipo = "archivo"
+
+    def __init__(self, ruta: str):
+        self.archivo = LectorArchivoFrames(ruta)
+        self.num_frames = len(self.archivo)
+
+    def leer(self, indice: int) -> Optional[np.ndarray]:
+        return self.archivo[indice]
+
+    def liberar(self):
+        self.archivo.cerrar()
+
+
+class _LectorVideo:
+    """Video decodificado secuencialmente con cv2.VideoCapture."""
+
+    tipo = "video"
+    num_frames = None  # CAP_PROP_FRAME_COUNT no es fiable: el fin se detecta al leer
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.cap = cv2.VideoCapture(ruta)
+        if not self.cap.isOpened():
+            raise ValueError(f"no se pudo abrir el video {ruta}")
+
+    def leer(self, indice: int) -> Optional[np.ndarray]:
+        if indice == 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        ok, frame = self.cap.read()
+        return frame if ok else None
+
+    def liberar(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class FuenteReplay:
+    """
+    Fuente de captura que reproduce frames grabados con la interfaz de CamaraTiempoOptimizada.
+
+    Características:
+    - Directorio de JPEG/PNG o volcados .raw, pila .npy memory-mapped, archivo de frames
+      crudos (.frames, ver frame_archive) o archivo de video
+    - Frames Bayer (2 dimensiones) convertidos con el mismo debayer que la cámara
+    - Mismo anillo de frames que la cámara (vistas fijadas, secuencias, espera sin sondeo)
+    - Con fps: ritmo fijo como la cámara (si nadie consume, los frames se pisan)
+    - Sin fps: tan rápido como se consuma, cada frame se entrega una sola vez
+      (el siguiente se prepara en segundo plano mientras se analiza el actual)
+
+    Los frames se entregan con el mismo orden de canales con que se guardaron
+    (una imagen escrita con cv2.imwrite desde un frame de la cámara vuelve idéntica).
+    """
+
+    def __init__(self, ruta: Optional[str] = None, fps: Optional[float] = None,
+                 bucle: Optional[bool] = None, forma_bayer=None):
+        """
+        Args:
+            ruta (str, optional): Directorio, archivo .npy/.frames o video (por defecto ReplayConfig.RUTA)
+            fps (float, optional): Ritmo de reproducción (None = ReplayConfig.FPS; 0/None = bajo demanda)
+            bucle (bool, optional): Reiniciar al terminar (por defecto ReplayConfig.BUCLE)
+            forma_bayer (tuple, optional): (alto, ancho) de los archivos .raw
+        """
+        self.ruta = ruta or ReplayConfig.RUTA
+        self.fps = fps if fps is not None else ReplayConfig.FPS
+        self.bucle = ReplayConfig.BUCLE if bucle is None else bucle
+        self.forma_bayer = tuple(forma_bayer or (ReplayConfig.ALTO_BAYER, ReplayConfig.ANCHO_BAYER))
+        self.codigo_bayer = codigo_bayer()
+
+        self.lector = None
+        self.anillo = None
+        self.indice = 0
+        self.vueltas = 0
+        self.agotada = False
+
+        # Entrega bajo demanda: el productor espera a que se consuma el último frame publicado
+        self._condicion_entrega = threading.Condition()
+        self._secuencia_entregada = 0
+
+        # Control de captura (mismos nombres que la cámara GigE)
+        self.buffer_lock = Lock()
+        self.frame_ready_event = Event()
+        self.capture_thread = None
+        self.capture_active = False
+        self.capture_paused = False
+        self.capture_resumed_event = Event()
+        self.capture_resumed_event.set()
+
+        # Estadísticas
+        self.processing_times = Queue(maxsize=StatsConfig.PROCESSING_TIMES_QUEUE_SIZE)
+        self.total_frames_captured = 0
+        self.frames_entregados = 0
+        self.start_time = 0
+
+    @property
+    def bajo_demanda(self) -> bool:
+        return not self.fps
+
+    # ------------------------------------------------------------------ configuración
+
+    def _abrir_lector(self):
+        if os.path.isdir(self.ruta):
+            return _LectorDirectorio(self.ruta, self.forma_bayer)
+        if self.ruta.lower().endswith(".npy"):
+            return _LectorNpy(self.ruta)
+        if self.ruta.lower().endswith(EXTENSION_ARCHIVO):
+            return _LectorArchivo(self.ruta)
+        if self.ruta.lower().endswith(EXTENSIONES_VIDEO):
+            return _LectorVideo(self.ruta)
+        raise ValueError(f"tipo de fuente no soportado: {self.ruta}")
+
+    def configurar_camara(self) -> bool:
+        """
+        Abre la fuente y prepara el anillo con la forma del primer frame.
+
+        Returns:
+            bool: True si la fuente tiene al menos un frame legible
+        """
+        try:
+            if not self.ruta or not os.path.exists(self.ruta):
+                print(f"❌ Fuente de replay no encontrada: {self.ruta}")
+                return False
+
+            self.lector = self._abrir_lector()
+            if self.lector.num_frames == 0:
+                print(f"❌ La fuente de replay no contiene frames: {self.ruta}")
+                return False
+
+            primero = self.lector.leer(0)
+            if primero is None:
+                print(f"❌ No se pudo leer el primer frame de {self.ruta}")
+                return False
+            alto, ancho = primero.shape[:2]
+            self.anillo = AnilloFrames(CameraConfig.RING_SLOTS, alto, ancho)
+
+            total = self.lector.num_frames if self.lector.num_frames is not None else "?"
+            print(f"✅ Replay {self.lector.tipo} configurado: {total} frames {ancho}x{alto} "
+                  f"({'bajo demanda' if self.bajo_demanda else f'{self.fps} FPS'})")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error configurando replay: {e}")
+            return False
+
+    # ------------------------------------------------------------------ producción de frames
+
+    def _escribir_en_slot(self, frame: np.ndarray, destino: np.ndarray):
+        """Copia/convierte el frame leído al slot del anillo (Bayer por el debayer de la cámara)."""
+        if frame.ndim == 2:
+            debayer(frame, destino, self.codigo_bayer)
+        elif frame.shape[2] == 4:
+            cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=destino)
+        else:
+            np.copyto(destino, frame)
+
+    def _reservar_slot(self):
+        """Reserva un slot; bajo demanda espera a que un lector libere uno (sin perder frames)."""
+        while self.capture_active:
+            reserva = self.anillo.reservar()
+            if reserva is not None or not self.bajo_demanda:
+                return reserva
+            time.sleep(0.001)
+        return None
+
+    def _publicar_siguiente(self) -> bool:
+        """
+        Lee el siguiente frame y lo publica en el anillo.
+
+        Returns:
+            bool: False cuando la fuente se agotó (sin bucle)
+        """
+        inicio = time.time()
+        if self.lector.num_frames is not None and self.indice >= self.lector.num_frames:
+            if not self.bucle:
+                return False
+            self.indice = 0
+            self.vueltas += 1
+
+        frame = self.lector.leer(self.indice)
+        if frame is None and self.indice > 0 and self.bucle:
+            self.indice = 0
+            self.vueltas += 1
+            frame = self.lector.leer(0)
+        if frame is None:
+            return False
+
+        reserva = self._reservar_slot()
+        self.indice += 1
+        if reserva is None:
+            return True
+        slot, destino = reserva
+        if frame.shape[:2] != destino.shape[:2]:
+            print(f"⚠️ Frame {self.indice - 1} con forma {frame.shape} distinta de {destino.shape}, se omite")
+            return True
+
+        self._escribir_en_slot(frame, destino)
+        self.anillo.publicar(slot, time.time())
+        self.total_frames_captured += 1
+
+        if not self.processing_times.full():
+            self.processing_times.put((time.time() - inicio) * 1000)
+        self.frame_ready_event.set()
+        return True
+
+    def _ultimo_consumido(self) -> bool:
+        return self._secuencia_entregada >= self.anillo.obtener_secuencia()
+
+    def _thread_reproduccion(self):
+        """Hilo productor: ritmo fijo o bajo demanda."""
+        periodo = 1.0 / self.fps if self.fps else None
+        proximo = time.time()
+        try:
+            while self.capture_active:
+                if periodo is None:
+                    # Preparar el siguiente frame en cuanto se entregó el último
+                    with self._condicion_entrega:
+                        if not self._condicion_entrega.wait_for(
+                                lambda: not self.capture_active or self._ultimo_consumido(),
+                                timeout=CameraConfig.FRAME_TIMEOUT):
+                            continue
+                    if not self.capture_active:
+                        break
+                else:
+                    # Ritmo fijo; la pausa detiene la producción como en la cámara
+                    if not self.capture_resumed_event.wait(timeout=CameraConfig.FRAME_TIMEOUT):
+                        continue
+                    espera = proximo - time.time()
+                    if espera > 0:
+                        time.sleep(espera)
+                    proximo = max(proximo + periodo, time.time())
+
+                if not self._publicar_siguiente():
+                    self.agotada = True
+                    print(f"📼 Replay terminado: {self.total_frames_captured} frames reproducidos")
+                    break
+        except Exception as e:
+            print(f"❌ Error en hilo de replay: {e}")
+
+    def iniciar_captura_continua(self) -> bool:
+        """
+        Inicia el hilo de reproducción y espera el primer frame.
+
+        Returns:
+            bool: True si el primer frame está disponible
+        """
+        if self.anillo is None:
+            print("❌ Replay no configurado")
+            return False
+        if self.capture_thread and self.capture_thread.is_alive():
+            print("⚠️ El replay ya está activo")
+            return True
+
+        self.capture_active = True
+        self.start_time = time.time()
+        self.capture_thread = threading.Thread(target=self._thread_reproduccion, daemon=True)
+        self.capture_thread.start()
+
+        if self.frame_ready_event.wait(timeout=CameraConfig.STARTUP_TIMEOUT):
+            print("✅ Replay iniciado correctamente")
+            return True
+        print("❌ Timeout esperando el primer frame del replay")
+        return False
+
+    # ------------------------------------------------------------------ lectura
+
+    def _marcar_entregado(self, fijado):
+        if fijado is not None:
+            with self._condicion_entrega:
+                if fijado.secuencia > self._secuencia_entregada:
+                    self._secuencia_entregada = fijado.secuencia
+                    self.frames_entregados += 1
+                self._condicion_entrega.notify_all()
+        return fijado
+
+    def obtener_frame_fijado(self):
+        """Frame más reciente sin copia (FrameFijado; liberar al terminar) o None."""
+        return self._marcar_entregado(self.anillo.ultimo()) if self.anillo else None
+
+    def esperar_frame_fijado(self, secuencia_minima: int = 0, timeout: Optional[float] = None):
+        """Primer frame con secuencia mayor a `secuencia_minima` sin copia, o None."""
+        if self.anillo is None:
+            return None
+        timeout = CameraConfig.FRESH_FRAME_TIMEOUT if timeout is None else timeout
+        return self._marcar_entregado(self.anillo.esperar(secuencia_minima, timeout))
+
+    def obtener_frame_instantaneo(self):
+        """
+        Copia del frame más reciente.
+
+        Returns:
+            tuple: (frame, tiempo_acceso_ms, timestamp) o (None, tiempo_acceso_ms, 0)
+        """
+        inicio = time.time()
+        fijado = self.obtener_frame_fijado()
+        if fijado is None:
+            return None, (time.time() - inicio) * 1000, 0
+        with fijado:
+            frame = fijado.copia()
+        return frame, (time.time() - inicio) * 1000, fijado.timestamp
+
+    def esperar_frame_nuevo(self, secuencia_minima: int = 0, timeout: Optional[float] = None):
+        """
+        Copia del primer frame con secuencia mayor a `secuencia_minima`.
+
+        Returns:
+            tuple: (frame, tiempo_espera_ms, timestamp, secuencia) o (None, tiempo_espera_ms, 0, secuencia)
+        """
+        inicio = time.time()
+        fijado = self.esperar_frame_fijado(secuencia_minima, timeout)
+        if fijado is None:
+            secuencia = self.anillo.obtener_secuencia() if self.anillo else 0
+            return None, (time.time() - inicio) * 1000, 0, secuencia
+        with fijado:
+            frame = fijado.copia()
+        return frame, (time.time() - inicio) * 1000, fijado.timestamp, fijado.secuencia
+
+    def obtener_secuencia_actual(self) -> int:
+        return self.anillo.obtener_secuencia() if self.anillo else 0
+
+    def capturar_frame(self):
+        frame, _, _ = self.obtener_frame_instantaneo()
+        return frame
+
+    # ------------------------------------------------------------------ control
+
+    def pausar_captura_continua(self):
+        """Pausa la reproducción a ritmo fijo (bajo demanda el siguiente frame se sigue preparando)."""
+        with self.buffer_lock:
+            self.capture_paused = True
+            self.capture_resumed_event.clear()
+
+    def reanudar_captura_continua(self) -> int:
+        """
+        Reanuda la reproducción.
+
+        Returns:
+            int: Secuencia a superar por el siguiente frame nuevo. Bajo demanda es la del
+                último frame entregado: el frame ya preparado cuenta como nuevo.
+        """
+        with self.buffer_lock:
+            self.capture_paused = False
+            self.capture_resumed_event.set()
+        if self.bajo_demanda:
+            with self._condicion_entrega:
+                return self._secuencia_entregada
+        return self.obtener_secuencia_actual()
+
+    def detener_captura(self):
+        """Detiene el hilo de reproducción."""
+        self.capture_active = False
+        with self._condicion_entrega:
+            self._condicion_entrega.notify_all()
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=CameraConfig.SHUTDOWN_TIMEOUT)
+
+    def liberar(self):
+        """Detiene la reproducción y cierra la fuente."""
+        try:
+            self.detener_captura()
+            if self.lector is not None:
+                self.lector.liberar()
+            if self.anillo is not None:
+                self.anillo.reiniciar()
+            print("✅ Recursos de replay liberados")
+        except Exception as e:
+            print(f"❌ Error liberando replay: {e}")
+
+    def obtener_estadisticas(self) -> dict:
+        """Estadísticas de reproducción (mismas claves principales que la cámara)."""
+        if self.start_time == 0:
+            return {}
+        tiempo_total = time.time() - self.start_time
+        tiempos = list(self.processing_times.queue)
+        return {
+            'fps_real': self.total_frames_captured / tiempo_total if tiempo_total > 0 else 0,
+            'frames_totales': self.total_frames_captured,
+            'frames_entregados': self.frames_entregados,
+            'tiempo_total': tiempo_total,
+            'fuente': self.ruta,
+            'tipo_fuente': self.lector.tipo if self.lector else None,
+            'frames_fuente': self.lector.num_frames if self.lector else None,
+            'indice': self.indice,
+            'vueltas': self.vueltas,
+            'agotada': self.agotada,
+            'framerate': self.fps or "bajo demanda",
+            'tiempo_lectura_promedio_ms': sum(tiempos) / len(tiempos) if tiempos else 0.0,
+            'anillo': self.anillo.obtener_estadisticas() if self.anillo else {}
+        }
+
+    def mostrar_configuracion(self):
+        """Muestra la configuración del replay."""
+        print(f"\n📼 CONFIGURACIÓN DE REPLAY:")
+        print(f"   Fuente: {self.ruta}")
+        print(f"   Tipo: {self.lector.tipo if self.lector else 'N/A'}")
+        print(f"   Ritmo: {self.fps or 'bajo demanda'}")
+        print(f"   Bucle: {'SÍ' if self.bucle else 'NO'}")
+        if self.anillo is not None:
+            print(f"   Forma: {self.anillo.forma}")
+        print(f"   Estado: {'REPRODUCIENDO' if self.capture_active else 'DETENIDO'}")
@@ -0,0 +1,92 @@
+"""
+Política de cascada del análisis completo
+Decide qué modelos posteriores ejecutar a partir de la clasificación y la detección de piezas
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from config import CascadaConfig
+
+
+class PoliticaCascada:
+    """
+    Política configurable que omite modelos cuando el resultado previo los hace innecesarios.
+
+    - Defectos (detección y segmentación): solo si la clase está en las clases de disparo
+      o la confianza del clasificador cae dentro de la banda de duda.
+    - Segmentación de piezas: solo si la detección de piezas encontró al menos una pieza.
+
+    Cada decisión queda registrada en una traza que se guarda en los metadatos.
+    """
+
+    def __init__(self, habilitada: Optional[bool] = None,
+                 clases_disparo: Optional[List[str]] = None,
+                 banda_confianza: Optional[Tuple[float, float]] = None,
+                 segmentar_piezas_solo_con_deteccion: Optional[bool] = None):
+        self.habilitada = CascadaConfig.HABILITADA if habilitada is None else habilitada
+        self.clases_disparo = list(clases_disparo or CascadaConfig.CLASES_DISPARO_DEFECTOS)
+        self.banda_confianza = tuple(banda_confianza or CascadaConfig.BANDA_CONFIANZA_DEFECTOS)
+        self.segmentar_piezas_solo_con_deteccion = (
+            CascadaConfig.SEGMENTAR_PIEZAS_SOLO_CON_DETECCION
+            if segmentar_piezas_solo_con_deteccion is None
+            else segmentar_piezas_solo_con_deteccion
+        )
+
+    def decidir_defectos(self, clase: Optional[str], confianza: float) -> Tuple[bool, str]:
+        """
+        Decide si se ejecutan los modelos de defectos.
+
+        Returns:
+            Tuple[bool, str]: (ejecutar, motivo)
+        """
+        if not self.habilitada:
+            return True, "cascada deshabilitada"
+        if clase is None:
+            return True, "clasificación no disponible"
+        if clase in self.clases_disparo:
+            return True, f"clase '{clase}' dispara análisis de defectos"
+        minimo, maximo = self.banda_confianza
+        if minimo <= confianza <= maximo:
+            return True, f"confianza {confianza:.3f} dentro de la banda [{minimo}, {maximo}]"
+        return False, f"clase '{clase}' con confianza {confianza:.3f} fuera de la banda [{minimo}, {maximo}]"
+
+    def decidir_segmentacion_piezas(self, num_piezas: int) -> Tuple[bool, str]:
+        """
+        Decide si se ejecuta la segmentación de piezas.
+
+        Returns:
+            Tuple[bool, str]: (ejecutar, motivo)
+        """
+        if not self.habilitada or not self.segmentar_piezas_solo_con_deteccion:
+            return True, "cascada deshabilitada"
+        if num_piezas > 0:
+            return True, f"{num_piezas} pieza(s) detectada(s)"
+        return False, "no se detectaron piezas"
+
+    def evaluar(self, clase: Optional[str], confianza: float, num_piezas: int,
+                defectos_requieren_pieza: bool = False) -> Dict:
+        """
+        Evalúa la política completa y construye la traza de decisiones.
+
+        Args:
+            defectos_requieren_pieza (bool): Omitir los modelos de defectos si no hay piezas
+                (recorte por pieza: no hay región que analizar), aun con la cascada deshabilitada
+
+        Returns:
+            Dict: {"habilitada", "decisiones": [{etapa, ejecutada, motivo}], "omitidas": [...]}
+        """
+        ejecutar_defectos, motivo_defectos = self.decidir_defectos(clase, confianza)
+        if ejecutar_defectos and defectos_requieren_pieza and num_piezas == 0:
+            ejecutar_defectos, motivo_defectos = False, "no se detectaron piezas (recorte por pieza)"
+        ejecutar_piezas, motivo_piezas = self.decidir_segmentacion_piezas(num_piezas)
+
+        decisiones = [
+            {"etapa": "deteccion_defectos", "ejecutada": ejecutar_defectos, "motivo": motivo_defectos},
+            {"etapa": "segmentacion_defectos", "ejecutada": ejecutar_defectos, "motivo": motivo_defectos},
+            {"etapa": "segmentacion_piezas", "ejecutada": ejecutar_piezas, "motivo": motivo_piezas}
+        ]
+        return {
+            "habilitada": self.habilitada,
+            "decisiones": decisiones,
+            "omitidas": [d["etapa"] for d in decisiones if not d["ejecutada"]]
+        }
@@ -7,10 +7,15 @@ import numpy as np
 import time
 import os
 import json
-from typing import Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, Any, List, Optional
 
 # Importar configuración
 from config import ModelsConfig, GlobalConfig
+from modules.session_registry import obtener_registro
+from modules.session_profiles import describir_perfil
+from modules.batch_inference import ejecutar_lote
+from modules.io_binding import EjecutorSesion, estadisticas_buffers
+from modules.preprocessing.letterbox import PreprocesadorRedimensionado
 
 
 class ClasificadorCoplesONNX:
@@ -25,12 +30,13 @@ class ClasificadorCoplesONNX:
     - Estadísticas de rendimiento
     """
     
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, hilos_intra_op: Optional[int] = None):
         """
         Inicializa el clasificador de coples.
         
         Args:
             model_path (str, optional): Ruta al modelo ONNX. Si no se proporciona, usa el por defecto.
+            hilos_intra_op (int, optional): Presupuesto de hilos intra-op (por defecto el del perfil de sesión)
         """
         self.model_path = model_path or os.path.join(
             ModelsConfig.MODELS_DIR, 
@@ -44,6 +50,7 @@ class ClasificadorCoplesONNX:
         # Estado del modelo
         self.model = None
         self.session = None
+        self.ejecutor = None
         self.input_name = None
         self.output_name = None
         self.input_shape = None
@@ -59,8 +66,11 @@ class ClasificadorCoplesONNX:
         self.procesamiento_activo = False
         
         # Configuración
+        self.hilos_intra_op = hilos_intra_op
         self.confidence_threshold = ModelsConfig.CONFIDENCE_THRESHOLD
         self.input_size = ModelsConfig.INPUT_SIZE  # 640x640
+        # Sin letterbox: el clasificador no retorna coordenadas y se entrenó con la imagen estirada
+        self.preprocesador = PreprocesadorRedimensionado(self.input_size, invertir_canales=True)
         
         # Cargar clases
         self._cargar_clases()
@@ -107,17 +117,9 @@ class ClasificadorCoplesONNX:
                 print("❌ ONNX Runtime no disponible. Instala con: pip install onnxruntime")
                 return False
             
-            # Configurar sesión ONNX
-            providers = ModelsConfig.PROVIDERS
-            session_options = ort.SessionOptions()
-            session_options.intra_op_num_threads = ModelsConfig.INTRA_OP_THREADS
-            session_options.inter_op_num_threads = ModelsConfig.INTER_OP_THREADS
-            
-            # Crear sesión
-            self.session = ort.InferenceSession(
-                self.model_path, 
-                sess_options=session_options,
-                providers=providers
+            # Obtener sesión compartida del registro (se carga una sola vez por proceso)
+            self.session = obtener_registro().obtener_sesion(
+                self.model_path, intra_op_threads=self.hilos_intra_op
             )
             
             # Obtener información del modelo
@@ -125,10 +127,12 @@ class ClasificadorCoplesONNX:
             self.output_name = self.session.get_outputs()[0].name
             self.input_shape = self.session.get_inputs()[0].shape
             self.output_shape = self.session.get_outputs()[0].shape
+            self.ejecutor = EjecutorSesion(self.session, self.input_name, [self.output_name], self.model_path)
             
             print(f"   📊 Input: {self.input_name} - Shape: {self.input_shape}")
             print(f"   📊 Output: {self.output_name} - Shape: {self.output_shape}")
             print(f"   🎯 Clases: {self.num_classes}")
+            print(f"   🔧 Sesión: {describir_perfil(obtener_registro().obtener_perfil(self.model_path))}")
             
             self.procesamiento_activo = True
             print("✅ Clasificador inicializado correctamente")
@@ -138,44 +142,32 @@ class ClasificadorCoplesONNX:
             print(f"❌ Error inicializando clasificador: {e}")
             return False
     
-    def preprocesar_imagen(self, imagen: np.ndarray) -> np.ndarray:
+    def preprocesar_imagen(self, imagen: np.ndarray, copia: bool = True) -> np.ndarray:
         """
-        Preprocesa la imagen para la inferencia.
+        Preprocesa la imagen para la inferencia (redimensionado a 640x640, BGR -> RGB, [0, 1]).
         
         Args:
             imagen (np.ndarray): Imagen de entrada (BGR)
+            copia (bool): False para escribir en el buffer de entrada reutilizable del motor
             
         Returns:
             np.ndarray: Imagen preprocesada en formato [1, 3, 640, 640]
         """
         try:
-            # Convertir BGR a RGB
-            imagen_rgb = cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB)
-            
-            # Redimensionar a tamaño del modelo
-            imagen_resized = cv2.resize(imagen_rgb, (self.input_size, self.input_size))
-            
-            # Normalizar a [0, 1]
-            imagen_normalized = imagen_resized.astype(np.float32) / 255.0
-            
-            # Transponer de [H, W, C] a [C, H, W] para formato ONNX
-            imagen_transposed = np.transpose(imagen_normalized, (2, 0, 1))
-            
-            # Agregar dimensión de batch: [C, H, W] -> [1, C, H, W]
-            imagen_batch = np.expand_dims(imagen_transposed, axis=0)
-            
-            return imagen_batch
+            tensor, _ = self.preprocesador.preparar(imagen, copia=copia)
+            return tensor
             
         except Exception as e:
             print(f"❌ Error preprocesando imagen: {e}")
             return None
     
-    def clasificar(self, imagen: np.ndarray) -> Tuple[Optional[str], float, float]:
+    def clasificar(self, imagen: np.ndarray, contexto=None) -> Tuple[Optional[str], float, float]:
         """
         Clasifica una imagen de cople.
         
         Args:
             imagen (np.ndarray): Imagen de entrada (BGR)
+            contexto (ContextoFrame, optional): Contexto con el tensor ya preprocesado
             
         Returns:
             tuple: (clase_predicha, confianza, tiempo_inferencia) o (None, 0, 0) si hay error
@@ -186,13 +178,19 @@ class ClasificadorCoplesONNX:
         try:
             start_time = time.time()
             
-            # Preprocesar imagen
-            imagen_procesada = self.preprocesar_imagen(imagen)
+            # Preprocesar imagen (reutiliza el tensor del contexto si existe)
+            if contexto is not None:
+                imagen_procesada = contexto.obtener_tensor(self.input_size, invertir_canales=True,
+                                                           letterbox=False)
+            else:
+                imagen_procesada = self.preprocesar_imagen(imagen, copia=False)
             if imagen_procesada is None:
                 return None, 0, 0
             
             # Ejecutar inferencia
-            outputs = self.session.run([self.output_name], {self.input_name: imagen_procesada})
+            tiempo_run = time.time()
+            outputs = self.ejecutor.ejecutar(imagen_procesada)
+            obtener_registro().registrar_inferencia(self.model_path, (time.time() - tiempo_run) * 1000)
             
             # Calcular tiempo de inferencia
             tiempo_inferencia = (time.time() - start_time) * 1000
@@ -214,6 +212,57 @@ class ClasificadorCoplesONNX:
             print(f"❌ Error en clasificación: {e}")
             return None, 0, 0
     
+    def clasificar_lote(self, imagenes: List[np.ndarray],
+                        contextos: Optional[List] = None) -> List[Tuple[Optional[str], float, float]]:
+        """
+        Clasifica varias imágenes en una sola ejecución [N, 3, H, W] si el modelo
+        tiene eje de lote dinámico (en ejecuciones secuenciales si no).
+        
+        Args:
+            imagenes (List[np.ndarray]): Imágenes de entrada (BGR)
+            contextos (List[ContextoFrame], optional): Contextos con los tensores ya preprocesados
+            
+        Returns:
+            List[tuple]: (clase_predicha, confianza, tiempo_inferencia) por imagen, en el mismo orden;
+                         el tiempo es el del lote repartido entre sus imágenes
+        """
+        if not self.procesamiento_activo or self.session is None:
+            return [(None, 0, 0) for _ in imagenes]
+        
+        try:
+            start_time = time.time()
+            
+            tensores = []
+            for i, imagen in enumerate(imagenes):
+                if contextos is not None and contextos[i] is not None:
+                    tensor = contextos[i].obtener_tensor(self.input_size, invertir_canales=True,
+                                                         letterbox=False)
+                else:
+                    tensor = self.preprocesar_imagen(imagen)
+                if tensor is None:
+                    return [(None, 0, 0) for _ in imagenes]
+                tensores.append(tensor)
+            
+            salidas = ejecutar_lote(self.session, [self.output_name], self.input_name,
+                                    tensores, self.model_path)
+            
+            tiempo_inferencia = (time.time() - start_time) * 1000 / max(len(imagenes), 1)
+            resultados = []
+            for outputs in salidas:
+                clase_predicha, confianza = self._procesar_resultados(outputs[0])
+                resultados.append((clase_predicha, confianza, tiempo_inferencia))
+            
+            self.inference_times.extend([tiempo_inferencia] * len(resultados))
+            self.total_inferences += len(resultados)
+            if len(self.inference_times) > 100:
+                self.inference_times = self.inference_times[-100:]
+            
+            return resultados
+            
+        except Exception as e:
+            print(f"❌ Error en clasificación por lote: {e}")
+            return [(None, 0, 0) for _ in imagenes]
+    
     def _procesar_resultados(self, output: np.ndarray) -> Tuple[str, float]:
         """
         Procesa los resultados de la inferencia.
@@ -298,7 +347,8 @@ class ClasificadorCoplesONNX:
                 'tiempo_promedio': 0,
                 'tiempo_min': 0,
                 'tiempo_max': 0,
-                'tiempo_std': 0
+                'tiempo_std': 0,
+                'buffers': estadisticas_buffers(self)
             }
         
         tiempos = np.array(self.inference_times)
@@ -307,7 +357,8 @@ class ClasificadorCoplesONNX:
             'tiempo_promedio': float(np.mean(tiempos)),
             'tiempo_min': float(np.min(tiempos)),
             'tiempo_max': float(np.max(tiempos)),
-            'tiempo_std': float(np.std(tiempos))
+            'tiempo_std': float(np.std(tiempos)),
+            'buffers': estadisticas_buffers(self)
         }
     
     def cambiar_umbral_confianza(self, nuevo_umbral: float) -> bool:
@@ -339,6 +390,7 @@ class ClasificadorCoplesONNX:
             
             if self.session:
                 self.session = None
+            self.ejecutor = None
             
             self.procesamiento_activo = False
             self.inference_times.clear()
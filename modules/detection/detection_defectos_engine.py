@@ -10,7 +10,13 @@ import os
 from typing import List, Dict, Tuple, Optional
 
 # Importar configuración
-from config import ModelsConfig, GlobalConfig
+from config import ModelsConfig, GlobalConfig, TeseladoConfig
+from modules.session_registry import obtener_registro
+from modules.session_profiles import describir_perfil
+from modules.batch_inference import ejecutar_lote
+from modules.io_binding import EjecutorSesion, estadisticas_buffers
+from modules.tiled_inference import calcular_teselas, extraer_teselas, fusionar_teselas, trasladar_resultados
+from modules.preprocessing.letterbox import PreprocesadorLetterbox
 
 # Importar decodificador YOLOv11
 from .yolov11_decoder import YOLOv11Decoder
@@ -28,13 +34,15 @@ class DetectorDefectosCoples:
     - Estadísticas de rendimiento
     """
     
-    def __init__(self, model_path: Optional[str] = None, confianza_min: float = 0.3):
+    def __init__(self, model_path: Optional[str] = None, confianza_min: float = 0.3,
+                 hilos_intra_op: Optional[int] = None):
         """
         Inicializa el detector de defectos de coples.
         
         Args:
             model_path (str, optional): Ruta al modelo ONNX. Si no se proporciona, usa el por defecto.
             confianza_min (float): Umbral mínimo de confianza para detecciones
+            hilos_intra_op (int, optional): Presupuesto de hilos intra-op (None = por defecto de ONNX Runtime)
         """
         self.model_path = model_path or os.path.join(
             ModelsConfig.MODELS_DIR, 
@@ -52,6 +60,7 @@ class DetectorDefectosCoples:
         self.output_names = None
         self.input_shape = None
         self.output_shapes = None
+        self.ejecutor = None
         
         # Clases del modelo
         self.class_names = []
@@ -63,7 +72,9 @@ class DetectorDefectosCoples:
         
         # Configuración
         self.confianza_min = confianza_min
+        self.hilos_intra_op = hilos_intra_op
         self.input_size = ModelsConfig.INPUT_SIZE  # 640x640
+        self.preprocesador = PreprocesadorLetterbox(self.input_size)
         
         # Cargar clases PRIMERO
         self._cargar_clases()
@@ -73,7 +84,8 @@ class DetectorDefectosCoples:
             confianza_min=confianza_min,
             iou_threshold=0.35,
             max_det=30,
-            class_names=self.class_names  # Pasar las clases del detector de defectos
+            class_names=self.class_names,  # Pasar las clases del detector de defectos
+            tamano_entrada=self.input_size
         )
     
     def _cargar_clases(self):
@@ -110,18 +122,9 @@ class DetectorDefectosCoples:
                 print(f"❌ Modelo de defectos no encontrado: {self.model_path}")
                 return False
             
-            # Cargar modelo ONNX
-            import onnxruntime as ort
-            
-            # Configurar proveedores
-            providers = ['CPUExecutionProvider']
-            if ort.get_device() == 'GPU':
-                providers = ['CUDAExecutionProvider'] + providers
-            
-            # Crear sesión
-            self.session = ort.InferenceSession(
-                self.model_path, 
-                providers=providers
+            # Obtener sesión compartida del registro
+            self.session = obtener_registro().obtener_sesion(
+                self.model_path, intra_op_threads=self.hilos_intra_op
             )
             
             # Obtener información del modelo
@@ -129,13 +132,14 @@ class DetectorDefectosCoples:
             self.output_names = [output.name for output in self.session.get_outputs()]
             self.input_shape = self.session.get_inputs()[0].shape
             self.output_shapes = [output.shape for output in self.session.get_outputs()]
+            self.ejecutor = EjecutorSesion(self.session, self.input_name, self.output_names, self.model_path)
             
             print(f"🧠 Motor de detección de defectos ONNX inicializado:")
             print(f"   📁 Modelo: {os.path.basename(self.model_path)}")
             print(f"   📊 Input: {self.input_name} - Shape: {self.input_shape}")
             print(f"   📊 Outputs: {self.output_names}")
             print(f"   🎯 Clases: {self.num_classes}")
-            print(f"   🔧 Proveedores: {providers}")
+            print(f"   🔧 Sesión: {describir_perfil(obtener_registro().obtener_perfil(self.model_path))}")
             
             return True
             
@@ -143,41 +147,32 @@ class DetectorDefectosCoples:
             print(f"❌ Error inicializando detector de defectos: {e}")
             return False
     
-    def preprocesar_imagen(self, imagen: np.ndarray) -> np.ndarray:
+    def preprocesar_imagen(self, imagen: np.ndarray, copia: bool = True) -> np.ndarray:
         """
         Preprocesa la imagen para el modelo de detección de defectos
         
         Args:
             imagen: Imagen RGB de entrada (H, W, C)
+            copia: False para escribir en el buffer de entrada reutilizable del motor
             
         Returns:
-            Imagen preprocesada lista para inferencia
+            Imagen preprocesada lista para inferencia (letterbox, NCHW float32 [0, 1])
         """
         try:
-            # Redimensionar a la entrada del modelo
-            imagen_resized = cv2.resize(imagen, (self.input_size, self.input_size))
-            
-            # Convertir a float32 y normalizar [0, 1]
-            imagen_float = imagen_resized.astype(np.float32) / 255.0
-            
-            # Transponer de HWC a CHW: (H, W, C) -> (C, H, W)
-            imagen_chw = np.transpose(imagen_float, (2, 0, 1))
-            
-            # Agregar dimensión de batch: (C, H, W) -> (1, C, H, W)
-            imagen_batch = np.expand_dims(imagen_chw, axis=0)
-            
-            return imagen_batch
+            tensor, _ = self.preprocesador.preparar(imagen, copia=copia)
+            return tensor
             
         except Exception as e:
             print(f"❌ Error en preprocesamiento: {e}")
             raise
     
-    def detectar_defectos(self, imagen: np.ndarray) -> List[Dict]:
+    def detectar_defectos(self, imagen: np.ndarray, contexto=None) -> List[Dict]:
         """
         Detecta defectos en la imagen
         
         Args:
             imagen: Imagen RGB de entrada (H, W, C)
+            contexto: ContextoFrame opcional con el tensor ya preprocesado
             
         Returns:
             Lista de detecciones con bbox, clase y confianza
@@ -187,8 +182,12 @@ class DetectorDefectosCoples:
             print(f"🔍 Debug imagen defectos - Original: {imagen.shape}")
             print(f"🔍 Debug imagen defectos - Input shape esperado: {self.input_size}")
             
-            # Preprocesar imagen
-            imagen_input = self.preprocesar_imagen(imagen)
+            # Preprocesar imagen (reutiliza el tensor del contexto si existe)
+            if contexto is not None:
+                imagen_input = contexto.obtener_tensor(self.input_size)
+                transformacion = contexto.obtener_transformacion(self.input_size)
+            else:
+                imagen_input, transformacion = self.preprocesador.preparar(imagen)
             
             # Debug: Mostrar tamaño de imagen procesada
             print(f"🔍 Debug imagen defectos - Procesada: {imagen_input.shape}")
@@ -197,12 +196,10 @@ class DetectorDefectosCoples:
             tiempo_inicio = time.time()
             
             try:
-                outputs = self.session.run(
-                    self.output_names,
-                    {self.input_name: imagen_input}
-                )
+                outputs = self.ejecutor.ejecutar(imagen_input)
                 
                 tiempo_inferencia = (time.time() - tiempo_inicio) * 1000  # ms
+                obtener_registro().registrar_inferencia(self.model_path, tiempo_inferencia)
                 
             except Exception as e:
                 print(f"⚠️ Error en detección de defectos: {e}")
@@ -215,8 +212,8 @@ class DetectorDefectosCoples:
             # Obtener dimensiones de la imagen de entrada para el decodificador
             imagen_height, imagen_width = imagen.shape[:2]
             
-            # Procesar salidas usando el decodificador YOLOv11
-            detecciones = self.decoder.decode_output(outputs[0], (imagen_height, imagen_width))
+            # Procesar salidas con el decodificador YOLOv11 (cajas en píxeles de la imagen original)
+            detecciones = self.decoder.decode_output(outputs[0], (imagen_height, imagen_width), transformacion)
             
             return detecciones
             
@@ -224,6 +221,100 @@ class DetectorDefectosCoples:
             print(f"❌ Error en detección de defectos: {e}")
             return []
     
+    def detectar_defectos_lote(self, imagenes: List[np.ndarray], contextos: Optional[List] = None) -> List[List[Dict]]:
+        """
+        Detecta defectos en varias imágenes con una sola ejecución [N, 3, H, W]
+        si el modelo tiene eje de lote dinámico (secuencial si no)
+        
+        Args:
+            imagenes: Imágenes RGB de entrada (H, W, C)
+            contextos: ContextoFrame opcionales (uno por imagen) con el tensor ya preprocesado
+            
+        Returns:
+            Lista de detecciones por imagen, en el mismo orden
+        """
+        try:
+            tensores = [
+                contextos[i].obtener_tensor(self.input_size)
+                if contextos is not None and contextos[i] is not None
+                else self.preprocesar_imagen(imagen)
+                for i, imagen in enumerate(imagenes)
+            ]
+            
+            tiempo_inicio = time.time()
+            salidas = ejecutar_lote(self.session, self.output_names, self.input_name,
+                                    tensores, self.model_path)
+            
+            self.tiempo_inferencia = (time.time() - tiempo_inicio) * 1000 / max(len(imagenes), 1)
+            self.frames_procesados += len(imagenes)
+            
+            return [
+                self.decoder.decode_output(outputs[0], imagen.shape[:2])
+                for imagen, outputs in zip(imagenes, salidas)
+            ]
+            
+        except Exception as e:
+            print(f"❌ Error en detección de defectos por lote: {e}")
+            return [[] for _ in imagenes]
+
+    def detectar_defectos_region(self, imagen: np.ndarray, region: Tuple[int, int, int, int]) -> List[Dict]:
+        """
+        Detecta defectos solo en una región de la imagen (p. ej. la caja de la pieza),
+        llevada completa a la entrada del modelo con letterbox
+        
+        Args:
+            imagen: Imagen RGB de entrada (H, W, C) a su resolución de captura
+            region: (x1, y1, x2, y2) a recortar, en píxeles de la imagen
+            
+        Returns:
+            Lista de detecciones en coordenadas de la imagen
+        """
+        try:
+            x1, y1, x2, y2 = region
+            detecciones = self.detectar_defectos(imagen[y1:y2, x1:x2])
+            return trasladar_resultados(detecciones, x1, y1, imagen.shape[:2])
+        except Exception as e:
+            print(f"❌ Error en detección de defectos por región: {e}")
+            return []
+
+    def detectar_defectos_teselado(self, imagen: np.ndarray, region: Optional[Tuple[int, int, int, int]] = None) -> List[Dict]:
+        """
+        Detecta defectos a resolución nativa recorriendo la imagen en teselas solapadas
+        del tamaño de entrada del modelo (una sola ejecución con todas las teselas)
+
+        Args:
+            imagen: Imagen RGB de entrada (H, W, C), p. ej. el frame completo del sensor
+            region: (x1, y1, x2, y2) a cubrir; None = imagen completa
+
+        Returns:
+            Lista de detecciones en coordenadas de la imagen, fusionadas entre teselas
+        """
+        try:
+            origenes = calcular_teselas(imagen.shape[:2], self.input_size, region=region)
+            teselas = extraer_teselas(imagen, origenes, self.input_size)
+
+            tiempo_inicio = time.time()
+            salidas = ejecutar_lote(self.session, self.output_names, self.input_name, teselas,
+                                    self.model_path, tamano_lote=TeseladoConfig.TESELAS_POR_RUN or len(origenes))
+
+            self.tiempo_inferencia = (time.time() - tiempo_inicio) * 1000
+            self.frames_procesados += 1
+
+            forma = imagen.shape[:2]
+            por_tesela = [
+                trasladar_resultados(self.decoder.decode_output(outputs[0], (self.input_size, self.input_size)),
+                                     x, y, forma)
+                for (x, y), outputs in zip(origenes, salidas)
+            ]
+            detecciones = fusionar_teselas(por_tesela)
+            print(f"🧩 Defectos por teselas: {len(detecciones)} en {len(origenes)} teselas "
+                  f"({self.tiempo_inferencia:.1f} ms de inferencia)")
+            return detecciones
+
+        except Exception as e:
+            print(f"❌ Error en detección de defectos por teselas: {e}")
+            return []
+
     def obtener_estadisticas(self) -> Dict:
         """
         Obtiene estadísticas de rendimiento del detector
@@ -240,7 +331,8 @@ class DetectorDefectosCoples:
             "tiempo_inferencia_promedio_ms": self.tiempo_inferencia,
             "frames_procesados": self.frames_procesados,
             "input_shape": self.input_shape,
-            "output_shapes": self.output_shapes
+            "output_shapes": self.output_shapes,
+            "buffers": estadisticas_buffers(self)
         }
     
     def actualizar_umbrales(self, confianza_min: float = None, iou_threshold: float = None):
@@ -265,6 +357,7 @@ class DetectorDefectosCoples:
         try:
             if self.session:
                 self.session = None
+            self.ejecutor = None
             print("✅ Recursos del detector de defectos liberados")
         except Exception as e:
             print(f"❌ Error liberando detector de defectos: {e}")
@@ -4,7 +4,6 @@ Implementa detección de objetos usando modelos ONNX
 """
 
 import numpy as np
-import onnxruntime as ort
 import cv2
 from typing import List, Dict, Tuple, Optional
 import time
@@ -15,6 +14,11 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from config import ModelsConfig, GlobalConfig
+from modules.session_registry import obtener_registro
+from modules.session_profiles import describir_perfil
+from modules.batch_inference import ejecutar_lote
+from modules.io_binding import EjecutorSesion, estadisticas_buffers
+from modules.preprocessing.letterbox import PreprocesadorLetterbox
 from .yolov11_decoder import YOLOv11Decoder
 
 
@@ -24,7 +28,8 @@ class DetectorCoplesONNX:
     Basado en el motor de clasificación pero adaptado para detección
     """
     
-    def __init__(self, modelo_path: str, clases_path: str, confianza_min: float = 0.3):
+    def __init__(self, modelo_path: str, clases_path: str, confianza_min: float = 0.3,
+                 hilos_intra_op: Optional[int] = None):
         """
         Inicializa el detector ONNX
         
@@ -32,10 +37,12 @@ class DetectorCoplesONNX:
             modelo_path: Ruta al archivo .onnx
             clases_path: Ruta al archivo de clases
             confianza_min: Umbral mínimo de confianza
+            hilos_intra_op: Presupuesto de hilos intra-op (None = por defecto de ONNX Runtime)
         """
         self.modelo_path = modelo_path
         self.clases_path = clases_path
         self.confianza_min = confianza_min
+        self.hilos_intra_op = hilos_intra_op
         
         # Cargar clases
         self.clases = self._cargar_clases()
@@ -45,6 +52,7 @@ class DetectorCoplesONNX:
         self.input_name = None
         self.output_names = []
         self.input_shape = None
+        self.ejecutor = None
         
         # Estadísticas
         self.tiempo_inferencia = 0.0
@@ -58,7 +66,8 @@ class DetectorCoplesONNX:
             confianza_min=self.confianza_min,  # Usar el umbral configurado
             iou_threshold=0.35,  # Más agresivo para eliminar falsos positivos
             max_det=30,          # Reducido para mayor calidad
-            class_names=self.clases  # Pasar las clases del detector de piezas
+            class_names=self.clases,  # Pasar las clases del detector de piezas
+            tamano_entrada=self.input_shape[0]
         )
     
     def _cargar_clases(self) -> List[str]:
@@ -75,17 +84,9 @@ class DetectorCoplesONNX:
     def _inicializar_modelo(self):
         """Inicializa el modelo ONNX"""
         try:
-            # Verificar que el archivo existe
-            if not os.path.exists(self.modelo_path):
-                raise FileNotFoundError(f"Modelo no encontrado: {self.modelo_path}")
-            
-            # Configurar proveedores ONNX
-            providers = ModelsConfig.PROVIDERS
-            
-            # Crear sesión ONNX
-            self.session = ort.InferenceSession(
-                self.modelo_path,
-                providers=providers
+            # Obtener sesión compartida del registro (lanza FileNotFoundError si no existe)
+            self.session = obtener_registro().obtener_sesion(
+                self.modelo_path, intra_op_threads=self.hilos_intra_op
             )
             
             # Obtener información del modelo
@@ -96,52 +97,48 @@ class DetectorCoplesONNX:
             input_shape = self.session.get_inputs()[0].shape
             self.input_shape = (input_shape[2], input_shape[3])  # (height, width)
             
+            # Letterbox con lienzo y tensor de entrada reutilizables por resolución
+            self.preprocesador = PreprocesadorLetterbox(self.input_shape[0])
+            # session.run o IOBinding con salidas preasignadas (EnlaceIOConfig)
+            self.ejecutor = EjecutorSesion(self.session, self.input_name, self.output_names, self.modelo_path)
+            
             print(f"🧠 Motor de detección ONNX inicializado:")
             print(f"   📁 Modelo: {os.path.basename(self.modelo_path)}")
             print(f"   📊 Input: {self.input_name} - Shape: {self.session.get_inputs()[0].shape}")
             print(f"   📊 Outputs: {self.output_names}")
             print(f"   🎯 Clases: {len(self.clases)}")
-            print(f"   🔧 Proveedores: {providers}")
+            print(f"   🔧 Sesión: {describir_perfil(obtener_registro().obtener_perfil(self.modelo_path))}")
             
         except Exception as e:
             print(f"❌ Error inicializando modelo de detección: {e}")
             raise
     
-    def preprocesar_imagen(self, imagen: np.ndarray) -> np.ndarray:
+    def preprocesar_imagen(self, imagen: np.ndarray, copia: bool = True) -> np.ndarray:
         """
         Preprocesa la imagen para el modelo de detección
         
         Args:
             imagen: Imagen RGB de entrada (H, W, C)
+            copia: False para escribir en el buffer de entrada reutilizable del motor
             
         Returns:
-            Imagen preprocesada lista para inferencia
+            Imagen preprocesada lista para inferencia (letterbox, NCHW float32 [0, 1])
         """
         try:
-            # Redimensionar a la entrada del modelo
-            imagen_resized = cv2.resize(imagen, self.input_shape)
-            
-            # Convertir a float32 y normalizar [0, 1]
-            imagen_float = imagen_resized.astype(np.float32) / 255.0
-            
-            # Transponer de HWC a CHW: (H, W, C) -> (C, H, W)
-            imagen_chw = np.transpose(imagen_float, (2, 0, 1))
-            
-            # Agregar dimensión de batch: (C, H, W) -> (1, C, H, W)
-            imagen_batch = np.expand_dims(imagen_chw, axis=0)
-            
-            return imagen_batch
+            tensor, _ = self.preprocesador.preparar(imagen, copia=copia)
+            return tensor
             
         except Exception as e:
             print(f"❌ Error en preprocesamiento: {e}")
             raise
     
-    def detectar_piezas(self, imagen: np.ndarray) -> List[Dict]:
+    def detectar_piezas(self, imagen: np.ndarray, contexto=None) -> List[Dict]:
         """
         Detecta piezas en la imagen
         
         Args:
             imagen: Imagen RGB de entrada (H, W, C)
+            contexto: ContextoFrame opcional con el tensor ya preprocesado
             
         Returns:
             Lista de detecciones con bbox, clase y confianza
@@ -151,8 +148,12 @@ class DetectorCoplesONNX:
             print(f"🔍 Debug imagen - Original: {imagen.shape}")
             print(f"🔍 Debug imagen - Input shape esperado: {self.input_shape}")
             
-            # Preprocesar imagen
-            imagen_input = self.preprocesar_imagen(imagen)
+            # Preprocesar imagen (reutiliza el tensor del contexto si existe)
+            if contexto is not None:
+                imagen_input = contexto.obtener_tensor(self.input_shape[0])
+                transformacion = contexto.obtener_transformacion(self.input_shape[0])
+            else:
+                imagen_input, transformacion = self.preprocesador.preparar(imagen)
             
             # Debug: Mostrar tamaño de imagen procesada
             print(f"🔍 Debug imagen - Procesada: {imagen_input.shape}")
@@ -161,12 +162,10 @@ class DetectorCoplesONNX:
             tiempo_inicio = time.time()
             
             try:
-                outputs = self.session.run(
-                    self.output_names,
-                    {self.input_name: imagen_input}
-                )
+                outputs = self.ejecutor.ejecutar(imagen_input)
                 
                 tiempo_inferencia = (time.time() - tiempo_inicio) * 1000  # ms
+                obtener_registro().registrar_inferencia(self.modelo_path, tiempo_inferencia)
                 
             except Exception as e:
                 print(f"⚠️ Error en detección de piezas: {e}")
@@ -179,8 +178,8 @@ class DetectorCoplesONNX:
             # Obtener dimensiones de la imagen de entrada para el decodificador
             imagen_height, imagen_width = imagen.shape[:2]
             
-            # Procesar salidas usando el decodificador YOLOv11 con imagen_shape
-            detecciones = self.decoder.decode_output(outputs[0], (imagen_height, imagen_width))
+            # Procesar salidas con el decodificador YOLOv11 (cajas en píxeles de la imagen original)
+            detecciones = self.decoder.decode_output(outputs[0], (imagen_height, imagen_width), transformacion)
             
             return detecciones
             
@@ -188,6 +187,42 @@ class DetectorCoplesONNX:
             print(f"❌ Error en detección: {e}")
             return []
     
+    def detectar_piezas_lote(self, imagenes: List[np.ndarray], contextos: Optional[List] = None) -> List[List[Dict]]:
+        """
+        Detecta piezas en varias imágenes con una sola ejecución [N, 3, H, W]
+        si el modelo tiene eje de lote dinámico (secuencial si no)
+        
+        Args:
+            imagenes: Imágenes RGB de entrada (H, W, C)
+            contextos: ContextoFrame opcionales (uno por imagen) con el tensor ya preprocesado
+            
+        Returns:
+            Lista de detecciones por imagen, en el mismo orden
+        """
+        try:
+            tensores = [
+                contextos[i].obtener_tensor(self.input_shape[0])
+                if contextos is not None and contextos[i] is not None
+                else self.preprocesar_imagen(imagen)
+                for i, imagen in enumerate(imagenes)
+            ]
+            
+            tiempo_inicio = time.time()
+            salidas = ejecutar_lote(self.session, self.output_names, self.input_name,
+                                    tensores, self.modelo_path)
+            
+            self.tiempo_inferencia = (time.time() - tiempo_inicio) * 1000 / max(len(imagenes), 1)
+            self.frames_procesados += len(imagenes)
+            
+            return [
+                self.decoder.decode_output(outputs[0], imagen.shape[:2])
+                for imagen, outputs in zip(imagenes, salidas)
+            ]
+            
+        except Exception as e:
+            print(f"❌ Error en detección por lote: {e}")
+            return [[] for _ in imagenes]
+    
     def _procesar_salidas(self, outputs: List[np.ndarray], imagen_shape: Tuple[int, int]) -> List[Dict]:
         """
         Procesa las salidas del modelo ONNX en formato YOLOv11
@@ -376,13 +411,15 @@ class DetectorCoplesONNX:
             "clases": len(self.clases),
             "frames_procesados": self.frames_procesados,
             "tiempo_inferencia_promedio_ms": self.tiempo_inferencia,
-            "confianza_minima": self.confianza_min
+            "confianza_minima": self.confianza_min,
+            "buffers": estadisticas_buffers(self)
         }
     
     def liberar(self):
         """Libera recursos del detector"""
         if self.session:
             self.session = None
+        self.ejecutor = None
         print("✅ Recursos del detector liberados")
 
 
@@ -392,17 +429,18 @@ class DetectorPiezasCoples(DetectorCoplesONNX):
     Usa el modelo CopleDetPz1C1V.onnx
     """
     
-    def __init__(self, confianza_min: float = 0.5):
+    def __init__(self, confianza_min: float = 0.5, hilos_intra_op: Optional[int] = None):
         """
         Inicializa detector de piezas de coples
         
         Args:
             confianza_min: Umbral mínimo de confianza
+            hilos_intra_op: Presupuesto de hilos intra-op (None = por defecto de ONNX Runtime)
         """
         modelo_path = os.path.join(ModelsConfig.MODELS_DIR, "CopleDetPz1C1V.onnx")
         clases_path = os.path.join(ModelsConfig.MODELS_DIR, "clases_CopleDetPz1C1V.txt")
         
-        super().__init__(modelo_path, clases_path, confianza_min)
+        super().__init__(modelo_path, clases_path, confianza_min, hilos_intra_op)
         print(f"🎯 Detector de piezas de coples inicializado")
     
     def detectar_piezas_coples(self, imagen: np.ndarray) -> List[Dict]:
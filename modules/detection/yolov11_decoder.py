@@ -4,16 +4,160 @@ Interpreta el formato de salida (1, 5, 8400) y lo convierte a coordenadas reales
 """
 
 import numpy as np
-import cv2
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
+
+from modules.preprocessing.letterbox import TransformacionLetterbox, obtener_transformacion
+
+
+# Resultado estructurado de una decodificación: una fila por detección
+DTYPE_DETECCION = np.dtype([
+    ("x1", np.float32),
+    ("y1", np.float32),
+    ("x2", np.float32),
+    ("y2", np.float32),
+    ("confianza", np.float32),
+    ("clase", np.int32)
+])
+
+
+def umbral_logit(confianza_min: float) -> float:
+    """
+    Convierte un umbral de confianza (post-sigmoid) al umbral equivalente sobre el logit.
+    
+    sigmoid(x) > c  <=>  x > log(c / (1 - c)), de modo que el filtrado se hace
+    antes de la sigmoid y esta solo se calcula para los sobrevivientes.
+    
+    Args:
+        confianza_min: Umbral de confianza en [0, 1]
+        
+    Returns:
+        Umbral sobre el logit
+    """
+    if confianza_min <= 0.0:
+        return -np.inf
+    if confianza_min >= 1.0:
+        return np.inf
+    return float(np.log(confianza_min / (1.0 - confianza_min)))
+
+
+def cxcywh_a_xyxy(cajas: np.ndarray) -> np.ndarray:
+    """
+    Convierte cajas (N, 4) de (cx, cy, w, h) a (x1, y1, x2, y2) de forma vectorizada.
+    """
+    return cxcywh_filas_a_xyxy(cajas[:, 0], cajas[:, 1], cajas[:, 2], cajas[:, 3])
+
+
+def cxcywh_filas_a_xyxy(cx: np.ndarray, cy: np.ndarray, w: np.ndarray, h: np.ndarray) -> np.ndarray:
+    """
+    Construye cajas (N, 4) en formato (x1, y1, x2, y2) a partir de las filas cx, cy, w, h.
+    """
+    cajas = np.empty((len(cx), 4), dtype=np.result_type(cx, np.float32))
+    mitad_w = w * 0.5
+    mitad_h = h * 0.5
+    np.subtract(cx, mitad_w, out=cajas[:, 0])
+    np.subtract(cy, mitad_h, out=cajas[:, 1])
+    np.add(cx, mitad_w, out=cajas[:, 2])
+    np.add(cy, mitad_h, out=cajas[:, 3])
+    return cajas
+
+
+def _iou_uno_contra_todos(caja: np.ndarray, cajas: np.ndarray, area: float, areas: np.ndarray) -> np.ndarray:
+    """IoU de una caja (4,) contra un array de cajas (N, 4)."""
+    ancho = np.maximum(np.minimum(caja[2], cajas[:, 2]) - np.maximum(caja[0], cajas[:, 0]), 0)
+    alto = np.maximum(np.minimum(caja[3], cajas[:, 3]) - np.maximum(caja[1], cajas[:, 1]), 0)
+    interseccion = ancho * alto
+    return interseccion / np.maximum(area + areas - interseccion, 1e-9)
+
+
+def nms_vectorizado(cajas_xyxy: np.ndarray, puntajes: np.ndarray,
+                    umbral_iou: float, max_det: int, prefijo: Optional[int] = None) -> np.ndarray:
+    """
+    Non-Maximum Suppression greedy sobre arrays NumPy.
+    
+    Como el NMS greedy decide cada caja solo a partir de las conservadas antes que
+    ella, basta procesar el prefijo de mayor confianza: se seleccionan las
+    `prefijo` mejores cajas (argpartition), se calcula su matriz de IoU de una vez
+    y el bucle solo itera sobre las detecciones conservadas. Si el prefijo no
+    alcanza max_det se recorre el conjunto completo, con el mismo resultado que
+    un NMS sobre todas las cajas.
+    
+    Args:
+        cajas_xyxy: Cajas (N, 4) en formato (x1, y1, x2, y2)
+        puntajes: Confianzas (N,)
+        umbral_iou: IoU a partir del cual se suprime una caja
+        max_det: Número máximo de detecciones a conservar
+        prefijo: Número de mejores candidatos evaluados con matriz de IoU (por defecto 4 * max_det)
+        
+    Returns:
+        Índices conservados, ordenados por confianza descendente
+    """
+    n = len(puntajes)
+    if n == 0 or max_det <= 0:
+        return np.empty(0, dtype=np.int64)
+    
+    # 1. Prefijo de mayor confianza con matriz de IoU completa
+    k = min(n, max(prefijo or 4 * max_det, max_det))
+    if k < n:
+        mejores = np.argpartition(-puntajes, k - 1)[:k]
+        orden = mejores[np.argsort(-puntajes[mejores], kind="stable")]
+    else:
+        orden = np.argsort(-puntajes, kind="stable")
+    
+    x1, y1, x2, y2 = cajas_xyxy[orden[:k]].T.copy()
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    ancho = np.minimum.outer(x2, x2) - np.maximum.outer(x1, x1)
+    alto = np.minimum.outer(y2, y2) - np.maximum.outer(y1, y1)
+    np.maximum(ancho, 0, out=ancho)
+    np.maximum(alto, 0, out=alto)
+    interseccion = ancho * alto
+    union = np.add.outer(areas, areas) - interseccion
+    suprime = interseccion > umbral_iou * np.maximum(union, 1e-9)
+    
+    vivos = np.ones(k, dtype=bool)
+    conservados = []
+    while len(conservados) < max_det:
+        restantes = np.flatnonzero(vivos)
+        if restantes.size == 0:
+            break
+        i = restantes[0]
+        conservados.append(i)
+        vivos &= ~suprime[i]
+        vivos[i] = False
+    
+    if len(conservados) >= max_det or k == n:
+        return orden[np.asarray(conservados, dtype=np.int64)]
+    
+    # 2. El prefijo no bastó: NMS fila a fila sobre todos los candidatos ordenados
+    orden = np.argsort(-puntajes, kind="stable")
+    cajas = cajas_xyxy[orden]
+    areas = np.maximum(cajas[:, 2] - cajas[:, 0], 0) * np.maximum(cajas[:, 3] - cajas[:, 1], 0)
+    restantes = np.arange(n)
+    conservados = []
+    while restantes.size > 0 and len(conservados) < max_det:
+        i = restantes[0]
+        conservados.append(i)
+        resto = restantes[1:]
+        iou = _iou_uno_contra_todos(cajas[i], cajas[resto], areas[i], areas[resto])
+        restantes = resto[iou <= umbral_iou]
+    
+    return orden[np.asarray(conservados, dtype=np.int64)]
+
 
 class YOLOv11Decoder:
     """
     Decodificador optimizado para modelos YOLOv11 ONNX
-    Maneja el formato específico (1, 5, 8400) con sigmoid y conversión de coordenadas
+    Maneja el formato específico (1, 5, 8400) con sigmoid y conversión de coordenadas.
+    
+    Todo el camino de decodificación es NumPy vectorizado: pre-filtrado sobre el logit,
+    conversión xyxy, NMS por arrays y resultado como array estructurado (DTYPE_DETECCION).
+    La vista de diccionarios se construye solo bajo demanda.
     """
     
-    def __init__(self, confianza_min: float = 0.55, iou_threshold: float = 0.35, max_det: int = 30, class_names: List[str] = None):
+    # Área mínima (px²) para aceptar una detección
+    AREA_MINIMA = 100
+    
+    def __init__(self, confianza_min: float = 0.55, iou_threshold: float = 0.35, max_det: int = 30, class_names: List[str] = None,
+                 tamano_entrada: int = 640):
         """
         Inicializa el decodificador YOLOv11
         
@@ -22,14 +166,117 @@ class YOLOv11Decoder:
             iou_threshold: Umbral de IoU para NMS (reducido a 0.35 para ser más agresivo)
             max_det: Número máximo de detecciones (reducido a 30 para mayor calidad)
             class_names: Lista de nombres de clases para usar en las detecciones
+            tamano_entrada: Lado de la entrada del modelo (espacio de las cajas predichas)
         """
+        self.tamano_entrada = tamano_entrada
         self.confianza_min = confianza_min
         self.iou_threshold = iou_threshold
         self.max_det = max_det
         self.class_names = class_names or ["Cople"]  # Por defecto usa "Cople" si no se proporcionan clases
         print(f"🎯 YOLOv11Decoder inicializado - Conf: {confianza_min}, IoU: {iou_threshold}, MaxDet: {max_det}, Clases: {self.class_names}")
     
-    def decode_output(self, outputs: np.ndarray, imagen_shape: Tuple[int, int] = (640, 640)) -> List[Dict]:
+    def decode_output_array(self, outputs: np.ndarray, imagen_shape: Tuple[int, int] = (640, 640),
+                            transformacion: Optional[TransformacionLetterbox] = None) -> np.ndarray:
+        """
+        Decodifica las predicciones del modelo a un array estructurado, sin bucles por caja
+        
+        Args:
+            outputs: Salida del modelo ONNX con shape (1, 4 + num_clases, N)
+            imagen_shape: Tamaño de la imagen original (height, width)
+            transformacion: Letterbox aplicado a la entrada; por defecto el de imagen_shape
+            
+        Returns:
+            Array estructurado (DTYPE_DETECCION) en píxeles de la imagen original,
+            ordenado por confianza descendente
+        """
+        if len(outputs.shape) != 3 or outputs.shape[1] < 5:
+            raise ValueError(f"Formato inesperado. Se esperaba shape (1, 5, N), se recibió {outputs.shape}")
+        
+        predicciones = outputs[0]  # (4 + num_clases, N), sin transponer
+        logits = predicciones[4:]
+        if logits.shape[0] == 1:
+            clases = None
+            logits_max = logits[0]
+        else:
+            clases = np.argmax(logits, axis=0)
+            logits_max = np.take_along_axis(logits, clases[None, :], axis=0)[0]
+        
+        # 1. Pre-filtrado sobre el logit: la sigmoid solo se calcula para los sobrevivientes
+        candidatos = np.flatnonzero(logits_max > umbral_logit(self.confianza_min))
+        if candidatos.size == 0:
+            return np.empty(0, dtype=DTYPE_DETECCION)
+        
+        confianzas = self._sigmoid(logits_max[candidatos])
+        cajas_xyxy = cxcywh_filas_a_xyxy(
+            predicciones[0, candidatos], predicciones[1, candidatos],
+            predicciones[2, candidatos], predicciones[3, candidatos]
+        )
+        
+        # 2. NMS por arrays y límite de detecciones
+        conservados = nms_vectorizado(cajas_xyxy, confianzas, self.iou_threshold, self.max_det)
+        cajas_xyxy = cajas_xyxy[conservados]
+        confianzas = confianzas[conservados]
+        
+        # 3. Validación vectorizada en la entrada del modelo: dentro de la imagen y área mínima
+        alto = ancho = self.tamano_entrada
+        x1, y1, x2, y2 = cajas_xyxy.T
+        validas = (
+            (x1 >= 0) & (y1 >= 0) & (x2 <= ancho) & (y2 <= alto) &
+            (x1 < x2) & (y1 < y2) &
+            (((x2 - x1) * (y2 - y1)).astype(np.int64) >= self.AREA_MINIMA)
+        )
+        
+        # 4. Retroproyección de la entrada del modelo (letterbox) a píxeles de la imagen original
+        if transformacion is None:
+            transformacion = obtener_transformacion(imagen_shape, self.tamano_entrada)
+        cajas_origen = transformacion.cajas_a_origen(cajas_xyxy[validas])
+        en_imagen = (cajas_origen[:, 0] < cajas_origen[:, 2]) & (cajas_origen[:, 1] < cajas_origen[:, 3])
+        cajas_origen = cajas_origen[en_imagen]
+        
+        detecciones = np.empty(len(cajas_origen), dtype=DTYPE_DETECCION)
+        detecciones["x1"] = cajas_origen[:, 0]
+        detecciones["y1"] = cajas_origen[:, 1]
+        detecciones["x2"] = cajas_origen[:, 2]
+        detecciones["y2"] = cajas_origen[:, 3]
+        detecciones["confianza"] = confianzas[validas][en_imagen]
+        detecciones["clase"] = 0 if clases is None else clases[candidatos[conservados]][validas][en_imagen]
+        return detecciones
+    
+    def a_diccionarios(self, detecciones: np.ndarray) -> List[Dict]:
+        """
+        Construye la vista de diccionarios (formato estándar del sistema) de un array estructurado
+        
+        Args:
+            detecciones: Array estructurado DTYPE_DETECCION
+            
+        Returns:
+            Lista de detecciones con clase, confianza, bbox, centroide y área
+        """
+        resultado = []
+        for x1, y1, x2, y2, confianza, clase in detecciones.tolist():
+            if 0 <= clase < len(self.class_names):
+                clase_nombre = self.class_names[clase]
+            else:
+                clase_nombre = "Cople"
+            resultado.append({
+                "clase": clase_nombre,
+                "confianza": confianza,
+                "bbox": {
+                    "x1": int(x1),
+                    "y1": int(y1),
+                    "x2": int(x2),
+                    "y2": int(y2)
+                },
+                "centroide": {
+                    "x": int((x1 + x2) / 2),
+                    "y": int((y1 + y2) / 2)
+                },
+                "area": int((x2 - x1) * (y2 - y1))
+            })
+        return resultado
+    
+    def decode_output(self, outputs: np.ndarray, imagen_shape: Tuple[int, int] = (640, 640),
+                      transformacion: Optional[TransformacionLetterbox] = None) -> List[Dict]:
         """
         Decodifica las predicciones del modelo YOLOv11 ONNX
         
@@ -37,109 +284,14 @@ class YOLOv11Decoder:
             outputs: Salida del modelo ONNX con shape (1, 5, 8400)
                     - 5 = [x, y, w, h, conf] para 1 clase
                     - 8400 = número de anchors (80×80 + 40×40 + 20×20)
-            imagen_shape: Tamaño de la imagen de entrada (height, width)
+            imagen_shape: Tamaño de la imagen original (height, width)
+            transformacion: Letterbox aplicado a la entrada; por defecto el de imagen_shape
             
         Returns:
-            Lista de detecciones con formato estándar
+            Lista de detecciones con formato estándar, en píxeles de la imagen original
         """
         try:
-            print(f"🔍 YOLOv11Decoder - Input shape: {outputs.shape}")
-            print(f"🔍 YOLOv11Decoder - Imagen shape: {imagen_shape}")
-            
-            # Verificar formato de salida
-            if len(outputs.shape) != 3 or outputs.shape[1] != 5:
-                raise ValueError(f"Formato inesperado. Se esperaba shape (1, 5, N), se recibió {outputs.shape}")
-            
-            # Transponer para facilitar procesamiento: (1, 5, 8400) -> (8400, 5)
-            predictions = outputs[0].transpose()  # Shape: (8400, 5)
-            print(f"🔍 YOLOv11Decoder - Predictions shape: {predictions.shape}")
-            
-            # Separar coordenadas y confianzas
-            boxes = predictions[:, :4]  # [x_center, y_center, width, height]
-            confidences = predictions[:, 4]  # Puntuaciones de confianza (logits)
-            
-            print(f"🔍 YOLOv11Decoder - Boxes shape: {boxes.shape}")
-            print(f"🔍 YOLOv11Decoder - Confidences shape: {confidences.shape}")
-            print(f"🔍 YOLOv11Decoder - Rango confidences: [{np.min(confidences):.4f}, {np.max(confidences):.4f}]")
-            
-            # CRÍTICO: Aplicar sigmoid a las confianzas
-            confidences_sigmoid = self._sigmoid(confidences)
-            print(f"🔍 YOLOv11Decoder - Rango confidences (sigmoid): [{np.min(confidences_sigmoid):.4f}, {np.max(confidences_sigmoid):.4f}]")
-            
-            # Filtrar por confianza mínima (más estricto)
-            valid_indices = confidences_sigmoid > self.confianza_min
-            valid_count = np.sum(valid_indices)
-            print(f"🔍 YOLOv11Decoder - Detecciones válidas (conf > {self.confianza_min}): {valid_count}")
-            
-            if valid_count == 0:
-                print("⚠️ YOLOv11Decoder - No se encontraron detecciones con confianza suficiente")
-                return []
-            
-            # Filtrar predicciones válidas
-            boxes_valid = boxes[valid_indices]
-            confidences_valid = confidences_sigmoid[valid_indices]
-            
-            # Convertir de formato center_x, center_y, width, height a x1, y1, x2, y2
-            boxes_xyxy = self._convert_to_xyxy(boxes_valid)
-            print(f"🔍 YOLOv11Decoder - Boxes XYXY shape: {boxes_xyxy.shape}")
-            
-            # Aplicar Non-Maximum Suppression con parámetros más agresivos
-            indices = cv2.dnn.NMSBoxes(
-                boxes_xyxy.tolist(), 
-                confidences_valid.tolist(), 
-                self.confianza_min, 
-                self.iou_threshold
-            )
-            
-            print(f"🔍 YOLOv11Decoder - NMS aplicado, índices válidos: {len(indices) if len(indices) > 0 else 0}")
-            
-            detecciones = []
-            
-            if len(indices) > 0:
-                # Limitar número máximo de detecciones
-                indices = indices.flatten()[:self.max_det]
-                
-                for i, idx in enumerate(indices):
-                    x1, y1, x2, y2 = boxes_xyxy[idx]
-                    confidence = confidences_valid[idx]
-                    
-                    # Validar coordenadas dentro de la imagen
-                    if (x1 >= 0 and y1 >= 0 and x2 <= imagen_shape[1] and y2 <= imagen_shape[0] and
-                        x1 < x2 and y1 < y2):
-                        
-                        # Calcular centroide y área
-                        centroid_x = int((x1 + x2) / 2)
-                        centroid_y = int((y1 + y2) / 2)
-                        area = int((x2 - x1) * (y2 - y1))
-                        
-                        # Validar área mínima (aumentada para evitar detecciones muy pequeñas)
-                        if area >= 100:  # Aumentado de 10 a 100
-                            # Usar la primera clase disponible o "Cople" por defecto
-                            clase_nombre = self.class_names[0] if self.class_names else "Cople"
-                            
-                            detection = {
-                                "clase": clase_nombre,
-                                "confianza": float(confidence),
-                                "bbox": {
-                                    "x1": int(x1),
-                                    "y1": int(y1),
-                                    "x2": int(x2),
-                                    "y2": int(y2)
-                                },
-                                "centroide": {
-                                    "x": centroid_x,
-                                    "y": centroid_y
-                                },
-                                "area": area
-                            }
-                            
-                            detecciones.append(detection)
-                            print(f"✅ YOLOv11Decoder - Detección {i+1}: {clase_nombre} - {confidence:.3f} - BBox: ({int(x1)},{int(y1)}) a ({int(x2)},{int(y2)}) - Área: {area}")
-                        else:
-                            print(f"⚠️ YOLOv11Decoder - Detección {i+1} descartada por área insuficiente: {area}")
-                    else:
-                        print(f"⚠️ YOLOv11Decoder - Detección {i+1} descartada por coordenadas inválidas: ({x1:.1f},{y1:.1f}) a ({x2:.1f},{y2:.1f})")
-            
+            detecciones = self.a_diccionarios(self.decode_output_array(outputs, imagen_shape, transformacion))
             print(f"🎯 YOLOv11Decoder - Total detecciones finales: {len(detecciones)}")
             return detecciones
             
@@ -171,45 +323,4 @@ class YOLOv11Decoder:
         Returns:
             Array de cajas en formato (x1, y1, x2, y2)
         """
-        boxes_xyxy = np.zeros_like(boxes_cxcywh)
-        
-        # x1 = center_x - width/2
-        boxes_xyxy[:, 0] = boxes_cxcywh[:, 0] - boxes_cxcywh[:, 2] / 2
-        # y1 = center_y - height/2
-        boxes_xyxy[:, 1] = boxes_cxcywh[:, 1] - boxes_cxcywh[:, 3] / 2
-        # x2 = center_x + width/2
-        boxes_xyxy[:, 2] = boxes_cxcywh[:, 0] + boxes_cxcywh[:, 2] / 2
-        # y2 = center_y + height/2
-        boxes_xyxy[:, 3] = boxes_cxcywh[:, 1] + boxes_cxcywh[:, 3] / 2
-        
-        return boxes_xyxy
-    
-    def _scale_coordinates(self, coords: Tuple[float, float, float, float], 
-                          input_shape: Tuple[int, int], 
-                          original_shape: Tuple[int, int]) -> Tuple[float, float, float, float]:
-        """
-        Escalar coordenadas del tamaño de entrada al tamaño original
-        
-        Args:
-            coords: Coordenadas (x1, y1, x2, y2)
-            input_shape: Tamaño de entrada del modelo (height, width)
-            original_shape: Tamaño original de la imagen (height, width)
-            
-        Returns:
-            Coordenadas escaladas
-        """
-        x1, y1, x2, y2 = coords
-        input_h, input_w = input_shape
-        orig_h, orig_w = original_shape
-        
-        # Calcular factores de escala
-        scale_x = orig_w / input_w
-        scale_y = orig_h / input_h
-        
-        # Aplicar escalado
-        x1 = x1 * scale_x
-        y1 = y1 * scale_y
-        x2 = x2 * scale_x
-        y2 = y2 * scale_y
-        
-        return x1, y1, x2, y2
+        return cxcywh_a_xyxy(boxes_cxcywh)
@@ -0,0 +1,146 @@
+"""
+Filtro de frames repetidos antes de la inferencia
+Compara una miniatura en gris del frame nuevo con la del último frame analizado y, si la
+diferencia es menor al umbral (línea detenida), permite reutilizar los resultados anteriores
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import FiltroFramesConfig
+
+
+def calcular_miniatura(frame: np.ndarray, lado: int = 32) -> np.ndarray:
+    """
+    Miniatura (lado, lado) en gris float32 del frame.
+
+    Se submuestrea con paso fijo antes de convertir a gris y promediar por área, de modo que
+    el costo no depende de la resolución del sensor (~0.5 ms con 4112x2176).
+
+    Args:
+        frame (np.ndarray): Imagen (H, W, 3) BGR o (H, W) en gris, uint8
+        lado (int): Lado de la miniatura
+    """
+    paso = max(1, min(frame.shape[:2]) // (lado * 4))
+    muestra = np.ascontiguousarray(frame[::paso, ::paso])
+    if muestra.ndim == 3:
+        muestra = cv2.cvtColor(muestra, cv2.COLOR_BGR2GRAY)
+    miniatura = cv2.resize(muestra, (lado, lado), interpolation=cv2.INTER_AREA)
+    return miniatura.astype(np.float32)
+
+
+class FiltroFramesRepetidos:
+    """
+    Decide si un frame es prácticamente igual al último analizado.
+
+    La referencia solo se actualiza con `registrar_analisis`, es decir, con frames que sí
+    pasaron por los modelos: una deriva lenta se acumula hasta superar el umbral y
+    fuerza un nuevo análisis. Tras `max_reutilizaciones` reutilizaciones seguidas también se
+    reanaliza aunque el frame no cambie.
+    """
+
+    def __init__(self, habilitado: Optional[bool] = None, umbral: Optional[float] = None,
+                 lado: Optional[int] = None):
+        """
+        Args:
+            habilitado (bool, optional): None = FiltroFramesConfig.HABILITADO
+            umbral (float, optional): Diferencia media absoluta máxima para reutilizar
+            lado (int, optional): Lado de la miniatura
+        """
+        self.habilitado = FiltroFramesConfig.HABILITADO if habilitado is None else habilitado
+        self.umbral = float(FiltroFramesConfig.UMBRAL_DIFERENCIA if umbral is None else umbral)
+        self.lado = int(lado or FiltroFramesConfig.LADO_MINIATURA)
+        self.max_reutilizaciones = FiltroFramesConfig.MAX_REUTILIZACIONES
+
+        self._lock = threading.Lock()
+        self._miniatura: Optional[np.ndarray] = None
+        self._resultados: Optional[Dict] = None
+        self._forma: Optional[Tuple[int, ...]] = None
+        self._consecutivas = 0
+
+        # Estadísticas
+        self.frames_evaluados = 0
+        self.reutilizaciones = 0
+        self.tiempo_ahorrado_ms = 0.0
+        self.tiempo_comparacion_ms = 0.0
+
+    def evaluar(self, frame: np.ndarray) -> Dict:
+        """
+        Compara el frame con el último analizado.
+
+        Returns:
+            Dict: {"reutilizar", "diferencia", "miniatura", "tiempo_ms"}; "resultados" con el
+            análisis anterior si reutilizar es True
+        """
+        if not self.habilitado:
+            return {"reutilizar": False, "diferencia": None, "miniatura": None, "tiempo_ms": 0.0}
+
+        inicio = time.perf_counter()
+        miniatura = calcular_miniatura(frame, self.lado)
+        with self._lock:
+            self.frames_evaluados += 1
+            diferencia = None
+            reutilizar = False
+            if self._miniatura is not None and frame.shape == self._forma:
+                diferencia = float(cv2.absdiff(miniatura, self._miniatura).mean())
+                limite_alcanzado = (self.max_reutilizaciones is not None
+                                    and self._consecutivas >= self.max_reutilizaciones)
+                reutilizar = diferencia < self.umbral and not limite_alcanzado
+            tiempo_ms = (time.perf_counter() - inicio) * 1000
+            self.tiempo_comparacion_ms += tiempo_ms
+
+            evaluacion = {"reutilizar": reutilizar, "diferencia": diferencia,
+                          "miniatura": miniatura, "tiempo_ms": tiempo_ms}
+            if reutilizar:
+                self._consecutivas += 1
+                self.reutilizaciones += 1
+                # CPU ahorrado: el procesamiento del análisis reutilizado menos la comparación
+                procesamiento = self._resultados.get("tiempos", {}).get("procesamiento_ms", 0.0)
+                self.tiempo_ahorrado_ms += max(0.0, procesamiento - tiempo_ms)
+                evaluacion["resultados"] = self._resultados
+            return evaluacion
+
+    def registrar_analisis(self, frame: np.ndarray, resultados: Dict, miniatura: Optional[np.ndarray] = None):
+        """
+        Toma un frame analizado como nueva referencia.
+
+        Args:
+            frame (np.ndarray): Frame que pasó por los modelos
+            resultados (Dict): Resultados de su análisis completo
+            miniatura (np.ndarray, optional): Miniatura ya calculada por `evaluar`
+        """
+        if not self.habilitado:
+            return
+        if miniatura is None:
+            miniatura = calcular_miniatura(frame, self.lado)
+        with self._lock:
+            self._miniatura = miniatura
+            self._forma = frame.shape
+            # Sin el frame: cada reutilización lleva el frame recién capturado
+            self._resultados = {k: v for k, v in resultados.items() if k != "frame"}
+            self._consecutivas = 0
+
+    def reiniciar(self):
+        """Olvida la referencia (p. ej. tras recargar modelos o cambiar la configuración)."""
+        with self._lock:
+            self._miniatura = None
+            self._resultados = None
+            self._forma = None
+            self._consecutivas = 0
+
+    def obtener_estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "habilitado": self.habilitado,
+                "umbral": self.umbral,
+                "frames_evaluados": self.frames_evaluados,
+                "reutilizaciones": self.reutilizaciones,
+                "tasa_reutilizacion": (round(self.reutilizaciones / self.frames_evaluados, 3)
+                                       if self.frames_evaluados else 0.0),
+                "tiempo_ahorrado_ms": round(self.tiempo_ahorrado_ms, 2),
+                "tiempo_comparacion_ms": round(self.tiempo_comparacion_ms, 2)
+            }
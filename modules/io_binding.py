@@ -0,0 +1,170 @@
+"""
+Ejecución de modelos ONNX con buffers de entrada/salida preasignados (IOBinding)
+Cada motor reutiliza sus arreglos NumPy entre frames: en régimen estable no hay
+asignaciones grandes por inferencia, y un contador de asignaciones lo demuestra
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import EnlaceIOConfig
+
+# Tipo de elemento de ONNX Runtime -> dtype de NumPy
+TIPOS_ORT = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(uint8)": np.uint8,
+    "tensor(int8)": np.int8,
+    "tensor(bool)": np.bool_
+}
+
+
+class ContadorAsignaciones:
+    """Cuenta los buffers grandes (tensores, lienzos, salidas) reservados por un componente."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.asignaciones = 0
+        self.bytes_asignados = 0
+
+    def registrar(self, *arreglos: np.ndarray):
+        """Registra uno o más arreglos recién reservados."""
+        with self._lock:
+            self.asignaciones += len(arreglos)
+            self.bytes_asignados += sum(int(a.nbytes) for a in arreglos)
+
+    def como_dict(self) -> Dict:
+        return {"asignaciones": self.asignaciones,
+                "mb_asignados": round(self.bytes_asignados / (1024 * 1024), 2)}
+
+
+def iobinding_habilitado(model_path: str) -> bool:
+    """True si el modelo debe ejecutarse con IOBinding según EnlaceIOConfig."""
+    if not EnlaceIOConfig.HABILITADO:
+        return False
+    modelos = EnlaceIOConfig.MODELOS
+    return modelos is None or os.path.basename(model_path) in modelos
+
+
+class EjecutorSesion:
+    """
+    Ejecuta un modelo sobre un tensor [1, 3, H, W] y retorna sus salidas.
+
+    Con IOBinding (EnlaceIOConfig) la entrada se enlaza al tensor recibido sin copiarlo y las
+    salidas se escriben en buffers NumPy reservados una sola vez (se vuelven a reservar solo si
+    cambia la forma de la entrada). Las salidas retornadas son esos mismos buffers: son válidas
+    hasta la siguiente ejecución, por lo que el motor debe decodificarlas antes de volver a
+    ejecutar. Sin IOBinding equivale a session.run y cuenta las salidas que este reserva.
+
+    Un ejecutor por motor; no es seguro ejecutar el mismo ejecutor desde dos hilos a la vez.
+    """
+
+    def __init__(self, session, input_name: str, output_names: Sequence[str], model_path: str,
+                 usar_iobinding: Optional[bool] = None):
+        """
+        Args:
+            session: Sesión ONNX Runtime del modelo
+            input_name (str): Nombre de la entrada
+            output_names (Sequence[str]): Salidas a obtener (en orden)
+            model_path (str): Ruta del modelo (para EnlaceIOConfig.MODELOS)
+            usar_iobinding (bool, optional): Fuerza el modo; None = según EnlaceIOConfig
+        """
+        self.session = session
+        self.input_name = input_name
+        self.output_names = list(output_names)
+        self.model_path = model_path
+        self.iobinding = iobinding_habilitado(model_path) if usar_iobinding is None else usar_iobinding
+        self.contador = ContadorAsignaciones()
+        self.ejecuciones = 0
+
+        self._binding = None
+        self._salidas: List[np.ndarray] = []
+        self._forma_entrada = None
+        self._entrada_enlazada = None  # (puntero, forma) del tensor enlazado como entrada
+        if self.iobinding:
+            try:
+                self._binding = session.io_binding()
+            except Exception as e:
+                print(f"⚠️ IOBinding no disponible para {os.path.basename(model_path)}: {e}")
+                self.iobinding = False
+
+    def _tipos_salida(self) -> List[type]:
+        tipos = {salida.name: salida.type for salida in self.session.get_outputs()}
+        return [TIPOS_ORT.get(tipos.get(nombre), np.float32) for nombre in self.output_names]
+
+    def _formas_salida(self, tensor: np.ndarray) -> List[tuple]:
+        """Formas de las salidas para la entrada dada (una ejecución normal si hay ejes simbólicos)."""
+        formas = {salida.name: salida.shape for salida in self.session.get_outputs()}
+        declaradas = [formas.get(nombre) for nombre in self.output_names]
+        if all(forma and all(isinstance(d, int) and d > 0 for d in forma) for forma in declaradas):
+            return [tuple(forma) for forma in declaradas]
+        salidas = self.session.run(self.output_names, {self.input_name: tensor})
+        self.contador.registrar(*salidas)
+        return [s.shape for s in salidas]
+
+    def _enlazar_salidas(self, tensor: np.ndarray):
+        """Reserva los buffers de salida para la forma de entrada actual y los enlaza."""
+        self._salidas = [np.empty(forma, dtype=tipo)
+                         for forma, tipo in zip(self._formas_salida(tensor), self._tipos_salida())]
+        self.contador.registrar(*self._salidas)
+        self._binding.clear_binding_outputs()
+        for nombre, buffer in zip(self.output_names, self._salidas):
+            self._binding.bind_output(nombre, "cpu", 0, buffer.dtype, buffer.shape, buffer.ctypes.data)
+        self._forma_entrada = tensor.shape
+        self._entrada_enlazada = None
+        nombre_modelo = os.path.basename(self.model_path)
+        print(f"🔗 IOBinding {nombre_modelo}: salidas {[s.shape for s in self._salidas]} preasignadas")
+
+    def ejecutar(self, tensor: np.ndarray) -> List[np.ndarray]:
+        """
+        Ejecuta el modelo.
+
+        Args:
+            tensor (np.ndarray): Entrada float32; con IOBinding debe seguir vivo y sin cambios
+                durante la ejecución (se enlaza por puntero, sin copia)
+
+        Returns:
+            List[np.ndarray]: Salidas en el orden de output_names
+        """
+        self.ejecuciones += 1
+        if not self.iobinding:
+            salidas = self.session.run(self.output_names, {self.input_name: tensor})
+            self.contador.registrar(*salidas)
+            return salidas
+
+        if tensor.dtype != np.float32 or not tensor.flags.c_contiguous:
+            tensor = np.ascontiguousarray(tensor, dtype=np.float32)
+            self.contador.registrar(tensor)
+        if tensor.shape != self._forma_entrada:
+            self._enlazar_salidas(tensor)
+
+        # Re-enlazar la entrada solo si cambió el buffer (el contexto del frame o el del motor)
+        enlazada = (tensor.ctypes.data, tensor.shape)
+        if enlazada != self._entrada_enlazada:
+            self._binding.bind_input(self.input_name, "cpu", 0, np.float32, tensor.shape, tensor.ctypes.data)
+            self._entrada_enlazada = enlazada
+        self.session.run_with_iobinding(self._binding)
+        return self._salidas
+
+
+def estadisticas_buffers(motor) -> Dict:
+    """
+    Asignaciones de buffers de un motor: preprocesamiento (lienzos/tensores) e inferencia (salidas).
+
+    Args:
+        motor: Motor con atributos `preprocesador` (PreprocesadorLetterbox) y `ejecutor` (EjecutorSesion)
+    """
+    ejecutor = getattr(motor, "ejecutor", None)
+    preprocesador = getattr(motor, "preprocesador", None)
+    return {
+        "iobinding": bool(ejecutor is not None and ejecutor.iobinding),
+        "ejecuciones": ejecutor.ejecuciones if ejecutor is not None else 0,
+        "inferencia": ejecutor.contador.como_dict() if ejecutor is not None else {},
+        "preprocesamiento": preprocesador.contador.como_dict() if preprocesador is not None else {}
+    }
@@ -9,6 +9,9 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 import numpy as np
 
+from config import FileConfig
+from modules.postprocessing.mask import Mask
+
 class MetadataStandard:
     """
     Clase para crear metadatos estandarizados para todos los tipos de análisis
@@ -244,7 +247,17 @@ class MetadataStandard:
                 # Información de la máscara si está disponible
                 if "mascara" in segmentacion and segmentacion["mascara"] is not None:
                     mascara = segmentacion["mascara"]
-                    if isinstance(mascara, np.ndarray):
+                    if isinstance(mascara, Mask):
+                        entrada["info_mascara"] = {
+                            "shape": list(mascara.shape),
+                            "tipo": "bbox_local_packed" if mascara.packed else "bbox_local_uint8",
+                            "bbox_local": list(mascara.bbox),
+                            "rango": [0.0, 1.0 if mascara.area else 0.0],
+                            "pixels_activos": mascara.area
+                        }
+                        if FileConfig.METADATOS_MASCARAS_RLE:
+                            entrada["info_mascara"]["rle"] = mascara.to_rle()
+                    elif isinstance(mascara, np.ndarray):
                         entrada["info_mascara"] = {
                             "shape": list(mascara.shape),
                             "tipo": str(mascara.dtype),
@@ -338,7 +351,8 @@ class MetadataStandard:
     @staticmethod
     def crear_metadatos_completos(tipo_analisis: str, archivo_imagen: str, 
                                 resultados: Any, tiempos: Dict,
-                                timestamp_captura: str = None) -> Dict:
+                                timestamp_captura: str = None,
+                                cascada: Optional[Dict] = None) -> Dict:
         """
         Crea metadatos completos según el tipo de análisis
         
@@ -348,6 +362,7 @@ class MetadataStandard:
             resultados: Resultados del análisis
             tiempos: Tiempos de procesamiento
             timestamp_captura: Timestamp de captura
+            cascada: Traza de decisiones de la política de cascada (opcional)
             
         Returns:
             Metadatos completos
@@ -379,4 +394,8 @@ class MetadataStandard:
                 metadatos, resultados, tiempos, "piezas"
             )
         
+        # Traza de la cascada: qué modelos se ejecutaron u omitieron y por qué
+        if cascada is not None:
+            metadatos["cascada"] = cascada
+        
         return metadatos
@@ -0,0 +1,326 @@
+"""
+Caché en disco de modelos ONNX optimizados por ONNX Runtime
+La primera carga guarda el grafo ya optimizado; las siguientes lo cargan sin volver a optimizar
+
+Uso como comando:
+    python -m modules.model_cache construir          # Precompila todos los .onnx de ModelsConfig.MODELS_DIR
+    python -m modules.model_cache listar
+    python -m modules.model_cache invalidar [MODELO]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import ModelsConfig, CacheModelosConfig
+
+EXTENSION_CACHE = ".opt.onnx"
+ARCHIVO_INDICE = "indice_hashes.json"
+
+_NIVELES_OPTIMIZACION = {
+    "deshabilitado": "ORT_DISABLE_ALL",
+    "basico": "ORT_ENABLE_BASIC",
+    "extendido": "ORT_ENABLE_EXTENDED",
+    "todo": "ORT_ENABLE_ALL"
+}
+
+
+def nivel_optimizacion(nombre: str):
+    """Convierte un nombre de nivel ("basico", "extendido", "todo"...) en GraphOptimizationLevel."""
+    import onnxruntime as ort
+
+    if nombre not in _NIVELES_OPTIMIZACION:
+        raise ValueError(f"nivel de optimización desconocido: {nombre} (válidos: {list(_NIVELES_OPTIMIZACION)})")
+    return getattr(ort.GraphOptimizationLevel, _NIVELES_OPTIMIZACION[nombre])
+
+
+def _identidad_cpu() -> str:
+    """Modelo de CPU: los grafos con nivel "todo" incluyen kernels y layouts propios del hardware."""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8", errors="ignore") as f:
+            for linea in f:
+                if linea.startswith("model name"):
+                    return linea.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "desconocida"
+
+
+class CacheModelosOptimizados:
+    """
+    Caché de grafos optimizados (SessionOptions.optimized_model_filepath).
+
+    Características:
+    - Clave = hash del .onnx + versión de ONNX Runtime + proveedores + opciones que cambian el grafo
+      (nivel de optimización) + arquitectura/CPU; los hilos no forman parte de la clave
+    - Escritura atómica (archivo temporal + os.replace) segura entre hilos y procesos
+    - Invalidación automática: al guardar una entrada nueva se borran las del mismo modelo
+      con otro hash u otra versión de ONNX Runtime; una entrada ilegible se descarta y se regenera
+    - Hash del modelo memorizado por (tamaño, mtime) en un índice para no releer el archivo en cada arranque
+    """
+
+    def __init__(self, directorio: Optional[str] = None):
+        """
+        Args:
+            directorio (str, optional): Directorio de la caché
+                (por defecto CacheModelosConfig.DIRECTORIO o MODELS_DIR/.cache_ort)
+        """
+        self.directorio = directorio or CacheModelosConfig.DIRECTORIO or os.path.join(
+            ModelsConfig.MODELS_DIR, ".cache_ort"
+        )
+        self._lock = threading.Lock()
+        self._hashes = None  # ruta -> {"tamano", "mtime_ns", "sha256"}
+
+    # ------------------------------------------------------------------ claves
+
+    def _ruta_indice(self) -> str:
+        return os.path.join(self.directorio, ARCHIVO_INDICE)
+
+    def _cargar_indice(self) -> Dict:
+        if self._hashes is None:
+            try:
+                with open(self._ruta_indice(), encoding="utf-8") as f:
+                    self._hashes = json.load(f)
+            except (OSError, ValueError):
+                self._hashes = {}
+        return self._hashes
+
+    def _escribir_json(self, ruta: str, datos: Dict):
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def hash_modelo(self, model_path: str) -> str:
+        """SHA-256 del archivo .onnx (se recalcula solo si cambian su tamaño o su mtime)."""
+        ruta = os.path.abspath(model_path)
+        info = os.stat(ruta)
+        with self._lock:
+            entrada = self._cargar_indice().get(ruta)
+            if entrada and entrada["tamano"] == info.st_size and entrada["mtime_ns"] == info.st_mtime_ns:
+                return entrada["sha256"]
+
+        sha = hashlib.sha256()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                sha.update(bloque)
+        digest = sha.hexdigest()
+
+        with self._lock:
+            indice = self._cargar_indice()
+            indice[ruta] = {"tamano": info.st_size, "mtime_ns": info.st_mtime_ns, "sha256": digest}
+            try:
+                os.makedirs(self.directorio, exist_ok=True)
+                self._escribir_json(self._ruta_indice(), indice)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el índice de la caché de modelos: {e}")
+        return digest
+
+    def clave(self, model_path: str, providers: List[str], opciones: Dict) -> Tuple[str, Dict]:
+        """
+        Clave de caché de un modelo con sus proveedores y opciones.
+
+        Returns:
+            Tuple[str, Dict]: (clave hexadecimal, descripción de los componentes de la clave)
+        """
+        import onnxruntime as ort
+
+        componentes = {
+            "modelo": os.path.abspath(model_path),
+            "sha256": self.hash_modelo(model_path),
+            "onnxruntime": ort.__version__,
+            "proveedores": list(providers),
+            "opciones": dict(sorted(opciones.items())),
+            "maquina": platform.machine(),
+            "cpu": _identidad_cpu()
+        }
+        serializado = json.dumps({k: v for k, v in componentes.items() if k != "modelo"}, sort_keys=True)
+        return hashlib.sha256(serializado.encode()).hexdigest()[:16], componentes
+
+    def ruta_entrada(self, model_path: str, clave: str) -> str:
+        nombre = os.path.splitext(os.path.basename(model_path))[0]
+        return os.path.join(self.directorio, f"{nombre}_{clave}{EXTENSION_CACHE}")
+
+    # ------------------------------------------------------------------ sesiones
+
+    def crear_sesion(self, model_path: str, session_options, providers: List[str],
+                     opciones: Optional[Dict] = None):
+        """
+        Crea la sesión desde la caché si existe la entrada; si no, optimiza el modelo y la guarda.
+
+        Args:
+            model_path (str): Modelo .onnx original
+            session_options (ort.SessionOptions): Opciones ya configuradas (hilos, nivel de optimización)
+            providers (List[str]): Proveedores de ejecución
+            opciones (Dict, optional): Opciones que cambian el grafo optimizado (forman parte de la clave)
+
+        Returns:
+            Tuple[ort.InferenceSession, str]: Sesión y origen ("cache" o "optimizado")
+        """
+        import onnxruntime as ort
+
+        clave, componentes = self.clave(model_path, providers, opciones or {})
+        ruta = self.ruta_entrada(model_path, clave)
+
+        if os.path.exists(ruta):
+            nivel_original = session_options.graph_optimization_level
+            try:
+                # El grafo ya está optimizado: no repetir las transformaciones
+                session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                return ort.InferenceSession(ruta, sess_options=session_options, providers=providers), "cache"
+            except Exception as e:
+                print(f"⚠️ Entrada de caché inválida, se regenera: {os.path.basename(ruta)} ({e})")
+                self._borrar_entrada(ruta)
+                session_options.graph_optimization_level = nivel_original
+
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        session_options.optimized_model_filepath = temporal
+        # ORT advierte que el grafo "todo" depende del hardware: la CPU ya forma parte de la clave
+        session_options.log_severity_level = 3
+        sesion = ort.InferenceSession(model_path, sess_options=session_options, providers=providers)
+        try:
+            os.replace(temporal, ruta)
+            componentes["clave"] = clave
+            componentes["creacion"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self._escribir_json(ruta + ".json", componentes)
+            self._purgar_obsoletas(componentes)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar {os.path.basename(ruta)} en la caché: {e}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        return sesion, "optimizado"
+
+    # ------------------------------------------------------------------ mantenimiento
+
+    def listar(self) -> List[Dict]:
+        """Entradas de la caché con sus componentes de clave y tamaño."""
+        entradas = []
+        if not os.path.isdir(self.directorio):
+            return entradas
+        for nombre in sorted(os.listdir(self.directorio)):
+            if not nombre.endswith(EXTENSION_CACHE + ".json"):
+                continue
+            ruta_manifiesto = os.path.join(self.directorio, nombre)
+            ruta = ruta_manifiesto[:-len(".json")]
+            try:
+                with open(ruta_manifiesto, encoding="utf-8") as f:
+                    manifiesto = json.load(f)
+            except (OSError, ValueError):
+                manifiesto = {}
+            manifiesto["ruta"] = ruta
+            manifiesto["existe"] = os.path.exists(ruta)
+            manifiesto["tamano_mb"] = round(os.path.getsize(ruta) / (1024 * 1024), 2) if manifiesto["existe"] else 0.0
+            entradas.append(manifiesto)
+        return entradas
+
+    def _borrar_entrada(self, ruta: str):
+        for archivo in (ruta, ruta + ".json"):
+            if os.path.exists(archivo):
+                os.remove(archivo)
+
+    def _purgar_obsoletas(self, componentes: Dict):
+        """Borra las entradas del mismo modelo con otro hash o de otra versión de ONNX Runtime."""
+        for entrada in self.listar():
+            if entrada.get("modelo") != componentes["modelo"] or entrada.get("clave") == componentes["clave"]:
+                continue
+            if (entrada.get("sha256") != componentes["sha256"]
+                    or entrada.get("onnxruntime") != componentes["onnxruntime"]):
+                self._borrar_entrada(entrada["ruta"])
+
+    def invalidar(self, model_path: Optional[str] = None) -> int:
+        """
+        Borra las entradas de un modelo (o todas).
+
+        Args:
+            model_path (str, optional): Modelo cuyas entradas se borran; None = toda la caché
+
+        Returns:
+            int: Entradas borradas
+        """
+        ruta_modelo = os.path.abspath(model_path) if model_path else None
+        borradas = 0
+        for entrada in self.listar():
+            if ruta_modelo is None or entrada.get("modelo") == ruta_modelo:
+                self._borrar_entrada(entrada["ruta"])
+                borradas += 1
+        if ruta_modelo is None and os.path.exists(self._ruta_indice()):
+            os.remove(self._ruta_indice())
+            self._hashes = None
+        return borradas
+
+
+_cache = None
+_lock_cache = threading.Lock()
+
+
+def obtener_cache() -> CacheModelosOptimizados:
+    """Retorna la caché del directorio configurado (se recrea si cambia MODELS_DIR o DIRECTORIO)."""
+    global _cache
+    directorio = CacheModelosConfig.DIRECTORIO or os.path.join(ModelsConfig.MODELS_DIR, ".cache_ort")
+    with _lock_cache:
+        if _cache is None or _cache.directorio != directorio:
+            _cache = CacheModelosOptimizados(directorio)
+        return _cache
+
+
+def construir(directorio_modelos: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Precompila la caché de todos los .onnx de un directorio con las mismas opciones y variante que el sistema.
+
+    Returns:
+        Dict[str, Dict]: modelo -> {origen, tiempo_ms}
+    """
+    from modules.session_registry import es_archivo_variante, obtener_registro
+
+    directorio = directorio_modelos or ModelsConfig.MODELS_DIR
+    registro = obtener_registro()
+    resultados = {}
+    for nombre in sorted(os.listdir(directorio)):
+        # Las variantes (INT8) se construyen a través de su modelo original según VARIANTE_MODELO
+        if not nombre.endswith(".onnx") or nombre.endswith(EXTENSION_CACHE) or es_archivo_variante(nombre):
+            continue
+        ruta = os.path.join(directorio, nombre)
+        registro.liberar(ruta)
+        registro.obtener_sesion(ruta)
+        stats = registro.obtener_estadisticas().get(nombre, {})
+        resultados[nombre] = {"origen": stats.get("origen"), "tiempo_ms": stats.get("tiempo_carga_ms")}
+        registro.liberar(ruta)
+    return resultados
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Caché de modelos ONNX optimizados")
+    parser.add_argument("accion", choices=["construir", "listar", "invalidar"])
+    parser.add_argument("modelo", nargs="?", default=None, help="Modelo a invalidar (por defecto todos)")
+    parser.add_argument("--modelos", default=None, help="Directorio de modelos (por defecto ModelsConfig.MODELS_DIR)")
+    args = parser.parse_args(argv)
+
+    if args.modelos:
+        ModelsConfig.MODELS_DIR = args.modelos
+    cache = obtener_cache()
+
+    if args.accion == "construir":
+        print(f"🏗️ Precompilando caché en {cache.directorio}...")
+        for nombre, datos in construir().items():
+            print(f"   {nombre:<28} {datos['origen'] or '-':<10} {datos['tiempo_ms'] or 0.0:8.1f} ms")
+    elif args.accion == "listar":
+        entradas = cache.listar()
+        print(f"📂 {cache.directorio}: {len(entradas)} entradas")
+        for entrada in entradas:
+            print(f"   {os.path.basename(entrada['ruta']):<48} {entrada['tamano_mb']:7.2f} MB  "
+                  f"ORT {entrada.get('onnxruntime', '?')}  {entrada.get('opciones', {})}")
+    else:
+        borradas = cache.invalidar(args.modelo)
+        print(f"🗑️ {borradas} entradas invalidadas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Recorte de la pieza para los modelos de defectos
+Calcula la región del frame con la pieza detectada (con margen); los motores la llevan a la
+entrada del modelo con letterbox y trasladan sus resultados a coordenadas del frame
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from config import RecortePiezaConfig
+from modules.tiled_inference import region_desde_piezas
+
+
+def calcular_recorte(detecciones: List[Dict], forma: Tuple[int, int],
+                     escala: Tuple[float, float] = (1.0, 1.0)) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Región (x1, y1, x2, y2) del frame a recortar para las piezas detectadas.
+
+    La caja que envuelve las piezas se amplía RecortePiezaConfig.MARGEN (fracción del lado,
+    al menos MARGEN_MINIMO_PX) y, con CUADRADO, se lleva a un cuadrado para que el letterbox
+    a la entrada del modelo no necesite relleno. Se desplaza para quedar dentro del frame.
+
+    Args:
+        detecciones (List[Dict]): Detecciones de piezas con "bbox"
+        forma (Tuple[int, int]): (alto, ancho) del frame
+        escala (Tuple[float, float]): (sx, sy) de las coordenadas de las detecciones a píxeles del frame
+
+    Returns:
+        Tuple o None si no hay piezas
+    """
+    caja = region_desde_piezas(detecciones, forma, margen=0, escala=escala)
+    if caja is None:
+        return None
+    alto, ancho = forma[:2]
+    x1, y1, x2, y2 = caja
+    margen_x = max(RecortePiezaConfig.MARGEN * (x2 - x1), RecortePiezaConfig.MARGEN_MINIMO_PX)
+    margen_y = max(RecortePiezaConfig.MARGEN * (y2 - y1), RecortePiezaConfig.MARGEN_MINIMO_PX)
+    lado_x, lado_y = (x2 - x1) + 2 * margen_x, (y2 - y1) + 2 * margen_y
+    if RecortePiezaConfig.CUADRADO:
+        lado_x = lado_y = max(lado_x, lado_y)
+    lado_x, lado_y = min(int(math.ceil(lado_x)), ancho), min(int(math.ceil(lado_y)), alto)
+
+    # Centrado en la pieza y desplazado hacia dentro si toca el borde del frame
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    rx1 = int(min(max(0, round(cx - lado_x / 2)), ancho - lado_x))
+    ry1 = int(min(max(0, round(cy - lado_y / 2)), alto - lado_y))
+    return (rx1, ry1, rx1 + lado_x, ry1 + lado_y)
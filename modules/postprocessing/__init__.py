@@ -2,6 +2,7 @@
 Módulo de post-procesamiento para fusión de máscaras
 """
 
+from .mask import Mask
 from .mask_fusion import FusionadorMascaras
 
-__all__ = ['FusionadorMascaras']
+__all__ = ['Mask', 'FusionadorMascaras']
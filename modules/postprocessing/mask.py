@@ -0,0 +1,242 @@
+"""
+Representación compacta de máscaras binarias
+Guarda solo la región del bounding box (uint8 o empaquetada en bits) con su desplazamiento
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class Mask:
+    """
+    Máscara binaria confinada a su bounding box.
+
+    Características:
+    - Almacena un arreglo local (alto, ancho) uint8 o empaquetado en bits, más el
+      desplazamiento (x, y) dentro del frame de tamaño `shape`
+    - Expansión al frame completo solo bajo demanda (to_full / np.asarray)
+    - Área, intersección, IoU y unión sin expandir al frame completo
+    - Conversión a/desde RLE estilo COCO (orden por columnas)
+    """
+
+    def __init__(self, local: np.ndarray, x: int, y: int, shape: Tuple[int, int],
+                 packed: bool = False):
+        """
+        Args:
+            local (np.ndarray): Máscara local (alto, ancho); se considera activo todo valor > 0
+            x (int): Columna del frame donde empieza la región local
+            y (int): Fila del frame donde empieza la región local
+            shape (Tuple[int, int]): (alto, ancho) del frame completo
+            packed (bool): Guardar la región local empaquetada en bits (8x menos memoria)
+        """
+        local = np.asarray(local)
+        if local.dtype == bool:
+            local = local.view(np.uint8)
+        elif local.dtype != np.uint8 or local.max(initial=0) > 1:
+            local = (local > 0).astype(np.uint8)
+
+        self.x = int(x)
+        self.y = int(y)
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.local_shape = local.shape
+        self.packed = packed
+        self._area = int(np.count_nonzero(local))
+        self._datos = np.packbits(local, axis=None) if packed else local
+
+    # ------------------------------------------------------------------ construcción
+
+    @classmethod
+    def empty(cls, shape: Tuple[int, int]) -> "Mask":
+        """Máscara vacía del tamaño indicado."""
+        return cls(np.zeros((0, 0), dtype=np.uint8), 0, 0, shape)
+
+    @classmethod
+    def from_local(cls, local: np.ndarray, x: int, y: int, shape: Tuple[int, int],
+                   packed: bool = False) -> "Mask":
+        """Crea la máscara a partir de una región local ya recortada."""
+        return cls(local, x, y, shape, packed=packed)
+
+    @classmethod
+    def from_array(cls, mascara: np.ndarray, umbral: float = 0.5, packed: bool = False) -> "Mask":
+        """
+        Crea la máscara a partir de un arreglo de frame completo, recortando a los píxeles activos.
+
+        Args:
+            mascara (np.ndarray): Máscara (H, W) de cualquier tipo numérico o bool
+            umbral (float): Valor a partir del cual un píxel se considera activo
+        """
+        mascara = np.asarray(mascara)
+        activa = mascara if mascara.dtype == bool else mascara > umbral
+        filas = np.flatnonzero(activa.any(axis=1))
+        if len(filas) == 0:
+            return cls.empty(mascara.shape[:2])
+        columnas = np.flatnonzero(activa.any(axis=0))
+        y1, y2 = filas[0], filas[-1] + 1
+        x1, x2 = columnas[0], columnas[-1] + 1
+        return cls(activa[y1:y2, x1:x2], x1, y1, mascara.shape[:2], packed=packed)
+
+    @classmethod
+    def from_any(cls, mascara) -> Optional["Mask"]:
+        """Acepta Mask, arreglo numpy o lista anidada (formato antiguo) y retorna Mask."""
+        if mascara is None or isinstance(mascara, cls):
+            return mascara
+        return cls.from_array(np.asarray(mascara, dtype=np.float32))
+
+    @classmethod
+    def from_rle(cls, rle: Dict, packed: bool = False) -> "Mask":
+        """
+        Crea la máscara desde un RLE sin comprimir estilo COCO.
+
+        Args:
+            rle (Dict): {"size": [alto, ancho], "counts": [ceros, unos, ceros, ...]}
+        """
+        alto, ancho = rle["size"]
+        conteos = np.asarray(rle["counts"], dtype=np.int64)
+        valores = np.zeros(len(conteos), dtype=np.uint8)
+        valores[1::2] = 1
+        plano = np.repeat(valores, conteos)
+        mascara = np.zeros(alto * ancho, dtype=np.uint8)
+        mascara[:len(plano)] = plano
+        mascara = mascara.reshape(ancho, alto).T
+        return cls.from_array(mascara.astype(bool), packed=packed)
+
+    # ------------------------------------------------------------------ acceso
+
+    @property
+    def local(self) -> np.ndarray:
+        """Región local (alto, ancho) uint8 con valores 0/1."""
+        if self.packed:
+            alto, ancho = self.local_shape
+            return np.unpackbits(self._datos, count=alto * ancho).reshape(alto, ancho)
+        return self._datos
+
+    @property
+    def bbox(self) -> Tuple[int, int, int, int]:
+        """Región local en coordenadas del frame (x1, y1, x2, y2)."""
+        return self.x, self.y, self.x + self.local_shape[1], self.y + self.local_shape[0]
+
+    @property
+    def area(self) -> int:
+        """Número de píxeles activos."""
+        return self._area
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por la región local."""
+        return int(self._datos.nbytes)
+
+    def pack(self) -> "Mask":
+        """Retorna una copia empaquetada en bits."""
+        return self if self.packed else Mask(self._datos, self.x, self.y, self.shape, packed=True)
+
+    def to_full(self, dtype=np.float32) -> np.ndarray:
+        """
+        Expande la máscara al frame completo.
+
+        Args:
+            dtype: Tipo del arreglo resultante (float32 por compatibilidad con el formato anterior)
+
+        Returns:
+            np.ndarray: Máscara (H, W) con valores 0/1
+        """
+        completa = np.zeros(self.shape, dtype=dtype)
+        if self._area:
+            x1, y1, x2, y2 = self.bbox
+            completa[y1:y2, x1:x2] = self.local
+        return completa
+
+    def __array__(self, dtype=None, copy=None):
+        """Compatibilidad con código que espera un arreglo de frame completo."""
+        return self.to_full(dtype or np.float32)
+
+    def __repr__(self) -> str:
+        return f"Mask(bbox={self.bbox}, shape={self.shape}, area={self._area}, packed={self.packed})"
+
+    # ------------------------------------------------------------------ operaciones
+
+    def intersection(self, otra: "Mask") -> int:
+        """Número de píxeles activos en ambas máscaras (sin expandir)."""
+        if not self._area or not otra._area:
+            return 0
+        ax1, ay1, ax2, ay2 = self.bbox
+        bx1, by1, bx2, by2 = otra.bbox
+        x1, y1 = max(ax1, bx1), max(ay1, by1)
+        x2, y2 = min(ax2, bx2), min(ay2, by2)
+        if x2 <= x1 or y2 <= y1:
+            return 0
+        a = self.local[y1 - ay1:y2 - ay1, x1 - ax1:x2 - ax1]
+        b = otra.local[y1 - by1:y2 - by1, x1 - bx1:x2 - bx1]
+        return int(np.count_nonzero(a & b))
+
+    def iou(self, otra: "Mask") -> float:
+        """Intersección sobre unión con otra máscara (sin expandir)."""
+        interseccion = self.intersection(otra)
+        union = self._area + otra._area - interseccion
+        return interseccion / union if union > 0 else 0.0
+
+    def union(self, otra: "Mask", margen: int = 0) -> "Mask":
+        """
+        Unión con otra máscara sobre el bounding box común.
+
+        Args:
+            otra (Mask): Máscara a unir
+            margen (int): Píxeles extra alrededor de la región (p. ej. para morfología posterior)
+        """
+        if not self._area and not otra._area:
+            return Mask.empty(self.shape)
+        cajas = [m.bbox for m in (self, otra) if m._area]
+        alto, ancho = self.shape
+        x1 = max(0, min(c[0] for c in cajas) - margen)
+        y1 = max(0, min(c[1] for c in cajas) - margen)
+        x2 = min(ancho, max(c[2] for c in cajas) + margen)
+        y2 = min(alto, max(c[3] for c in cajas) + margen)
+
+        local = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+        for m in (self, otra):
+            if m._area:
+                mx1, my1, mx2, my2 = m.bbox
+                local[my1 - y1:my2 - y1, mx1 - x1:mx2 - x1] |= m.local
+        return Mask(local, x1, y1, self.shape, packed=self.packed)
+
+    def contours(self) -> List[np.ndarray]:
+        """Contornos externos en coordenadas del frame (sin expandir)."""
+        if not self._area:
+            return []
+        contornos, _ = cv2.findContours(
+            np.ascontiguousarray(self.local), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+            offset=(self.x, self.y)
+        )
+        return list(contornos)
+
+    def to_rle(self) -> Dict:
+        """
+        Codifica la máscara como RLE sin comprimir estilo COCO (orden por columnas,
+        empezando por ceros).
+
+        Returns:
+            Dict: {"size": [alto, ancho], "counts": [...]}
+        """
+        alto, ancho = self.shape
+        if not self._area:
+            return {"size": [alto, ancho], "counts": [alto * ancho]}
+
+        # Solo las columnas del bounding box; las demás son ceros
+        x1, y1, x2, y2 = self.bbox
+        columnas = np.zeros((x2 - x1, alto), dtype=np.uint8)
+        columnas[:, y1:y2] = self.local.T
+        plano = columnas.ravel()
+
+        cambios = np.flatnonzero(np.diff(plano)) + 1
+        conteos = np.diff(np.concatenate(([0], cambios, [len(plano)])))
+        if plano[0]:
+            conteos = np.concatenate(([0], conteos))
+
+        # Los conteos alternan ceros/unos empezando por ceros: sumar las columnas fuera de la caja
+        conteos[0] += x1 * alto
+        if len(conteos) % 2 == 1:
+            conteos[-1] += (ancho - x2) * alto
+        elif ancho > x2:
+            conteos = np.concatenate((conteos, [(ancho - x2) * alto]))
+        return {"size": [alto, ancho], "counts": [int(c) for c in conteos]}
@@ -8,6 +8,8 @@ import numpy as np
 from typing import List, Dict, Tuple, Optional
 import logging
 
+from modules.postprocessing.mask import Mask
+
 class FusionadorMascaras:
     """
     Clase para fusionar máscaras de objetos que están muy cerca o pegados
@@ -24,12 +26,12 @@ class FusionadorMascaras:
         # Parámetros de análisis de conectividad
         self.kernel_conectividad = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
         
-    def analizar_conectividad_mascaras(self, mascaras: List[np.ndarray]) -> List[Dict]:
+    def analizar_conectividad_mascaras(self, mascaras: List) -> List[Dict]:
         """
         Analiza la conectividad entre máscaras para detectar objetos pegados
         
         Args:
-            mascaras: Lista de máscaras (arrays numpy)
+            mascaras: Lista de máscaras (Mask o arrays numpy)
             
         Returns:
             Lista de diccionarios con información de conectividad
@@ -38,12 +40,9 @@ class FusionadorMascaras:
             resultados = []
             
             for i, mascara in enumerate(mascaras):
-                # Encontrar contornos
-                contornos, _ = cv2.findContours(
-                    mascara.astype(np.uint8), 
-                    cv2.RETR_EXTERNAL, 
-                    cv2.CHAIN_APPROX_SIMPLE
-                )
+                # Encontrar contornos sobre la región local (coordenadas del frame)
+                mascara = Mask.from_any(mascara)
+                contornos = mascara.contours()
                 
                 if len(contornos) == 0:
                     continue
@@ -127,56 +126,46 @@ class FusionadorMascaras:
             self.logger.error(f"Error calculando distancia: {e}")
             return float('inf')
     
-    def calcular_overlap_mascaras(self, mascara1: np.ndarray, mascara2: np.ndarray) -> float:
+    def calcular_overlap_mascaras(self, mascara1, mascara2) -> float:
         """
         Calcula el porcentaje de overlap entre dos máscaras
         
         Args:
-            mascara1: Primera máscara
-            mascara2: Segunda máscara
+            mascara1: Primera máscara (Mask o array numpy)
+            mascara2: Segunda máscara (Mask o array numpy)
             
         Returns:
             Porcentaje de overlap (0.0 a 1.0)
         """
         try:
-            # Calcular intersección
-            interseccion = np.logical_and(mascara1 > 0.5, mascara2 > 0.5)
-            area_interseccion = np.sum(interseccion)
-            
-            # Calcular unión
-            union = np.logical_or(mascara1 > 0.5, mascara2 > 0.5)
-            area_union = np.sum(union)
-            
-            # Calcular overlap como intersección / unión
-            if area_union > 0:
-                return area_interseccion / area_union
-            else:
-                return 0.0
+            # Intersección / unión sin expandir al frame completo
+            return Mask.from_any(mascara1).iou(Mask.from_any(mascara2))
                 
         except Exception as e:
             self.logger.error(f"Error calculando overlap: {e}")
             return 0.0
     
-    def fusionar_mascaras(self, mascara1: np.ndarray, mascara2: np.ndarray) -> np.ndarray:
+    def fusionar_mascaras(self, mascara1, mascara2) -> Mask:
         """
         Fusiona dos máscaras en una sola
         
         Args:
-            mascara1: Primera máscara
-            mascara2: Segunda máscara
+            mascara1: Primera máscara (Mask o array numpy)
+            mascara2: Segunda máscara (Mask o array numpy)
             
         Returns:
-            Máscara fusionada
+            Máscara fusionada (Mask)
         """
         try:
-            # Combinar máscaras usando OR lógico
-            mascara_fusionada = np.logical_or(mascara1 > 0.5, mascara2 > 0.5).astype(np.float32)
+            # Combinar máscaras usando OR lógico sobre la región común
+            # (margen de 2 píxeles para que el cierre morfológico sea igual que en el frame completo)
+            union = Mask.from_any(mascara1).union(Mask.from_any(mascara2), margen=2)
             
             # Aplicar operaciones morfológicas para suavizar
             kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-            mascara_fusionada = cv2.morphologyEx(mascara_fusionada, cv2.MORPH_CLOSE, kernel, iterations=1)
+            local = cv2.morphologyEx(union.local, cv2.MORPH_CLOSE, kernel, iterations=1)
             
-            return mascara_fusionada
+            return Mask.from_local(local, union.x, union.y, union.shape)
             
         except Exception as e:
             self.logger.error(f"Error fusionando máscaras: {e}")
@@ -316,7 +305,7 @@ class FusionadorMascaras:
             return segmentaciones
     
     def _crear_segmentacion_fusionada(self, segmentaciones: List[Dict], 
-                                    grupo: List[int], mascara_fusionada: np.ndarray) -> Dict:
+                                    grupo: List[int], mascara_fusionada: Mask) -> Dict:
         """
         Crea una nueva segmentación fusionada a partir de un grupo de segmentaciones
         
@@ -333,14 +322,11 @@ class FusionadorMascaras:
             base = segmentaciones[grupo[0]].copy()
             
             # Calcular nuevas propiedades de la máscara fusionada
-            area_fusionada = int(np.sum(mascara_fusionada > 0.5))
+            mascara_fusionada = Mask.from_any(mascara_fusionada)
+            area_fusionada = mascara_fusionada.area
             
             # Encontrar contornos de la máscara fusionada
-            contornos, _ = cv2.findContours(
-                mascara_fusionada.astype(np.uint8), 
-                cv2.RETR_EXTERNAL, 
-                cv2.CHAIN_APPROX_SIMPLE
-            )
+            contornos = mascara_fusionada.contours()
             
             if len(contornos) > 0:
                 contorno_principal = max(contornos, key=cv2.contourArea)
@@ -3,5 +3,9 @@ Módulo de preprocesamiento para robustez ante cambios de iluminación
 """
 
 from .illumination_robust import RobustezIluminacion
+from .frame_context import BuffersContexto, ContextoFrame
+from .letterbox import (PreprocesadorLetterbox, PreprocesadorRedimensionado, TransformacionLetterbox,
+                        obtener_transformacion)
 
-__all__ = ['RobustezIluminacion']
+__all__ = ['RobustezIluminacion', 'ContextoFrame', 'BuffersContexto', 'PreprocesadorLetterbox',
+           'PreprocesadorRedimensionado', 'TransformacionLetterbox', 'obtener_transformacion']
@@ -0,0 +1,135 @@
+"""
+Contexto de preprocesamiento por frame
+Calcula una sola vez el tensor NCHW float32 que comparten todos los modelos
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from modules.io_binding import ContadorAsignaciones
+from .letterbox import (TransformacionLetterbox, aplicar_letterbox, nuevo_lienzo, obtener_transformacion,
+                        redimensionar_estirado)
+
+
+class BuffersContexto:
+    """
+    Lienzos y tensores reutilizables entre los ContextoFrame de frames sucesivos.
+
+    Con `reutilizar` cada combinación (tamaño, canales / resolución) se reserva una sola vez;
+    sin él se reserva por frame (comportamiento original). En ambos casos el contador
+    registra las reservas. Solo es válido si un contexto deja de usarse antes de crear el
+    siguiente (el análisis completo procesa un frame a la vez).
+    """
+
+    def __init__(self, reutilizar: bool = True):
+        self.reutilizar = reutilizar
+        self.contador = ContadorAsignaciones()
+        self._buffers: Dict[Tuple, np.ndarray] = {}
+
+    def obtener(self, clave: Tuple, crear) -> np.ndarray:
+        """Buffer de la clave, reservado con `crear()` la primera vez (o siempre, sin reutilizar)."""
+        buffer = self._buffers.get(clave) if self.reutilizar else None
+        if buffer is None:
+            buffer = crear()
+            self.contador.registrar(buffer)
+            if self.reutilizar:
+                self._buffers[clave] = buffer
+        return buffer
+
+
+class ContextoFrame:
+    """
+    Contexto de un frame capturado con sus tensores de entrada ya preparados.
+
+    Cada motor pide el tensor en el tamaño y orden de canales que necesita;
+    el letterbox y la conversión a float32 se hacen una sola vez por
+    combinación y se reutilizan en todo el pipeline. La transformación
+    aplicada se obtiene con obtener_transformacion() para llevar las
+    detecciones a píxeles del frame. El clasificador pide la variante
+    estirada (letterbox=False), como su preprocesamiento original.
+    """
+
+    def __init__(self, frame: np.ndarray, buffers: Optional[BuffersContexto] = None):
+        """
+        Args:
+            frame (np.ndarray): Imagen capturada (H, W, 3) uint8
+            buffers (BuffersContexto, optional): Lienzos y tensores reutilizables entre frames
+        """
+        self.frame = frame
+        self.buffers = buffers
+        self._lock = threading.Lock()
+        self._redimensionadas: Dict[Tuple[int, bool], np.ndarray] = {}
+        self._tensores: Dict[Tuple[int, bool, bool], np.ndarray] = {}
+
+    def obtener_transformacion(self, tamano: int = 640) -> TransformacionLetterbox:
+        """Transformación letterbox del frame a la entrada de lado `tamano`."""
+        return obtener_transformacion(self.frame.shape, tamano)
+
+    def _redimensionar(self, tamano: int, letterbox: bool = True) -> np.ndarray:
+        """Lleva el frame al tamaño del modelo con letterbox o estirado (sin copia si ya coincide)."""
+        imagen = self._redimensionadas.get((tamano, letterbox))
+        if imagen is None:
+            transformacion = self.obtener_transformacion(tamano)
+            lienzo = None
+            if self.buffers is not None and not transformacion.identidad:
+                if letterbox:
+                    lienzo = self.buffers.obtener(("lienzo", transformacion.geometria, tamano),
+                                                  lambda: nuevo_lienzo(tamano))
+                else:
+                    lienzo = self.buffers.obtener(("estirado", tamano),
+                                                  lambda: np.empty((tamano, tamano, 3), dtype=np.uint8))
+            if letterbox:
+                imagen = aplicar_letterbox(self.frame, transformacion, lienzo=lienzo)
+            else:
+                imagen = redimensionar_estirado(self.frame, tamano, lienzo=lienzo)
+            self._redimensionadas[(tamano, letterbox)] = imagen
+        return imagen
+
+    def obtener_tensor(self, tamano: int = 640, invertir_canales: bool = False,
+                       letterbox: bool = True) -> np.ndarray:
+        """
+        Obtiene el tensor de entrada [1, 3, tamano, tamano] normalizado a [0, 1].
+
+        Args:
+            tamano (int): Lado de la entrada del modelo
+            invertir_canales (bool): True para invertir el orden de canales (BGR <-> RGB)
+            letterbox (bool): False para estirar el frame a la entrada (clasificador)
+
+        Returns:
+            np.ndarray: Tensor float32 compartido (no debe modificarse)
+        """
+        # Sin escala ni relleno las dos variantes coinciden: comparten tensor
+        if self.frame.shape[:2] == (int(tamano), int(tamano)):
+            letterbox = True
+        clave = (int(tamano), bool(invertir_canales), bool(letterbox))
+        with self._lock:
+            tensor = self._tensores.get(clave)
+            if tensor is None:
+                imagen = self._redimensionar(clave[0], clave[2])
+                if invertir_canales:
+                    imagen = imagen[..., ::-1]
+
+                # HWC uint8 -> NCHW float32 en un solo paso, sin intermedios
+                forma = (1, 3, clave[0], clave[0])
+                if self.buffers is not None:
+                    tensor = self.buffers.obtener(("tensor",) + clave, lambda: np.empty(forma, dtype=np.float32))
+                else:
+                    tensor = np.empty(forma, dtype=np.float32)
+                np.divide(imagen.transpose(2, 0, 1), np.float32(255.0), out=tensor[0])
+                self._tensores[clave] = tensor
+            return tensor
+
+    def preparar(self, tamano: int = 640,
+                 variantes: Tuple[Tuple[bool, bool], ...] = ((False, True), (True, True), (True, False))):
+        """
+        Calcula por adelantado los tensores de las variantes indicadas.
+
+        Args:
+            tamano (int): Lado de la entrada del modelo
+            variantes (Tuple[Tuple[bool, bool], ...]): Pares (invertir_canales, letterbox) a preparar;
+                por defecto los de los detectores, el segmentador de piezas y el clasificador
+        """
+        for invertir, letterbox in variantes:
+            self.obtener_tensor(tamano, invertir, letterbox)
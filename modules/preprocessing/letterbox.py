@@ -0,0 +1,286 @@
+"""
+Preprocesamiento letterbox para la entrada de los modelos
+Redimensiona conservando la relación de aspecto, rellena el resto del lienzo y guarda la
+transformación para llevar cajas y máscaras de la entrada del modelo a píxeles de la imagen.
+El clasificador, que no devuelve coordenadas, conserva el redimensionado directo (estirado)
+"""
+
+import math
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from modules.io_binding import ContadorAsignaciones
+from modules.postprocessing.mask import Mask
+
+# Valor de relleno del lienzo (gris, el mismo que usa el entrenamiento de YOLO)
+VALOR_RELLENO = 114
+
+# Lienzos retenidos por preprocesador (LRU): los recortes por pieza cambian de tamaño en cada frame
+MAX_LIENZOS = 8
+
+
+class TransformacionLetterbox:
+    """
+    Escala y desplazamiento de una imagen de forma `forma_origen` a una entrada cuadrada `tamano`.
+
+    La imagen se escala por `escala` (mismo factor en ambos ejes) y se centra en el lienzo
+    con un relleno de `pad_x` columnas y `pad_y` filas. Se calcula una vez por resolución.
+    """
+
+    def __init__(self, forma_origen: Tuple[int, int], tamano: int):
+        """
+        Args:
+            forma_origen (Tuple[int, int]): (alto, ancho) de la imagen original
+            tamano (int): Lado de la entrada del modelo
+        """
+        self.alto_origen, self.ancho_origen = int(forma_origen[0]), int(forma_origen[1])
+        self.tamano = int(tamano)
+        self.escala = min(self.tamano / self.alto_origen, self.tamano / self.ancho_origen)
+        self.ancho_escalado = min(self.tamano, int(round(self.ancho_origen * self.escala)))
+        self.alto_escalado = min(self.tamano, int(round(self.alto_origen * self.escala)))
+        self.pad_x = (self.tamano - self.ancho_escalado) // 2
+        self.pad_y = (self.tamano - self.alto_escalado) // 2
+        # Factores exactos por eje (el redondeo del tamaño escalado los separa ligeramente)
+        self.escala_x = self.ancho_escalado / self.ancho_origen
+        self.escala_y = self.alto_escalado / self.alto_origen
+
+    @property
+    def forma_origen(self) -> Tuple[int, int]:
+        return self.alto_origen, self.ancho_origen
+
+    @property
+    def geometria(self) -> Tuple[int, int, int, int]:
+        """(alto_escalado, ancho_escalado, pad_y, pad_x): lo único de lo que depende el lienzo.
+
+        Resoluciones de origen distintas con la misma geometría (p. ej. todos los recortes
+        cuadrados) comparten lienzo: la zona de imagen se sobrescribe completa en cada frame.
+        """
+        return self.alto_escalado, self.ancho_escalado, self.pad_y, self.pad_x
+
+    @property
+    def identidad(self) -> bool:
+        """True si la imagen ya tiene el tamaño de la entrada (sin escala ni relleno)."""
+        return (self.alto_origen, self.ancho_origen) == (self.tamano, self.tamano)
+
+    def cajas_a_origen(self, cajas: np.ndarray) -> np.ndarray:
+        """
+        Lleva cajas (N, 4) x1, y1, x2, y2 de la entrada del modelo a píxeles de la imagen original.
+
+        Returns:
+            np.ndarray: Cajas float32 recortadas a los límites de la imagen (una caja que cae
+            por completo en el relleno queda degenerada, con x1 == x2 o y1 == y2)
+        """
+        cajas = np.asarray(cajas, dtype=np.float32).reshape(-1, 4)
+        if self.identidad:
+            return cajas
+        salida = np.empty_like(cajas)
+        salida[:, 0::2] = np.clip((cajas[:, 0::2] - self.pad_x) / self.escala_x, 0, self.ancho_origen)
+        salida[:, 1::2] = np.clip((cajas[:, 1::2] - self.pad_y) / self.escala_y, 0, self.alto_origen)
+        return salida
+
+    def mascara_a_origen(self, mascara: Mask) -> Mask:
+        """
+        Lleva una máscara de la entrada del modelo a la imagen original (vecino más cercano).
+
+        Se descarta la parte que cae en el relleno y solo se escala la región local de la máscara.
+        """
+        forma = self.forma_origen
+        if mascara is None or not mascara.area:
+            return Mask.empty(forma)
+        if self.identidad:
+            return mascara
+
+        # Región local limitada a la zona con imagen (sin relleno)
+        mx1, my1, mx2, my2 = mascara.bbox
+        cx1, cy1 = max(mx1, self.pad_x), max(my1, self.pad_y)
+        cx2 = min(mx2, self.pad_x + self.ancho_escalado)
+        cy2 = min(my2, self.pad_y + self.alto_escalado)
+        if cx2 <= cx1 or cy2 <= cy1:
+            return Mask.empty(forma)
+        local = mascara.local[cy1 - my1:cy2 - my1, cx1 - mx1:cx2 - mx1]
+
+        x1 = int(math.floor((cx1 - self.pad_x) / self.escala_x))
+        y1 = int(math.floor((cy1 - self.pad_y) / self.escala_y))
+        x2 = min(forma[1], int(math.ceil((cx2 - self.pad_x) / self.escala_x)))
+        y2 = min(forma[0], int(math.ceil((cy2 - self.pad_y) / self.escala_y)))
+        if x2 <= x1 or y2 <= y1:
+            return Mask.empty(forma)
+        if local.shape != (y2 - y1, x2 - x1):
+            local = cv2.resize(np.ascontiguousarray(local), (x2 - x1, y2 - y1),
+                               interpolation=cv2.INTER_NEAREST)
+        return Mask.from_local(local, x1, y1, forma, packed=mascara.packed)
+
+    def __repr__(self) -> str:
+        return (f"TransformacionLetterbox({self.ancho_origen}x{self.alto_origen} -> {self.tamano}, "
+                f"escala={self.escala:.4f}, pad=({self.pad_x}, {self.pad_y}))")
+
+
+@lru_cache(maxsize=32)
+def _transformacion_cacheada(alto: int, ancho: int, tamano: int) -> TransformacionLetterbox:
+    return TransformacionLetterbox((alto, ancho), tamano)
+
+
+def obtener_transformacion(forma: Tuple[int, ...], tamano: int = 640) -> TransformacionLetterbox:
+    """
+    Transformación letterbox para una resolución (cacheada: se calcula una vez por resolución).
+
+    Args:
+        forma (Tuple): Forma de la imagen (alto, ancho[, canales])
+        tamano (int): Lado de la entrada del modelo
+    """
+    return _transformacion_cacheada(int(forma[0]), int(forma[1]), int(tamano))
+
+
+def nuevo_lienzo(tamano: int, canales: int = 3) -> np.ndarray:
+    """Lienzo uint8 (tamano, tamano, canales) relleno con VALOR_RELLENO."""
+    return np.full((tamano, tamano, canales), VALOR_RELLENO, dtype=np.uint8)
+
+
+def aplicar_letterbox(imagen: np.ndarray, transformacion: Optional[TransformacionLetterbox] = None,
+                      tamano: int = 640, lienzo: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Imagen en la entrada del modelo con letterbox.
+
+    Args:
+        imagen (np.ndarray): Imagen (H, W, C) uint8
+        transformacion (TransformacionLetterbox): Transformación de la resolución (se obtiene si es None)
+        tamano (int): Lado de la entrada del modelo (si no se da transformación)
+        lienzo (np.ndarray): Lienzo reutilizable con el relleno ya aplicado; solo se escribe
+            la zona de imagen, por lo que el relleno se conserva entre frames de la misma resolución
+
+    Returns:
+        np.ndarray: Imagen (tamano, tamano, C); la propia imagen si la transformación es identidad
+    """
+    if transformacion is None:
+        transformacion = obtener_transformacion(imagen.shape, tamano)
+    if transformacion.identidad:
+        return imagen
+
+    t = transformacion
+    if lienzo is None:
+        lienzo = nuevo_lienzo(t.tamano, imagen.shape[2] if imagen.ndim == 3 else 1)
+    # Escritura directa en la vista del lienzo, sin imagen intermedia. Bilineal como el
+    # redimensionado anterior: INTER_AREA cuesta un orden de magnitud más sobre el frame 4112x2176
+    cv2.resize(imagen, (t.ancho_escalado, t.alto_escalado),
+               dst=lienzo[t.pad_y:t.pad_y + t.alto_escalado, t.pad_x:t.pad_x + t.ancho_escalado],
+               interpolation=cv2.INTER_LINEAR)
+    return lienzo
+
+
+def redimensionar_estirado(imagen: np.ndarray, tamano: int = 640,
+                           lienzo: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Imagen estirada a (tamano, tamano) sin conservar la relación de aspecto (preprocesamiento original).
+
+    Args:
+        imagen (np.ndarray): Imagen (H, W, C) uint8
+        tamano (int): Lado de la entrada del modelo
+        lienzo (np.ndarray): Destino reutilizable (tamano, tamano, C); se sobrescribe completo
+
+    Returns:
+        np.ndarray: Imagen (tamano, tamano, C); la propia imagen si ya tiene ese tamaño
+    """
+    if imagen.shape[:2] == (tamano, tamano):
+        return imagen
+    if lienzo is None:
+        return cv2.resize(imagen, (tamano, tamano))
+    cv2.resize(imagen, (tamano, tamano), dst=lienzo)
+    return lienzo
+
+
+class PreprocesadorLetterbox:
+    """
+    Preprocesador de un motor: letterbox + HWC uint8 -> NCHW float32 [0, 1].
+
+    Reutiliza por geometría de letterbox el lienzo uint8 (con el relleno ya aplicado) y un único
+    tensor de entrada, de modo que el cálculo de escala/relleno y las reservas de memoria se pagan
+    una vez por geometría y no por frame. Retiene a lo sumo MAX_LIENZOS lienzos (LRU).
+    No es seguro entre hilos: cada motor tiene el suyo.
+    """
+
+    def __init__(self, tamano: int = 640, invertir_canales: bool = False):
+        """
+        Args:
+            tamano (int): Lado de la entrada del modelo
+            invertir_canales (bool): True para invertir el orden de canales (BGR -> RGB)
+        """
+        self.tamano = int(tamano)
+        self.invertir_canales = invertir_canales
+        self.contador = ContadorAsignaciones()
+        self._lienzos: Dict[Tuple[int, int, int, int], np.ndarray] = OrderedDict()
+        self._tensor = np.empty((1, 3, self.tamano, self.tamano), dtype=np.float32)
+        self.contador.registrar(self._tensor)
+
+    def preparar(self, imagen: np.ndarray,
+                 copia: bool = False) -> Tuple[np.ndarray, TransformacionLetterbox]:
+        """
+        Tensor de entrada [1, 3, tamano, tamano] y la transformación aplicada.
+
+        Args:
+            imagen (np.ndarray): Imagen (H, W, 3) uint8 BGR
+            copia (bool): True para devolver un tensor nuevo en lugar del buffer reutilizable
+                (necesario si el tensor debe sobrevivir al siguiente frame, p. ej. en lotes)
+
+        Returns:
+            Tuple[np.ndarray, TransformacionLetterbox]: Tensor float32 y transformación
+        """
+        transformacion = obtener_transformacion(imagen.shape, self.tamano)
+        lienzo = None
+        if not transformacion.identidad:
+            clave = transformacion.geometria
+            lienzo = self._lienzos.get(clave)
+            if lienzo is None:
+                lienzo = nuevo_lienzo(self.tamano)
+                self._lienzos[clave] = lienzo
+                self.contador.registrar(lienzo)
+                if len(self._lienzos) > MAX_LIENZOS:
+                    self._lienzos.popitem(last=False)
+            else:
+                self._lienzos.move_to_end(clave)
+        entrada = aplicar_letterbox(imagen, transformacion, lienzo=lienzo)
+        return self._normalizar(entrada, copia), transformacion
+
+    def _normalizar(self, entrada: np.ndarray, copia: bool) -> np.ndarray:
+        """HWC uint8 -> NCHW float32 [0, 1] en el tensor reutilizable (o en uno nuevo con `copia`)."""
+        if self.invertir_canales:
+            entrada = entrada[..., ::-1]
+
+        if copia:
+            tensor = np.empty_like(self._tensor)
+            self.contador.registrar(tensor)
+        else:
+            tensor = self._tensor
+        np.divide(entrada.transpose(2, 0, 1), np.float32(255.0), out=tensor[0])
+        return tensor
+
+
+class PreprocesadorRedimensionado(PreprocesadorLetterbox):
+    """
+    Preprocesador sin letterbox: estira la imagen a la entrada como el preprocesamiento original.
+
+    Para el clasificador: no devuelve coordenadas que retroproyectar y fue entrenado con la
+    imagen estirada, así que el letterbox solo cambiaría lo que ve en fuentes no cuadradas.
+    Reutiliza un único lienzo y el tensor de entrada.
+    """
+
+    def preparar(self, imagen: np.ndarray, copia: bool = False) -> Tuple[np.ndarray, None]:
+        """
+        Tensor de entrada [1, 3, tamano, tamano] (sin transformación que retornar).
+
+        Args:
+            imagen (np.ndarray): Imagen (H, W, 3) uint8 BGR
+            copia (bool): True para devolver un tensor nuevo en lugar del buffer reutilizable
+        """
+        lienzo = None
+        if imagen.shape[:2] != (self.tamano, self.tamano):
+            lienzo = self._lienzos.get(None)
+            if lienzo is None:
+                lienzo = np.empty((self.tamano, self.tamano, 3), dtype=np.uint8)
+                self._lienzos[None] = lienzo
+                self.contador.registrar(lienzo)
+        entrada = redimensionar_estirado(imagen, self.tamano, lienzo=lienzo)
+        return self._normalizar(entrada, copia), None
@@ -0,0 +1,228 @@
+"""
+Escritor asíncrono de resultados
+Ejecuta anotación, codificación JPEG y escritura de JSON fuera del hilo de inspección
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from config import EscrituraConfig
+
+
+class EscritorResultadosAsincrono:
+    """
+    Cola acotada de escrituras atendida por un pool de hilos.
+
+    Características:
+    - Cada tarea recibe una instantánea propia de los resultados (no comparte estado con la inspección)
+    - Contrapresión o descarte cuando la cola está llena (ver EscrituraConfig.POLITICA_COLA_LLENA)
+    - Vaciado ordenado al cerrar
+    - Contadores de profundidad de cola, descartes y latencia de escritura
+    """
+
+    POLITICAS = ("bloquear", "descartar_nuevo", "descartar_antiguo")
+
+    def __init__(self, tamano_cola: Optional[int] = None, trabajadores: Optional[int] = None,
+                 politica: Optional[str] = None, tiempo_max_bloqueo_s: Optional[float] = None):
+        """
+        Args:
+            tamano_cola (int, optional): Tareas pendientes como máximo
+            trabajadores (int, optional): Hilos de escritura
+            politica (str, optional): "bloquear", "descartar_nuevo" o "descartar_antiguo"
+            tiempo_max_bloqueo_s (float, optional): Espera máxima con la política "bloquear"
+        """
+        self.tamano_cola = max(1, int(tamano_cola or EscrituraConfig.TAMANO_COLA))
+        self.num_trabajadores = max(1, int(trabajadores or EscrituraConfig.TRABAJADORES))
+        self.politica = politica or EscrituraConfig.POLITICA_COLA_LLENA
+        if self.politica not in self.POLITICAS:
+            print(f"⚠️ Política de cola desconocida '{self.politica}', usando 'bloquear'")
+            self.politica = "bloquear"
+        self.tiempo_max_bloqueo_s = (EscrituraConfig.TIEMPO_MAX_BLOQUEO_S
+                                     if tiempo_max_bloqueo_s is None else tiempo_max_bloqueo_s)
+
+        self._cola = queue.Queue(maxsize=self.tamano_cola)
+        self._condicion = threading.Condition()
+        self._pendientes = 0
+        self._activo = True
+        self._detener = threading.Event()  # Los hilos lo consultan: el cierre no depende de poder encolar
+
+        # Contadores
+        self._stats = {
+            "encoladas": 0,
+            "completadas": 0,
+            "fallidas": 0,
+            "descartadas": 0,
+            "profundidad_maxima": 0
+        }
+        self._latencias_ms = deque(maxlen=100)
+        self._esperas_ms = deque(maxlen=100)
+
+        self._hilos = []
+        for i in range(self.num_trabajadores):
+            hilo = threading.Thread(target=self._bucle_trabajador, name=f"escritor-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def _descartar(self, descripcion: str, motivo: str):
+        """Contabiliza una tarea descartada."""
+        with self._condicion:
+            self._stats["descartadas"] += 1
+        print(f"⚠️ Escritura descartada ({motivo}): {descripcion}")
+
+    def enviar(self, tarea: Callable[[], None], descripcion: str = "") -> bool:
+        """
+        Encola una tarea de escritura.
+
+        Args:
+            tarea (Callable): Función sin argumentos que anota y escribe una instantánea
+            descripcion (str): Texto para logs de descarte/error
+
+        Returns:
+            bool: True si la tarea quedó encolada
+        """
+        if not self._activo:
+            self._descartar(descripcion, "escritor cerrado")
+            return False
+
+        elemento = (tarea, descripcion, time.time())
+        with self._condicion:
+            self._pendientes += 1
+
+        try:
+            if self.politica == "bloquear":
+                self._cola.put(elemento, timeout=self.tiempo_max_bloqueo_s)
+            elif self.politica == "descartar_nuevo":
+                self._cola.put_nowait(elemento)
+            else:
+                while True:
+                    try:
+                        self._cola.put_nowait(elemento)
+                        break
+                    except queue.Full:
+                        try:
+                            _, descripcion_antigua, _ = self._cola.get_nowait()
+                        except queue.Empty:
+                            continue
+                        self._finalizar_pendiente()
+                        self._descartar(descripcion_antigua, "cola llena, se descarta la más antigua")
+        except queue.Full:
+            self._finalizar_pendiente()
+            self._descartar(descripcion, "cola llena")
+            return False
+
+        with self._condicion:
+            self._stats["encoladas"] += 1
+            self._stats["profundidad_maxima"] = max(self._stats["profundidad_maxima"], self._cola.qsize())
+        return True
+
+    def _finalizar_pendiente(self):
+        """Marca una tarea como terminada (ejecutada o descartada)."""
+        with self._condicion:
+            self._pendientes -= 1
+            if self._pendientes <= 0:
+                self._condicion.notify_all()
+
+    def _bucle_trabajador(self):
+        """Atiende la cola hasta recibir la señal de parada (None o el evento _detener)."""
+        while not self._detener.is_set():
+            try:
+                elemento = self._cola.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if elemento is None:
+                break
+
+            tarea, descripcion, tiempo_envio = elemento
+            tiempo_inicio = time.time()
+            exito = True
+            try:
+                tarea()
+            except Exception as e:
+                exito = False
+                print(f"❌ Error en escritura asíncrona ({descripcion}): {e}")
+            tiempo_fin = time.time()
+
+            with self._condicion:
+                self._stats["completadas" if exito else "fallidas"] += 1
+                self._esperas_ms.append((tiempo_inicio - tiempo_envio) * 1000)
+                self._latencias_ms.append((tiempo_fin - tiempo_inicio) * 1000)
+            self._finalizar_pendiente()
+
+    def vaciar(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se escriban todas las tareas pendientes.
+
+        Args:
+            timeout (float, optional): Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            bool: True si la cola quedó vacía
+        """
+        with self._condicion:
+            return self._condicion.wait_for(lambda: self._pendientes <= 0, timeout)
+
+    def cerrar(self, timeout: Optional[float] = None) -> bool:
+        """
+        Vacía la cola y detiene los hilos de escritura.
+
+        Args:
+            timeout (float, optional): Segundos máximos para vaciar (por defecto EscrituraConfig.TIEMPO_MAX_VACIADO_S)
+
+        Returns:
+            bool: True si se escribieron todas las tareas pendientes
+        """
+        if not self._activo:
+            return True
+        self._activo = False
+
+        timeout = EscrituraConfig.TIEMPO_MAX_VACIADO_S if timeout is None else timeout
+        vaciada = self.vaciar(timeout)
+        if not vaciada:
+            print(f"⚠️ Escritor cerrado con {self._pendientes} escrituras pendientes")
+
+        # Si no se vació, la cola acotada puede seguir llena: put(None) bloquearía para siempre.
+        # El evento detiene a los hilos tras su tarea actual; el None solo los despierta antes.
+        self._detener.set()
+        for _ in self._hilos:
+            try:
+                self._cola.put_nowait(None)
+            except queue.Full:
+                break
+        for hilo in self._hilos:
+            hilo.join(timeout=1.0)
+
+        # Tareas que quedaron en la cola sin escribir
+        while True:
+            try:
+                elemento = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if elemento is not None:
+                self._finalizar_pendiente()
+                self._descartar(elemento[1], "escritor cerrado sin vaciar")
+        return vaciada
+
+    def obtener_estadisticas(self) -> Dict:
+        """
+        Retorna contadores de la cola y latencias de escritura.
+
+        Returns:
+            Dict: encoladas, completadas, fallidas, descartadas, profundidad, latencias...
+        """
+        with self._condicion:
+            latencias = list(self._latencias_ms)
+            esperas = list(self._esperas_ms)
+            return {
+                **self._stats,
+                "politica": self.politica,
+                "trabajadores": self.num_trabajadores,
+                "tamano_cola": self.tamano_cola,
+                "profundidad_actual": self._cola.qsize(),
+                "pendientes": self._pendientes,
+                "latencia_escritura_promedio_ms": sum(latencias) / len(latencias) if latencias else 0.0,
+                "latencia_escritura_max_ms": max(latencias) if latencias else 0.0,
+                "espera_cola_promedio_ms": sum(esperas) / len(esperas) if esperas else 0.0
+            }
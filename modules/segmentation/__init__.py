@@ -4,8 +4,10 @@ Módulo de Segmentación para Análisis de Coples
 
 from .segmentation_defectos_engine import SegmentadorDefectosCoples
 from .defectos_segmentation_processor import ProcesadorSegmentacionDefectos
+from .mask_assembler import EnsambladorMascarasYOLO
 
 __all__ = [
     "SegmentadorDefectosCoples",
-    "ProcesadorSegmentacionDefectos"
+    "ProcesadorSegmentacionDefectos",
+    "EnsambladorMascarasYOLO"
 ]
@@ -15,8 +15,7 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from modules.metadata_standard import MetadataStandard
-import matplotlib.pyplot as plt
-from matplotlib.colors import ListedColormap
+from modules.postprocessing.mask import Mask
 
 
 class ProcesadorSegmentacionDefectos:
@@ -459,64 +458,61 @@ class MaskVisualizer:
                 print(f"   ⚠️  Segmentación {i}: Sin datos de máscara")
                 continue
             
-            # 2. CONVERTIR MÁSCARA A NUMPY
-            if isinstance(mask_data, list):
-                mask = np.array(mask_data, dtype=np.float32)
+            # 2. CONVERTIR A MASK COMPACTA (acepta listas y arrays del formato anterior)
+            if isinstance(mask_data, Mask):
+                mask = mask_data
             else:
-                mask = mask_data.astype(np.float32)
-            
-            # 3. VERIFICAR DIMENSIONES
-            print(f"   📐 Máscara {i}: {mask.shape}, rango: [{mask.min():.3f}, {mask.max():.3f}]")
-            
-            if len(mask.shape) != 2:
-                print(f"   ❌ Máscara {i}: Dimensiones incorrectas {mask.shape}")
-                continue
+                mask = np.asarray(mask_data, dtype=np.float32)
+                print(f"   📐 Máscara {i}: {mask.shape}, rango: [{mask.min():.3f}, {mask.max():.3f}]")
+                
+                if len(mask.shape) != 2:
+                    print(f"   ❌ Máscara {i}: Dimensiones incorrectas {mask.shape}")
+                    continue
+                mask = Mask.from_array(mask)
             
-            # 4. REDIMENSIONAR SI ES NECESARIO
+            # 3. REDIMENSIONAR SI ES NECESARIO
             if mask.shape != imagen.shape[:2]:
                 print(f"   🔄 Redimensionando máscara de {mask.shape} a {imagen.shape[:2]}")
-                mask = cv2.resize(mask, (imagen.shape[1], imagen.shape[0]))
-            
-            # 5. BINARIZAR MÁSCARA
-            mask_binary = (mask > 0.5).astype(np.uint8)
+                mask = Mask.from_array(cv2.resize(mask.to_full(), (imagen.shape[1], imagen.shape[0])))
             
-            # 6. VERIFICAR SI LA MÁSCARA TIENE CONTENIDO
-            pixels_activos = np.sum(mask_binary)
+            # 4. VERIFICAR SI LA MÁSCARA TIENE CONTENIDO
+            pixels_activos = mask.area
             if pixels_activos == 0:
                 print(f"   ⚠️  Máscara {i}: Sin píxeles activos después de binarizar")
                 continue
             
             print(f"   ✅ Máscara {i}: {pixels_activos} píxeles activos")
             
-            # 7. APLICAR MÚLTIPLES TÉCNICAS DE VISUALIZACIÓN
-            resultado = self._aplicar_overlay(resultado, mask_binary, color, seg, i)
+            # 5. APLICAR MÚLTIPLES TÉCNICAS DE VISUALIZACIÓN
+            resultado = self._aplicar_overlay(resultado, mask, color, seg, i)
         
-        # 8. GUARDAR RESULTADO
+        # 6. GUARDAR RESULTADO
         if save_path:
             cv2.imwrite(save_path, resultado)
             print(f"   💾 Imagen con máscaras guardada: {save_path}")
         
-        # 9. MOSTRAR SI SE REQUIERE
+        # 7. MOSTRAR SI SE REQUIERE
         if mostrar:
             self._mostrar_resultado(imagen, resultado, segmentaciones)
         
         return resultado
     
-    def _aplicar_overlay(self, imagen: np.ndarray, mask_binary: np.ndarray, 
+    def _aplicar_overlay(self, imagen: np.ndarray, mask: Mask, 
                         color: Tuple[int, int, int], seg: Dict, index: int) -> np.ndarray:
         """
         Aplica overlay de máscara con múltiples técnicas
         """
         resultado = imagen.copy()
         
-        # TÉCNICA 1: Overlay semitransparente
-        overlay = resultado.copy()
-        overlay[mask_binary > 0] = color
-        resultado = cv2.addWeighted(resultado, 0.7, overlay, 0.3, 0)
+        # TÉCNICA 1: Overlay semitransparente (solo en la región de la máscara)
+        x1, y1, x2, y2 = mask.bbox
+        region = resultado[y1:y2, x1:x2]
+        overlay = region.copy()
+        overlay[mask.local > 0] = color
+        resultado[y1:y2, x1:x2] = cv2.addWeighted(region, 0.7, overlay, 0.3, 0)
         
         # TÉCNICA 2: Contornos de la máscara
-        contornos, _ = cv2.findContours(mask_binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        cv2.drawContours(resultado, contornos, -1, color, 2)
+        cv2.drawContours(resultado, mask.contours(), -1, color, 2)
         
         # TÉCNICA 3: Bounding box
         bbox = seg.get('bbox', {})
@@ -543,9 +539,11 @@ class MaskVisualizer:
     
     def _mostrar_resultado(self, original: np.ndarray, resultado: np.ndarray, segmentaciones: List[Dict]):
         """
-        Muestra comparativa con matplotlib
+        Muestra comparativa con matplotlib (se importa solo aquí: cuesta ~0.4 s y solo se usa con mostrar=True)
         """
         try:
+            import matplotlib.pyplot as plt
+            
             fig, axes = plt.subplots(1, 2, figsize=(15, 7))
             
             # Imagen original
@@ -596,7 +594,11 @@ class MaskVisualizer:
             
             # Info de máscara (CORREGIDO)
             mask_data = seg.get('mascara')  # ← CAMBIO: 'mask' por 'mascara'
-            if mask_data is not None:
+            if isinstance(mask_data, Mask):
+                total_pixels = mask_data.shape[0] * mask_data.shape[1]
+                print(f"   Máscara shape: {mask_data.shape} (región local {mask_data.bbox}, {mask_data.nbytes} bytes)")
+                print(f"   Píxeles activos: {mask_data.area}/{total_pixels} ({mask_data.area/total_pixels*100:.1f}%)")
+            elif mask_data is not None:
                 if isinstance(mask_data, list):
                     mask = np.array(mask_data)
                 else:
@@ -621,7 +623,12 @@ class MaskVisualizer:
         
         for seg in segmentaciones:
             mask_data = seg.get('mascara')  # ← CAMBIO: 'mask' por 'mascara'
-            if mask_data is not None:
+            if isinstance(mask_data, Mask):
+                # Acumular solo la región local de la máscara
+                if mask_data.shape == tuple(shape) and mask_data.area:
+                    x1, y1, x2, y2 = mask_data.bbox
+                    mapa_calor[y1:y2, x1:x2] += mask_data.local * np.float32(seg.get('confianza', 1.0))
+            elif mask_data is not None:
                 if isinstance(mask_data, list):
                     mask = np.array(mask_data, dtype=np.float32)
                 else:
@@ -670,7 +677,9 @@ class MaskVisualizer:
                     if campo == 'mascara':
                         mask_data = seg[campo]
                         if mask_data is not None:
-                            if isinstance(mask_data, np.ndarray):
+                            if isinstance(mask_data, Mask):
+                                print(f"   ✅ {campo}: {mask_data}")
+                            elif isinstance(mask_data, np.ndarray):
                                 print(f"   ✅ {campo}: numpy array {mask_data.shape}")
                             elif isinstance(mask_data, list):
                                 print(f"   ✅ {campo}: lista con {len(mask_data)} elementos")
@@ -0,0 +1,111 @@
+"""
+Ensamblado por lotes de máscaras YOLO11-SEG
+Combina coeficientes y prototipos de todas las detecciones con una sola multiplicación
+y solo redimensiona el recorte de cada caja
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from modules.postprocessing.mask import Mask
+
+
+class EnsambladorMascarasYOLO:
+    """
+    Ensamblador de máscaras para salidas YOLO11-SEG.
+
+    Características:
+    - Una sola multiplicación (N, 32) x (32, 160*160) para todas las detecciones
+    - Recorte de cada caja en el espacio de prototipos (con 1 píxel de margen)
+    - Sigmoid y redimensionado solo sobre el recorte, no sobre el frame completo
+    - Umbral estricto opcional cuando la máscara cubre casi toda la caja
+    - Resultado como Mask local a la caja (sin arreglos de frame completo)
+    """
+
+    MARGEN_PROTOTIPO = 1  # Píxeles de prototipo extra alrededor de la caja (interpolación exacta en el borde)
+
+    def __init__(self, forma_entrada: Tuple[int, int] = (640, 640), umbral: float = 0.5,
+                 umbral_estricto: Optional[float] = None, cobertura_maxima: Optional[float] = None):
+        """
+        Args:
+            forma_entrada (Tuple[int, int]): (alto, ancho) de la entrada del modelo
+            umbral (float): Umbral de binarización de la máscara
+            umbral_estricto (float, optional): Umbral a usar si la máscara supera la cobertura máxima
+            cobertura_maxima (float, optional): Fracción de la caja a partir de la cual se usa el umbral estricto
+        """
+        self.forma_entrada = forma_entrada
+        self.umbral = umbral
+        self.umbral_estricto = umbral_estricto
+        self.cobertura_maxima = cobertura_maxima
+
+    @staticmethod
+    def _sigmoid(x: np.ndarray) -> np.ndarray:
+        """Sigmoid estable (misma expresión que los motores de segmentación)."""
+        return 1 / (1 + np.exp(-np.clip(x, -250, 250)))
+
+    def ensamblar(self, coeficientes: np.ndarray, prototipos: np.ndarray,
+                  cajas_xyxy: np.ndarray) -> List[Mask]:
+        """
+        Genera las máscaras binarias de todas las detecciones conservadas.
+
+        Args:
+            coeficientes (np.ndarray): Coeficientes de máscara (N, 32)
+            prototipos (np.ndarray): Prototipos (1, 32, ph, pw) o (32, ph, pw)
+            cajas_xyxy (np.ndarray): Cajas (N, 4) en coordenadas de la entrada del modelo
+
+        Returns:
+            List[Mask]: Una máscara por detección, confinada a su caja recortada a la imagen
+            (vacía si la caja queda fuera de la imagen)
+        """
+        protos = prototipos[0] if prototipos.ndim == 4 else prototipos
+        num_protos, alto_proto, ancho_proto = protos.shape
+        H, W = self.forma_entrada
+        escala_x = W / ancho_proto
+        escala_y = H / alto_proto
+
+        n = len(coeficientes)
+        if n == 0:
+            return []
+
+        # Una sola multiplicación para todas las detecciones: (N, 32) x (32, ph*pw)
+        logits = np.dot(
+            np.ascontiguousarray(coeficientes, dtype=protos.dtype),
+            protos.reshape(num_protos, -1)
+        ).reshape(n, alto_proto, ancho_proto)
+
+        resultados = []
+        for i in range(n):
+            x1, y1, x2, y2 = map(int, cajas_xyxy[i])
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(W, x2), min(H, y2)
+            if x2 <= x1 or y2 <= y1:
+                resultados.append(Mask.empty((H, W)))
+                continue
+
+            # Ventana de la caja en el espacio de prototipos, con margen
+            px1 = max(0, int(x1 / escala_x) - self.MARGEN_PROTOTIPO)
+            py1 = max(0, int(y1 / escala_y) - self.MARGEN_PROTOTIPO)
+            px2 = min(ancho_proto, math.ceil(x2 / escala_x) + self.MARGEN_PROTOTIPO)
+            py2 = min(alto_proto, math.ceil(y2 / escala_y) + self.MARGEN_PROTOTIPO)
+
+            # Sigmoid y redimensionado solo del recorte
+            recorte = self._sigmoid(logits[i, py1:py2, px1:px2])
+            ancho_destino = int(round((px2 - px1) * escala_x))
+            alto_destino = int(round((py2 - py1) * escala_y))
+            recorte = cv2.resize(recorte, (ancho_destino, alto_destino))
+
+            # Región exacta de la caja dentro del recorte redimensionado
+            ox = x1 - int(round(px1 * escala_x))
+            oy = y1 - int(round(py1 * escala_y))
+            region = recorte[oy:oy + (y2 - y1), ox:ox + (x2 - x1)]
+
+            mascara = region > self.umbral
+            if self.umbral_estricto is not None and self.cobertura_maxima is not None:
+                if np.count_nonzero(mascara) > region.size * self.cobertura_maxima:
+                    mascara = region > self.umbral_estricto
+
+            resultados.append(Mask.from_local(mascara, x1, y1, (H, W)))
+        return resultados
@@ -17,6 +17,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 # Importar configuración
 from config import FileConfig, VisualizationConfig
 from modules.postprocessing.mask_fusion import FusionadorMascaras
+from modules.postprocessing.mask import Mask
 from modules.metadata_standard import MetadataStandard
 
 
@@ -39,7 +40,7 @@ class ProcesadorSegmentacionPiezas:
             output_dir (str, optional): Directorio de salida. Si no se proporciona, usa el por defecto.
         """
         self.output_dir = output_dir or os.path.join(FileConfig.OUTPUT_DIR, "Salida_seg_pz")
-        self._crear_directorio_salida()
+        self._directorio_creado = False  # Se crea al guardar el primer resultado
         
         # Colores para visualización
         self.colores = {
@@ -55,8 +56,11 @@ class ProcesadorSegmentacionPiezas:
     
     def _crear_directorio_salida(self):
         """Crea el directorio de salida si no existe."""
+        if self._directorio_creado:
+            return
         try:
             os.makedirs(self.output_dir, exist_ok=True)
+            self._directorio_creado = True
             print(f"📁 Directorio de segmentación de piezas: {self.output_dir}")
         except Exception as e:
             print(f"⚠️ Error creando directorio de salida: {e}")
@@ -102,6 +106,7 @@ class ProcesadorSegmentacionPiezas:
             mapa_calor = self._crear_mapa_calor(imagen, segmentaciones)
             
             # Generar nombres de archivo
+            self._crear_directorio_salida()
             nombre_base = f"cople_segmentacion_piezas_{timestamp}"
             archivo_imagen = os.path.join(self.output_dir, f"{nombre_base}.jpg")
             archivo_json = os.path.join(self.output_dir, f"{nombre_base}.json")
@@ -153,8 +158,8 @@ class ProcesadorSegmentacionPiezas:
                 # Verificar máscara
                 if 'mascara' in seg and seg['mascara'] is not None:
                     mascara = seg['mascara']
-                    if isinstance(mascara, np.ndarray):
-                        print(f"   ✅ mascara: numpy array {mascara.shape}")
+                    if isinstance(mascara, (Mask, np.ndarray)):
+                        print(f"   ✅ mascara: {mascara if isinstance(mascara, Mask) else f'numpy array {mascara.shape}'}")
                         
                         # Verificar consistencia de áreas
                         if 'area' in seg and 'area_mascara' in seg:
@@ -231,7 +236,7 @@ class ProcesadorSegmentacionPiezas:
                         print(f"🎨 Dibujando segmentación {i+1}: {clase} en ({x1},{y1}) a ({x2},{y2})")
                     
                     # Dibujar máscara si está disponible
-                    if mascara is not None and isinstance(mascara, np.ndarray):
+                    if mascara is not None and isinstance(mascara, (Mask, np.ndarray)):
                         self._dibujar_mascara(imagen_vis, mascara, color, alpha=0.3)
                     
                 except Exception as e:
@@ -244,17 +249,30 @@ class ProcesadorSegmentacionPiezas:
             print(f"❌ Error creando visualización: {e}")
             return imagen
     
-    def _dibujar_mascara(self, imagen: np.ndarray, mascara: np.ndarray, color: Tuple[int, int, int], alpha: float = 0.3):
+    def _dibujar_mascara(self, imagen: np.ndarray, mascara, color: Tuple[int, int, int], alpha: float = 0.3):
         """
         Dibuja una máscara sobre la imagen con transparencia.
         
         Args:
             imagen (np.ndarray): Imagen sobre la que dibujar
-            mascara (np.ndarray): Máscara a dibujar
+            mascara (Mask | np.ndarray): Máscara a dibujar
             color (Tuple[int, int, int]): Color en formato BGR
             alpha (float): Transparencia (0.0 a 1.0)
         """
         try:
+            # Máscara compacta: mezclar solo su región local
+            if isinstance(mascara, Mask) and mascara.shape == imagen.shape[:2]:
+                if mascara.area:
+                    x1, y1, x2, y2 = mascara.bbox
+                    region = imagen[y1:y2, x1:x2]
+                    overlay = region.copy()
+                    overlay[mascara.local > 0] = color
+                    imagen[y1:y2, x1:x2] = cv2.addWeighted(overlay, alpha, region, 1 - alpha, 0)
+                return
+            
+            if isinstance(mascara, Mask):
+                mascara = mascara.to_full()
+            
             # Crear máscara binaria
             mascara_binaria = (mascara > 0.5).astype(np.uint8)
             
@@ -288,7 +306,14 @@ class ProcesadorSegmentacionPiezas:
             for i, seg in enumerate(segmentaciones):
                 try:
                     mascara = seg.get('mascara')
-                    if mascara is not None and isinstance(mascara, np.ndarray):
+                    if isinstance(mascara, Mask) and mascara.shape == mapa_calor.shape:
+                        # Agregar solo la región local de la máscara
+                        if mascara.area:
+                            x1, y1, x2, y2 = mascara.bbox
+                            mapa_calor[y1:y2, x1:x2] += mascara.local
+                        print(f"   ✅ Máscara {i}: {mascara.area} píxeles activos")
+                    elif mascara is not None and isinstance(mascara, (Mask, np.ndarray)):
+                        mascara = np.asarray(mascara)
                         print(f"   📐 Máscara {i}: {mascara.shape}, rango: [{np.min(mascara):.3f}, {np.max(mascara):.3f}]")
                         
                         # Agregar máscara al mapa de calor
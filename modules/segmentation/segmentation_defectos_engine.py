@@ -10,7 +10,15 @@ import os
 from typing import List, Dict, Tuple, Optional
 
 # Importar configuración
-from config import ModelsConfig, GlobalConfig
+from config import ModelsConfig, GlobalConfig, TeseladoConfig
+from modules.session_registry import obtener_registro
+from modules.session_profiles import describir_perfil
+from modules.batch_inference import ejecutar_lote
+from modules.io_binding import EjecutorSesion, estadisticas_buffers
+from modules.tiled_inference import calcular_teselas, extraer_teselas, fusionar_teselas, trasladar_resultados
+from modules.preprocessing.letterbox import PreprocesadorLetterbox, obtener_transformacion
+from modules.segmentation.mask_assembler import EnsambladorMascarasYOLO
+from modules.postprocessing.mask import Mask
 
 
 class SegmentadorDefectosCoples:
@@ -25,13 +33,15 @@ class SegmentadorDefectosCoples:
     - Estadísticas de rendimiento
     """
     
-    def __init__(self, model_path: Optional[str] = None, confianza_min: float = 0.55):
+    def __init__(self, model_path: Optional[str] = None, confianza_min: float = 0.55,
+                 hilos_intra_op: Optional[int] = None):
         """
         Inicializa el segmentador de defectos de coples.
         
         Args:
             model_path (str, optional): Ruta al modelo ONNX. Si no se proporciona, usa el por defecto.
             confianza_min (float): Umbral mínimo de confianza para segmentaciones
+            hilos_intra_op (int, optional): Presupuesto de hilos intra-op (None = por defecto de ONNX Runtime)
         """
         self.model_path = model_path or os.path.join(
             ModelsConfig.MODELS_DIR, 
@@ -45,6 +55,7 @@ class SegmentadorDefectosCoples:
         # Estado del modelo
         self.model = None
         self.session = None
+        self.ejecutor = None
         self.input_name = None
         self.output_names = None
         self.input_shape = None
@@ -60,7 +71,10 @@ class SegmentadorDefectosCoples:
         
         # Configuración
         self.confianza_min = confianza_min
+        self.hilos_intra_op = hilos_intra_op
         self.input_size = ModelsConfig.INPUT_SIZE  # 640x640
+        self.ensamblador = EnsambladorMascarasYOLO((self.input_size, self.input_size), umbral=0.5)
+        self.preprocesador = PreprocesadorLetterbox(self.input_size)
         
         # Cargar clases PRIMERO
         self._cargar_clases()
@@ -96,28 +110,25 @@ class SegmentadorDefectosCoples:
                 print(f"❌ Modelo de segmentación de defectos no encontrado: {self.model_path}")
                 return False
             
-            import onnxruntime as ort
-            
-            # Configurar proveedores
-            providers = ['CPUExecutionProvider']
-            if ort.get_device() == 'GPU':
-                providers = ['CUDAExecutionProvider'] + providers
-            
-            # Crear sesión ONNX
-            self.session = ort.InferenceSession(self.model_path, providers=providers)
+            # Obtener sesión compartida del registro
+            self.session = obtener_registro().obtener_sesion(
+                self.model_path, intra_op_threads=self.hilos_intra_op
+            )
             
             # Obtener información del modelo
             self.input_name = self.session.get_inputs()[0].name
             self.output_names = [output.name for output in self.session.get_outputs()]
             self.input_shape = self.session.get_inputs()[0].shape
             self.output_shapes = [output.shape for output in self.session.get_outputs()]
+            # session.run o IOBinding con las salidas (detecciones y prototipos) preasignadas
+            self.ejecutor = EjecutorSesion(self.session, self.input_name, self.output_names, self.model_path)
             
             print(f"🧠 Motor de segmentación de defectos ONNX inicializado:")
             print(f"   📁 Modelo: {os.path.basename(self.model_path)}")
             print(f"   📊 Input: {self.input_name} - Shape: {self.input_shape}")
             print(f"   📊 Outputs: {self.output_names}")
             print(f"   🎯 Clases: {self.num_classes}")
-            print(f"   🔧 Proveedores: {providers}")
+            print(f"   🔧 Sesión: {describir_perfil(obtener_registro().obtener_perfil(self.model_path))}")
             
             return True
             
@@ -125,12 +136,13 @@ class SegmentadorDefectosCoples:
             print(f"❌ Error inicializando segmentador de defectos: {e}")
             return False
     
-    def preprocesar_imagen(self, imagen: np.ndarray) -> np.ndarray:
+    def preprocesar_imagen(self, imagen: np.ndarray, copia: bool = True) -> np.ndarray:
         """
-        Preprocesa la imagen para el modelo de segmentación (ULTRA-SIMPLIFICADO)
+        Preprocesa la imagen para el modelo de segmentación (letterbox a la entrada del modelo)
         
         Args:
             imagen: Imagen RGB de entrada (H, W, C)
+            copia: False para escribir en el buffer de entrada reutilizable del motor
             
         Returns:
             Imagen preprocesada lista para inferencia
@@ -146,25 +158,9 @@ class SegmentadorDefectosCoples:
                 print("⚠️ Formato de imagen incorrecto, usando fallback")
                 return np.zeros((1, 3, self.input_size, self.input_size), dtype=np.float32)
             
-            # Crear imagen de fallback directamente (evitar operaciones complejas)
-            imagen_fallback = np.zeros((1, 3, self.input_size, self.input_size), dtype=np.float32)
-            
-            # Solo procesar si la imagen es del tamaño correcto
-            if imagen.shape[:2] == (self.input_size, self.input_size):
-                try:
-                    # Conversión mínima: solo normalización
-                    imagen_norm = imagen.astype(np.float32) / 255.0
-                    # Transposición simple
-                    imagen_chw = np.transpose(imagen_norm, (2, 0, 1))
-                    # Batch dimension
-                    imagen_fallback[0] = imagen_chw
-                    print(f"✅ Preprocesamiento exitoso: {imagen_fallback.shape}")
-                except Exception as e:
-                    print(f"⚠️ Error en preprocesamiento: {e}, usando fallback")
-            else:
-                print(f"⚠️ Tamaño incorrecto: {imagen.shape}, usando fallback")
-            
-            return imagen_fallback
+            # Letterbox + normalización en el buffer del motor (cualquier resolución)
+            tensor, _ = self.preprocesador.preparar(imagen, copia=copia)
+            return tensor
             
         except Exception as e:
             print(f"❌ Error crítico en preprocesamiento: {e}")
@@ -173,12 +169,13 @@ class SegmentadorDefectosCoples:
             print(f"⚠️ Usando imagen de fallback: {fallback.shape}")
             return fallback
     
-    def segmentar_defectos(self, imagen: np.ndarray) -> List[Dict]:
+    def segmentar_defectos(self, imagen: np.ndarray, contexto=None) -> List[Dict]:
         """
         Segmenta defectos en la imagen
         
         Args:
             imagen: Imagen RGB de entrada (H, W, C)
+            contexto: ContextoFrame opcional con el tensor ya preprocesado
             
         Returns:
             Lista de segmentaciones con máscaras, clase y confianza
@@ -188,8 +185,12 @@ class SegmentadorDefectosCoples:
             print(f"🔍 Debug imagen segmentación - Original: {imagen.shape}")
             print(f"🔍 Debug imagen segmentación - Input shape esperado: {self.input_size}")
             
-            # Preprocesar imagen
-            imagen_input = self.preprocesar_imagen(imagen)
+            # Preprocesar imagen (reutiliza el tensor del contexto si existe)
+            if contexto is not None:
+                imagen_input = contexto.obtener_tensor(self.input_size)
+            else:
+                imagen_input = self.preprocesar_imagen(imagen, copia=False)
+            transformacion = obtener_transformacion(imagen.shape, self.input_size)
             
             # Debug: Mostrar tamaño de imagen procesada
             print(f"🔍 Debug imagen segmentación - Procesada: {imagen_input.shape}")
@@ -198,9 +199,9 @@ class SegmentadorDefectosCoples:
             tiempo_inicio = time.time()
             
             try:
-                outputs = self.session.run(
-                    self.output_names,
-                    {self.input_name: imagen_input}
+                outputs = self.ejecutor.ejecutar(imagen_input)
+                obtener_registro().registrar_inferencia(
+                    self.model_path, (time.time() - tiempo_inicio) * 1000
                 )
                 print("✅ Inferencia ONNX exitosa")
             except Exception as e:
@@ -217,11 +218,8 @@ class SegmentadorDefectosCoples:
             self.tiempo_inferencia = tiempo_inferencia
             self.frames_procesados += 1
             
-            # Obtener dimensiones de la imagen de entrada para el postprocesamiento
-            imagen_height, imagen_width = imagen.shape[:2]
-            
-            # Procesar salidas de segmentación
-            segmentaciones = self._procesar_salidas_segmentacion(outputs)
+            # Procesar salidas de segmentación (cajas y máscaras en píxeles de la imagen original)
+            segmentaciones = self._procesar_salidas_segmentacion(outputs, transformacion)
             
             return segmentaciones
             
@@ -229,10 +227,109 @@ class SegmentadorDefectosCoples:
             print(f"❌ Error en segmentación de defectos: {e}")
             return []
     
-    def _procesar_salidas_segmentacion(self, outputs):
+    def segmentar_defectos_lote(self, imagenes: List[np.ndarray], contextos: Optional[List] = None) -> List[List[Dict]]:
+        """
+        Segmenta defectos en varias imágenes con una sola ejecución [N, 3, H, W]
+        si el modelo tiene eje de lote dinámico (secuencial si no)
+        
+        Args:
+            imagenes: Imágenes RGB de entrada (H, W, C)
+            contextos: ContextoFrame opcionales (uno por imagen) con el tensor ya preprocesado
+            
+        Returns:
+            Lista de segmentaciones por imagen, en el mismo orden
+        """
+        try:
+            tensores = [
+                contextos[i].obtener_tensor(self.input_size)
+                if contextos is not None and contextos[i] is not None
+                else self.preprocesar_imagen(imagen)
+                for i, imagen in enumerate(imagenes)
+            ]
+            
+            tiempo_inicio = time.time()
+            salidas = ejecutar_lote(self.session, self.output_names, self.input_name,
+                                    tensores, self.model_path)
+            
+            self.tiempo_inferencia = (time.time() - tiempo_inicio) * 1000 / max(len(imagenes), 1)
+            self.frames_procesados += len(imagenes)
+            
+            return [
+                self._procesar_salidas_segmentacion(outputs, obtener_transformacion(imagen.shape, self.input_size))
+                for imagen, outputs in zip(imagenes, salidas)
+            ]
+            
+        except Exception as e:
+            print(f"❌ Error en segmentación de defectos por lote: {e}")
+            return [[] for _ in imagenes]
+
+    def segmentar_defectos_region(self, imagen: np.ndarray, region: Tuple[int, int, int, int]) -> List[Dict]:
+        """
+        Segmenta defectos solo en una región de la imagen (p. ej. la caja de la pieza),
+        llevada completa a la entrada del modelo con letterbox
+        
+        Args:
+            imagen: Imagen RGB de entrada (H, W, C) a su resolución de captura
+            region: (x1, y1, x2, y2) a recortar, en píxeles de la imagen
+            
+        Returns:
+            Lista de segmentaciones (cajas y máscaras) en coordenadas de la imagen
+        """
+        try:
+            x1, y1, x2, y2 = region
+            segmentaciones = self.segmentar_defectos(imagen[y1:y2, x1:x2])
+            return trasladar_resultados(segmentaciones, x1, y1, imagen.shape[:2])
+        except Exception as e:
+            print(f"❌ Error en segmentación de defectos por región: {e}")
+            return []
+
+    def segmentar_defectos_teselado(self, imagen: np.ndarray, region: Optional[Tuple[int, int, int, int]] = None) -> List[Dict]:
+        """
+        Segmenta defectos a resolución nativa recorriendo la imagen en teselas solapadas
+        del tamaño de entrada del modelo (una sola ejecución con todas las teselas)
+
+        Args:
+            imagen: Imagen RGB de entrada (H, W, C), p. ej. el frame completo del sensor
+            region: (x1, y1, x2, y2) a cubrir; None = imagen completa
+
+        Returns:
+            Lista de segmentaciones en coordenadas de la imagen, con las máscaras
+            de un mismo defecto unidas entre teselas
+        """
+        try:
+            origenes = calcular_teselas(imagen.shape[:2], self.input_size, region=region)
+            teselas = extraer_teselas(imagen, origenes, self.input_size)
+
+            tiempo_inicio = time.time()
+            salidas = ejecutar_lote(self.session, self.output_names, self.input_name, teselas,
+                                    self.model_path, tamano_lote=TeseladoConfig.TESELAS_POR_RUN or len(origenes))
+
+            self.tiempo_inferencia = (time.time() - tiempo_inicio) * 1000
+            self.frames_procesados += 1
+
+            forma = imagen.shape[:2]
+            por_tesela = [
+                trasladar_resultados(self._procesar_salidas_segmentacion(outputs), x, y, forma)
+                for (x, y), outputs in zip(origenes, salidas)
+            ]
+            segmentaciones = fusionar_teselas(por_tesela)
+            print(f"🧩 Segmentaciones por teselas: {len(segmentaciones)} en {len(origenes)} teselas "
+                  f"({self.tiempo_inferencia:.1f} ms de inferencia)")
+            return segmentaciones
+
+        except Exception as e:
+            print(f"❌ Error en segmentación de defectos por teselas: {e}")
+            return []
+
+    def _procesar_salidas_segmentacion(self, outputs, transformacion=None):
         """
         Procesa las salidas del modelo YOLO11-SEG para extraer segmentaciones
+        
+        Las cajas y máscaras se obtienen en la entrada del modelo y se retroproyectan con
+        `transformacion` (letterbox) a píxeles de la imagen original; None = imagen ya en la entrada.
         """
+        if transformacion is None:
+            transformacion = obtener_transformacion((self.input_size, self.input_size), self.input_size)
         print(f"🔍 Procesando salidas de segmentación...")
         print(f"   Número de outputs: {len(outputs)}")
         
@@ -301,24 +398,34 @@ class SegmentadorDefectosCoples:
                 indices = indices.flatten()[:30]  # max_det
                 print(f"   ✅ {len(indices)} detecciones después de NMS")
                 
-                for i in indices:
-                    x1, y1, x2, y2 = boxes_xyxy[i]
+                # Ensamblar todas las máscaras en lote (una sola multiplicación)
+                forma = (self.input_size, self.input_size)
+                try:
+                    mascaras = self.ensamblador.ensamblar(mask_coeffs[indices], mask_protos, boxes_xyxy[indices])
+                except Exception as e:
+                    print(f"   ⚠️  Error con prototipos: {e}, usando fallback")
+                    mascaras = [None] * len(indices)
+                
+                # Retroproyección de las cajas a la imagen original
+                cajas_origen = transformacion.cajas_a_origen(boxes_xyxy[indices])
+                
+                for i, mask, caja in zip(indices, mascaras, cajas_origen):
+                    x1, y1, x2, y2 = caja
+                    if x1 >= x2 or y1 >= y2:
+                        continue  # Caja por completo en el relleno del letterbox
                     confidence = confidences[i]
                     mask_coeff = mask_coeffs[i]
                     
+                    # Fallback: máscara rectangular simple
+                    if mask is None:
+                        mask = Mask.from_array(self._mascara_rectangular(boxes_xyxy[i], forma))
+                    mask = transformacion.mascara_a_origen(mask)
+                    mask_area = mask.area
+                    
                     # Calcular centroide
                     cx = int((x1 + x2) / 2)
                     cy = int((y1 + y2) / 2)
                     
-                    # Generar máscara combinando coeficientes con prototipos
-                    try:
-                        mask = self._generate_mask(mask_coeff, mask_protos, (x1, y1, x2, y2), (640, 640))
-                        mask_area = int(np.sum(mask > 0.5)) if mask is not None else 0
-                    except Exception as e:
-                        print(f"   ⚠️  Error generando máscara: {e}")
-                        mask = None
-                        mask_area = 0
-                    
                     # Crear segmentación con máscaras reales (SIN CONVERSIÓN A LISTA)
                     segmentacion = {
                         "clase": "Defecto",
@@ -335,17 +442,11 @@ class SegmentadorDefectosCoples:
                         },
                         "area": int((x2 - x1) * (y2 - y1)),
                         "area_mascara": mask_area,
-                        "mascara": mask,  # Mantener como numpy array (SIN .tolist())
+                        "mascara": mask,  # Mask compacta local a la caja (SIN .tolist())
                         "coeficientes_mascara": mask_coeff.tolist()[:5],  # Solo primeros 5 coeficientes
                         "contorno": self._bbox_to_contour(x1, y1, x2, y2)
                     }
                     
-                    # Debug de máscara
-                    if mask is not None:
-                        print(f"   ✅ Máscara creada: {mask.shape}, área: {mask_area}")
-                    else:
-                        print(f"   ⚠️  Máscara fallback creada: área: {mask_area}")
-                    
                     segmentaciones.append(segmentacion)
                     print(f"✅ Segmentación: Defecto - {confidence:.3f} - BBox: ({int(x1)},{int(y1)}) a ({int(x2)},{int(y2)}) - Área: {int((x2 - x1) * (y2 - y1))}")
             else:
@@ -358,7 +459,7 @@ class SegmentadorDefectosCoples:
         # Debug final: verificar que las máscaras estén presentes
         for i, seg in enumerate(segmentaciones):
             if 'mascara' in seg and seg['mascara'] is not None:
-                print(f"   ✅ Segmentación {i}: Máscara presente, shape: {len(seg['mascara'])} elementos")
+                print(f"   ✅ Segmentación {i}: Máscara presente, {seg['mascara']}")
             else:
                 print(f"   ❌ Segmentación {i}: Máscara ausente o None")
         
@@ -377,60 +478,12 @@ class SegmentadorDefectosCoples:
         boxes_xyxy[:, 3] = boxes_cxcywh[:, 1] + boxes_cxcywh[:, 3] / 2  # y2
         return boxes_xyxy
     
-    def _generate_mask(self, mask_coeffs, mask_protos, bbox, input_shape):
-        """
-        Genera máscara a partir de coeficientes y prototipos de YOLO11
-        """
-        try:
-            # Extraer prototipos (shape: [1, 32, 160, 160])
-            protos = mask_protos[0]  # Shape: [32, 160, 160]
-            
-            # Aplicar coeficientes a prototipos
-            # mask_coeffs shape: [32], protos shape: [32, 160, 160]
-            mask = np.tensordot(mask_coeffs, protos, axes=([0], [0]))  # Shape: [160, 160]
-            
-            # Aplicar sigmoid para normalizar
-            mask = self._sigmoid(mask)
-            
-            # Redimensionar a input_shape
-            H, W = input_shape
-            if mask.shape != (H, W):
-                mask = cv2.resize(mask, (W, H))
-            
-            # Recortar a la región del bounding box para mejorar precisión
-            x1, y1, x2, y2 = map(int, bbox)
-            mask_cropped = np.zeros_like(mask)
-            
-            # Aplicar máscara solo en la región del bbox
-            if x1 < W and y1 < H and x2 > 0 and y2 > 0:
-                # Asegurar que las coordenadas estén dentro de los límites
-                x1 = max(0, x1)
-                y1 = max(0, y1)
-                x2 = min(W, x2)
-                y2 = min(H, y2)
-                
-                # Extraer región de la máscara original
-                bbox_mask = mask[y1:y2, x1:x2]
-                # Aplicar umbral más estricto en la región del bbox
-                bbox_mask_binary = (bbox_mask > 0.5).astype(np.float32)
-                mask_cropped[y1:y2, x1:x2] = bbox_mask_binary
-            
-            print(f"   ✅ Máscara generada (con prototipos): {mask.shape}, rango: [{mask.min():.3f}, {mask.max():.3f}]")
-            print(f"   📊 Píxeles activos: {np.sum(mask_cropped > 0.5)} de {mask_cropped.size}")
-            
-            return mask_cropped
-            
-        except Exception as e:
-            print(f"   ⚠️  Error con prototipos: {e}, usando fallback")
-            # Fallback: máscara rectangular simple
-            x1, y1, x2, y2 = map(int, bbox)
-            H, W = input_shape
-            
-            mask = np.zeros((H, W), dtype=np.float32)
-            mask[y1:y2, x1:x2] = 1.0
-            
-            print(f"   ✅ Máscara fallback generada: {mask.shape}, píxeles activos: {np.sum(mask > 0.5)}")
-            return mask
+    def _mascara_rectangular(self, bbox, input_shape):
+        """Máscara rectangular simple usada como fallback"""
+        x1, y1, x2, y2 = (max(0, int(v)) for v in bbox)
+        mask = np.zeros(input_shape, dtype=np.float32)
+        mask[y1:y2, x1:x2] = 1.0
+        return mask
     
     def _bbox_to_contour(self, x1, y1, x2, y2):
         """Convierte bounding box a formato de contorno OpenCV"""
@@ -452,7 +505,8 @@ class SegmentadorDefectosCoples:
             "tiempo_inferencia_promedio_ms": self.tiempo_inferencia,
             "frames_procesados": self.frames_procesados,
             "input_shape": self.input_shape,
-            "output_shapes": self.output_shapes
+            "output_shapes": self.output_shapes,
+            "buffers": estadisticas_buffers(self)
         }
     
     def liberar(self):
@@ -460,6 +514,7 @@ class SegmentadorDefectosCoples:
         try:
             if self.session:
                 self.session = None
+            self.ejecutor = None
             print("✅ Recursos del segmentador de defectos liberados")
         except Exception as e:
             print(f"❌ Error liberando segmentador de defectos: {e}")
@@ -12,6 +12,13 @@ from typing import List, Dict, Tuple, Optional
 
 # Importar configuración
 from config import ModelsConfig, GlobalConfig
+from modules.session_registry import obtener_registro
+from modules.session_profiles import describir_perfil
+from modules.batch_inference import ejecutar_lote
+from modules.io_binding import EjecutorSesion, estadisticas_buffers
+from modules.preprocessing.letterbox import PreprocesadorLetterbox, obtener_transformacion
+from modules.segmentation.mask_assembler import EnsambladorMascarasYOLO
+from modules.postprocessing.mask import Mask
 
 
 class SegmentadorPiezasCoples:
@@ -27,13 +34,15 @@ class SegmentadorPiezasCoples:
     MEJORADO basándose en el módulo de defectos que funciona bien
     """
     
-    def __init__(self, model_path: Optional[str] = None, confianza_min: float = 0.55):
+    def __init__(self, model_path: Optional[str] = None, confianza_min: float = 0.55,
+                 hilos_intra_op: Optional[int] = None):
         """
         Inicializa el segmentador de piezas de coples.
         
         Args:
             model_path (str, optional): Ruta al modelo ONNX. Si no se proporciona, usa el por defecto.
             confianza_min (float): Umbral mínimo de confianza para segmentaciones
+            hilos_intra_op (int, optional): Presupuesto de hilos intra-op (None = por defecto de ONNX Runtime)
         """
         self.model_path = model_path or os.path.join(
             ModelsConfig.MODELS_DIR, 
@@ -47,6 +56,7 @@ class SegmentadorPiezasCoples:
         # Estado del modelo
         self.model = None
         self.session = None
+        self.ejecutor = None
         self.input_name = None
         self.output_names = None
         self.input_shape = None
@@ -71,7 +81,15 @@ class SegmentadorPiezasCoples:
         
         # Configuración
         self.confianza_min = confianza_min
+        self.hilos_intra_op = hilos_intra_op
         self.input_size = ModelsConfig.INPUT_SIZE  # 640x640
+        # Umbral 0.7; si la máscara cubre más del 80% de la caja se usa 0.8
+        self.ensamblador = EnsambladorMascarasYOLO(
+            (self.input_size, self.input_size), umbral=0.7,
+            umbral_estricto=0.8, cobertura_maxima=0.8
+        )
+        # Letterbox BGR -> RGB con lienzo y tensor de entrada reutilizables por resolución
+        self.preprocesador = PreprocesadorLetterbox(self.input_size, invertir_canales=True)
         
         # Cargar clases PRIMERO
         self._cargar_clases()
@@ -107,26 +125,25 @@ class SegmentadorPiezasCoples:
                 print(f"❌ Modelo de segmentación de piezas no encontrado: {self.model_path}")
                 return False
             
-            import onnxruntime as ort
-            
-            # Configurar proveedores
-            providers = ['CPUExecutionProvider']
-            
-            # Crear sesión ONNX
-            self.session = ort.InferenceSession(self.model_path, providers=providers)
+            # Obtener sesión compartida del registro
+            self.session = obtener_registro().obtener_sesion(
+                self.model_path, intra_op_threads=self.hilos_intra_op
+            )
             
             # Obtener información del modelo
             self.input_name = self.session.get_inputs()[0].name
             self.output_names = [output.name for output in self.session.get_outputs()]
             self.input_shape = self.session.get_inputs()[0].shape
             self.output_shapes = [output.shape for output in self.session.get_outputs()]
+            # session.run o IOBinding con las salidas (detecciones y prototipos) preasignadas
+            self.ejecutor = EjecutorSesion(self.session, self.input_name, self.output_names, self.model_path)
             
             print(f"🧠 Motor de segmentación de piezas ONNX inicializado:")
             print(f"   📁 Modelo: {os.path.basename(self.model_path)}")
             print(f"   📊 Input: {self.input_name} - Shape: {self.input_shape}")
             print(f"   📊 Outputs: {self.output_names}")
             print(f"   🎯 Clases: {self.num_classes}")
-            print(f"   🔧 Proveedores: {providers}")
+            print(f"   🔧 Sesión: {describir_perfil(obtener_registro().obtener_perfil(self.model_path))}")
             
             # Marcar como inicializado en las estadísticas
             self.stats['inicializado'] = True
@@ -137,12 +154,13 @@ class SegmentadorPiezasCoples:
             print(f"❌ Error inicializando motor de segmentación de piezas: {e}")
             return False
     
-    def procesar_imagen(self, imagen: np.ndarray) -> List[Dict]:
+    def procesar_imagen(self, imagen: np.ndarray, contexto=None) -> List[Dict]:
         """
         Procesa una imagen y retorna las segmentaciones detectadas.
         
         Args:
             imagen (np.ndarray): Imagen de entrada (BGR)
+            contexto (ContextoFrame, optional): Contexto con el tensor ya preprocesado
             
         Returns:
             List[Dict]: Lista de segmentaciones detectadas
@@ -154,14 +172,20 @@ class SegmentadorPiezasCoples:
         try:
             inicio = time.time()
             
-            # Preprocesar imagen
-            imagen_procesada = self._preprocesar_imagen(imagen)
+            # Preprocesar imagen (reutiliza el tensor del contexto si existe)
+            if contexto is not None:
+                imagen_procesada = contexto.obtener_tensor(self.input_size, invertir_canales=True)
+            else:
+                imagen_procesada = self._preprocesar_imagen(imagen, copia=False)
+            transformacion = obtener_transformacion(imagen.shape, self.input_size)
             
             # Ejecutar inferencia
-            outputs = self.session.run(self.output_names, {self.input_name: imagen_procesada})
+            tiempo_run = time.time()
+            outputs = self.ejecutor.ejecutar(imagen_procesada)
+            obtener_registro().registrar_inferencia(self.model_path, (time.time() - tiempo_run) * 1000)
             
-            # Procesar salidas
-            segmentaciones = self._procesar_salidas_segmentacion(outputs)
+            # Procesar salidas (cajas y máscaras en píxeles de la imagen original)
+            segmentaciones = self._procesar_salidas_segmentacion(outputs, transformacion)
             
             # Actualizar estadísticas
             self.tiempo_inferencia = (time.time() - inicio) * 1000
@@ -179,48 +203,87 @@ class SegmentadorPiezasCoples:
             print(f"❌ Error procesando imagen: {e}")
             return []
     
-    def segmentar(self, imagen: np.ndarray) -> List[Dict]:
+    def segmentar(self, imagen: np.ndarray, contexto=None) -> List[Dict]:
         """
         Método de compatibilidad con el sistema integrado.
         Alias para procesar_imagen.
         
         Args:
             imagen (np.ndarray): Imagen de entrada (BGR)
+            contexto (ContextoFrame, optional): Contexto con el tensor ya preprocesado
             
         Returns:
             List[Dict]: Lista de segmentaciones detectadas
         """
-        return self.procesar_imagen(imagen)
+        return self.procesar_imagen(imagen, contexto)
     
-    def _preprocesar_imagen(self, imagen: np.ndarray) -> np.ndarray:
-        """Preprocesa la imagen para el modelo ONNX."""
-        try:
-            # Redimensionar a 640x640
-            imagen_resized = cv2.resize(imagen, (self.input_size, self.input_size))
-            
-            # Convertir BGR a RGB
-            imagen_rgb = cv2.cvtColor(imagen_resized, cv2.COLOR_BGR2RGB)
+    def segmentar_lote(self, imagenes: List[np.ndarray], contextos: Optional[List] = None) -> List[List[Dict]]:
+        """
+        Segmenta piezas en varias imágenes con una sola ejecución [N, 3, H, W]
+        si el modelo tiene eje de lote dinámico (secuencial si no).
+        
+        Args:
+            imagenes (List[np.ndarray]): Imágenes de entrada (BGR)
+            contextos (List[ContextoFrame], optional): Contextos con los tensores ya preprocesados
             
-            # Normalizar a [0, 1]
-            imagen_normalizada = imagen_rgb.astype(np.float32) / 255.0
+        Returns:
+            List[List[Dict]]: Segmentaciones por imagen, en el mismo orden
+        """
+        if self.session is None:
+            print("❌ Modelo no inicializado")
+            return [[] for _ in imagenes]
+        
+        try:
+            inicio = time.time()
             
-            # Transponer a formato CHW (Channels, Height, Width)
-            imagen_chw = np.transpose(imagen_normalizada, (2, 0, 1))
+            tensores = [
+                contextos[i].obtener_tensor(self.input_size, invertir_canales=True)
+                if contextos is not None and contextos[i] is not None
+                else self._preprocesar_imagen(imagen)
+                for i, imagen in enumerate(imagenes)
+            ]
+            
+            salidas = ejecutar_lote(self.session, self.output_names, self.input_name,
+                                    tensores, self.model_path)
+            resultados = [
+                self._procesar_salidas_segmentacion(outputs, obtener_transformacion(imagen.shape, self.input_size))
+                for imagen, outputs in zip(imagenes, salidas)
+            ]
+            
+            # Estadísticas: el tiempo del lote se reparte entre sus imágenes
+            self.tiempo_inferencia = (time.time() - inicio) * 1000 / max(len(imagenes), 1)
+            self.frames_procesados += len(imagenes)
+            self.stats['inferencias_totales'] += len(imagenes)
+            self.stats['tiempo_total'] += self.tiempo_inferencia * len(imagenes)
+            self.stats['tiempo_promedio'] = self.stats['tiempo_total'] / max(self.stats['inferencias_totales'], 1)
+            self.stats['ultima_inferencia'] = self.tiempo_inferencia
             
-            # Agregar dimensión de batch
-            imagen_batch = np.expand_dims(imagen_chw, axis=0)
+            return resultados
             
-            return imagen_batch
+        except Exception as e:
+            print(f"❌ Error procesando lote: {e}")
+            return [[] for _ in imagenes]
+    
+    def _preprocesar_imagen(self, imagen: np.ndarray, copia: bool = True) -> np.ndarray:
+        """Preprocesa la imagen para el modelo ONNX (letterbox, BGR -> RGB, NCHW [0, 1])."""
+        try:
+            tensor, _ = self.preprocesador.preparar(imagen, copia=copia)
+            return tensor
             
         except Exception as e:
             print(f"❌ Error preprocesando imagen: {e}")
             return None
     
-    def _procesar_salidas_segmentacion(self, outputs):
+    def _procesar_salidas_segmentacion(self, outputs, transformacion=None):
         """
         Procesa las salidas del modelo YOLO11-SEG para extraer segmentaciones
         BASADO EN EL MÉTODO DE DEFECTOS QUE FUNCIONA BIEN
+        
+        Las cajas y máscaras se retroproyectan con `transformacion` (letterbox) a píxeles
+        de la imagen original; None = imagen ya en la entrada del modelo.
         """
+        if transformacion is None:
+            transformacion = obtener_transformacion((self.input_size, self.input_size), self.input_size)
         print(f"🔍 Procesando salidas de segmentación de piezas...")
         print(f"   Número de outputs: {len(outputs)}")
         
@@ -289,35 +352,39 @@ class SegmentadorPiezasCoples:
                 indices = indices.flatten()[:30]  # max_det
                 print(f"   ✅ {len(indices)} detecciones después de NMS")
                 
-                for i in indices:
-                    x1, y1, x2, y2 = boxes_xyxy[i]
+                # Ensamblar todas las máscaras en lote (una sola multiplicación)
+                forma = (self.input_size, self.input_size)
+                try:
+                    mascaras = self.ensamblador.ensamblar(mask_coeffs[indices], mask_protos, boxes_xyxy[indices])
+                except Exception as e:
+                    print(f"   ⚠️  Error con prototipos: {e}, usando fallback")
+                    mascaras = [None] * len(indices)
+                
+                # Retroproyección de las cajas a la imagen original
+                cajas_origen = transformacion.cajas_a_origen(boxes_xyxy[indices])
+                
+                for i, mask, caja in zip(indices, mascaras, cajas_origen):
+                    x1, y1, x2, y2 = caja
+                    if x1 >= x2 or y1 >= y2:
+                        continue  # Caja por completo en el relleno del letterbox
                     confidence = confidences[i]
                     mask_coeff = mask_coeffs[i]
                     
+                    # Fallback: máscara rectangular simple
+                    if mask is None:
+                        mask = Mask.from_array(self._mascara_rectangular(boxes_xyxy[i], forma))
+                    mask = transformacion.mascara_a_origen(mask)
+                    mask_area = mask.area
+                    
                     # Calcular centroide
                     cx = int((x1 + x2) / 2)
                     cy = int((y1 + y2) / 2)
                     
-                    # Generar máscara combinando coeficientes con prototipos
-                    try:
-                        mask = self._generate_mask(mask_coeff, mask_protos, (x1, y1, x2, y2), (640, 640))
-                        mask_area = int(np.sum(mask > 0.5)) if mask is not None else 0
-                    except Exception as e:
-                        print(f"   ⚠️  Error generando máscara: {e}")
-                        mask = None
-                        mask_area = 0
-                    
-                    # Calcular dimensiones reales de la máscara
-                    if mask is not None:
-                        # Encontrar píxeles activos en la máscara
-                        y_coords, x_coords = np.where(mask > 0.5)
-                        if len(x_coords) > 0 and len(y_coords) > 0:
-                            ancho_mascara_real = int(np.max(x_coords) - np.min(x_coords))
-                            alto_mascara_real = int(np.max(y_coords) - np.min(y_coords))
-                        else:
-                            # Fallback a dimensiones del bbox
-                            ancho_mascara_real = int(x2 - x1)
-                            alto_mascara_real = int(y2 - y1)
+                    # Dimensiones reales de la máscara (calculadas sobre la región local)
+                    if mask_area > 0:
+                        y_coords, x_coords = np.nonzero(mask.local)
+                        ancho_mascara_real = int(x_coords.max() - x_coords.min())
+                        alto_mascara_real = int(y_coords.max() - y_coords.min())
                     else:
                         # Fallback a dimensiones del bbox
                         ancho_mascara_real = int(x2 - x1)
@@ -341,17 +408,11 @@ class SegmentadorPiezasCoples:
                         "area_mascara": mask_area,
                         "ancho_mascara": ancho_mascara_real,
                         "alto_mascara": alto_mascara_real,
-                        "mascara": mask,  # Mantener como numpy array
+                        "mascara": mask,  # Mask compacta local a la caja
                         "coeficientes_mascara": mask_coeff.tolist()[:5],  # Solo primeros 5 coeficientes
                         "contorno": self._bbox_to_contour(x1, y1, x2, y2)
                     }
                     
-                    # Debug de máscara
-                    if mask is not None:
-                        print(f"   ✅ Máscara creada: {mask.shape}, área: {mask_area}")
-                    else:
-                        print(f"   ⚠️  Máscara fallback creada: área: {mask_area}")
-                    
                     segmentaciones.append(segmentacion)
                     print(f"✅ Segmentación: Cople - {confidence:.3f} - BBox: ({int(x1)},{int(y1)}) a ({int(x2)},{int(y2)}) - Área: {int((x2 - x1) * (y2 - y1))} - Máscara: {ancho_mascara_real}x{alto_mascara_real}")
             else:
@@ -364,7 +425,7 @@ class SegmentadorPiezasCoples:
         # Debug final: verificar que las máscaras estén presentes
         for i, seg in enumerate(segmentaciones):
             if 'mascara' in seg and seg['mascara'] is not None:
-                print(f"   ✅ Segmentación {i}: Máscara presente, shape: {len(seg['mascara'])} elementos")
+                print(f"   ✅ Segmentación {i}: Máscara presente, {seg['mascara']}")
             else:
                 print(f"   ❌ Segmentación {i}: Máscara ausente o None")
         
@@ -383,73 +444,12 @@ class SegmentadorPiezasCoples:
         boxes_xyxy[:, 3] = boxes_cxcywh[:, 1] + boxes_cxcywh[:, 3] / 2  # y2
         return boxes_xyxy
     
-    def _generate_mask(self, mask_coeffs, mask_protos, bbox, input_shape):
-        """
-        Genera máscara a partir de coeficientes y prototipos de YOLO11
-        OPTIMIZADO PARA EVITAR TIMEOUTS DE CPU
-        """
-        try:
-            # OPTIMIZACIÓN: Usar operación más eficiente que np.tensordot
-            # Extraer prototipos (shape: [1, 32, 160, 160])
-            protos = mask_protos[0]  # Shape: [32, 160, 160]
-            
-            # OPTIMIZACIÓN: Usar np.dot en lugar de np.tensordot para mejor rendimiento
-            # Reshape para operación más eficiente
-            protos_reshaped = protos.reshape(32, -1)  # Shape: [32, 160*160]
-            mask_flat = np.dot(mask_coeffs, protos_reshaped)  # Shape: [160*160]
-            mask = mask_flat.reshape(160, 160)  # Shape: [160, 160]
-            
-            # Aplicar sigmoid para normalizar
-            mask = self._sigmoid(mask)
-            
-            # Redimensionar a input_shape
-            H, W = input_shape
-            if mask.shape != (H, W):
-                mask = cv2.resize(mask, (W, H))
-            
-            # Recortar a la región del bounding box para mejorar precisión
-            x1, y1, x2, y2 = map(int, bbox)
-            mask_cropped = np.zeros_like(mask)
-            
-            # Aplicar máscara solo en la región del bbox
-            if x1 < W and y1 < H and x2 > 0 and y2 > 0:
-                # Asegurar que las coordenadas estén dentro de los límites
-                x1 = max(0, x1)
-                y1 = max(0, y1)
-                x2 = min(W, x2)
-                y2 = min(H, y2)
-                
-                # Extraer región de la máscara original
-                bbox_mask = mask[y1:y2, x1:x2]
-                # Aplicar umbral MÁS ESTRICTO para evitar máscaras muy grandes
-                bbox_mask_binary = (bbox_mask > 0.7).astype(np.float32)  # Cambiado de 0.5 a 0.7
-                mask_cropped[y1:y2, x1:x2] = bbox_mask_binary
-                
-                # Validar que la máscara no sea demasiado grande
-                pixels_activos = np.sum(mask_cropped > 0.5)
-                area_bbox = (x2 - x1) * (y2 - y1)
-                if pixels_activos > area_bbox * 0.8:  # Si cubre más del 80% del bbox
-                    print(f"   ⚠️ Máscara muy grande ({pixels_activos} píxeles), usando umbral más estricto")
-                    bbox_mask_binary = (bbox_mask > 0.8).astype(np.float32)  # Umbral aún más estricto
-                    mask_cropped[y1:y2, x1:x2] = bbox_mask_binary
-            
-            pixels_activos = np.sum(mask_cropped > 0.5)
-            print(f"   ✅ Máscara generada (optimizada): {mask.shape}, rango: [{mask.min():.3f}, {mask.max():.3f}]")
-            print(f"   📊 Píxeles activos: {pixels_activos} de {mask_cropped.size}")
-            
-            return mask_cropped
-            
-        except Exception as e:
-            print(f"   ⚠️  Error con prototipos: {e}, usando fallback")
-            # Fallback: máscara rectangular simple
-            x1, y1, x2, y2 = map(int, bbox)
-            H, W = input_shape
-            
-            mask = np.zeros((H, W), dtype=np.float32)
-            mask[y1:y2, x1:x2] = 1.0
-            
-            print(f"   ✅ Máscara fallback generada: {mask.shape}, píxeles activos: {np.sum(mask > 0.5)}")
-            return mask
+    def _mascara_rectangular(self, bbox, input_shape):
+        """Máscara rectangular simple usada como fallback"""
+        x1, y1, x2, y2 = (max(0, int(v)) for v in bbox)
+        mask = np.zeros(input_shape, dtype=np.float32)
+        mask[y1:y2, x1:x2] = 1.0
+        return mask
     
     def _bbox_to_contour(self, x1, y1, x2, y2):
         """Convierte bbox a contorno"""
@@ -465,11 +465,13 @@ class SegmentadorPiezasCoples:
             "confianza_minima": self.confianza_min,
             "tiempo_inferencia_promedio_ms": self.tiempo_inferencia,
             "frames_procesados": self.frames_procesados,
+            "buffers": estadisticas_buffers(self)
         }
     
     def liberar(self):
         """Libera los recursos del motor"""
-        if self.session:
-            del self.session
-            self.session = None
+        # La sesión pertenece al registro compartido; solo se suelta la referencia
+        self.session = None
+        self.ejecutor = None
+        self.stats['inicializado'] = False
         print("✅ Recursos del segmentador de piezas liberados")
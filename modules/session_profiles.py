@@ -0,0 +1,150 @@
+"""
+Perfiles de sesión ONNX Runtime por modelo
+Resuelve hilos, modo de ejecución, nivel de optimización, memoria y afinidad de cada modelo
+a partir de SesionConfig y del archivo de perfiles escrito por benchmarks/autotune_sessions.py
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+from config import ModelsConfig, SesionConfig
+
+CLAVES_PERFIL = (
+    "proveedores", "intra_op_threads", "inter_op_threads", "modo_ejecucion", "nivel_optimizacion",
+    "patron_memoria", "arena_cpu", "afinidad", "espera_activa"
+)
+
+
+def ruta_archivo_perfiles() -> str:
+    """Archivo JSON de perfiles ajustados (por defecto <MODELS_DIR>/perfiles_sesion.json)."""
+    return SesionConfig.ARCHIVO_PERFILES or os.path.join(ModelsConfig.MODELS_DIR, "perfiles_sesion.json")
+
+
+def cargar_perfiles_archivo(ruta: Optional[str] = None) -> Dict[str, Dict]:
+    """Perfiles por nombre de modelo guardados por el autoajuste ({} si no hay archivo)."""
+    ruta = ruta or ruta_archivo_perfiles()
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        return {modelo: datos_modelo.get("perfil", datos_modelo) for modelo, datos_modelo in datos.items()}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Archivo de perfiles de sesión inválido ({ruta}): {e}")
+        return {}
+
+
+def guardar_perfil(nombre_modelo: str, perfil: Dict, medicion: Optional[Dict] = None,
+                   ruta: Optional[str] = None) -> str:
+    """
+    Escribe (o reemplaza) el perfil de un modelo en el archivo de perfiles.
+
+    Args:
+        nombre_modelo (str): Nombre del archivo .onnx
+        perfil (Dict): Valores del perfil (solo las claves de CLAVES_PERFIL)
+        medicion (Dict, optional): Resultado del autoajuste que se guarda junto al perfil
+        ruta (str, optional): Archivo de perfiles (por defecto ruta_archivo_perfiles())
+
+    Returns:
+        str: Ruta del archivo escrito
+    """
+    ruta = ruta or ruta_archivo_perfiles()
+    datos = {}
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+    datos[nombre_modelo] = {"perfil": {k: v for k, v in perfil.items() if k in CLAVES_PERFIL}}
+    if medicion:
+        datos[nombre_modelo]["medicion"] = medicion
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def resolver_perfil(model_path: str, **sobrescrituras) -> Dict:
+    """
+    Perfil efectivo de un modelo.
+
+    Precedencia (de menor a mayor): ModelsConfig (proveedores, hilos, nivel de optimización),
+    SesionConfig.PERFIL_DEFAULT, SesionConfig.PERFILES[modelo], archivo de perfiles ajustados
+    y las sobrescrituras explícitas distintas de None (p. ej. el presupuesto de hilos del planificador).
+
+    Excepción: si el archivo de perfiles ajustados fija intra_op_threads, ese valor se usa
+    aunque haya presupuesto de hilos, limitado a ese presupuesto (el autoajuste mide bajo el
+    presupuesto del planificador, así que normalmente ya cabe en él).
+
+    Args:
+        model_path (str): Ruta o nombre del modelo .onnx
+
+    Returns:
+        Dict: Perfil con todas las claves de CLAVES_PERFIL
+    """
+    nombre = os.path.basename(model_path)
+    perfil = {
+        "proveedores": list(ModelsConfig.PROVIDERS),
+        "intra_op_threads": None,
+        "inter_op_threads": None,
+        "nivel_optimizacion": ModelsConfig.GRAPH_OPTIMIZATION_LEVEL
+    }
+    perfil.update(SesionConfig.PERFIL_DEFAULT)
+    perfil.update(SesionConfig.PERFILES.get(nombre, {}))
+    ajustado = cargar_perfiles_archivo().get(nombre, {})
+    perfil.update(ajustado)
+    perfil.update({k: v for k, v in sobrescrituras.items() if v is not None})
+
+    hilos_ajustados = ajustado.get("intra_op_threads")
+    if hilos_ajustados is not None:
+        presupuesto = sobrescrituras.get("intra_op_threads")
+        perfil["intra_op_threads"] = (hilos_ajustados if presupuesto is None
+                                      else min(int(hilos_ajustados), int(presupuesto)))
+
+    desconocidas = set(perfil) - set(CLAVES_PERFIL)
+    if desconocidas:
+        raise ValueError(f"claves de perfil de sesión desconocidas para {nombre}: {sorted(desconocidas)}")
+    perfil["proveedores"] = list(perfil["proveedores"])
+    return perfil
+
+
+def crear_opciones_sesion(perfil: Dict):
+    """
+    Construye ort.SessionOptions a partir de un perfil.
+
+    La afinidad usa el formato de ONNX Runtime para session.intra_op_thread_affinities:
+    un grupo de núcleos por hilo intra-op adicional, separados por ";" (p. ej. "1;2;3" con 4 hilos).
+    """
+    import onnxruntime as ort
+    from modules.model_cache import nivel_optimizacion
+
+    opciones = ort.SessionOptions()
+    if perfil.get("intra_op_threads") is not None:
+        opciones.intra_op_num_threads = int(perfil["intra_op_threads"])
+    if perfil.get("inter_op_threads") is not None:
+        opciones.inter_op_num_threads = int(perfil["inter_op_threads"])
+
+    modo = perfil.get("modo_ejecucion", "secuencial")
+    if modo not in ("secuencial", "paralelo"):
+        raise ValueError(f"modo de ejecución desconocido: {modo}")
+    opciones.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if modo == "paralelo"
+                               else ort.ExecutionMode.ORT_SEQUENTIAL)
+    opciones.graph_optimization_level = nivel_optimizacion(perfil.get("nivel_optimizacion", "todo"))
+    opciones.enable_mem_pattern = bool(perfil.get("patron_memoria", True))
+    opciones.enable_cpu_mem_arena = bool(perfil.get("arena_cpu", True))
+
+    if perfil.get("afinidad"):
+        opciones.add_session_config_entry("session.intra_op_thread_affinities", str(perfil["afinidad"]))
+    if perfil.get("espera_activa") is not None:
+        opciones.add_session_config_entry("session.intra_op.allow_spinning",
+                                          "1" if perfil["espera_activa"] else "0")
+    return opciones
+
+
+def describir_perfil(perfil: Dict) -> str:
+    """Resumen de una línea para los logs de inicialización de los motores."""
+    hilos = perfil.get("intra_op_threads") or "auto"
+    return (f"{perfil.get('modo_ejecucion', 'secuencial')}, intra {hilos}, "
+            f"opt {perfil.get('nivel_optimizacion')}, proveedores {perfil.get('proveedores')}")
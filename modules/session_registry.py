@@ -0,0 +1,303 @@
+"""
+Registro de sesiones ONNX compartido por todo el proceso
+Carga cada modelo una sola vez y entrega sesiones de larga vida a los motores
+"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import ModelsConfig, CacheModelosConfig
+from modules.session_profiles import crear_opciones_sesion, resolver_perfil
+
+
+def ruta_variante(model_path: str, variante: Optional[str] = None) -> str:
+    """
+    Archivo a cargar para un modelo según la variante configurada (ModelsConfig.VARIANTE_MODELO).
+
+    Si la variante pedida no existe junto al modelo se usa el archivo original.
+    """
+    variante = variante or ModelsConfig.VARIANTE_MODELO
+    sufijo = ModelsConfig.SUFIJOS_VARIANTE.get(variante)
+    if sufijo is None:
+        raise ValueError(f"variante de modelo desconocida: {variante}")
+    base, extension = os.path.splitext(model_path)
+    if extension != ".onnx" or sufijo == ".onnx":
+        return model_path
+    ruta = base + sufijo
+    if not os.path.exists(ruta):
+        print(f"⚠️ {os.path.basename(model_path)} no tiene variante {variante}, se usa el original")
+        return model_path
+    return ruta
+
+
+def es_archivo_variante(nombre: str) -> bool:
+    """True si el archivo es una variante derivada (p. ej. .int8.onnx) y no un modelo original."""
+    return any(nombre.endswith(sufijo) for sufijo in ModelsConfig.SUFIJOS_VARIANTE.values() if sufijo != ".onnx")
+
+
+class RegistroSesionesONNX:
+    """
+    Registro único (singleton) de sesiones ONNX Runtime.
+
+    Características:
+    - Carga cada archivo .onnx una sola vez por proceso
+    - Entrega la misma sesión a todos los motores que la soliciten
+    - Recarga explícita bajo demanda (por modelo o todos)
+    - Cargas de modelos distintos en paralelo (bloqueo por modelo, no global)
+    - Calentamiento con tensores de prueba y tiempo de la primera inferencia
+    - Variante FP32/INT8 de cada modelo según ModelsConfig.VARIANTE_MODELO (mismas claves y estadísticas)
+    - Grafos optimizados guardados en disco (modules/model_cache.py) para no reoptimizar en cada arranque
+    - Estadísticas separadas de tiempo de carga y tiempo de inferencia
+    """
+
+    _instancia = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock_instancia:
+            if cls._instancia is None:
+                instancia = super().__new__(cls)
+                instancia._inicializado = False
+                cls._instancia = instancia
+        return cls._instancia
+
+    def __init__(self):
+        if self._inicializado:
+            return
+
+        self._lock = threading.RLock()
+        self._sesiones = {}      # ruta -> InferenceSession
+        self._parametros = {}    # ruta -> perfil de sesión con el que se cargó
+        self._estadisticas = {}  # ruta -> dict de tiempos
+        self._locks_carga = {}   # ruta -> Lock de la carga en curso de ese modelo
+        self._inicializado = True
+
+    @staticmethod
+    def _clave(model_path: str) -> str:
+        """Normaliza la ruta del modelo para usarla como clave."""
+        return os.path.abspath(model_path)
+
+    def _crear_sesion(self, clave: str, perfil: Dict):
+        """Construye la sesión ONNX Runtime (desde la caché de grafos optimizados si está habilitada)."""
+        import onnxruntime as ort
+        from modules.model_cache import obtener_cache
+
+        providers = perfil["proveedores"]
+        ruta = ruta_variante(clave)
+        tiempo_inicio = time.time()
+        sesion, origen = None, "directo"
+        if CacheModelosConfig.HABILITADA:
+            try:
+                sesion, origen = obtener_cache().crear_sesion(
+                    ruta, crear_opciones_sesion(perfil), providers,
+                    {"nivel_optimizacion": perfil["nivel_optimizacion"]}
+                )
+            except Exception as e:
+                print(f"⚠️ Caché de modelos no disponible para {os.path.basename(clave)}: {e}")
+        if sesion is None:
+            sesion = ort.InferenceSession(ruta, sess_options=crear_opciones_sesion(perfil), providers=providers)
+        tiempo_carga = (time.time() - tiempo_inicio) * 1000
+
+        with self._lock:
+            stats = self._estadisticas.setdefault(clave, {
+                "cargas": 0,
+                "tiempo_carga_ms": 0.0,
+                "tiempo_carga_total_ms": 0.0,
+                "inferencias": 0,
+                "tiempo_inferencia_total_ms": 0.0,
+                "primera_inferencia_ms": None,
+                "calentamiento_ms": None
+            })
+            stats["cargas"] += 1
+            stats["tiempo_carga_ms"] = tiempo_carga
+            stats["tiempo_carga_total_ms"] += tiempo_carga
+            stats["primera_inferencia_ms"] = None
+            stats["calentamiento_ms"] = None
+            stats["origen"] = origen
+            stats["archivo"] = os.path.basename(ruta)
+
+        print(f"📦 Sesión ONNX cargada: {os.path.basename(ruta)} ({tiempo_carga:.1f} ms, {origen})")
+        return sesion
+
+    def obtener_sesion(self, model_path: str, providers: Optional[List[str]] = None,
+                       intra_op_threads: Optional[int] = None,
+                       inter_op_threads: Optional[int] = None):
+        """
+        Obtiene la sesión de un modelo, cargándolo solo la primera vez.
+
+        Las opciones salen del perfil de sesión del modelo (SesionConfig y perfiles ajustados);
+        los argumentos distintos de None tienen prioridad sobre el perfil.
+
+        Args:
+            model_path (str): Ruta al archivo .onnx
+            providers (List[str], optional): Proveedores de ejecución
+            intra_op_threads (int, optional): Hilos intra-op (solo aplica en la primera carga)
+            inter_op_threads (int, optional): Hilos inter-op (solo aplica en la primera carga)
+
+        Returns:
+            ort.InferenceSession: Sesión compartida del modelo
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Modelo no encontrado: {model_path}")
+
+        clave = self._clave(model_path)
+        with self._lock:
+            sesion = self._sesiones.get(clave)
+            if sesion is not None:
+                return sesion
+            lock_carga = self._locks_carga.setdefault(clave, threading.Lock())
+
+        # La carga se hace fuera del lock global: otros modelos pueden cargarse a la vez
+        with lock_carga:
+            with self._lock:
+                sesion = self._sesiones.get(clave)
+            if sesion is None:
+                perfil = resolver_perfil(clave, proveedores=providers, intra_op_threads=intra_op_threads,
+                                         inter_op_threads=inter_op_threads)
+                sesion = self._crear_sesion(clave, perfil)
+                with self._lock:
+                    self._sesiones[clave] = sesion
+                    self._parametros[clave] = perfil
+            return sesion
+
+    def recargar(self, model_path: Optional[str] = None) -> bool:
+        """
+        Recarga explícitamente uno o todos los modelos registrados.
+
+        Los motores deben volver a pedir su sesión después de recargar.
+
+        Args:
+            model_path (str, optional): Modelo a recargar. Si es None, recarga todos.
+
+        Returns:
+            bool: True si todas las recargas fueron exitosas
+        """
+        with self._lock:
+            claves = [self._clave(model_path)] if model_path else list(self._sesiones.keys())
+            exito = True
+            for clave in claves:
+                perfil = self._parametros.get(clave) or resolver_perfil(clave)
+                try:
+                    self._sesiones[clave] = self._crear_sesion(clave, perfil)
+                    self._parametros[clave] = perfil
+                except Exception as e:
+                    print(f"❌ Error recargando {os.path.basename(clave)}: {e}")
+                    exito = False
+            return exito
+
+    def calentar(self, model_path: str, iteraciones: int = 1) -> Optional[float]:
+        """
+        Ejecuta inferencias con un tensor de ceros para inicializar kernels y arenas de memoria.
+
+        Los ejes simbólicos de la entrada (p. ej. el lote) se fijan a 1. Registra el tiempo
+        de la primera inferencia y el total del calentamiento en las estadísticas del modelo.
+
+        Args:
+            model_path (str): Modelo ya cargado en el registro
+            iteraciones (int): Inferencias de calentamiento
+
+        Returns:
+            float o None: Tiempo de la primera inferencia en ms (None si el modelo no está cargado)
+        """
+        clave = self._clave(model_path)
+        with self._lock:
+            sesion = self._sesiones.get(clave)
+        if sesion is None or iteraciones <= 0:
+            return None
+
+        entradas = {
+            entrada.name: np.zeros([d if isinstance(d, int) and d > 0 else 1 for d in entrada.shape],
+                                   dtype=np.float32)
+            for entrada in sesion.get_inputs()
+        }
+        tiempos = []
+        for _ in range(iteraciones):
+            tiempo_inicio = time.time()
+            sesion.run(None, entradas)
+            tiempos.append((time.time() - tiempo_inicio) * 1000)
+
+        with self._lock:
+            stats = self._estadisticas.get(clave)
+            if stats is not None:
+                stats["primera_inferencia_ms"] = tiempos[0]
+                stats["calentamiento_ms"] = sum(tiempos)
+        return tiempos[0]
+
+    def registrar_inferencia(self, model_path: str, tiempo_ms: float):
+        """
+        Registra el tiempo de una inferencia de un modelo.
+
+        Args:
+            model_path (str): Ruta al modelo
+            tiempo_ms (float): Tiempo de la llamada a session.run en ms
+        """
+        clave = self._clave(model_path)
+        with self._lock:
+            stats = self._estadisticas.get(clave)
+            if stats is not None:
+                stats["inferencias"] += 1
+                stats["tiempo_inferencia_total_ms"] += tiempo_ms
+
+    def liberar(self, model_path: Optional[str] = None):
+        """
+        Descarta sesiones del registro (uno o todos los modelos).
+
+        Args:
+            model_path (str, optional): Modelo a descartar. Si es None, descarta todos.
+        """
+        with self._lock:
+            if model_path:
+                clave = self._clave(model_path)
+                self._sesiones.pop(clave, None)
+                self._parametros.pop(clave, None)
+            else:
+                self._sesiones.clear()
+                self._parametros.clear()
+
+    def obtener_perfil(self, model_path: str) -> Optional[Dict]:
+        """Perfil de sesión con el que se cargó el modelo (None si no está cargado)."""
+        with self._lock:
+            return self._parametros.get(self._clave(model_path))
+
+    def esta_cargado(self, model_path: str) -> bool:
+        """Indica si el modelo ya tiene una sesión cargada."""
+        with self._lock:
+            return self._clave(model_path) in self._sesiones
+
+    def obtener_estadisticas(self) -> Dict:
+        """
+        Retorna estadísticas de carga e inferencia por modelo.
+
+        Returns:
+            Dict: {nombre_modelo: {cargas, tiempo_carga_ms, inferencias, ...}}
+        """
+        with self._lock:
+            resumen = {}
+            for clave, stats in self._estadisticas.items():
+                inferencias = stats["inferencias"]
+                resumen[os.path.basename(clave)] = {
+                    "cargado": clave in self._sesiones,
+                    "cargas": stats["cargas"],
+                    "tiempo_carga_ms": stats["tiempo_carga_ms"],
+                    "tiempo_carga_total_ms": stats["tiempo_carga_total_ms"],
+                    "inferencias": inferencias,
+                    "tiempo_inferencia_total_ms": stats["tiempo_inferencia_total_ms"],
+                    "tiempo_inferencia_promedio_ms": (
+                        stats["tiempo_inferencia_total_ms"] / inferencias if inferencias else 0.0
+                    ),
+                    "origen": stats.get("origen"),
+                    "archivo": stats.get("archivo"),
+                    "primera_inferencia_ms": stats.get("primera_inferencia_ms"),
+                    "calentamiento_ms": stats.get("calentamiento_ms"),
+                    "perfil": self._parametros.get(clave)
+                }
+            return resumen
+
+
+def obtener_registro() -> RegistroSesionesONNX:
+    """Retorna la instancia única del registro de sesiones."""
+    return RegistroSesionesONNX()
@@ -0,0 +1,101 @@
+"""
+Planificador de etapas del pipeline de análisis
+Ejecuta las inferencias independientes de un frame en un pool de hilos acotado
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class PlanificadorEtapas:
+    """
+    Ejecuta etapas independientes del análisis sobre un pool de hilos acotado.
+
+    Características:
+    - ONNX Runtime libera el GIL, por lo que las inferencias corren en paralelo
+    - Registra por etapa el tiempo de espera en cola y el tiempo de ejecución
+    - Modo secuencial (max_trabajadores=1) sin pool, con la misma interfaz
+    """
+
+    def __init__(self, max_trabajadores: int = 5):
+        """
+        Args:
+            max_trabajadores (int): Máximo de etapas ejecutándose a la vez
+        """
+        self.max_trabajadores = max(1, int(max_trabajadores))
+        self._pool = None
+        if self.max_trabajadores > 1:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_trabajadores,
+                thread_name_prefix="etapa"
+            )
+
+    @staticmethod
+    def calcular_presupuesto_hilos(pesos: Dict[str, float],
+                                   nucleos: Optional[int] = None) -> Dict[str, int]:
+        """
+        Reparte los núcleos entre etapas según su peso para no sobresuscribir la CPU.
+
+        Args:
+            pesos (Dict[str, float]): Peso relativo de cada etapa
+            nucleos (int, optional): Núcleos disponibles (por defecto os.cpu_count())
+
+        Returns:
+            Dict[str, int]: Hilos intra-op asignados a cada etapa (mínimo 1)
+        """
+        nucleos = nucleos or os.cpu_count() or 1
+        peso_total = float(sum(pesos.values())) or 1.0
+        return {
+            etapa: max(1, int(nucleos * peso / peso_total))
+            for etapa, peso in pesos.items()
+        }
+
+    def _ejecutar_etapa(self, nombre: str, funcion: Callable[[], Any],
+                        tiempo_envio: float) -> Tuple[Any, Dict[str, float]]:
+        """Ejecuta una etapa midiendo espera en cola y duración."""
+        tiempo_inicio = time.time()
+        tiempos = {"espera_ms": (tiempo_inicio - tiempo_envio) * 1000}
+        try:
+            resultado = funcion()
+        except Exception as e:
+            print(f"❌ ERROR en etapa {nombre}: {e}")
+            resultado = None
+            tiempos["error"] = str(e)
+        tiempos["duracion_ms"] = (time.time() - tiempo_inicio) * 1000
+        return resultado, tiempos
+
+    def ejecutar(self, etapas: Dict[str, Callable[[], Any]]) -> Tuple[Dict[str, Any], Dict[str, Dict]]:
+        """
+        Ejecuta un conjunto de etapas independientes y espera a que terminen.
+
+        Args:
+            etapas (Dict[str, Callable]): Nombre de etapa -> función sin argumentos
+
+        Returns:
+            Tuple[Dict, Dict]: (resultados por etapa, tiempos por etapa).
+            Una etapa que lanzó excepción tiene resultado None y clave "error" en sus tiempos.
+        """
+        resultados = {}
+        tiempos = {}
+        tiempo_envio = time.time()
+
+        if self._pool is None:
+            for nombre, funcion in etapas.items():
+                resultados[nombre], tiempos[nombre] = self._ejecutar_etapa(nombre, funcion, tiempo_envio)
+            return resultados, tiempos
+
+        futuros = {
+            nombre: self._pool.submit(self._ejecutar_etapa, nombre, funcion, tiempo_envio)
+            for nombre, funcion in etapas.items()
+        }
+        for nombre, futuro in futuros.items():
+            resultados[nombre], tiempos[nombre] = futuro.result()
+        return resultados, tiempos
+
+    def cerrar(self):
+        """Detiene el pool de hilos."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,227 @@
+"""
+Inferencia por teselas a resolución nativa
+Cubre el frame del sensor (o la región de la pieza) con teselas solapadas del tamaño de entrada
+del modelo, las ejecuta en un solo lote y fusiona las detecciones en coordenadas del sensor
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import ModelsConfig, TeseladoConfig
+from modules.postprocessing.mask import Mask
+from modules.preprocessing.letterbox import VALOR_RELLENO
+
+
+def tamano_tesela() -> int:
+    """Lado de las teselas (por defecto la entrada de los modelos)."""
+    return int(TeseladoConfig.TAMANO_TESELA or ModelsConfig.INPUT_SIZE)
+
+
+def _posiciones(inicio: int, fin: int, tamano: int, paso: int, limite: int) -> List[int]:
+    """Inicios de las teselas sobre un eje: cubren [inicio, fin) con paso máximo `paso`."""
+    longitud = fin - inicio
+    if longitud <= tamano:
+        # Una sola tesela centrada en la región y desplazada para no salir del frame
+        centro = (inicio + fin) // 2
+        return [int(min(max(0, centro - tamano // 2), max(0, limite - tamano)))]
+    # Teselas repartidas uniformemente: la última termina justo en `fin` (solapamiento >= el pedido)
+    n = math.ceil((longitud - tamano) / paso) + 1
+    return [int(round(inicio + i * (longitud - tamano) / (n - 1))) for i in range(n)]
+
+
+def calcular_teselas(forma: Tuple[int, int], tamano: Optional[int] = None,
+                     solapamiento: Optional[float] = None,
+                     region: Optional[Tuple[int, int, int, int]] = None) -> List[Tuple[int, int]]:
+    """
+    Orígenes (x, y) de las teselas que cubren el frame o una región.
+
+    Args:
+        forma (Tuple[int, int]): (alto, ancho) del frame
+        tamano (int, optional): Lado de la tesela (por defecto tamano_tesela())
+        solapamiento (float, optional): Fracción del lado compartida con la tesela vecina
+            (por defecto TeseladoConfig.SOLAPAMIENTO)
+        region (Tuple, optional): (x1, y1, x2, y2) a cubrir; None = frame completo
+
+    Returns:
+        List[Tuple[int, int]]: Esquinas superiores izquierdas, por filas
+    """
+    alto, ancho = forma[:2]
+    tamano = int(tamano or tamano_tesela())
+    solapamiento = TeseladoConfig.SOLAPAMIENTO if solapamiento is None else solapamiento
+    if not 0 <= solapamiento < 1:
+        raise ValueError(f"solapamiento de teselas fuera de [0, 1): {solapamiento}")
+    paso = max(1, tamano - int(round(tamano * solapamiento)))
+
+    x1, y1, x2, y2 = region if region is not None else (0, 0, ancho, alto)
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(ancho, int(x2)), min(alto, int(y2))
+    if x2 <= x1 or y2 <= y1:
+        x1, y1, x2, y2 = 0, 0, ancho, alto
+
+    columnas = _posiciones(x1, x2, tamano, paso, ancho)
+    filas = _posiciones(y1, y2, tamano, paso, alto)
+    return [(x, y) for y in filas for x in columnas]
+
+
+def extraer_teselas(imagen: np.ndarray, origenes: Sequence[Tuple[int, int]], tamano: Optional[int] = None,
+                    invertir_canales: bool = False) -> np.ndarray:
+    """
+    Tensor de lote [N, 3, tamano, tamano] float32 normalizado a [0, 1] con todas las teselas.
+
+    Las teselas que exceden el frame (frame menor que la tesela) se rellenan con VALOR_RELLENO,
+    el mismo gris del letterbox con el que se entrenaron los modelos.
+    """
+    tamano = int(tamano or tamano_tesela())
+    lote = np.empty((len(origenes), 3, tamano, tamano), dtype=np.float32)
+    for i, (x, y) in enumerate(origenes):
+        recorte = imagen[y:y + tamano, x:x + tamano]
+        if invertir_canales:
+            recorte = recorte[..., ::-1]
+        alto, ancho = recorte.shape[:2]
+        if (alto, ancho) != (tamano, tamano):
+            lote[i].fill(VALOR_RELLENO / 255.0)
+        np.divide(recorte.transpose(2, 0, 1), np.float32(255.0), out=lote[i, :, :alto, :ancho])
+    return lote
+
+
+def region_desde_piezas(detecciones: List[Dict], forma: Tuple[int, int], margen: Optional[int] = None,
+                        escala: Tuple[float, float] = (1.0, 1.0)) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Región (x1, y1, x2, y2) que envuelve las piezas detectadas, con margen y recortada al frame.
+
+    Args:
+        detecciones (List[Dict]): Detecciones de piezas con "bbox"
+        forma (Tuple[int, int]): (alto, ancho) del frame
+        margen (int, optional): Píxeles alrededor de la caja (por defecto TeseladoConfig.MARGEN_PIEZA)
+        escala (Tuple[float, float]): (sx, sy) de las coordenadas de las detecciones a píxeles del frame
+
+    Returns:
+        Tuple o None si no hay piezas
+    """
+    if not detecciones:
+        return None
+    margen = TeseladoConfig.MARGEN_PIEZA if margen is None else margen
+    sx, sy = escala
+    alto, ancho = forma[:2]
+    x1 = min(d["bbox"]["x1"] for d in detecciones) * sx - margen
+    y1 = min(d["bbox"]["y1"] for d in detecciones) * sy - margen
+    x2 = max(d["bbox"]["x2"] for d in detecciones) * sx + margen
+    y2 = max(d["bbox"]["y2"] for d in detecciones) * sy + margen
+    return (max(0, int(x1)), max(0, int(y1)), min(ancho, int(math.ceil(x2))), min(alto, int(math.ceil(y2))))
+
+
+def _trasladar_mascara(mascara: Mask, dx: int, dy: int, forma: Tuple[int, int]) -> Mask:
+    """Mueve una máscara local de la tesela al frame, recortando lo que cae en el relleno."""
+    if not mascara.area:
+        return Mask.empty(forma)
+    x1, y1, x2, y2 = mascara.bbox
+    alto, ancho = forma
+    fx1, fy1 = x1 + dx, y1 + dy
+    fx2, fy2 = min(ancho, x2 + dx), min(alto, y2 + dy)
+    if fx2 <= fx1 or fy2 <= fy1:
+        return Mask.empty(forma)
+    return Mask.from_local(mascara.local[:fy2 - fy1, :fx2 - fx1], fx1, fy1, forma, packed=mascara.packed)
+
+
+def trasladar_resultado(resultado: Dict, dx: int, dy: int, forma: Tuple[int, int]) -> Dict:
+    """
+    Copia de una detección/segmentación de una tesela (o región) en coordenadas del frame.
+
+    Args:
+        resultado (Dict): Resultado con "bbox" (y opcionalmente centroide, contorno, mascara)
+        dx, dy (int): Origen de la tesela (o región) en el frame
+        forma (Tuple[int, int]): (alto, ancho) del frame
+    """
+    alto, ancho = forma
+    caja = resultado["bbox"]
+    x1, y1 = caja["x1"] + dx, caja["y1"] + dy
+    x2, y2 = min(ancho, caja["x2"] + dx), min(alto, caja["y2"] + dy)
+
+    trasladado = dict(resultado)
+    trasladado["bbox"] = {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
+    trasladado["centroide"] = {"x": (x1 + x2) // 2, "y": (y1 + y2) // 2}
+    trasladado["area"] = int((x2 - x1) * (y2 - y1))
+    if "contorno" in resultado:
+        trasladado["contorno"] = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+    if resultado.get("mascara") is not None:
+        trasladado["mascara"] = _trasladar_mascara(Mask.from_any(resultado["mascara"]), dx, dy, forma)
+        trasladado["area_mascara"] = trasladado["mascara"].area
+    return trasladado
+
+
+def trasladar_resultados(resultados: List[Dict], dx: int, dy: int, forma: Tuple[int, int]) -> List[Dict]:
+    """
+    trasladar_resultado sobre una lista, descartando las cajas que caen por completo fuera del
+    frame (en el relleno de una tesela mayor que el frame), como hace el decodificador con el letterbox.
+    """
+    trasladados = (trasladar_resultado(r, dx, dy, forma) for r in resultados)
+    return [r for r in trasladados
+            if r["bbox"]["x2"] > r["bbox"]["x1"] and r["bbox"]["y2"] > r["bbox"]["y1"]]
+
+
+def _unir(grupo: Dict, otro: Dict):
+    """Agrega al grupo conservado una detección de otra tesela (caja y máscara unidas)."""
+    a, b = grupo["bbox"], otro["bbox"]
+    x1, y1 = min(a["x1"], b["x1"]), min(a["y1"], b["y1"])
+    x2, y2 = max(a["x2"], b["x2"]), max(a["y2"], b["y2"])
+    grupo["bbox"] = {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
+    grupo["centroide"] = {"x": (x1 + x2) // 2, "y": (y1 + y2) // 2}
+    grupo["area"] = int((x2 - x1) * (y2 - y1))
+    if "contorno" in grupo:
+        grupo["contorno"] = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+    if grupo.get("mascara") is not None and otro.get("mascara") is not None:
+        grupo["mascara"] = grupo["mascara"].union(otro["mascara"])
+        grupo["area_mascara"] = grupo["mascara"].area
+
+
+def fusionar_teselas(resultados_teselas: List[List[Dict]], umbral_iou: Optional[float] = None,
+                     umbral_contencion: Optional[float] = None) -> List[Dict]:
+    """
+    NMS global entre teselas con unión de cajas y máscaras.
+
+    Las detecciones (ya en coordenadas del frame) se recorren por confianza descendente; una
+    detección de otra tesela con la misma clase se funde con la conservada si su IoU supera
+    `umbral_iou` o si la caja menor queda contenida en la otra en más de `umbral_contencion`
+    (el mismo defecto cortado por el borde de una tesela). Al fundirse se unen las cajas y las
+    máscaras y se conserva la confianza mayor. Las detecciones de una misma tesela nunca se funden:
+    el NMS del decodificador ya las separó.
+
+    Args:
+        resultados_teselas (List[List[Dict]]): Resultados trasladados, una lista por tesela
+        umbral_iou (float, optional): Por defecto TeseladoConfig.IOU_FUSION
+        umbral_contencion (float, optional): Por defecto TeseladoConfig.CONTENCION_FUSION
+
+    Returns:
+        List[Dict]: Detecciones fusionadas, por confianza descendente
+    """
+    umbral_iou = TeseladoConfig.IOU_FUSION if umbral_iou is None else umbral_iou
+    umbral_contencion = TeseladoConfig.CONTENCION_FUSION if umbral_contencion is None else umbral_contencion
+
+    candidatos = [(r, indice) for indice, lista in enumerate(resultados_teselas) for r in lista]
+    candidatos.sort(key=lambda par: -par[0]["confianza"])
+
+    grupos: List[Tuple[Dict, set]] = []
+    for resultado, tesela in candidatos:
+        b = resultado["bbox"]
+        area_b = max(b["x2"] - b["x1"], 0) * max(b["y2"] - b["y1"], 0)
+        for grupo, teselas in grupos:
+            if tesela in teselas or grupo["clase"] != resultado["clase"]:
+                continue
+            a = grupo["bbox"]
+            ancho = min(a["x2"], b["x2"]) - max(a["x1"], b["x1"])
+            alto = min(a["y2"], b["y2"]) - max(a["y1"], b["y1"])
+            if ancho <= 0 or alto <= 0:
+                continue
+            interseccion = ancho * alto
+            area_a = (a["x2"] - a["x1"]) * (a["y2"] - a["y1"])
+            iou = interseccion / max(area_a + area_b - interseccion, 1e-9)
+            contencion = interseccion / max(min(area_a, area_b), 1e-9)
+            if iou >= umbral_iou or contencion >= umbral_contencion:
+                _unir(grupo, resultado)
+                teselas.add(tesela)
+                break
+        else:
+            grupos.append((dict(resultado), {tesela}))
+    return [grupo for grupo, _ in grupos]
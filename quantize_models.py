@@ -0,0 +1,274 @@
+"""
+Generación de variantes INT8 de los cinco modelos Cople*.onnx
+Cuantización estática (QDQ, activaciones calibradas con frames archivados) o dinámica (solo pesos).
+Cada variante se escribe junto a su modelo como <modelo>.int8.onnx y se activa con
+ModelsConfig.VARIANTE_MODELO = "int8".
+
+Antes de activarla en una estación, comparar latencia y concordancia con FP32:
+    python benchmarks/compare_variants.py Salida_cople
+
+Uso:
+    python quantize_models.py                                   # Los cinco modelos, calibrados con Salida_cople
+    python quantize_models.py --calibracion capturas.zip turno.frames --muestras 300
+    python quantize_models.py --analisis segmentacion_defectos --modo dinamico
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from config import ModelsConfig, CuantizacionConfig
+from reinspect import ANALISIS, cargar_imagen, enumerar_entradas
+
+# El clasificador y el segmentador de piezas reciben los canales invertidos (ver los motores)
+INVERTIR_CANALES = {"clasificacion": True, "segmentacion_piezas": True}
+# El clasificador recibe el frame estirado, sin letterbox (ver PreprocesadorRedimensionado)
+SIN_LETTERBOX = {"clasificacion"}
+
+_METODOS_CALIBRACION = {"minmax": "MinMax", "entropia": "Entropy", "percentil": "Percentile"}
+
+
+def rutas_modelos(directorio: Optional[str] = None) -> Dict[str, str]:
+    """Análisis -> ruta del modelo FP32 (el detector de piezas usa su nombre fijo, como su motor)."""
+    directorio = directorio or ModelsConfig.MODELS_DIR
+    return {
+        "clasificacion": os.path.join(directorio, ModelsConfig.CLASSIFICATION_MODEL),
+        "deteccion_piezas": os.path.join(directorio, "CopleDetPz1C1V.onnx"),
+        "deteccion_defectos": os.path.join(directorio, ModelsConfig.DETECTION_DEFECTOS_MODEL),
+        "segmentacion_defectos": os.path.join(directorio, ModelsConfig.SEGMENTATION_DEFECTOS_MODEL),
+        "segmentacion_piezas": os.path.join(directorio, ModelsConfig.SEGMENTATION_PARTS_MODEL)
+    }
+
+
+def ruta_int8(ruta_modelo: str) -> str:
+    return os.path.splitext(ruta_modelo)[0] + ModelsConfig.SUFIJOS_VARIANTE["int8"]
+
+
+def _crear_lector_calibracion(elementos: List, nombre_entrada: str, tamano: int, invertir_canales: bool,
+                              letterbox: bool = True):
+    """
+    CalibrationDataReader de ONNX Runtime sobre frames archivados.
+
+    Cada frame se preprocesa igual que en el sistema (ContextoFrame.obtener_tensor).
+    """
+    from onnxruntime.quantization import CalibrationDataReader
+    from modules.preprocessing.frame_context import ContextoFrame
+
+    class LectorCalibracion(CalibrationDataReader):
+        def __init__(self):
+            self.pendientes = iter(elementos)
+            self.leidos = 0
+            self.errores = 0
+
+        def get_next(self):
+            for elemento in self.pendientes:
+                try:
+                    imagen = cargar_imagen(elemento)
+                except Exception as e:
+                    self.errores += 1
+                    print(f"⚠️ Frame de calibración ignorado ({elemento[0]}): {e}")
+                    continue
+                self.leidos += 1
+                tensor = ContextoFrame(imagen).obtener_tensor(tamano, invertir_canales, letterbox)
+                return {nombre_entrada: tensor.copy()}
+            return None
+
+    return LectorCalibracion()
+
+
+def _nombrar_nodos(ruta_modelo: str, directorio: str) -> str:
+    """
+    Copia del modelo con nombre en todos los nodos (nodes_to_exclude trabaja por nombre y algunos
+    exportadores dejan nodos sin nombre). Retorna la ruta original si todos ya lo tienen.
+    """
+    import onnx
+
+    modelo = onnx.load(ruta_modelo)
+    sin_nombre = [nodo for nodo in modelo.graph.node if not nodo.name]
+    if not sin_nombre:
+        return ruta_modelo
+    usados = {nodo.name for nodo in modelo.graph.node}
+    for i, nodo in enumerate(modelo.graph.node):
+        if not nodo.name:
+            nombre = f"{nodo.op_type}_{i}"
+            while nombre in usados:
+                nombre += "_"
+            nodo.name = nombre
+            usados.add(nombre)
+    ruta = os.path.join(directorio, "nombrado.onnx")
+    onnx.save(modelo, ruta)
+    return ruta
+
+
+def nodos_cabeza(ruta_modelo: str, profundidad: int) -> List[str]:
+    """
+    Nombres de los nodos a `profundidad` saltos o menos de las salidas del grafo.
+
+    En YOLO la cabeza concatena cajas en píxeles (0-640) y scores (0-1) en el mismo tensor:
+    una sola escala INT8 para ambos destruye los scores, así que esa parte se deja en FP32.
+    """
+    import onnx
+
+    if profundidad <= 0:
+        return []
+    grafo = onnx.load(ruta_modelo, load_external_data=False).graph
+    productor = {salida: nodo for nodo in grafo.node for salida in nodo.output}
+    excluidos = set()
+    frontera = deque((salida.name, 1) for salida in grafo.output)
+    while frontera:
+        tensor, nivel = frontera.popleft()
+        nodo = productor.get(tensor)
+        if nodo is None or nodo.name in excluidos or nivel > profundidad:
+            continue
+        excluidos.add(nodo.name)
+        frontera.extend((entrada, nivel + 1) for entrada in nodo.input)
+    return sorted(excluidos)
+
+
+def cuantizar_modelo(ruta_modelo: str, ruta_salida: str, modo: str, elementos: Optional[List] = None,
+                     invertir_canales: bool = False, metodo: str = "minmax", por_canal: bool = True,
+                     profundidad_cabeza: int = 2, letterbox: bool = True) -> Dict:
+    """
+    Cuantiza un modelo a INT8.
+
+    Args:
+        ruta_modelo (str): Modelo FP32
+        ruta_salida (str): Variante INT8 a escribir
+        modo (str): "estatico" (QDQ, requiere `elementos` de calibración) o "dinamico"
+        elementos (List, optional): Frames de calibración (elementos de reinspect.enumerar_entradas)
+        invertir_canales (bool): Orden de canales que espera el modelo
+        metodo (str): Calibración "minmax", "entropia" o "percentil"
+        por_canal (bool): Pesos cuantizados por canal
+        profundidad_cabeza (int): Nodos cercanos a las salidas que quedan en FP32
+        letterbox (bool): False si el modelo recibe el frame estirado (clasificador)
+
+    Returns:
+        Dict: tamaños, tiempo, nodos excluidos y frames de calibración usados
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_dynamic, quantize_static)
+
+    if modo not in ("estatico", "dinamico"):
+        raise ValueError(f"modo de cuantización desconocido: {modo}")
+    if modo == "estatico" and not elementos:
+        raise ValueError("la cuantización estática requiere frames de calibración")
+    if metodo not in _METODOS_CALIBRACION:
+        raise ValueError(f"método de calibración desconocido: {metodo}")
+
+    inicio = time.time()
+    frames_calibracion = 0
+    with tempfile.TemporaryDirectory(prefix="cuantizacion_") as temporal:
+        # Inferencia de formas y fusiones previas recomendadas por ONNX Runtime
+        preprocesado = os.path.join(temporal, "preprocesado.onnx")
+        try:
+            from onnxruntime.quantization.shape_inference import quant_pre_process
+            quant_pre_process(ruta_modelo, preprocesado, skip_symbolic_shape=True)
+        except Exception as e:
+            print(f"⚠️ Preprocesado para cuantización omitido: {e}")
+            preprocesado = ruta_modelo
+        preprocesado = _nombrar_nodos(preprocesado, temporal)
+        excluidos = nodos_cabeza(preprocesado, profundidad_cabeza)
+
+        if modo == "dinamico":
+            quantize_dynamic(preprocesado, ruta_salida, weight_type=QuantType.QInt8,
+                             per_channel=por_canal, nodes_to_exclude=excluidos)
+        else:
+            entrada = ort.InferenceSession(preprocesado, providers=["CPUExecutionProvider"]).get_inputs()[0]
+            tamano = entrada.shape[2] if isinstance(entrada.shape[2], int) else ModelsConfig.INPUT_SIZE
+            lector = _crear_lector_calibracion(elementos, entrada.name, tamano, invertir_canales, letterbox)
+            quantize_static(
+                preprocesado, ruta_salida, lector,
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=por_canal,
+                calibrate_method=getattr(CalibrationMethod, _METODOS_CALIBRACION[metodo]),
+                nodes_to_exclude=excluidos
+            )
+            frames_calibracion = lector.leidos
+
+    return {
+        "modo": modo,
+        "salida": ruta_salida,
+        "tamano_fp32_mb": round(os.path.getsize(ruta_modelo) / (1024 * 1024), 2),
+        "tamano_int8_mb": round(os.path.getsize(ruta_salida) / (1024 * 1024), 2),
+        "nodos_fp32": len(excluidos),
+        "frames_calibracion": frames_calibracion,
+        "tiempo_s": round(time.time() - inicio, 1)
+    }
+
+
+def _argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Variantes INT8 de los modelos de coples")
+    parser.add_argument("--analisis", default=",".join(ANALISIS),
+                        help=f"Modelos a cuantizar separados por coma ({', '.join(ANALISIS)})")
+    parser.add_argument("--modelos", default=None, help="Directorio de modelos (por defecto ModelsConfig.MODELS_DIR)")
+    parser.add_argument("--modo", choices=["estatico", "dinamico"], default=CuantizacionConfig.MODO)
+    parser.add_argument("--calibracion", nargs="+", default=[CuantizacionConfig.DIRECTORIO_CALIBRACION],
+                        help="Directorios o archivos de frames de calibración (mismos formatos que reinspect.py)")
+    parser.add_argument("--muestras", type=int, default=CuantizacionConfig.MUESTRAS_CALIBRACION,
+                        help="Frames de calibración por modelo")
+    parser.add_argument("--metodo", choices=list(_METODOS_CALIBRACION), default=CuantizacionConfig.METODO_CALIBRACION)
+    parser.add_argument("--por-tensor", action="store_true", help="Pesos por tensor en vez de por canal")
+    parser.add_argument("--profundidad-cabeza", type=int, default=CuantizacionConfig.PROFUNDIDAD_CABEZA_FP32,
+                        help="Nodos cercanos a las salidas que quedan en FP32 (0 = cuantizar todo)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    analisis = [a.strip() for a in args.analisis.split(",") if a.strip()]
+    desconocidos = set(analisis) - set(ANALISIS)
+    if desconocidos:
+        print(f"❌ Análisis desconocidos: {sorted(desconocidos)}")
+        return 2
+
+    elementos = []
+    if args.modo == "estatico":
+        # Muestra espaciada uniformemente sobre todo el archivo (no solo los primeros frames del turno)
+        todos = list(enumerar_entradas(args.calibracion))
+        if not todos:
+            print("❌ No hay frames de calibración; usar --calibracion o --modo dinamico")
+            return 1
+        paso = max(1, len(todos) // max(1, args.muestras))
+        elementos = list(itertools.islice(todos[::paso], args.muestras))
+        print(f"📐 Calibración con {len(elementos)} de {len(todos)} frames ({args.metodo})")
+
+    rutas = rutas_modelos(args.modelos)
+    fallidos = 0
+    for etapa in analisis:
+        ruta = rutas[etapa]
+        if not os.path.exists(ruta):
+            print(f"⚠️ Modelo no encontrado, se omite: {ruta}")
+            continue
+        print(f"🔢 Cuantizando {os.path.basename(ruta)} ({args.modo})...")
+        try:
+            resultado = cuantizar_modelo(
+                ruta, ruta_int8(ruta), args.modo, elementos,
+                invertir_canales=INVERTIR_CANALES.get(etapa, False),
+                metodo=args.metodo,
+                por_canal=not args.por_tensor,
+                profundidad_cabeza=args.profundidad_cabeza,
+                letterbox=etapa not in SIN_LETTERBOX
+            )
+        except Exception as e:
+            print(f"❌ Error cuantizando {os.path.basename(ruta)}: {e}")
+            fallidos += 1
+            continue
+        print(f"   ✅ {os.path.basename(resultado['salida'])}: {resultado['tamano_fp32_mb']} MB → "
+              f"{resultado['tamano_int8_mb']} MB, {resultado['nodos_fp32']} nodos en FP32, "
+              f"{resultado['tiempo_s']} s")
+
+    print("ℹ️ Activar con ModelsConfig.VARIANTE_MODELO = \"int8\" después de revisar "
+          "benchmarks/compare_variants.py")
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,558 @@
+"""
+Reinspección offline de imágenes archivadas
+Recorre directorios o archivos de imágenes (zip/tar, .frames, .npy) y ejecuta cualquier
+subconjunto de los cinco análisis en un pool de procesos, sin cámara ni menú interactivo.
+
+Resultados en un único CSV (un renglón por imagen, columnas por análisis); la ejecución es
+reanudable: las imágenes ya presentes en el CSV se omiten. Se usa CSV en lugar de Parquet
+porque no agrega dependencias (pyarrow) y admite escritura incremental por bloques. Las coordenadas de cajas están
+en píxeles de la imagen original (retroproyectadas del letterbox), igual que en los JSON del sistema.
+
+Uso:
+    python reinspect.py Salida_cople --salida reinspeccion.csv
+    python reinspect.py capturas.zip turno.frames --analisis clasificacion,deteccion_defectos
+    python reinspect.py Salida_cople --procesos 4 --anotadas reinspeccion_anotadas --informe informe.json
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from config import ModelsConfig, ReinspeccionConfig, RobustezConfig
+
+ANALISIS = ("clasificacion", "deteccion_piezas", "deteccion_defectos",
+            "segmentacion_defectos", "segmentacion_piezas")
+
+# Método por lote de cada motor (ver modules/batch_inference.py)
+METODOS_LOTE = {
+    "clasificacion": "clasificar_lote",
+    "deteccion_piezas": "detectar_piezas_lote",
+    "deteccion_defectos": "detectar_defectos_lote",
+    "segmentacion_defectos": "segmentar_defectos_lote",
+    "segmentacion_piezas": "segmentar_lote"
+}
+
+COLORES = {
+    "deteccion_piezas": (0, 255, 0),
+    "deteccion_defectos": (0, 0, 255),
+    "segmentacion_defectos": (0, 0, 255),
+    "segmentacion_piezas": (255, 128, 0)
+}
+
+# Una imagen a reinspeccionar: (id estable, tipo de fuente, ruta, miembro o índice)
+Elemento = Tuple[str, str, str, Optional[str]]
+
+
+# ==================== ENUMERACIÓN DE ENTRADAS ====================
+
+def _es_imagen(nombre: str) -> bool:
+    return nombre.lower().endswith(ReinspeccionConfig.EXTENSIONES)
+
+
+def enumerar_entradas(rutas: List[str]) -> Iterator[Elemento]:
+    """
+    Recorre las entradas y genera un elemento por imagen, en orden estable.
+
+    Soporta directorios (recursivo), imágenes sueltas, .zip, .tar(.gz), archivos de
+    frames (.frames) y pilas .npy.
+    """
+    from modules.capture.frame_archive import EXTENSION as EXTENSION_FRAMES
+
+    for ruta in rutas:
+        ruta = os.path.normpath(ruta)
+        if not os.path.exists(ruta):
+            print(f"⚠️ Entrada ignorada (no existe): {ruta}")
+        elif os.path.isdir(ruta):
+            for raiz, directorios, archivos in os.walk(ruta):
+                directorios.sort()
+                for archivo in sorted(archivos):
+                    if _es_imagen(archivo):
+                        completa = os.path.join(raiz, archivo)
+                        yield completa, "archivo", completa, None
+        elif ruta.lower().endswith(".zip"):
+            with zipfile.ZipFile(ruta) as z:
+                for miembro in sorted(n for n in z.namelist() if _es_imagen(n)):
+                    yield f"{ruta}::{miembro}", "zip", ruta, miembro
+        elif ruta.lower().endswith((".tar", ".tar.gz", ".tgz")):
+            with tarfile.open(ruta) as t:
+                for miembro in sorted(m.name for m in t.getmembers() if m.isfile() and _es_imagen(m.name)):
+                    yield f"{ruta}::{miembro}", "tar", ruta, miembro
+        elif ruta.lower().endswith(EXTENSION_FRAMES):
+            from modules.capture.frame_archive import LectorArchivoFrames
+            with LectorArchivoFrames(ruta) as lector:
+                total = len(lector)
+            for i in range(total):
+                yield f"{ruta}#{i}", "frames", ruta, str(i)
+        elif ruta.lower().endswith(".npy"):
+            pila = np.load(ruta, mmap_mode="r")
+            total = 1 if pila.ndim == 2 or (pila.ndim == 3 and pila.shape[-1] == 3) else len(pila)
+            for i in range(total):
+                yield f"{ruta}#{i}", "npy", ruta, str(i)
+        elif _es_imagen(ruta):
+            yield ruta, "archivo", ruta, None
+        else:
+            print(f"⚠️ Entrada ignorada (formato no soportado): {ruta}")
+
+
+# ==================== ARCHIVO DE RESULTADOS ====================
+
+def columnas_resultados(analisis: List[str]) -> List[str]:
+    """Columnas del CSV para el subconjunto de análisis elegido."""
+    columnas = ["id", "ancho", "alto", "error", "tiempo_ms"]
+    for etapa in analisis:
+        if etapa == "clasificacion":
+            columnas += ["clasificacion_clase", "clasificacion_confianza"]
+            continue
+        columnas += [f"{etapa}_n", f"{etapa}_confianza_max"]
+        if etapa.startswith("segmentacion"):
+            columnas.append(f"{etapa}_area_mascaras")
+        columnas.append(f"{etapa}_cajas")
+    return columnas
+
+
+def leer_procesados(ruta: str, columnas: List[str]) -> Set[str]:
+    """
+    Ids ya presentes en el CSV (para reanudar).
+
+    Recorta un último renglón incompleto (interrupción a mitad de escritura) y exige
+    que las columnas coincidan con las del subconjunto de análisis actual.
+    """
+    if not os.path.exists(ruta) or os.path.getsize(ruta) == 0:
+        return set()
+
+    with open(ruta, "rb+") as f:
+        contenido = f.read()
+        if not contenido.endswith(b"\n"):
+            f.truncate(contenido.rfind(b"\n") + 1)
+
+    with open(ruta, "r", newline="", encoding="utf-8") as f:
+        lector = csv.DictReader(f)
+        if lector.fieldnames != columnas:
+            raise ValueError(f"las columnas de {ruta} no corresponden a los análisis elegidos "
+                             f"(use --reiniciar u otro --salida)")
+        return {fila["id"] for fila in lector}
+
+
+# ==================== TRABAJADOR ====================
+
+_MOTORES: Dict[str, object] = {}
+_ANALISIS: List[str] = []
+_DIRECTORIO_ANOTADAS: Optional[str] = None
+_FUENTES_ABIERTAS: Dict[str, object] = {}
+_ERROR_INICIALIZACION: Optional[str] = None
+
+
+def cargar_motores(analisis: List[str], hilos: int) -> Dict[str, object]:
+    """
+    Crea e inicializa los motores de los análisis elegidos.
+
+    Raises:
+        RuntimeError: Si algún modelo no se pudo cargar
+    """
+    motores = {}
+    if "clasificacion" in analisis:
+        from modules.classification import ClasificadorCoplesONNX
+        motor = ClasificadorCoplesONNX(hilos_intra_op=hilos)
+        if not motor.inicializar():
+            raise RuntimeError("no se pudo inicializar el clasificador")
+        motores["clasificacion"] = motor
+    if "deteccion_piezas" in analisis:
+        from modules.detection import DetectorPiezasCoples
+        try:
+            motores["deteccion_piezas"] = DetectorPiezasCoples(hilos_intra_op=hilos)
+        except Exception as e:
+            raise RuntimeError(f"no se pudo inicializar el detector de piezas: {e}")
+    if "deteccion_defectos" in analisis:
+        from modules.detection import DetectorDefectosCoples
+        motor = DetectorDefectosCoples(hilos_intra_op=hilos)
+        if not motor.inicializar():
+            raise RuntimeError("no se pudo inicializar el detector de defectos")
+        motores["deteccion_defectos"] = motor
+    if "segmentacion_defectos" in analisis:
+        from modules.segmentation import SegmentadorDefectosCoples
+        motor = SegmentadorDefectosCoples(hilos_intra_op=hilos)
+        if not motor._inicializar_modelo():
+            raise RuntimeError("no se pudo inicializar el segmentador de defectos")
+        motores["segmentacion_defectos"] = motor
+    if "segmentacion_piezas" in analisis:
+        from modules.segmentation.segmentation_piezas_engine import SegmentadorPiezasCoples
+        motor = SegmentadorPiezasCoples(hilos_intra_op=hilos)
+        if not motor.stats["inicializado"]:
+            raise RuntimeError("no se pudo inicializar el segmentador de piezas")
+        motores["segmentacion_piezas"] = motor
+
+    # Mismos umbrales de detección que aplica el sistema integrado al iniciar
+    umbrales = RobustezConfig.CONFIGURACION_DEFAULT
+    for etapa in ("deteccion_piezas", "deteccion_defectos"):
+        if etapa in motores:
+            motores[etapa].actualizar_umbrales(confianza_min=umbrales["confianza_min"],
+                                               iou_threshold=umbrales["iou_threshold"])
+    return motores
+
+
+def validar_modelos(analisis: List[str], directorio_modelos: Optional[str], verbose: bool = False):
+    """
+    Carga una vez en el proceso principal los modelos elegidos y los libera.
+
+    Un modelo faltante o inválido se detecta aquí, antes de crear el pool: un error en el
+    inicializador de un pool `spawn` solo haría que sus trabajadores se recrearan sin fin.
+
+    Raises:
+        RuntimeError: Si algún modelo no se pudo cargar
+    """
+    from modules.session_registry import obtener_registro
+
+    if directorio_modelos:
+        ModelsConfig.MODELS_DIR = directorio_modelos
+    salida = sys.stdout
+    try:
+        if not verbose:
+            sys.stdout = open(os.devnull, "w")
+        motores = cargar_motores(analisis, 1)
+        for motor in motores.values():
+            motor.liberar()
+    finally:
+        if sys.stdout is not salida:
+            sys.stdout.close()
+            sys.stdout = salida
+        obtener_registro().liberar()
+
+
+def _inicializar_trabajador(analisis: List[str], hilos: int, directorio_modelos: Optional[str],
+                            directorio_anotadas: Optional[str], verbose: bool):
+    """
+    Carga en el proceso trabajador sus propias sesiones ONNX (una por análisis elegido).
+
+    Nunca lanza excepciones: el pool recrearía al trabajador indefinidamente. El error se
+    guarda y procesar_bloque lo reporta como un renglón de error por imagen.
+    """
+    global _ANALISIS, _DIRECTORIO_ANOTADAS, _ERROR_INICIALIZACION
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")
+    if directorio_modelos:
+        ModelsConfig.MODELS_DIR = directorio_modelos
+    _ANALISIS = list(analisis)
+    _DIRECTORIO_ANOTADAS = directorio_anotadas
+
+    try:
+        _MOTORES.update(cargar_motores(analisis, hilos))
+    except Exception as e:
+        _ERROR_INICIALIZACION = f"inicialización: {e}"
+
+
+def _fuente_abierta(tipo: str, ruta: str):
+    """Archivo contenedor abierto una sola vez por trabajador."""
+    clave = f"{tipo}:{ruta}"
+    fuente = _FUENTES_ABIERTAS.get(clave)
+    if fuente is None:
+        if tipo == "zip":
+            fuente = zipfile.ZipFile(ruta)
+        elif tipo == "tar":
+            fuente = tarfile.open(ruta)
+        elif tipo == "frames":
+            from modules.capture.frame_archive import LectorArchivoFrames
+            fuente = LectorArchivoFrames(ruta)
+        else:
+            fuente = np.load(ruta, mmap_mode="r")
+        _FUENTES_ABIERTAS[clave] = fuente
+    return fuente
+
+
+def cargar_imagen(elemento: Elemento) -> np.ndarray:
+    """Lee la imagen de un elemento (los frames Bayer pasan por el debayer de la cámara)."""
+    _, tipo, ruta, miembro = elemento
+    if tipo == "archivo":
+        imagen = cv2.imread(ruta)
+    elif tipo in ("zip", "tar"):
+        fuente = _fuente_abierta(tipo, ruta)
+        datos = fuente.read(miembro) if tipo == "zip" else fuente.extractfile(miembro).read()
+        imagen = cv2.imdecode(np.frombuffer(datos, dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        fuente = _fuente_abierta(tipo, ruta)
+        if tipo == "npy" and (fuente.ndim == 2 or (fuente.ndim == 3 and fuente.shape[-1] == 3)):
+            imagen = np.array(fuente)
+        else:
+            imagen = np.array(fuente[int(miembro)])
+        if imagen.ndim == 2:
+            from modules.capture.debayer import debayer
+            imagen = debayer(imagen)
+    if imagen is None:
+        raise ValueError("no se pudo decodificar la imagen")
+    return imagen
+
+
+def _fila(etapa: str, resultado) -> Dict:
+    """Columnas de un análisis para una imagen."""
+    if etapa == "clasificacion":
+        clase, confianza, _ = resultado
+        return {"clasificacion_clase": clase or "", "clasificacion_confianza": round(float(confianza), 4)}
+
+    fila = {
+        f"{etapa}_n": len(resultado),
+        f"{etapa}_confianza_max": round(max((d["confianza"] for d in resultado), default=0.0), 4),
+        f"{etapa}_cajas": json.dumps([
+            [d["bbox"]["x1"], d["bbox"]["y1"], d["bbox"]["x2"], d["bbox"]["y2"],
+             round(float(d["confianza"]), 4), d["clase"]]
+            for d in resultado
+        ], ensure_ascii=False)
+    }
+    if etapa.startswith("segmentacion"):
+        fila[f"{etapa}_area_mascaras"] = sum(int(d.get("area_mascara", 0)) for d in resultado)
+    return fila
+
+
+def anotar(imagen: np.ndarray, resultados: Dict[str, object]) -> np.ndarray:
+    """Dibuja cajas, máscaras y la clase sobre una copia de la imagen (coordenadas de la imagen)."""
+    anotada = imagen.copy()
+
+    for etapa in ("segmentacion_piezas", "segmentacion_defectos"):
+        for seg in resultados.get(etapa, []):
+            mascara = seg.get("mascara")
+            if mascara is None or not hasattr(mascara, "bbox"):
+                continue
+            x1, y1, x2, y2 = mascara.bbox
+            local = mascara.local.astype(bool)
+            region = anotada[y1:y2, x1:x2]
+            region[local] = (0.6 * region[local] + 0.4 * np.array(COLORES[etapa])).astype(np.uint8)
+
+    for etapa in ("deteccion_piezas", "deteccion_defectos", "segmentacion_defectos", "segmentacion_piezas"):
+        for det in resultados.get(etapa, []):
+            caja = det["bbox"]
+            cv2.rectangle(anotada, (caja["x1"], caja["y1"]), (caja["x2"], caja["y2"]), COLORES[etapa], 2)
+            cv2.putText(anotada, f"{det['clase']} {det['confianza']:.2f}", (caja["x1"], max(caja["y1"] - 4, 10)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, COLORES[etapa], 1)
+
+    if "clasificacion" in resultados:
+        clase, confianza, _ = resultados["clasificacion"]
+        cv2.putText(anotada, f"{clase} {confianza:.1%}", (10, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    return anotada
+
+
+def _nombre_anotada(id_elemento: str) -> str:
+    base = id_elemento.replace("::", "__").replace("#", "_").replace(os.sep, "__").replace(":", "")
+    raiz, extension = os.path.splitext(base)
+    return (raiz if extension.lower() in ReinspeccionConfig.EXTENSIONES else base) + ".jpg"
+
+
+def procesar_bloque(bloque: List[Elemento]) -> Tuple[List[Dict], Dict[str, float]]:
+    """
+    Reinspecciona un bloque de imágenes con una inferencia por lote por análisis.
+
+    Returns:
+        Tuple: (filas del CSV, tiempo total en ms por análisis para el bloque)
+    """
+    if _ERROR_INICIALIZACION:
+        return [{"id": elemento[0], "error": _ERROR_INICIALIZACION} for elemento in bloque], {}
+
+    inicio = time.perf_counter()
+    filas, imagenes, validas = [], [], []
+    for elemento in bloque:
+        fila = {"id": elemento[0], "error": ""}
+        try:
+            imagen = cargar_imagen(elemento)
+            fila["alto"], fila["ancho"] = imagen.shape[:2]
+            imagenes.append(imagen)
+            validas.append(fila)
+        except Exception as e:
+            fila["error"] = f"lectura: {e}"
+        filas.append(fila)
+
+    tiempos = {}
+    resultados = [{} for _ in imagenes]
+    for etapa in _ANALISIS:
+        inicio_etapa = time.perf_counter()
+        try:
+            salidas = getattr(_MOTORES[etapa], METODOS_LOTE[etapa])(imagenes)
+        except Exception as e:
+            salidas = None
+            for fila in validas:
+                fila["error"] = f"{etapa}: {e}"
+        tiempos[etapa] = (time.perf_counter() - inicio_etapa) * 1000
+        if salidas is None:
+            continue
+        for fila, resultado, salida in zip(validas, resultados, salidas):
+            resultado[etapa] = salida
+            fila.update(_fila(etapa, salida))
+
+    if _DIRECTORIO_ANOTADAS:
+        for fila, imagen, resultado in zip(validas, imagenes, resultados):
+            try:
+                cv2.imwrite(os.path.join(_DIRECTORIO_ANOTADAS, _nombre_anotada(fila["id"])),
+                            anotar(imagen, resultado))
+            except Exception as e:
+                fila["error"] = fila["error"] or f"anotación: {e}"
+
+    tiempo_por_imagen = (time.perf_counter() - inicio) * 1000 / max(len(bloque), 1)
+    for fila in filas:
+        fila["tiempo_ms"] = round(tiempo_por_imagen, 2)
+    return filas, tiempos
+
+
+# ==================== PROCESO PRINCIPAL ====================
+
+def _bloques(elementos: List[Elemento], tamano: int) -> Iterator[List[Elemento]]:
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+def reinspeccionar(entradas: List[str], salida: str, analisis: List[str], procesos: int,
+                   tamano_bloque: int, directorio_anotadas: Optional[str] = None,
+                   directorio_modelos: Optional[str] = None, reiniciar: bool = False,
+                   verbose: bool = False) -> Dict:
+    """
+    Reinspecciona todas las imágenes de las entradas y agrega los resultados al CSV.
+
+    Returns:
+        Dict: Informe de throughput (imágenes, errores, tiempos por análisis)
+    """
+    columnas = columnas_resultados(analisis)
+    if reiniciar and os.path.exists(salida):
+        os.remove(salida)
+    procesados = leer_procesados(salida, columnas)
+
+    elementos = list(enumerar_entradas(entradas))
+    pendientes = [e for e in elementos if e[0] not in procesados]
+    print(f"🔎 {len(elementos)} imágenes encontradas, {len(elementos) - len(pendientes)} ya procesadas, "
+          f"{len(pendientes)} pendientes")
+
+    nucleos = os.cpu_count() or 1
+    procesos = max(1, min(procesos, len(pendientes) or 1))
+    hilos = max(1, nucleos // procesos)
+    if directorio_anotadas:
+        os.makedirs(directorio_anotadas, exist_ok=True)
+
+    informe = {
+        "entradas": entradas,
+        "salida": os.path.abspath(salida),
+        "analisis": analisis,
+        "imagenes_encontradas": len(elementos),
+        "imagenes_omitidas": len(elementos) - len(pendientes),
+        "imagenes_procesadas": 0,
+        "errores": 0,
+        "procesos": procesos,
+        "hilos_por_proceso": hilos,
+        "tamano_bloque": tamano_bloque,
+        "tiempo_primer_bloque_s": 0.0,
+        "tiempo_total_s": 0.0,
+        "imagenes_por_segundo": 0.0,
+        "tiempo_por_analisis_ms": {}
+    }
+    if not pendientes:
+        return informe
+
+    # Un modelo faltante se reporta aquí y no como trabajadores del pool que fallan sin fin
+    print("🔍 Verificando modelos...")
+    validar_modelos(analisis, directorio_modelos, verbose)
+
+    print(f"🧵 {procesos} procesos x {hilos} hilos intra-op, bloques de {tamano_bloque} imágenes")
+    inicio = time.perf_counter()
+    tiempos_analisis = {etapa: 0.0 for etapa in analisis}
+    nueva = not os.path.exists(salida) or os.path.getsize(salida) == 0
+    contexto = multiprocessing.get_context("spawn")  # Sesiones ONNX nunca heredadas por fork
+
+    with open(salida, "a", newline="", encoding="utf-8") as archivo, \
+            contexto.Pool(procesos, initializer=_inicializar_trabajador,
+                          initargs=(analisis, hilos, directorio_modelos, directorio_anotadas, verbose)) as pool:
+        escritor = csv.DictWriter(archivo, fieldnames=columnas)
+        if nueva:
+            escritor.writeheader()
+
+        primer_resultado = None
+        siguiente_reporte = ReinspeccionConfig.PROGRESO_CADA
+        for filas, tiempos in pool.imap_unordered(procesar_bloque, _bloques(pendientes, tamano_bloque)):
+            if primer_resultado is None:
+                primer_resultado = time.perf_counter()
+            escritor.writerows(filas)
+            archivo.flush()
+            informe["imagenes_procesadas"] += len(filas)
+            informe["errores"] += sum(1 for f in filas if f["error"])
+            for etapa, ms in tiempos.items():
+                tiempos_analisis[etapa] += ms
+
+            hechas = informe["imagenes_procesadas"]
+            if hechas >= siguiente_reporte or hechas == len(pendientes):
+                transcurrido = time.perf_counter() - inicio
+                print(f"   {hechas}/{len(pendientes)} imágenes - {hechas / transcurrido:.1f} img/s - "
+                      f"{informe['errores']} errores")
+                siguiente_reporte = hechas + ReinspeccionConfig.PROGRESO_CADA
+
+    total = time.perf_counter() - inicio
+    procesadas = informe["imagenes_procesadas"]
+    informe["tiempo_total_s"] = round(total, 2)
+    informe["tiempo_primer_bloque_s"] = round((primer_resultado or inicio) - inicio, 2)
+    informe["imagenes_por_segundo"] = round(procesadas / total, 2) if total > 0 else 0.0
+    informe["tiempo_por_analisis_ms"] = {
+        etapa: round(ms / procesadas, 2) if procesadas else 0.0 for etapa, ms in tiempos_analisis.items()
+    }
+    return informe
+
+
+def _argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reinspección offline de imágenes archivadas")
+    parser.add_argument("entradas", nargs="+",
+                        help="Directorios, imágenes, .zip/.tar, archivos .frames o pilas .npy")
+    parser.add_argument("--salida", default=ReinspeccionConfig.ARCHIVO_RESULTADOS, help="CSV de resultados")
+    parser.add_argument("--analisis", default=",".join(ANALISIS),
+                        help=f"Análisis a ejecutar, separados por comas ({','.join(ANALISIS)})")
+    parser.add_argument("--procesos", type=int, default=ReinspeccionConfig.PROCESOS,
+                        help="Procesos trabajadores (por defecto uno por núcleo)")
+    parser.add_argument("--lote", type=int, default=ReinspeccionConfig.TAMANO_BLOQUE,
+                        help="Imágenes por tarea (inferencia por lote si el modelo lo admite)")
+    parser.add_argument("--anotadas", default=None, help="Directorio para guardar imágenes anotadas")
+    parser.add_argument("--modelos", default=None, help="Directorio de modelos (por defecto ModelsConfig.MODELS_DIR)")
+    parser.add_argument("--reiniciar", action="store_true", help="Descartar el CSV existente en vez de reanudar")
+    parser.add_argument("--informe", default=None, help="Guardar el informe de throughput en JSON")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs de los motores")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _argumentos(argv)
+    analisis = [a.strip() for a in args.analisis.split(",") if a.strip()]
+    desconocidos = [a for a in analisis if a not in ANALISIS]
+    if desconocidos or not analisis:
+        print(f"❌ Análisis no reconocidos: {desconocidos or args.analisis}")
+        return 2
+
+    try:
+        informe = reinspeccionar(
+            args.entradas, args.salida, analisis,
+            procesos=args.procesos or os.cpu_count() or 1,
+            tamano_bloque=max(1, args.lote),
+            directorio_anotadas=args.anotadas,
+            directorio_modelos=os.path.abspath(args.modelos) if args.modelos else None,
+            reiniciar=args.reiniciar,
+            verbose=args.verbose
+        )
+    except Exception as e:
+        print(f"❌ Error en la reinspección: {e}")
+        return 1
+
+    print("📊 Reinspección terminada:")
+    print(f"   Imágenes procesadas: {informe['imagenes_procesadas']} "
+          f"(omitidas: {informe['imagenes_omitidas']}, errores: {informe['errores']})")
+    print(f"   Tiempo total: {informe['tiempo_total_s']} s (primer bloque, con carga de modelos: {informe['tiempo_primer_bloque_s']} s)")
+    print(f"   Throughput: {informe['imagenes_por_segundo']} img/s "
+          f"({informe['imagenes_por_segundo'] * 60:.0f} img/min)")
+    for etapa, ms in informe["tiempo_por_analisis_ms"].items():
+        print(f"   {etapa:<22} {ms:8.2f} ms/imagen")
+    print(f"   💾 Resultados en {informe['salida']}")
+
+    if args.informe:
+        with open(args.informe, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())